@@ -0,0 +1,264 @@
+"""
+Benchmark of gpx files ingestion and chart data: gpxpy objects walk
+(previous implementation) vs single-pass streaming parser and vectorized
+metrics.
+
+Usage (from repository root):
+
+    python benchmarks/gpx_ingest.py --points 50000 100000 500000
+
+For each size, a gpx file with 3 segments is generated in a temporary
+directory, both implementations are run and results are compared.
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import gpxpy
+
+from fittrackee.workouts.utils.gpx import get_chart_data
+from fittrackee.workouts.utils.gpx_stream import parse_gpx_stream
+
+STOPPED_SPEED_THRESHOLD = 1.0
+
+
+def generate_gpx_file(file_path: str, points: int, segments: int = 3) -> None:
+    rand = random.Random(points)
+    point_time = datetime(2025, 5, 1, 7, 0, tzinfo=timezone.utc)
+    latitude, longitude, elevation = 44.68095, 6.07367, 998.0
+    with open(file_path, "w") as f:
+        f.write(
+            "<?xml version='1.0' encoding='UTF-8'?>"
+            '<gpx version="1.1" creator="benchmark" '
+            'xmlns="http://www.topografix.com/GPX/1/1">'
+            "<trk><name>benchmark</name>"
+        )
+        for _ in range(segments):
+            f.write("<trkseg>")
+            for _ in range(points // segments):
+                point_time += timedelta(seconds=rand.choice([1, 1, 1, 2, 5]))
+                latitude += rand.uniform(-0.0001, 0.00015)
+                longitude += rand.uniform(-0.0001, 0.00015)
+                elevation += rand.uniform(-1.5, 1.5)
+                f.write(
+                    f'<trkpt lat="{latitude:.7f}" lon="{longitude:.7f}">'
+                    f"<ele>{elevation:.1f}</ele>"
+                    f"<time>{point_time.strftime('%Y-%m-%dT%H:%M:%SZ')}</time>"
+                    "</trkpt>"
+                )
+            f.write("</trkseg>")
+            point_time += timedelta(minutes=5)
+        f.write("</trk></gpx>")
+
+
+def gpxpy_walk(file_path: str) -> Dict:
+    """
+    Statistics calculated with gpxpy objects, as 'get_gpx_info' did before
+    streaming parser.
+    """
+    with open(file_path, "r") as f:
+        gpx = gpxpy.parse(f)
+    map_data: List = []
+    segments = []
+    max_speed = 0.0
+    for segment in gpx.tracks[0].segments:
+        for point in segment.points:
+            map_data.append([point.longitude, point.latitude])
+        moving_data = segment.get_moving_data(
+            stopped_speed_threshold=STOPPED_SPEED_THRESHOLD
+        )
+        max_speed = max(max_speed, moving_data.max_speed or 0)  # type: ignore
+        segments.append(
+            (
+                segment.get_duration(),
+                segment.get_elevation_extremes(),
+                segment.get_uphill_downhill(),
+                segment.get_moving_data(  # type: ignore
+                    stopped_speed_threshold=STOPPED_SPEED_THRESHOLD
+                )[:4],
+            )
+        )
+    return {
+        "segments": segments,
+        "duration": gpx.get_duration(),
+        "elevation": gpx.get_elevation_extremes(),
+        "hill": gpx.get_uphill_downhill(),
+        "moving_data": gpx.get_moving_data(
+            stopped_speed_threshold=STOPPED_SPEED_THRESHOLD
+        )[:4],
+        "max_speed": max_speed,
+        "bounds": list(gpx.get_bounds()),  # type: ignore
+        "map_data": map_data,
+    }
+
+
+def streaming_parser(file_path: str) -> Dict:
+    with open(file_path, "r") as f:
+        gpx = parse_gpx_stream(f, STOPPED_SPEED_THRESHOLD)
+    return {
+        "segments": [
+            (
+                segment.get_duration(),
+                segment.get_elevation_extremes(),
+                segment.get_uphill_downhill(),
+                segment.get_moving_data()[:4],
+            )
+            for segment in gpx.tracks[0].segments
+        ],
+        "duration": gpx.get_duration(),
+        "elevation": gpx.get_elevation_extremes(),
+        "hill": gpx.get_uphill_downhill(),
+        "moving_data": gpx.get_moving_data()[:4],
+        "max_speed": max(
+            segment.get_max_speed() for segment in gpx.tracks[0].segments
+        ),
+        "bounds": list(gpx.get_bounds()),  # type: ignore
+        "map_data": gpx.map_data,
+    }
+
+
+def gpxpy_chart_data(file_path: str) -> Dict:
+    """
+    Chart data calculated with gpxpy objects, as 'get_chart_data' did
+    before vectorized metrics.
+    """
+    with open(file_path, "r") as f:
+        gpx = gpxpy.parse(f)
+    chart_data = []
+    first_point = None
+    previous_point = None
+    previous_distance = 0.0
+    for segment in gpx.tracks[0].segments:
+        for point_idx, point in enumerate(segment.points):
+            if first_point is None:
+                first_point = point
+            distance = (
+                point.distance_3d(previous_point)
+                if point.elevation
+                and previous_point
+                and previous_point.elevation
+                else point.distance_2d(previous_point)  # type: ignore
+            ) or 0.0
+            distance += previous_distance
+            speed = segment.get_speed(point_idx)
+            chart_data.append(
+                {
+                    "distance": round(distance / 1000, 2),
+                    "duration": point.time_difference(first_point),
+                    "speed": (
+                        0 if speed is None else round((speed / 1000) * 3600, 2)
+                    ),
+                    "elevation": round(point.elevation, 1),  # type: ignore
+                }
+            )
+            previous_point = point
+            previous_distance = distance
+    return {"chart_data": chart_data}
+
+
+def vectorized_chart_data(file_path: str) -> Dict:
+    chart_data = get_chart_data(file_path) or []
+    return {
+        "chart_data": [
+            {
+                key: data[key]
+                for key in ["distance", "duration", "speed", "elevation"]
+            }
+            for data in chart_data
+        ]
+    }
+
+
+def are_close(value: Any, other_value: Any) -> bool:
+    """
+    Vectorized sums may differ from sequential sums on last digits
+    """
+    if isinstance(value, float) and isinstance(other_value, float):
+        return math.isclose(value, other_value, rel_tol=1e-9)
+    if isinstance(value, dict) and isinstance(other_value, dict):
+        return value.keys() == other_value.keys() and all(
+            are_close(value[key], other_value[key]) for key in value
+        )
+    if isinstance(value, (list, tuple)) and isinstance(
+        other_value, (list, tuple)
+    ):
+        return len(value) == len(other_value) and all(
+            are_close(item, other_item)
+            for item, other_item in zip(value, other_value)
+        )
+    return value == other_value
+
+
+def measure(
+    function: Callable[[str], Dict], file_path: str, repeat: int
+) -> Tuple[float, float, Dict]:
+    """
+    Returns best duration (in seconds), peak memory (in MB) and result
+    """
+    durations = []
+    result: Optional[Dict] = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(file_path)
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(durations), peak / 1024 / 1024, result  # type: ignore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--points", type=int, nargs="+", default=[50000, 100000, 500000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(  # noqa: T201
+        f"{'points':>8} | {'step':<10} | {'implementation':<16} | "
+        f"{'time (s)':>9} | {'peak (MB)':>9} | speedup"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for points in args.points:
+            file_path = os.path.join(tmp_dir, f"{points}.gpx")
+            generate_gpx_file(file_path, points)
+            for step, previous_function, new_function in [
+                ("ingest", gpxpy_walk, streaming_parser),
+                ("chart data", gpxpy_chart_data, vectorized_chart_data),
+            ]:
+                previous_time, previous_peak, previous_result = measure(
+                    previous_function, file_path, args.repeat
+                )
+                new_time, new_peak, new_result = measure(
+                    new_function, file_path, args.repeat
+                )
+                if not are_close(previous_result, new_result):
+                    raise AssertionError(
+                        f"{step} results differ for {points} points"
+                    )
+                for label, duration, peak, speedup in [
+                    ("gpxpy", previous_time, previous_peak, ""),
+                    (
+                        "vectorized",
+                        new_time,
+                        new_peak,
+                        f"x{previous_time / new_time:.1f}",
+                    ),
+                ]:
+                    print(  # noqa: T201
+                        f"{points:>8} | {step:<10} | {label:<16} | "
+                        f"{duration:>9.2f} | {peak:>9.1f} | {speedup}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
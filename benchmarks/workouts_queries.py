@@ -0,0 +1,400 @@
+"""
+Benchmark of user workouts queries (workouts list, latest workouts,
+timeline, statistics by sport, records) with previous indexes (single
+column index on 'user_id') vs composite and partial indexes.
+
+Usage (from repository root):
+
+    python benchmarks/workouts_queries.py \
+        --database-url postgresql://postgres@localhost:5432/fittrackee_bench \
+        --workouts 200000 --users 50 --repeat 5
+
+Tables are created and seeded in a temporary schema, in a transaction that
+is rolled back once benchmark is done (existing tables are not modified).
+For each query, median execution time reported by 'EXPLAIN ANALYZE' and
+scans used by plan are displayed.
+"""
+
+import argparse
+import statistics
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import (
+    Connection,
+    Select,
+    and_,
+    create_engine,
+    func,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.expression import nulls_last
+
+from fittrackee import db
+from fittrackee.equipments.models import WorkoutEquipment
+from fittrackee.users.models import User
+from fittrackee.visibility_levels import VisibilityLevel
+from fittrackee.workouts.models import (
+    RECORD_TYPES_COLUMNS,
+    WORKOUTS_SORTING_COLUMNS,
+    Sport,
+    Workout,
+)
+
+BENCHMARK_SCHEMA = "fittrackee_benchmark"
+HEAVY_USER_ID = 1
+# user with a few old workouts
+INACTIVE_USER_ID = 2
+SPORTS_COUNT = 4
+# index dropped by migration '84493b628330'
+PREVIOUS_INDEXES = ["CREATE INDEX ix_workouts_user_id ON workouts (user_id)"]
+NEW_INDEXES = [
+    "ix_workouts_user_id_workout_date",
+    "ix_workouts_user_id_sport_id_workout_date",
+    *[
+        f"ix_workouts_user_id_{column}_not_suspended"
+        for column in WORKOUTS_SORTING_COLUMNS
+    ],
+]
+
+
+def seed_database(
+    connection: Connection, heavy_user_workouts: int, users: int
+) -> None:
+    now = datetime.now(timezone.utc)
+    connection.execute(
+        User.__table__.insert(),  # type: ignore
+        [
+            {
+                "username": f"user_{user_id}",
+                "email": f"user_{user_id}@example.com",
+                "password": "benchmark",
+                "created_at": now,
+            }
+            for user_id in range(1, users + 3)
+        ],
+    )
+    connection.execute(
+        Sport.__table__.insert(),  # type: ignore
+        [{"label": f"sport {i}"} for i in range(1, SPORTS_COUNT + 1)],
+    )
+    # heavy user workouts, inactive user workouts, then workouts of other
+    # users (sharing the same number of workouts), about 1% of workouts are
+    # suspended and 10% have no ascent
+    for user_ids, workouts_count, start_date in [
+        ((HEAVY_USER_ID, HEAVY_USER_ID), heavy_user_workouts, "2015-01-01"),
+        ((INACTIVE_USER_ID, INACTIVE_USER_ID), 50, "2010-01-01"),
+        ((3, users + 2), heavy_user_workouts // users, "2015-01-01"),
+    ]:
+        connection.execute(
+            text(
+                """
+                INSERT INTO workouts (
+                  uuid, user_id, sport_id, creation_date, workout_date,
+                  duration, moving, distance, ascent, ave_speed, max_speed,
+                  suspended_at, workout_visibility)
+                SELECT
+                  md5(u || '-' || i)::uuid, u, 1 + i % :sports, now(),
+                  CAST(:start_date AS timestamptz)
+                    + i * interval '97 minutes' + u * interval '1 second',
+                  interval '1 second' * (1200 + i % 7200),
+                  interval '1 second' * (1100 + i % 7000),
+                  1 + (i * 7919 % 99000) / 1000.0,
+                  CASE WHEN i % 10 = 0 THEN NULL ELSE i % 1500 END,
+                  5 + (i * 31 % 4000) / 100.0,
+                  10 + (i * 17 % 6000) / 100.0,
+                  CASE WHEN i % 100 = 0 THEN now() END,
+                  'PUBLIC'
+                FROM generate_series(:user_from, :user_to) AS u,
+                     generate_series(1, :workouts) AS i
+                """
+            ),
+            {
+                "sports": SPORTS_COUNT,
+                "user_from": user_ids[0],
+                "user_to": user_ids[1],
+                "workouts": workouts_count,
+                "start_date": f"{start_date} 07:00+00",
+            },
+        )
+    connection.execute(text("ANALYZE"))
+
+
+def get_workouts_list_query(user_id: int, order_by: str, order: str) -> Select:
+    """
+    Authenticated user workouts list ('GET /api/workouts'), first page
+    """
+    column = getattr(Workout, order_by)
+    return (
+        select(Workout)
+        .outerjoin(WorkoutEquipment)
+        .where(
+            Workout.user_id == user_id,
+            Workout.suspended_at == None,  # noqa
+        )
+        .order_by(column.asc() if order == "asc" else column.desc())
+        .limit(5)
+    )
+
+
+def get_queries(users: int) -> Dict[str, Select]:
+    following_ids = list(range(3, min(users + 3, 23)))
+    limited_workouts = (
+        select(Workout)
+        .where(Workout.user_id == HEAVY_USER_ID, Workout.sport_id == 1)
+        .order_by(Workout.workout_date.desc())
+        .limit(1000)
+        .subquery()
+    )
+    ranked_workouts = (
+        select(
+            Workout.id.label("workout_id"),
+            *[
+                func.row_number()
+                .over(
+                    order_by=(
+                        nulls_last(getattr(Workout, column).desc()),
+                        Workout.workout_date,
+                    )
+                )
+                .label(record_type)
+                for record_type, column in RECORD_TYPES_COLUMNS.items()
+            ],
+        )
+        .where(Workout.user_id == HEAVY_USER_ID, Workout.sport_id == 1)
+        .subquery()
+    )
+    return {
+        "workouts list, by date desc": get_workouts_list_query(
+            HEAVY_USER_ID, "workout_date", "desc"
+        ),
+        "workouts list, by date asc": get_workouts_list_query(
+            HEAVY_USER_ID, "workout_date", "asc"
+        ),
+        "workouts list, by distance desc": get_workouts_list_query(
+            HEAVY_USER_ID, "distance", "desc"
+        ),
+        "workouts list, by duration asc": get_workouts_list_query(
+            HEAVY_USER_ID, "moving", "asc"
+        ),
+        "workouts list, by max. speed desc": get_workouts_list_query(
+            HEAVY_USER_ID, "max_speed", "desc"
+        ),
+        "workouts list, by date desc (inactive user)": (
+            get_workouts_list_query(INACTIVE_USER_ID, "workout_date", "desc")
+        ),
+        "workouts list, sport and date": (
+            select(Workout)
+            .where(
+                Workout.user_id == HEAVY_USER_ID,
+                Workout.suspended_at == None,  # noqa
+                Workout.sport_id == 2,
+            )
+            .order_by(Workout.workout_date.desc())
+            .limit(5)
+        ),
+        "previous workout": (
+            select(Workout)
+            .where(
+                Workout.user_id == HEAVY_USER_ID,
+                Workout.workout_date
+                <= datetime(2017, 6, 1, tzinfo=timezone.utc),
+            )
+            .order_by(Workout.workout_date.desc())
+            .limit(1)
+        ),
+        "user latest workouts": (
+            select(Workout)
+            .where(
+                Workout.suspended_at == None,  # noqa
+                Workout.user_id == HEAVY_USER_ID,
+                Workout.workout_visibility == VisibilityLevel.PUBLIC,
+            )
+            .order_by(Workout.workout_date.desc())
+            .limit(5)
+        ),
+        "user latest workouts (inactive user)": (
+            select(Workout)
+            .where(
+                Workout.suspended_at == None,  # noqa
+                Workout.user_id == INACTIVE_USER_ID,
+                Workout.workout_visibility == VisibilityLevel.PUBLIC,
+            )
+            .order_by(Workout.workout_date.desc())
+            .limit(5)
+        ),
+        "timeline": (
+            select(Workout)
+            .join(User, Workout.user_id == User.id)
+            .where(
+                or_(
+                    Workout.user_id == HEAVY_USER_ID,
+                    and_(
+                        Workout.suspended_at == None,  # noqa
+                        Workout.user_id.in_(following_ids),
+                        Workout.workout_visibility.in_(
+                            [VisibilityLevel.FOLLOWERS, VisibilityLevel.PUBLIC]
+                        ),
+                    ),
+                ),
+                User.suspended_at == None,  # noqa
+            )
+            .order_by(Workout.workout_date.desc())
+            .limit(5)
+        ),
+        "statistics by sport": (
+            select(
+                func.count(limited_workouts.c.id),
+                func.sum(limited_workouts.c.distance),
+                func.avg(limited_workouts.c.ave_speed),
+            )
+        ),
+        "records": (
+            select(Workout.id)
+            .join(ranked_workouts, Workout.id == ranked_workouts.c.workout_id)
+            .where(
+                or_(
+                    *[
+                        ranked_workouts.c[record_type] == 1
+                        for record_type in RECORD_TYPES_COLUMNS
+                    ]
+                )
+            )
+        ),
+    }
+
+
+def get_scans(plan: Dict) -> List[str]:
+    scans = []
+    if "Scan" in plan["Node Type"]:
+        scans.append(
+            f"{plan['Node Type']}"
+            + (f" ({plan['Index Name']})" if "Index Name" in plan else "")
+        )
+    for sub_plan in plan.get("Plans", []):
+        scans.extend(get_scans(sub_plan))
+    return scans
+
+
+def explain_analyze(
+    connection: Connection, query: Select, repeat: int
+) -> Tuple[float, List[str]]:
+    sql = str(
+        query.compile(
+            dialect=postgresql.dialect(),  # type: ignore
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+    durations = []
+    scans: List[str] = []
+    for _ in range(repeat):
+        result = connection.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        ).scalar_one()
+        durations.append(result[0]["Execution Time"])
+        scans = get_scans(result[0]["Plan"])
+    return statistics.median(durations), sorted(set(scans))
+
+
+def run_queries(
+    connection: Connection, queries: Dict[str, Select], repeat: int
+) -> Dict[str, Tuple[float, List[str]]]:
+    return {
+        name: explain_analyze(connection, query, repeat)
+        for name, query in queries.items()
+    }
+
+
+def display_results(
+    previous_results: Dict[str, Tuple[float, List[str]]],
+    new_results: Dict[str, Tuple[float, List[str]]],
+) -> None:
+    print(  # noqa: T201
+        f"{'query':<44} {'previous (ms)':>14} {'new (ms)':>10} {'speedup':>8}"
+    )
+    for name, (previous_duration, previous_scans) in previous_results.items():
+        new_duration, new_scans = new_results[name]
+        print(  # noqa: T201
+            f"{name:<44} {previous_duration:>14.3f} {new_duration:>10.3f} "
+            f"{previous_duration / max(new_duration, 0.001):>7.1f}x"
+        )
+        print(f"    previous: {', '.join(previous_scans)}")  # noqa: T201
+        print(f"    new:      {', '.join(new_scans)}")  # noqa: T201
+
+
+def main(arguments: Any) -> None:
+    engine = create_engine(arguments.database_url)
+    tables = [
+        db.metadata.tables[table_name]
+        for table_name in [
+            "users",
+            "sports",
+            "equipment_types",
+            "equipments",
+            "workouts",
+            WorkoutEquipment.name,
+        ]
+    ]
+    with engine.connect() as connection:
+        connection.execute(text(f"CREATE SCHEMA {BENCHMARK_SCHEMA}"))
+        connection.execute(
+            text(f"SET LOCAL search_path TO {BENCHMARK_SCHEMA}")
+        )
+        try:
+            # tables are created with current indexes
+            db.metadata.create_all(connection, tables=tables)
+            print(  # noqa: T201
+                f"seeding database ({arguments.workouts} workouts for heavy "
+                f"user, {arguments.users} other users)..."
+            )
+            seed_database(connection, arguments.workouts, arguments.users)
+            queries = get_queries(arguments.users)
+            new_results = run_queries(connection, queries, arguments.repeat)
+
+            for index_name in NEW_INDEXES:
+                connection.execute(text(f"DROP INDEX {index_name}"))
+            for index_statement in PREVIOUS_INDEXES:
+                connection.execute(text(index_statement))
+            connection.execute(text("ANALYZE workouts"))
+            previous_results = run_queries(
+                connection, queries, arguments.repeat
+            )
+
+            display_results(previous_results, new_results)
+        finally:
+            # schema is removed with all seeded data
+            connection.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark workouts queries indexes"
+    )
+    parser.add_argument(
+        "--database-url",
+        required=True,
+        help="URL of a PostgreSQL database (tables are created in a "
+        "temporary schema)",
+    )
+    parser.add_argument(
+        "--workouts",
+        type=int,
+        default=200000,
+        help="number of heavy user workouts (default: 200000)",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=50,
+        help="number of other users (default: 50)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of executions for each query (default: 5)",
+    )
+    main(parser.parse_args())
@@ -126,6 +126,18 @@ def create_app(init_email: bool = True) -> Flask:
                 "EMAIL_URL is not provided, email sending is deactivated."
             )
 
+    from .files import FILES_OFFLOAD_MODES
+
+    if (
+        app.config["FILES_OFFLOAD"]
+        and app.config["FILES_OFFLOAD"] not in FILES_OFFLOAD_MODES
+    ):
+        appLog.warning(
+            f"invalid FILES_OFFLOAD value '{app.config['FILES_OFFLOAD']}', "
+            "files offload is deactivated."
+        )
+        app.config["FILES_OFFLOAD"] = ""
+
     # get configuration from database
     from .application.utils import (
         get_or_init_config,
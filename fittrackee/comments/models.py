@@ -2,12 +2,13 @@ from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 from uuid import UUID, uuid4
 
+from sqlalchemy import tuple_
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine.base import Connection
 from sqlalchemy.event import listens_for
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm.mapper import Mapper
-from sqlalchemy.orm.session import Session
+from sqlalchemy.orm.session import Session, object_session
 from sqlalchemy.sql import select
 from sqlalchemy.sql import text as sql_text
 from sqlalchemy.types import Enum
@@ -15,6 +16,7 @@ from sqlalchemy.types import Enum
 from fittrackee import BaseModel, db
 from fittrackee.database import TZDateTime
 from fittrackee.dates import aware_utc_now
+from fittrackee.flush_events import add_flush_event
 from fittrackee.utils import encode_uuid
 from fittrackee.visibility_levels import VisibilityLevel, can_view
 
@@ -340,40 +342,51 @@ class Mention(BaseModel):
         )
 
 
-@listens_for(Comment, "after_insert")
-def on_comment_insert(
-    mapper: Mapper, connection: Connection, new_comment: Comment
+def create_comments_notifications(
+    session: Session, new_comments: List[Comment]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        from fittrackee.users.models import FollowRequest, Notification, User
-        from fittrackee.workouts.models import Workout
-
-        # it creates notification on comment creation only when:
-        # - the comment author (notification.from_user_id) is not the recipient
-        #   (notification.to_user)
-        # - the comment is public
-        # - the recipient follows the comment author if privacy level is only
-        #   followers
+    from fittrackee.users.models import FollowRequest, Notification, User
+    from fittrackee.workouts.models import Workout
 
+    # it creates notification on comment creation only when:
+    # - the comment author (notification.from_user_id) is not the recipient
+    #   (notification.to_user)
+    # - the comment is public
+    # - the recipient follows the comment author if privacy level is only
+    #   followers
+
+    workouts = {
+        workout.id: workout
+        for workout in Workout.query.filter(
+            Workout.id.in_({comment.workout_id for comment in new_comments})
+        ).all()
+    }
+    recipients = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_({workout.user_id for workout in workouts.values()})
+        ).all()
+    }
+
+    for new_comment in new_comments:
         create_notification = False
         if new_comment.text_visibility == VisibilityLevel.PUBLIC:
             create_notification = True
 
-        workout = Workout.query.filter_by(id=new_comment.workout_id).first()
+        workout = workouts.get(new_comment.workout_id)
         if not workout:
-            return
+            continue
 
         to_user_id = workout.user_id
 
         if new_comment.user_id == to_user_id:
-            return
+            continue
 
-        to_user = User.query.filter_by(id=to_user_id).first()
+        to_user = recipients.get(to_user_id)
         if not to_user or not to_user.is_notification_enabled(
             "workout_comment"
         ):
-            return
+            continue
 
         if (
             not create_notification
@@ -389,7 +402,7 @@ def on_comment_insert(
             )
 
         if not create_notification:
-            return
+            continue
 
         notification = Notification(
             from_user_id=new_comment.user_id,
@@ -401,48 +414,82 @@ def on_comment_insert(
         session.add(notification)
 
 
+@listens_for(Comment, "after_insert")
+def on_comment_insert(
+    mapper: Mapper, connection: Connection, new_comment: Comment
+) -> None:
+    add_flush_event(
+        object_session(new_comment),
+        "comments_insert",
+        create_comments_notifications,
+        new_comment,
+    )
+
+
+def delete_comments_notifications(
+    session: Session, old_comments: List[Comment]
+) -> None:
+    from fittrackee.users.models import Notification
+
+    # delete all notifications related to deleted comments
+    Notification.query.filter(
+        Notification.event_object_id.in_(
+            [old_comment.id for old_comment in old_comments]
+        ),
+        Notification.event_type.in_(
+            [
+                "comment_like",
+                "mention",
+                "workout_comment",
+            ]
+        ),
+    ).delete()
+
+
 @listens_for(Comment, "after_delete")
 def on_comment_delete(
     mapper: Mapper, connection: Connection, old_comment: Comment
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        from fittrackee.users.models import Notification
-
-        # delete all notifications related to deleted comment
-        Notification.query.filter(
-            Notification.event_object_id == old_comment.id,
-            Notification.event_type.in_(
-                [
-                    "comment_like",
-                    "mention",
-                    "workout_comment",
-                ]
-            ),
-        ).delete()
+    add_flush_event(
+        object_session(old_comment),
+        "comments_delete",
+        delete_comments_notifications,
+        old_comment,
+    )
 
 
-@listens_for(Mention, "after_insert")
-def on_mention_insert(
-    mapper: Mapper, connection: Connection, new_mention: Mention
+def create_mentions_notifications(
+    session: Session, new_mentions: List[Mention]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        from fittrackee.users.models import Notification, User
-
-        comment = Comment.query.filter_by(id=new_mention.comment_id).first()
+    from fittrackee.users.models import Notification, User
+
+    comments = {
+        comment.id: comment
+        for comment in Comment.query.filter(
+            Comment.id.in_({mention.comment_id for mention in new_mentions})
+        ).all()
+    }
+    recipients = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_({mention.user_id for mention in new_mentions})
+        ).all()
+    }
+
+    for new_mention in new_mentions:
+        comment = comments.get(new_mention.comment_id)
         if not comment:
-            return
+            continue
 
         # `mention` notification is not created when:
 
         # - mentioned user is comment author
         if new_mention.user_id == comment.user_id:
-            return
+            continue
 
-        to_user = User.query.filter_by(id=new_mention.user_id).first()
+        to_user = recipients.get(new_mention.user_id)
         if not to_user or not to_user.is_notification_enabled("mention"):
-            return
+            continue
 
         # - mentioned user is workout owner and 'workout_comment'
         # notification does not exist
@@ -458,7 +505,7 @@ def on_mention_insert(
             .first()
         )
         if notification:
-            return
+            continue
 
         notification = Notification(
             from_user_id=comment.user_id,
@@ -470,19 +517,44 @@ def on_mention_insert(
         session.add(notification)
 
 
+@listens_for(Mention, "after_insert")
+def on_mention_insert(
+    mapper: Mapper, connection: Connection, new_mention: Mention
+) -> None:
+    add_flush_event(
+        object_session(new_mention),
+        "mentions_insert",
+        create_mentions_notifications,
+        new_mention,
+    )
+
+
+def delete_mentions_notifications(
+    session: Session, old_mentions: List[Mention]
+) -> None:
+    from fittrackee.users.models import Notification
+
+    Notification.query.filter(
+        tuple_(Notification.to_user_id, Notification.event_object_id).in_(
+            [
+                (old_mention.user_id, old_mention.comment_id)
+                for old_mention in old_mentions
+            ]
+        ),
+        Notification.event_type == "mention",
+    ).delete()
+
+
 @listens_for(Mention, "after_delete")
 def on_mention_delete(
     mapper: Mapper, connection: Connection, old_mention: Mention
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        from fittrackee.users.models import Notification
-
-        Notification.query.filter_by(
-            to_user_id=old_mention.user_id,
-            event_type="mention",
-            event_object_id=old_mention.comment_id,
-        ).delete()
+    add_flush_event(
+        object_session(old_mention),
+        "mentions_delete",
+        delete_mentions_notifications,
+        old_mention,
+    )
 
 
 class CommentLike(BaseModel):
@@ -520,53 +592,102 @@ class CommentLike(BaseModel):
         )
 
 
+def create_comment_likes_notifications(
+    session: Session, new_comment_likes: List[CommentLike]
+) -> None:
+    from fittrackee.users.models import Notification, User
+
+    comments = {
+        comment.id: comment
+        for comment in Comment.query.filter(
+            Comment.id.in_(
+                {comment_like.comment_id for comment_like in new_comment_likes}
+            )
+        ).all()
+    }
+    recipients = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_({comment.user_id for comment in comments.values()})
+        ).all()
+    }
+
+    for new_comment_like in new_comment_likes:
+        comment = comments.get(new_comment_like.comment_id)
+        if not comment or new_comment_like.user_id == comment.user_id:
+            continue
+
+        to_user = recipients.get(comment.user_id)
+        if not to_user or not to_user.is_notification_enabled("comment_like"):
+            continue
+
+        notification = Notification(
+            from_user_id=new_comment_like.user_id,
+            to_user_id=comment.user_id,
+            created_at=new_comment_like.created_at,
+            event_type="comment_like",
+            event_object_id=comment.id,
+        )
+        session.add(notification)
+
+
 @listens_for(CommentLike, "after_insert")
 def on_comment_like_insert(
     mapper: Mapper, connection: Connection, new_comment_like: CommentLike
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        from fittrackee.users.models import Notification, User
+    add_flush_event(
+        object_session(new_comment_like),
+        "comment_likes_insert",
+        create_comment_likes_notifications,
+        new_comment_like,
+    )
 
-        comment = Comment.query.filter_by(
-            id=new_comment_like.comment_id
-        ).first()
-        if not comment:
-            return
-
-        if new_comment_like.user_id != comment.user_id:
-            to_user = User.query.filter_by(id=comment.user_id).first()
-            if not to_user or not to_user.is_notification_enabled(
-                "comment_like"
-            ):
-                return
-
-            notification = Notification(
-                from_user_id=new_comment_like.user_id,
-                to_user_id=comment.user_id,
-                created_at=new_comment_like.created_at,
-                event_type="comment_like",
-                event_object_id=comment.id,
+
+def delete_comment_likes_notifications(
+    session: Session, old_comment_likes: List[CommentLike]
+) -> None:
+    from fittrackee.users.models import Notification
+
+    comments_authors: Dict[int, int] = {
+        comment_id: user_id
+        for comment_id, user_id in db.session.query(
+            Comment.id, Comment.user_id
+        )
+        .filter(
+            Comment.id.in_(
+                {comment_like.comment_id for comment_like in old_comment_likes}
             )
-            session.add(notification)
+        )
+        .all()
+    }
+    notifications_keys = [
+        (
+            old_comment_like.user_id,
+            comments_authors[old_comment_like.comment_id],
+            old_comment_like.comment_id,
+        )
+        for old_comment_like in old_comment_likes
+        if old_comment_like.comment_id in comments_authors
+    ]
+    if not notifications_keys:
+        return
+    Notification.query.filter(
+        tuple_(
+            Notification.from_user_id,
+            Notification.to_user_id,
+            Notification.event_object_id,
+        ).in_(notifications_keys),
+        Notification.event_type == "comment_like",
+    ).delete()
 
 
 @listens_for(CommentLike, "after_delete")
 def on_comment_like_delete(
     mapper: Mapper, connection: Connection, old_comment_like: CommentLike
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        from fittrackee.users.models import Notification
-
-        comment = Comment.query.filter_by(
-            id=old_comment_like.comment_id
-        ).first()
-        if not comment:
-            return
-        Notification.query.filter_by(
-            from_user_id=old_comment_like.user_id,
-            to_user_id=comment.user_id,
-            event_type="comment_like",
-            event_object_id=comment.id,
-        ).delete()
+    add_flush_event(
+        object_session(old_comment_like),
+        "comment_likes_delete",
+        delete_comment_likes_notifications,
+        old_comment_like,
+    )
@@ -56,7 +56,30 @@ class BaseConfig:
             os.environ.get("DEFAULT_STATICMAP", "false").lower() == "true"
         ),
         "STATICMAP_SUBDOMAINS": os.environ.get("STATICMAP_SUBDOMAINS", ""),
+        # local tiles file, replaces tile server if provided
+        "MBTILES_FILE": os.environ.get("TILE_SERVER_MBTILES_FILE"),
+        # tiles cache for static maps (disabled if folder is empty)
+        "CACHE_FOLDER": os.environ.get(
+            "TILE_CACHE_FOLDER", os.path.join(UPLOAD_FOLDER, "tiles")
+        ),
+        # in bytes (no limit if 0)
+        "CACHE_MAX_SIZE": (
+            int(os.environ.get("TILE_CACHE_MAX_SIZE", 500)) * 1024 * 1024
+        ),
+        # in seconds (tiles do not expire if 0)
+        "CACHE_TTL": int(os.environ.get("TILE_CACHE_TTL", 604800)),
     }
+    # files served by reverse proxy ("x-accel-redirect" or "x-sendfile"),
+    # disabled if empty
+    FILES_OFFLOAD = os.environ.get("FILES_OFFLOAD", "").lower()
+    # nginx internal location pointing to upload folder
+    FILES_X_ACCEL_REDIRECT_PREFIX = os.environ.get(
+        "FILES_X_ACCEL_REDIRECT_PREFIX", "/internal-uploads/"
+    )
+    # number of processes used to process gpx files from zip archives
+    WORKOUTS_PROCESSING_WORKERS = int(
+        os.environ.get("WORKOUTS_PROCESSING_WORKERS", 1)
+    )
     TRANSLATIONS_FOLDER = os.path.join(
         current_app.root_path, "emails/translations"
     )
@@ -89,6 +112,10 @@ class TestingConfig(BaseConfig):
         os.getenv("UPLOAD_FOLDER", current_app.root_path),
         "uploads" + XDIST_WORKER,
     )
+    TILE_SERVER = {
+        **BaseConfig.TILE_SERVER,
+        "CACHE_FOLDER": os.path.join(UPLOAD_FOLDER, "tiles"),
+    }
     SECRET_KEY = "test key"  # nosec
     BCRYPT_LOG_ROUNDS = 4
     TOKEN_EXPIRATION_DAYS = 0
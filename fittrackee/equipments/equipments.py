@@ -2,7 +2,7 @@ from datetime import timedelta
 from typing import Dict, List, Tuple, Union
 
 from flask import Blueprint, request
-from sqlalchemy import exc, func
+from sqlalchemy import exc
 from sqlalchemy.dialects.postgresql import insert
 
 from fittrackee import db
@@ -21,11 +21,11 @@ from fittrackee.users.models import (
 )
 from fittrackee.utils import decode_short_id
 from fittrackee.visibility_levels import VisibilityLevel
-from fittrackee.workouts.models import Sport, Workout
+from fittrackee.workouts.models import Sport
 
 from .exceptions import InvalidEquipmentsException
 from .models import Equipment, EquipmentType, WorkoutEquipment
-from .utils import SPORT_EQUIPMENT_TYPES
+from .utils import SPORT_EQUIPMENT_TYPES, update_equipment_totals
 
 equipments_blueprint = Blueprint("equipments", __name__)
 
@@ -834,34 +834,7 @@ def refresh_equipment(
         return DataNotFoundErrorResponse("equipments")
 
     try:
-        totals = (
-            db.session.query(
-                func.sum(Workout.distance).label("total_distance"),
-                func.sum(Workout.duration).label("total_duration"),
-                func.sum(Workout.moving).label("total_moving"),
-                func.count(Workout.id).label("total_workouts"),
-            )
-            .join(WorkoutEquipment)
-            .filter(WorkoutEquipment.c.equipment_id == equipment.id)
-            .one()
-            ._asdict()
-        )
-        equipment.total_distance = (
-            0.0
-            if totals["total_distance"] is None
-            else totals["total_distance"]
-        )
-        equipment.total_duration = (
-            timedelta()
-            if totals["total_duration"] is None
-            else totals["total_duration"]
-        )
-        equipment.total_moving = (
-            timedelta()
-            if totals["total_moving"] is None
-            else totals["total_moving"]
-        )
-        equipment.total_workouts = totals["total_workouts"]
+        update_equipment_totals(equipment)
 
         db.session.commit()
 
@@ -1,9 +1,13 @@
+from datetime import timedelta
 from typing import List, Optional, Union
 
-from fittrackee.equipments.models import Equipment
+from sqlalchemy import func
+
+from fittrackee import db
+from fittrackee.equipments.models import Equipment, WorkoutEquipment
 from fittrackee.users.models import User
 from fittrackee.utils import decode_short_id
-from fittrackee.workouts.models import Sport
+from fittrackee.workouts.models import Sport, Workout
 
 from .exceptions import InvalidEquipmentException, InvalidEquipmentsException
 
@@ -95,3 +99,35 @@ def handle_equipments(
                 )
             equipments_list.append(equipment)
     return equipments_list
+
+
+def update_equipment_totals(equipment: Equipment) -> None:
+    """
+    Calculate equipment totals from associated workouts
+    """
+    totals = (
+        db.session.query(
+            func.sum(Workout.distance).label("total_distance"),
+            func.sum(Workout.duration).label("total_duration"),
+            func.sum(Workout.moving).label("total_moving"),
+            func.count(Workout.id).label("total_workouts"),
+        )
+        .join(WorkoutEquipment)
+        .filter(WorkoutEquipment.c.equipment_id == equipment.id)
+        .one()
+        ._asdict()
+    )
+    equipment.total_distance = (
+        0.0 if totals["total_distance"] is None else totals["total_distance"]
+    )
+    equipment.total_duration = (
+        timedelta()
+        if totals["total_duration"] is None
+        else totals["total_duration"]
+    )
+    equipment.total_moving = (
+        timedelta()
+        if totals["total_moving"] is None
+        else totals["total_moving"]
+    )
+    equipment.total_workouts = totals["total_workouts"]
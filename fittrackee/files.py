@@ -1,7 +1,14 @@
 import os
-from typing import Union
+from typing import Optional, Union
+from urllib.parse import quote
 
-from flask import current_app
+from flask import Response, current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import safe_join, send_file
+
+FILES_OFFLOAD_MODES = ["x-accel-redirect", "x-sendfile"]
+# for files whose url changes when content changes (1 year)
+IMMUTABLE_FILE_MAX_AGE = 31536000
 
 
 def display_readable_file_size(size_in_bytes: Union[float, int]) -> str:
@@ -21,3 +28,54 @@ def display_readable_file_size(size_in_bytes: Union[float, int]) -> str:
 
 def get_absolute_file_path(relative_path: str) -> str:
     return os.path.join(current_app.config["UPLOAD_FOLDER"], relative_path)
+
+
+def send_upload_file(
+    relative_path: str,
+    *,
+    mimetype: Optional[str] = None,
+    as_attachment: bool = False,
+    download_name: Optional[str] = None,
+    immutable: bool = False,
+) -> Response:
+    """
+    Send file stored in upload folder.
+
+    If files offload is enabled, file is served by reverse proxy, with
+    'X-Accel-Redirect' (nginx) or 'X-Sendfile' header (reverse proxy also
+    handles conditional and range requests). Otherwise, file is sent by
+    application, with conditional and range requests support.
+
+    Immutable files (files whose url changes when content changes, like
+    workout maps) can be cached by clients without revalidation.
+
+    Raises NotFound if file does not exist.
+    """
+    file_path = safe_join(current_app.config["UPLOAD_FOLDER"], relative_path)
+    if file_path is None or not os.path.isfile(file_path):
+        raise NotFound()
+
+    offload = current_app.config["FILES_OFFLOAD"]
+    response = send_file(
+        file_path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=not offload,
+        use_x_sendfile=bool(offload),
+        response_class=current_app.response_class,
+    )
+    if offload == "x-accel-redirect":
+        del response.headers["X-Sendfile"]
+        prefix = current_app.config["FILES_X_ACCEL_REDIRECT_PREFIX"]
+        response.headers["X-Accel-Redirect"] = (
+            f"{prefix.rstrip('/')}/{quote(relative_path)}"
+        )
+
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = IMMUTABLE_FILE_MAX_AGE
+        response.cache_control.immutable = True
+    return response  # type: ignore[return-value]
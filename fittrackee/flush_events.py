@@ -0,0 +1,57 @@
+from typing import Any, Callable, Dict, Hashable, List, Union
+
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm.session import Session, SessionTransaction
+
+from fittrackee import db
+
+FLUSH_EVENTS_KEY = "flush_events"
+
+FlushEventHandler = Callable[[Session, List[Any]], None]
+
+
+class FlushEvent:
+    def __init__(self, handler: FlushEventHandler) -> None:
+        self.handler = handler
+        self.items: List[Any] = []
+
+
+def add_flush_event(
+    session: Union[Session, scoped_session, None],
+    key: Hashable,
+    handler: FlushEventHandler,
+    item: Any = None,
+) -> None:
+    """
+    Collect a side effect to execute once current flush is done.
+
+    Side effects with the same key are coalesced: handler is called once
+    with all collected items (in collection order).
+    Handlers are called in the order in which the keys were first added.
+    """
+    session_info = db.session.info if session is None else session.info
+    flush_events: Dict[Hashable, FlushEvent] = session_info.setdefault(
+        FLUSH_EVENTS_KEY, {}
+    )
+    if key not in flush_events:
+        flush_events[key] = FlushEvent(handler)
+    if item is not None:
+        flush_events[key].items.append(item)
+
+
+@listens_for(db.Session, "after_flush")
+def run_flush_events(session: Session, flush_context: Any) -> None:
+    flush_events = session.info.pop(FLUSH_EVENTS_KEY, None)
+    if not flush_events:
+        return
+    for flush_event in flush_events.values():
+        flush_event.handler(session, flush_event.items)
+
+
+@listens_for(db.Session, "after_soft_rollback")
+def clear_flush_events(
+    session: Session, previous_transaction: SessionTransaction
+) -> None:
+    # side effects collected during a failed flush must not be executed
+    session.info.pop(FLUSH_EVENTS_KEY, None)
@@ -0,0 +1,69 @@
+"""add workouts daily stats
+
+Revision ID: acfa8c801369
+Revises: e6999fec0cf4
+Create Date: 2026-10-18 21:42:05.163820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'acfa8c801369'
+down_revision = 'e6999fec0cf4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('workouts_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sport_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total_workouts', sa.Integer(), nullable=False),
+    sa.Column('total_distance', sa.Numeric(precision=12, scale=3), nullable=False),
+    sa.Column('total_duration', sa.Interval(), nullable=False),
+    sa.Column('total_ascent', sa.Numeric(precision=14, scale=3), nullable=True),
+    sa.Column('ascent_count', sa.Integer(), nullable=False),
+    sa.Column('total_descent', sa.Numeric(precision=14, scale=3), nullable=True),
+    sa.Column('descent_count', sa.Integer(), nullable=False),
+    sa.Column('total_ave_speed', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('ave_speed_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sport_id'], ['sports.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'sport_id', 'day')
+    )
+
+    # days are calculated in user timezone
+    op.execute(
+        """
+        INSERT INTO workouts_daily_stats (
+          user_id, sport_id, day, total_workouts, total_distance,
+          total_duration, total_ascent, ascent_count, total_descent,
+          descent_count, total_ave_speed, ave_speed_count
+        )
+        SELECT workouts.user_id,
+               workouts.sport_id,
+               date(timezone(
+                 COALESCE(users.timezone, 'UTC'),
+                 timezone('Z', workouts.workout_date)
+               )) AS day,
+               count(workouts.id),
+               COALESCE(sum(workouts.distance), 0),
+               COALESCE(sum(workouts.moving), interval '0'),
+               sum(workouts.ascent),
+               count(workouts.ascent),
+               sum(workouts.descent),
+               count(workouts.descent),
+               COALESCE(sum(workouts.ave_speed), 0),
+               count(workouts.ave_speed)
+        FROM workouts
+        JOIN users ON users.id = workouts.user_id
+        GROUP BY workouts.user_id, workouts.sport_id, day;
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('workouts_daily_stats')
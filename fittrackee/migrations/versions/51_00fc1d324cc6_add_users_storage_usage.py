@@ -0,0 +1,92 @@
+"""add users storage usage
+
+Revision ID: 00fc1d324cc6
+Revises: acfa8c801369
+Create Date: 2026-10-18 22:31:12.481530
+
+"""
+import os
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '00fc1d324cc6'
+down_revision = 'acfa8c801369'
+branch_labels = None
+depends_on = None
+
+MAPS_EXTENSIONS = ('.png', '.webp')
+EXCLUDED_FILES_EXTENSIONS = ('.lock', '.columns')
+
+
+def get_storage_usage_from_files(upload_folder, users_ids):
+    # same categories as 'fittrackee.users.storage.get_storage_key'
+    storage_usage = defaultdict(int)
+    for directory in ['workouts', 'pictures', 'exports']:
+        for user_id in users_ids:
+            user_directory = os.path.join(
+                upload_folder, directory, str(user_id)
+            )
+            for dir_path, dir_names, file_names in os.walk(user_directory):
+                if dir_path == user_directory and directory == 'workouts':
+                    # temporary upload files
+                    dir_names[:] = [
+                        dir_name
+                        for dir_name in dir_names
+                        if dir_name != 'uploads'
+                    ]
+                for file_name in file_names:
+                    if file_name.endswith(EXCLUDED_FILES_EXTENSIONS):
+                        continue
+                    if directory != 'workouts':
+                        category = directory
+                    elif file_name.endswith(MAPS_EXTENSIONS):
+                        category = 'maps'
+                    else:
+                        category = 'gpx'
+                    try:
+                        storage_usage[(user_id, category)] += (
+                            os.path.getsize(os.path.join(dir_path, file_name))
+                        )
+                    except OSError:
+                        pass
+    return storage_usage
+
+
+def upgrade():
+    op.create_table('users_storage_usage',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=20), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'category')
+    )
+
+    # storage usage is calculated from existing files (it can be
+    # calculated again with 'ftcli users reconcile_storage_usage')
+    connection = op.get_bind()
+    users_ids = connection.execute(
+        sa.text('SELECT id FROM users')
+    ).scalars().all()
+    storage_usage = get_storage_usage_from_files(
+        current_app.config['UPLOAD_FOLDER'], users_ids
+    )
+    if storage_usage:
+        connection.execute(
+            sa.text(
+                'INSERT INTO users_storage_usage (user_id, category, size) '
+                'VALUES (:user_id, :category, :size)'
+            ),
+            [
+                {'user_id': user_id, 'category': category, 'size': size}
+                for (user_id, category), size in storage_usage.items()
+            ],
+        )
+
+
+def downgrade():
+    op.drop_table('users_storage_usage')
@@ -0,0 +1,42 @@
+"""add composite indexes on workouts
+
+Revision ID: 84493b628330
+Revises: 00fc1d324cc6
+Create Date: 2026-10-18 23:29:41.282545
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '84493b628330'
+down_revision = '00fc1d324cc6'
+branch_labels = None
+depends_on = None
+
+WORKOUTS_SORTING_COLUMNS = ["ave_speed", "distance", "max_speed", "moving"]
+
+
+def upgrade():
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        # replaced by composite indexes starting with 'user_id'
+        batch_op.drop_index('ix_workouts_user_id')
+        batch_op.create_index('ix_workouts_user_id_workout_date', ['user_id', 'workout_date'], unique=False)
+        batch_op.create_index('ix_workouts_user_id_sport_id_workout_date', ['user_id', 'sport_id', 'workout_date'], unique=False)
+        for column in WORKOUTS_SORTING_COLUMNS:
+            batch_op.create_index(
+                f'ix_workouts_user_id_{column}_not_suspended',
+                ['user_id', column],
+                unique=False,
+                postgresql_where=sa.text('suspended_at IS NULL'),
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        for column in WORKOUTS_SORTING_COLUMNS:
+            batch_op.drop_index(f'ix_workouts_user_id_{column}_not_suspended')
+        batch_op.drop_index('ix_workouts_user_id_sport_id_workout_date')
+        batch_op.drop_index('ix_workouts_user_id_workout_date')
+        batch_op.create_index('ix_workouts_user_id', ['user_id'], unique=False)
@@ -6,12 +6,14 @@ from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine.base import Connection
 from sqlalchemy.event import listens_for
 from sqlalchemy.orm import Mapped, Mapper, Session, mapped_column, relationship
+from sqlalchemy.orm.session import object_session
 
 from fittrackee import BaseModel, db
 from fittrackee.comments.exceptions import CommentForbiddenException
 from fittrackee.comments.models import Comment
 from fittrackee.database import TZDateTime
 from fittrackee.dates import aware_utc_now
+from fittrackee.flush_events import add_flush_event
 from fittrackee.users.models import Notification, User
 from fittrackee.users.roles import UserRole
 from fittrackee.utils import encode_uuid
@@ -252,22 +254,24 @@ class Report(BaseModel):
         return report
 
 
-@listens_for(Report, "after_insert")
-def on_report_insert(
-    mapper: Mapper, connection: Connection, new_report: Report
+def get_active_moderators() -> List[User]:
+    return User.query.filter(
+        User.role >= UserRole.MODERATOR.value,
+        User.is_active == True,  # noqa
+    ).all()
+
+
+def create_reports_notifications(
+    session: Session, new_reports: List[Report]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
+    moderators = get_active_moderators()
+    for new_report in new_reports:
         if not new_report.reported_by:
-            return
+            continue
 
-        from fittrackee.users.models import Notification, User
-
-        for admin in User.query.filter(
-            User.role >= UserRole.MODERATOR.value,
-            User.id != new_report.reported_by,
-            User.is_active == True,  # noqa
-        ).all():
+        for admin in moderators:
+            if admin.id == new_report.reported_by:
+                continue
             notification = Notification(
                 from_user_id=new_report.reported_by,
                 to_user_id=admin.id,
@@ -278,6 +282,18 @@ def on_report_insert(
             session.add(notification)
 
 
+@listens_for(Report, "after_insert")
+def on_report_insert(
+    mapper: Mapper, connection: Connection, new_report: Report
+) -> None:
+    add_flush_event(
+        object_session(new_report),
+        "reports_insert",
+        create_reports_notifications,
+        new_report,
+    )
+
+
 class ReportComment(BaseModel):
     __tablename__ = "report_comments"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -600,14 +616,12 @@ class ReportActionAppeal(BaseModel):
         return appeal
 
 
-@listens_for(ReportAction, "after_insert")
-def on_report_action_insert(
-    mapper: Mapper, connection: Connection, new_action: ReportAction
+def create_report_actions_notifications(
+    session: Session, new_actions: List[ReportAction]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
+    for new_action in new_actions:
         if not new_action.moderator_id or not new_action.user_id:
-            return
+            continue
 
         if (
             new_action.action_type
@@ -625,32 +639,60 @@ def on_report_action_insert(
             session.add(notification)
 
 
+@listens_for(ReportAction, "after_insert")
+def on_report_action_insert(
+    mapper: Mapper, connection: Connection, new_action: ReportAction
+) -> None:
+    add_flush_event(
+        object_session(new_action),
+        "report_actions_insert",
+        create_report_actions_notifications,
+        new_action,
+    )
+
+
+def create_report_action_appeals_notifications(
+    session: Session, new_appeals: List[ReportActionAppeal]
+) -> None:
+    report_actions = {
+        report_action.id: report_action
+        for report_action in ReportAction.query.filter(
+            ReportAction.id.in_(
+                {new_appeal.action_id for new_appeal in new_appeals}
+            )
+        ).all()
+    }
+    if not report_actions:
+        return
+    moderators = get_active_moderators()
+    for new_appeal in new_appeals:
+        report_action = report_actions.get(new_appeal.action_id)
+        if not report_action:
+            continue
+        for admin in moderators:
+            if admin.id == new_appeal.user_id:
+                continue
+            notification = Notification(
+                from_user_id=new_appeal.user_id,
+                to_user_id=admin.id,
+                created_at=new_appeal.created_at,
+                event_type=(
+                    "user_warning_appeal"
+                    if report_action.action_type == "user_warning"
+                    else "suspension_appeal"
+                ),
+                event_object_id=new_appeal.id,
+            )
+            session.add(notification)
+
+
 @listens_for(ReportActionAppeal, "after_insert")
 def on_report_action_appeal_insert(
     mapper: Mapper, connection: Connection, new_appeal: ReportActionAppeal
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        from fittrackee.users.models import Notification, User
-
-        report_action = ReportAction.query.filter_by(
-            id=new_appeal.action_id
-        ).first()
-        if report_action:
-            for admin in User.query.filter(
-                User.role >= UserRole.MODERATOR.value,
-                User.id != new_appeal.user_id,
-                User.is_active == True,  # noqa
-            ).all():
-                notification = Notification(
-                    from_user_id=new_appeal.user_id,
-                    to_user_id=admin.id,
-                    created_at=new_appeal.created_at,
-                    event_type=(
-                        "user_warning_appeal"
-                        if report_action.action_type == "user_warning"
-                        else "suspension_appeal"
-                    ),
-                    event_object_id=new_appeal.id,
-                )
-                session.add(notification)
+    add_flush_event(
+        object_session(new_appeal),
+        "report_action_appeals_insert",
+        create_report_action_appeals_notifications,
+        new_appeal,
+    )
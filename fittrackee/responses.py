@@ -9,7 +9,7 @@ from fittrackee.files import display_readable_file_size
 
 
 def get_empty_data_for_datatype(data_type: str) -> Union[str, List]:
-    return "" if data_type in ["gpx", "chart_data"] else []
+    return "" if data_type in ["gpx", "chart_data", "geometry"] else []
 
 
 class HttpResponse(Response):
@@ -1,8 +1,9 @@
 import os
 
+import pytest
 from flask import Flask
 
-from fittrackee import DEFAULT_PRIVACY_POLICY_DATA, VERSION
+from fittrackee import DEFAULT_PRIVACY_POLICY_DATA, VERSION, create_app
 
 
 class TestDevelopmentConfig:
@@ -109,3 +110,26 @@ class TestProductionConfig:
             app.config["DEFAULT_PRIVACY_POLICY_DATA"]
             == DEFAULT_PRIVACY_POLICY_DATA
         )
+
+
+class TestFilesOffloadConfig:
+    @pytest.mark.parametrize(
+        "input_value,expected_value",
+        [
+            ("", ""),
+            ("X-Accel-Redirect", "x-accel-redirect"),
+            ("x-sendfile", "x-sendfile"),
+            ("invalid", ""),
+        ],
+    )
+    def test_it_sets_files_offload(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        input_value: str,
+        expected_value: str,
+    ) -> None:
+        monkeypatch.setenv("FILES_OFFLOAD", input_value)
+
+        app = create_app(init_email=False)
+
+        assert app.config["FILES_OFFLOAD"] == expected_value
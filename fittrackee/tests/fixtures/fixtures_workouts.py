@@ -31,8 +31,14 @@ def update_records_patch(request: pytest.FixtureRequest) -> Iterator[None]:
     if "disable_autouse_update_records_patch" in request.keywords:
         yield
     else:
-        with patch(
-            "fittrackee.workouts.models.update_records", return_value=None
+        with (
+            patch(
+                "fittrackee.workouts.models.update_records", return_value=None
+            ),
+            patch(
+                "fittrackee.workouts.models.update_records_with_workout",
+                return_value=None,
+            ),
         ):
             yield
 
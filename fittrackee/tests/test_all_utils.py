@@ -1,11 +1,13 @@
+import os
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Union
 
 import pytest
 from flask import Flask
+from werkzeug.exceptions import NotFound
 
 from fittrackee.dates import get_date_string_for_user, get_readable_duration
-from fittrackee.files import display_readable_file_size
+from fittrackee.files import display_readable_file_size, send_upload_file
 from fittrackee.request import UserAgent
 from fittrackee.utils import clean_input
 
@@ -32,6 +34,115 @@ class TestDisplayReadableFileSize:
         assert readable_file_size == expected_readable_size
 
 
+class TestSendUploadFile:
+    @staticmethod
+    def create_file(app: Flask, relative_path: str) -> str:
+        file_path = os.path.join(app.config["UPLOAD_FOLDER"], relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(b"0123456789")
+        return file_path
+
+    def test_it_raises_not_found_when_file_does_not_exist(
+        self, app: Flask
+    ) -> None:
+        with app.test_request_context(), pytest.raises(NotFound):
+            send_upload_file("workouts/1/file.gpx")
+
+    def test_it_raises_not_found_when_path_is_outside_upload_folder(
+        self, app: Flask
+    ) -> None:
+        with app.test_request_context(), pytest.raises(NotFound):
+            send_upload_file("../config.py")
+
+    def test_it_sends_file_with_strong_etag(self, app: Flask) -> None:
+        self.create_file(app, "workouts/1/file.gpx")
+
+        with app.test_request_context():
+            response = send_upload_file(
+                "workouts/1/file.gpx", as_attachment=True
+            )
+
+        response.direct_passthrough = False
+        assert response.status_code == 200
+        assert response.data == b"0123456789"
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.get_etag()[1] is False
+        assert response.headers["Content-Disposition"] == (
+            "attachment; filename=file.gpx"
+        )
+
+    def test_it_sends_requested_range(self, app: Flask) -> None:
+        self.create_file(app, "workouts/1/file.gpx")
+
+        with app.test_request_context(headers={"Range": "bytes=2-5"}):
+            response = send_upload_file("workouts/1/file.gpx")
+
+        response.direct_passthrough = False
+        assert response.status_code == 206
+        assert response.data == b"2345"
+        assert response.headers["Content-Range"] == "bytes 2-5/10"
+
+    def test_it_returns_not_modified_when_etag_matches(
+        self, app: Flask
+    ) -> None:
+        self.create_file(app, "workouts/1/file.gpx")
+        with app.test_request_context():
+            etag = send_upload_file("workouts/1/file.gpx").headers["ETag"]
+
+        with app.test_request_context(headers={"If-None-Match": etag}):
+            response = send_upload_file("workouts/1/file.gpx")
+
+        assert response.status_code == 304
+
+    def test_it_sets_immutable_cache_control(self, app: Flask) -> None:
+        self.create_file(app, "workouts/1/map.png")
+
+        with app.test_request_context():
+            response = send_upload_file(
+                "workouts/1/map.png", mimetype="image/png", immutable=True
+            )
+
+        assert response.headers["Cache-Control"] == (
+            "private, max-age=31536000, immutable"
+        )
+
+    def test_it_returns_x_sendfile_header_when_offload_is_enabled(
+        self, app: Flask
+    ) -> None:
+        app.config["FILES_OFFLOAD"] = "x-sendfile"
+        file_path = self.create_file(app, "workouts/1/file.gpx")
+
+        with app.test_request_context(headers={"Range": "bytes=2-5"}):
+            response = send_upload_file(
+                "workouts/1/file.gpx", mimetype="application/gpx+xml"
+            )
+
+        # range is handled by reverse proxy
+        assert response.status_code == 200
+        assert response.headers["X-Sendfile"] == file_path
+        assert response.mimetype == "application/gpx+xml"
+        assert response.get_data() == b""
+
+    def test_it_returns_x_accel_redirect_header_when_offload_is_enabled(
+        self, app: Flask
+    ) -> None:
+        app.config["FILES_OFFLOAD"] = "x-accel-redirect"
+        self.create_file(app, "exports/1/archive 1.zip")
+
+        with app.test_request_context():
+            response = send_upload_file(
+                "exports/1/archive 1.zip", as_attachment=True
+            )
+
+        assert response.status_code == 200
+        assert response.headers["X-Accel-Redirect"] == (
+            "/internal-uploads/exports/1/archive%201.zip"
+        )
+        assert "X-Sendfile" not in response.headers
+        assert response.get_data() == b""
+
+
 class TestReadableDuration:
     @pytest.mark.parametrize(
         "locale, expected_duration",
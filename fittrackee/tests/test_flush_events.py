@@ -0,0 +1,70 @@
+from typing import Any, List
+from unittest.mock import Mock
+
+from flask import Flask
+from sqlalchemy.orm.session import Session
+
+from fittrackee import db
+from fittrackee.flush_events import FLUSH_EVENTS_KEY, add_flush_event
+from fittrackee.users.models import User
+
+
+class TestAddFlushEvent:
+    def test_it_calls_handler_once_with_all_items_after_flush(
+        self, app: Flask, user_1: User
+    ) -> None:
+        handler = Mock()
+
+        add_flush_event(db.session, "event", handler, "item_1")
+        add_flush_event(db.session, "event", handler, "item_2")
+        user_1.bio = "new bio"
+        db.session.flush()
+
+        handler.assert_called_once()
+        assert handler.call_args.args[1] == ["item_1", "item_2"]
+
+    def test_it_calls_handlers_in_order_of_first_addition(
+        self, app: Flask, user_1: User
+    ) -> None:
+        calls: List[str] = []
+
+        def handler_1(session: Session, items: List[Any]) -> None:
+            calls.append("handler_1")
+
+        def handler_2(session: Session, items: List[Any]) -> None:
+            calls.append("handler_2")
+
+        add_flush_event(db.session, "event_2", handler_2, "item")
+        add_flush_event(db.session, "event_1", handler_1, "item")
+        add_flush_event(db.session, "event_2", handler_2, "item")
+        user_1.bio = "new bio"
+        db.session.flush()
+
+        assert calls == ["handler_2", "handler_1"]
+
+    def test_it_does_not_call_handler_again_on_next_flush(
+        self, app: Flask, user_1: User
+    ) -> None:
+        handler = Mock()
+        add_flush_event(db.session, "event", handler, "item")
+        user_1.bio = "new bio"
+        db.session.flush()
+
+        user_1.bio = "another bio"
+        db.session.flush()
+
+        handler.assert_called_once()
+
+    def test_it_clears_events_on_rollback(
+        self, app: Flask, user_1: User
+    ) -> None:
+        handler = Mock()
+        user_1.bio = "new bio"
+        add_flush_event(db.session, "event", handler, "item")
+
+        db.session.rollback()
+
+        assert FLUSH_EVENTS_KEY not in db.session.info
+        user_1.bio = "another bio"
+        db.session.flush()
+        handler.assert_not_called()
@@ -3950,7 +3950,7 @@ class TestDownloadExportDataArchive(ApiTestCaseMixin):
 
         self.assert_404_with_message(response, "file not found")
 
-    def test_it_calls_send_from_directory_if_request_exist(
+    def test_it_calls_send_upload_file_if_request_exist(
         self, app: Flask, user_1: User
     ) -> None:
         archive_file_name = self.random_string()
@@ -3962,7 +3962,7 @@ class TestDownloadExportDataArchive(ApiTestCaseMixin):
         client, auth_token = self.get_test_client_and_auth_token(
             app, user_1.email
         )
-        with patch("fittrackee.users.auth.send_from_directory") as mock:
+        with patch("fittrackee.users.auth.send_upload_file") as mock:
             mock.return_value = "file"
 
             client.get(
@@ -3971,8 +3971,7 @@ class TestDownloadExportDataArchive(ApiTestCaseMixin):
             )
 
         mock.assert_called_once_with(
-            f"{app.config['UPLOAD_FOLDER']}/exports/{user_1.id}",
-            archive_file_name,
+            f"exports/{user_1.id}/{archive_file_name}",
             mimetype="application/zip",
             as_attachment=True,
         )
@@ -3991,7 +3990,7 @@ class TestDownloadExportDataArchive(ApiTestCaseMixin):
         client, auth_token = self.get_test_client_and_auth_token(
             app, suspended_user.email
         )
-        with patch("fittrackee.users.auth.send_from_directory") as mock:
+        with patch("fittrackee.users.auth.send_upload_file") as mock:
             mock.return_value = "file"
 
             client.get(
@@ -4000,8 +3999,7 @@ class TestDownloadExportDataArchive(ApiTestCaseMixin):
             )
 
         mock.assert_called_once_with(
-            f"{app.config['UPLOAD_FOLDER']}/exports/{suspended_user.id}",
-            archive_file_name,
+            f"exports/{suspended_user.id}/{archive_file_name}",
             mimetype="application/zip",
             as_attachment=True,
         )
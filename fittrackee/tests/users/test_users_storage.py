@@ -0,0 +1,381 @@
+import json
+import os
+from io import BytesIO
+from typing import Dict
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from fittrackee import db
+from fittrackee.files import get_absolute_file_path
+from fittrackee.users.export_data import export_user_data
+from fittrackee.users.models import User, UserDataExport
+from fittrackee.users.storage import (
+    get_storage_key,
+    get_total_storage_usage,
+    get_user_storage_usage,
+    get_user_storage_usage_from_files,
+    reconcile_users_storage_usage,
+    update_storage_usage,
+)
+from fittrackee.workouts.maps import generate_workout_map
+from fittrackee.workouts.models import Sport, Workout
+from fittrackee.workouts.utils.gpx_columns import (
+    get_track_columns,
+    get_track_columns_file_path,
+)
+from fittrackee.workouts.utils.maps import get_map_variants_filepaths
+from fittrackee.workouts.utils.workouts import process_files
+
+from ..mixins import ApiTestCaseMixin
+
+
+def write_file(relative_path: str, content: bytes) -> str:
+    file_path = get_absolute_file_path(relative_path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(content)
+    return file_path
+
+
+def get_expected_storage_usage(**sizes: int) -> Dict[str, int]:
+    return {"gpx": 0, "maps": 0, "pictures": 0, "exports": 0, **sizes}
+
+
+def create_workout_with_gpx(
+    user: User, sport: Sport, gpx_file: str
+) -> Workout:
+    return process_files(
+        auth_user=user,
+        workout_data={"sport_id": sport.id},
+        workout_file=FileStorage(
+            stream=BytesIO(str.encode(gpx_file)), filename="example.gpx"
+        ),
+    )[0]
+
+
+def get_workout_files_size(workout: Workout) -> int:
+    # track columns file is not counted
+    return os.path.getsize(
+        get_absolute_file_path(workout.gpx)  # type: ignore
+    )
+
+
+class TestGetStorageKey:
+    @pytest.mark.parametrize(
+        "input_relative_path,expected_key",
+        [
+            ("workouts/1/2018-03-13_12-44-45_1_abc.gpx", (1, "gpx")),
+            ("workouts/1/2018-03-13_12-44-45_1_abc.gpx.cols", (1, "gpx")),
+            ("workouts/2/2018-03-13_12-44-45_1_abc.png", (2, "maps")),
+            ("workouts/2/2018-03-13_12-44-45_1_abc_retina.webp", (2, "maps")),
+            ("pictures/3/avatar.png", (3, "pictures")),
+            ("pictures/3", (3, "pictures")),
+            ("exports/4/archive_abc.zip", (4, "exports")),
+            ("workouts/1/uploads/abc/example.zip", None),
+            ("workouts/1/.maps.lock", None),
+            ("workouts/1/2018-03-13_12-44-45_1_abc.gpx.columns", None),
+            ("tiles/1/2/3.png", None),
+            ("exports", None),
+        ],
+    )
+    def test_it_returns_storage_key(
+        self, app: Flask, input_relative_path: str, expected_key: tuple
+    ) -> None:
+        assert (
+            get_storage_key(get_absolute_file_path(input_relative_path))
+            == expected_key
+        )
+
+
+class TestUpdateStorageUsage:
+    def test_it_adds_size_changes_by_user_and_category(
+        self, app: Flask, user_1: User, user_2: User
+    ) -> None:
+        update_storage_usage(
+            db.session,
+            {
+                get_absolute_file_path("workouts/1/a.gpx"): 100,
+                get_absolute_file_path("workouts/1/a.png"): 10,
+                get_absolute_file_path("workouts/1/b.gpx"): 50,
+                get_absolute_file_path("pictures/2"): 20,
+            },
+        )
+        update_storage_usage(
+            db.session, {get_absolute_file_path("workouts/1/a.gpx"): -100}
+        )
+        db.session.commit()
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(gpx=50, maps=10)
+        )
+        assert get_user_storage_usage(user_2.id) == (
+            get_expected_storage_usage(pictures=20)
+        )
+        assert get_total_storage_usage() == 80
+
+    def test_it_does_not_update_storage_usage_for_unknown_user(
+        self, app: Flask, user_1: User
+    ) -> None:
+        update_storage_usage(
+            db.session, {get_absolute_file_path("workouts/99/a.gpx"): 100}
+        )
+        db.session.commit()
+
+        assert get_total_storage_usage() == 0
+
+
+class TestStorageUsageUpdateOnWorkoutFiles:
+    def test_it_adds_workout_files_when_workout_is_created(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(gpx=get_workout_files_size(workout))
+        )
+
+    def test_it_adds_map_files_when_map_is_generated(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        gpx_size = get_workout_files_size(workout)
+        map_filepaths = get_map_variants_filepaths(
+            get_absolute_file_path(workout.map)  # type: ignore
+        )
+
+        def generate_missing_map(map_filepath: str, gpx_filepath: str) -> bool:
+            for map_filepath in map_filepaths:
+                with open(map_filepath, "wb") as f:
+                    f.write(b"map")
+            return True
+
+        with patch(
+            "fittrackee.workouts.maps.generate_missing_map",
+            side_effect=generate_missing_map,
+        ):
+            generate_workout_map(workout)
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(
+                gpx=gpx_size, maps=3 * len(map_filepaths)
+            )
+        )
+
+    def test_it_removes_workout_files_when_workout_is_deleted(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        db.session.delete(workout)
+        db.session.commit()
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage()
+        )
+
+    def test_it_does_not_count_rebuilt_track_columns_file(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        gpx_filepath = get_absolute_file_path(workout.gpx)  # type: ignore
+        # track columns file is missing for workouts created before track
+        # columns files were introduced
+        os.remove(get_track_columns_file_path(gpx_filepath))
+
+        get_track_columns(gpx_filepath)
+
+        assert os.path.exists(get_track_columns_file_path(gpx_filepath))
+        assert get_user_storage_usage(user_1.id) == (
+            get_user_storage_usage_from_files(user_1.id)
+        )
+
+
+class TestStorageUsageUpdateOnPicture(ApiTestCaseMixin):
+    def test_it_updates_storage_usage_when_picture_is_updated(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        for picture in [b"avatar" * 10, b"avatar"]:
+            client.post(
+                "/api/auth/picture",
+                data=dict(file=(BytesIO(picture), "avatar.png")),
+                headers=dict(
+                    content_type="multipart/form-data",
+                    Authorization=f"Bearer {auth_token}",
+                ),
+            )
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(pictures=len(b"avatar"))
+        )
+
+    def test_it_updates_storage_usage_when_picture_is_deleted(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        client.post(
+            "/api/auth/picture",
+            data=dict(file=(BytesIO(b"avatar"), "avatar.png")),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        client.delete(
+            "/api/auth/picture",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage()
+        )
+
+
+class TestStorageUsageUpdateOnDataExport:
+    def test_it_updates_storage_usage_when_archive_is_generated_and_deleted(
+        self, app: Flask, user_1: User
+    ) -> None:
+        export_request = UserDataExport(user_id=user_1.id)
+        db.session.add(export_request)
+        db.session.commit()
+
+        export_user_data(export_request_id=export_request.id)
+
+        export_directory = get_absolute_file_path(f"exports/{user_1.id}")
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(
+                exports=sum(
+                    entry.stat().st_size
+                    for entry in os.scandir(export_directory)
+                )
+            )
+        )
+        archive_size = os.path.getsize(
+            os.path.join(export_directory, export_request.file_name)  # type: ignore
+        )
+        exports_size = get_user_storage_usage(user_1.id)["exports"]
+
+        db.session.delete(export_request)
+        db.session.commit()
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(exports=exports_size - archive_size)
+        )
+
+
+class TestReconcileUsersStorageUsage:
+    def test_it_corrects_storage_usage_from_files(
+        self, app: Flask, user_1: User, user_2: User, user_3: User
+    ) -> None:
+        write_file(f"workouts/{user_1.id}/a.gpx", b"gpx")
+        write_file(f"workouts/{user_1.id}/a.webp", b"webp")
+        write_file(f"workouts/{user_1.id}/a.gpx.columns", b"columns")
+        # temporary file
+        write_file(f"workouts/{user_1.id}/uploads/abc/b.gpx", b"gpx")
+        write_file(f"pictures/{user_2.id}/avatar.png", b"avatar")
+        update_storage_usage(
+            db.session,
+            {
+                get_absolute_file_path(f"exports/{user_2.id}"): 10,
+                get_absolute_file_path(f"pictures/{user_2.id}"): 6,
+            },
+        )
+        db.session.commit()
+
+        assert reconcile_users_storage_usage() == (3, 2)
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage(gpx=3, maps=4)
+        )
+        assert get_user_storage_usage(user_2.id) == (
+            get_expected_storage_usage(pictures=6)
+        )
+        assert get_user_storage_usage(user_3.id) == (
+            get_expected_storage_usage()
+        )
+
+    def test_it_corrects_storage_usage_for_given_users(
+        self, app: Flask, user_1: User, user_2: User
+    ) -> None:
+        write_file(f"workouts/{user_1.id}/a.gpx", b"gpx")
+        write_file(f"workouts/{user_2.id}/a.gpx", b"gpx")
+
+        assert reconcile_users_storage_usage([user_2.id]) == (1, 1)
+
+        assert get_user_storage_usage(user_1.id) == (
+            get_expected_storage_usage()
+        )
+        assert get_user_storage_usage(user_2.id) == (
+            get_expected_storage_usage(gpx=3)
+        )
+
+
+class TestStorageUsageForAdmin(ApiTestCaseMixin):
+    def test_it_returns_user_storage_usage_to_admin(
+        self, app: Flask, user_1_admin: User, user_2: User
+    ) -> None:
+        update_storage_usage(
+            db.session,
+            {get_absolute_file_path(f"pictures/{user_2.id}"): 20},
+        )
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1_admin.email
+        )
+
+        response = client.get(
+            f"/api/users/{user_2.username}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        data = json.loads(response.data.decode())
+        assert data["data"]["users"][0]["storage_usage"] == {
+            **get_expected_storage_usage(pictures=20),
+            "total": 20,
+        }
+
+    def test_it_does_not_return_storage_usage_to_user(
+        self, app: Flask, user_1: User, user_2: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/users/{user_2.username}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        data = json.loads(response.data.decode())
+        assert "storage_usage" not in data["data"]["users"][0]
+
+    def test_it_returns_total_storage_usage_in_application_stats(
+        self, app: Flask, user_1_admin: User, user_2: User
+    ) -> None:
+        update_storage_usage(
+            db.session,
+            {
+                get_absolute_file_path(f"pictures/{user_1_admin.id}"): 10,
+                get_absolute_file_path(f"exports/{user_2.id}"): 20,
+            },
+        )
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1_admin.email
+        )
+
+        response = client.get(
+            "/api/stats/all",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        data = json.loads(response.data.decode())
+        assert data["data"]["uploads_dir_size"] == 30
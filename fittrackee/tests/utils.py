@@ -2,9 +2,10 @@ import random
 import string
 from datetime import datetime, timezone
 from json import dumps, loads
-from typing import Dict, Optional, Union
+from typing import Any, Dict, Optional, Union
 from uuid import uuid4
 
+import pytest
 from flask import json as flask_json
 from requests import Response
 
@@ -107,3 +108,22 @@ OAUTH_SCOPES = {
     "workouts:read": False,
     "workouts:write": False,
 }
+
+
+def assert_almost_equal(value: Any, expected_value: Any) -> None:
+    """
+    Compare values, floats being compared with a tolerance (including
+    floats in lists, tuples and dictionaries)
+    """
+    if isinstance(expected_value, dict):
+        assert value.keys() == expected_value.keys()
+        for key, expected in expected_value.items():
+            assert_almost_equal(value[key], expected)
+    elif isinstance(expected_value, (list, tuple)):
+        assert len(value) == len(expected_value)
+        for item, expected_item in zip(value, expected_value):
+            assert_almost_equal(item, expected_item)
+    elif isinstance(expected_value, float):
+        assert value == pytest.approx(expected_value, rel=1e-9, abs=1e-9)
+    else:
+        assert value == expected_value
@@ -1,10 +1,19 @@
 import datetime
+from typing import Dict
+from unittest.mock import patch
 
 import pytest
 from flask import Flask
 
+from fittrackee import db
+from fittrackee.tests.fixtures.fixtures_workouts import update_workout
 from fittrackee.users.models import User
-from fittrackee.workouts.models import Record, Sport, Workout
+from fittrackee.workouts.models import (
+    Record,
+    Sport,
+    Workout,
+    update_records,
+)
 
 
 @pytest.mark.disable_autouse_update_records_patch
@@ -168,3 +177,242 @@ class TestRecordModel:
         record_serialize = record_ms.serialize()
         assert record_serialize.get("value") == 10.0
         assert isinstance(record_serialize.get("value"), float)
+
+
+@pytest.mark.disable_autouse_update_records_patch
+class TestGetUserWorkoutRecords:
+    def test_it_returns_empty_records_when_user_has_no_workouts(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        records = Workout.get_user_workout_records(
+            user_1.id, sport_1_cycling.id
+        )
+
+        assert records == {
+            record_type: {"record_value": None, "workout": None}
+            for record_type in ["AS", "FD", "HA", "LD", "MS"]
+        }
+
+    def test_it_returns_records_holders(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        another_workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.duration = datetime.timedelta(seconds=7200)
+        workout_cycling_user_1.moving = workout_cycling_user_1.duration
+        db.session.commit()
+
+        records = Workout.get_user_workout_records(
+            user_1.id, sport_1_cycling.id
+        )
+
+        assert records["AS"]["workout"] == another_workout_cycling_user_1
+        assert records["FD"]["workout"] == another_workout_cycling_user_1
+        assert records["HA"]["record_value"] is None
+        assert records["LD"]["workout"] == workout_cycling_user_1
+        assert records["LD"]["record_value"] == datetime.timedelta(
+            seconds=7200
+        )
+        assert records["MS"]["workout"] == another_workout_cycling_user_1
+
+    def test_it_returns_oldest_workout_when_values_are_equal(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        another_workout_cycling_user_1: Workout,
+    ) -> None:
+        records = Workout.get_user_workout_records(
+            user_1.id, sport_1_cycling.id
+        )
+
+        assert records["LD"]["workout"] == workout_cycling_user_1
+
+
+@pytest.mark.disable_autouse_update_records_patch
+class TestRecordsUpdate:
+    @staticmethod
+    def get_records(user: User, sport: Sport) -> Dict:
+        return {
+            record.record_type: record.workout_id
+            for record in Record.query.filter_by(
+                user_id=user.id, sport_id=sport.id
+            ).all()
+        }
+
+    def test_it_updates_records_without_recalculation_on_insert(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        with patch(
+            "fittrackee.workouts.models.update_records"
+        ) as update_records_mock:
+            workout = Workout(
+                user_id=user_1.id,
+                sport_id=sport_1_cycling.id,
+                workout_date=datetime.datetime(
+                    2018, 2, 1, tzinfo=datetime.timezone.utc
+                ),
+                distance=20,
+                duration=datetime.timedelta(seconds=1800),
+            )
+            update_workout(workout)
+            db.session.add(workout)
+            db.session.commit()
+
+        update_records_mock.assert_not_called()
+        assert self.get_records(user_1, sport_1_cycling) == {
+            "AS": workout.id,
+            "FD": workout.id,
+            "LD": workout_cycling_user_1.id,
+            "MS": workout.id,
+        }
+
+    def test_it_recalculates_records_when_values_are_equal(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        # workout is older than record holder, with the same values
+        workout = Workout(
+            user_id=user_1.id,
+            sport_id=sport_1_cycling.id,
+            workout_date=datetime.datetime(
+                2017, 1, 1, tzinfo=datetime.timezone.utc
+            ),
+            distance=10,
+            duration=datetime.timedelta(seconds=3600),
+        )
+        update_workout(workout)
+        db.session.add(workout)
+        db.session.commit()
+
+        assert self.get_records(user_1, sport_1_cycling) == {
+            "AS": workout.id,
+            "FD": workout.id,
+            "LD": workout.id,
+            "MS": workout.id,
+        }
+
+    def test_it_does_not_update_records_when_workout_title_is_updated(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        with (
+            patch(
+                "fittrackee.workouts.models.update_records"
+            ) as update_records_mock,
+            patch(
+                "fittrackee.workouts.models.update_records_with_workout"
+            ) as update_records_with_workout_mock,
+        ):
+            workout_cycling_user_1.title = "new title"
+            db.session.commit()
+
+        update_records_mock.assert_not_called()
+        update_records_with_workout_mock.assert_not_called()
+
+    def test_it_recalculates_records_when_record_holder_is_updated(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        another_workout_cycling_user_1: Workout,
+    ) -> None:
+        another_workout_cycling_user_1.distance = 5
+        another_workout_cycling_user_1.ave_speed = 5
+        another_workout_cycling_user_1.max_speed = 5
+        db.session.commit()
+
+        assert self.get_records(user_1, sport_1_cycling) == {
+            "AS": workout_cycling_user_1.id,
+            "FD": workout_cycling_user_1.id,
+            "LD": workout_cycling_user_1.id,
+            "MS": workout_cycling_user_1.id,
+        }
+
+    def test_it_updates_records_when_workout_not_holding_records_is_updated(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout = Workout(
+            user_id=user_1.id,
+            sport_id=sport_1_cycling.id,
+            workout_date=datetime.datetime(
+                2018, 2, 1, tzinfo=datetime.timezone.utc
+            ),
+            distance=4,
+            duration=datetime.timedelta(seconds=1800),
+        )
+        update_workout(workout)
+        db.session.add(workout)
+        db.session.commit()
+
+        with patch(
+            "fittrackee.workouts.models.update_records"
+        ) as update_records_mock:
+            workout.distance = 20
+            db.session.commit()
+
+        update_records_mock.assert_not_called()
+        assert self.get_records(user_1, sport_1_cycling) == {
+            "AS": workout_cycling_user_1.id,
+            "FD": workout.id,
+            "LD": workout_cycling_user_1.id,
+            "MS": workout_cycling_user_1.id,
+        }
+
+    def test_it_recalculates_records_once_when_workouts_are_flushed_together(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workouts = []
+        for distance in [20, 30]:
+            workout = Workout(
+                user_id=user_1.id,
+                sport_id=sport_1_cycling.id,
+                workout_date=datetime.datetime(
+                    2018, 2, 1, tzinfo=datetime.timezone.utc
+                ),
+                distance=distance,
+                duration=datetime.timedelta(seconds=1800),
+            )
+            update_workout(workout)
+            db.session.add(workout)
+            workouts.append(workout)
+
+        with patch(
+            "fittrackee.workouts.models.update_records", wraps=update_records
+        ) as update_records_mock:
+            db.session.commit()
+
+        update_records_mock.assert_called_once()
+        assert update_records_mock.call_args.args[:2] == (
+            user_1.id,
+            sport_1_cycling.id,
+        )
+        assert self.get_records(user_1, sport_1_cycling) == {
+            "AS": workouts[1].id,
+            "FD": workouts[1].id,
+            "LD": workout_cycling_user_1.id,
+            "MS": workouts[1].id,
+        }
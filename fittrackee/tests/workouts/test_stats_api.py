@@ -1479,6 +1479,47 @@ class TestGetStatsByTime(ApiTestCaseMixin):
             },
         }
 
+    def test_it_gets_average_speed_only_for_workouts_with_speed(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout = Workout(
+            user_id=user_1.id,
+            sport_id=sport_1_cycling.id,
+            workout_date=datetime(2018, 1, 2, tzinfo=timezone.utc),
+            distance=5,
+            duration=timedelta(seconds=1800),
+        )
+        workout.moving = workout.duration
+        db.session.add(workout)
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/by_time?type=average",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        data = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert data["data"]["statistics"] == {
+            "2018": {
+                "1": {
+                    "average_ascent": None,
+                    "average_descent": None,
+                    "average_distance": 7.5,
+                    "average_duration": 2700,
+                    "average_speed": 10.0,
+                    "total_workouts": 2,
+                }
+            },
+        }
+
     @pytest.mark.parametrize(
         "client_scope, can_access",
         {**OAUTH_SCOPES, "workouts:read": True}.items(),
@@ -1887,6 +1928,248 @@ class TestGetStatsBySport(ApiTestCaseMixin):
         self.assert_response_scope(response, can_access)
 
 
+class TestGetStatsCalendar(ApiTestCaseMixin):
+    def test_it_returns_error_if_user_is_not_authenticated(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client = app.test_client()
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar"
+            "?from=2018-01-01&to=2018-01-31",
+        )
+
+        self.assert_401(response)
+
+    def test_it_returns_error_if_user_is_authenticated_authenticated(
+        self, app: Flask, user_1: User, user_2: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_2.username}/calendar"
+            "?from=2018-01-01&to=2018-01-31",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_403(response)
+
+    def test_it_returns_error_when_user_is_suspended(
+        self, app: Flask, suspended_user: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, suspended_user.email
+        )
+
+        response = client.get(
+            f"/api/stats/{suspended_user.username}/calendar"
+            "?from=2018-01-01&to=2018-01-31",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_403(response)
+
+    def test_it_returns_error_when_user_does_not_exist(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            "/api/stats/1000/calendar?from=2018-01-01&to=2018-01-31",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_404_with_entity(response, "user")
+
+    @pytest.mark.parametrize(
+        "input_params,expected_message",
+        [
+            ("", "missing date range"),
+            ("?from=2018-01-01", "missing date range"),
+            ("?from=2018-01-01&to=", "missing date range"),
+            ('?from="2018-01-01&to=2018-01-31', "invalid date format"),
+            ("?from=2018-01-31&to=2018-01-01", "invalid date range"),
+            ("?from=2018-01-01&to=2019-01-02", "invalid date range"),
+        ],
+    )
+    def test_it_returns_error_when_date_range_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        input_params: str,
+        expected_message: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar{input_params}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(response, expected_message, "fail")
+
+    def test_it_returns_empty_days_when_user_has_no_workouts(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar"
+            "?from=2018-01-01&to=2018-01-03",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["status"] == "success"
+        assert data["data"]["calendar"] == {
+            "from": "2018-01-01",
+            "to": "2018-01-03",
+            "sports": {},
+            "total_distance": [0, 0, 0],
+            "total_duration": [0, 0, 0],
+            "total_workouts": [0, 0, 0],
+        }
+
+    def test_it_returns_366_days(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar"
+            "?from=2017-12-31&to=2018-12-31",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert response.status_code == 200
+        calendar = json.loads(response.data.decode())["data"]["calendar"]
+        assert len(calendar["total_workouts"]) == 366
+        assert calendar["total_workouts"][:3] == [0, 1, 0]
+        assert sum(calendar["total_workouts"]) == 1
+
+    def test_it_gets_calendar_by_sport(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        sport_1_cycling: Sport,
+        sport_2_running: Sport,
+        seven_workouts_user_1: List[Workout],
+        workout_running_user_1: Workout,
+        workout_cycling_user_2: Workout,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar"
+            "?from=2018-03-31&to=2018-04-02",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["status"] == "success"
+        assert data["data"]["calendar"] == {
+            "from": "2018-03-31",
+            "to": "2018-04-02",
+            "sports": {
+                str(sport_1_cycling.id): {
+                    "total_distance": [0, 8.0, 0],
+                    "total_duration": [0, 6000, 0],
+                    "total_workouts": [0, 1, 0],
+                },
+                str(sport_2_running.id): {
+                    "total_distance": [0, 0, 12.0],
+                    "total_duration": [0, 0, 6000],
+                    "total_workouts": [0, 0, 1],
+                },
+            },
+            "total_distance": [0, 8.0, 12.0],
+            "total_duration": [0, 6000, 6000],
+            "total_workouts": [0, 1, 1],
+        }
+
+    def test_it_gets_calendar_with_paris_timezone(
+        self,
+        app: Flask,
+        user_1_paris: User,
+        sport_1_cycling: Sport,
+        seven_workouts_user_1: List[Workout],
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1_paris.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1_paris.username}/calendar"
+            "?from=2017-12-31&to=2018-01-01",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["data"]["calendar"] == {
+            "from": "2017-12-31",
+            "to": "2018-01-01",
+            "sports": {
+                str(sport_1_cycling.id): {
+                    "total_distance": [0, 20.0],
+                    "total_duration": [0, 4480],
+                    "total_workouts": [0, 2],
+                },
+            },
+            "total_distance": [0, 20.0],
+            "total_duration": [0, 4480],
+            "total_workouts": [0, 2],
+        }
+
+    @pytest.mark.parametrize(
+        "client_scope, can_access",
+        {**OAUTH_SCOPES, "workouts:read": True}.items(),
+    )
+    def test_expected_scopes_are_defined(
+        self,
+        app: Flask,
+        user_1: User,
+        client_scope: str,
+        can_access: bool,
+    ) -> None:
+        (
+            client,
+            oauth_client,
+            access_token,
+            _,
+        ) = self.create_oauth2_client_and_issue_token(
+            app, user_1, scope=client_scope
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/calendar"
+            "?from=2018-01-01&to=2018-01-31",
+            content_type="application/json",
+            headers=dict(Authorization=f"Bearer {access_token}"),
+        )
+
+        self.assert_response_scope(response, can_access)
+
+
 class TestGetAllStats(ApiTestCaseMixin):
     def test_it_returns_error_if_user_is_not_authenticated(
         self, app: Flask, user_1: User
@@ -0,0 +1,361 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional, Union
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from fittrackee import db
+from fittrackee.responses import HttpResponse, NotFoundErrorResponse
+from fittrackee.users.models import User
+from fittrackee.workouts.models import Sport, Workout
+from fittrackee.workouts.stats_cache import StatsCache
+
+from ..mixins import ApiTestCaseMixin
+
+
+class InMemoryRedis:
+    """
+    Minimal Redis client for stats cache tests (values are stored as
+    bytes, like Redis does)
+    """
+
+    def __init__(self) -> None:
+        self.values: Dict[str, bytes] = {}
+        self.hashes: Dict[str, Dict[bytes, bytes]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.values.get(key)
+
+    def set(
+        self, key: str, value: str, ex: Optional[int] = None, nx: bool = False
+    ) -> None:
+        if nx and key in self.values:
+            return
+        self.values[key] = str(value).encode()
+
+    def incr(self, key: str) -> int:
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    def hincrby(self, key: str, field: str, amount: int) -> None:
+        values = self.hashes.setdefault(key, {})
+        values[field.encode()] = str(
+            int(values.get(field.encode(), b"0")) + amount
+        ).encode()
+
+    def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        return self.hashes.get(key, {})
+
+    def pipeline(self) -> "InMemoryRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+
+@pytest.fixture()
+def stats_cache() -> Iterator[StatsCache]:
+    stats_cache = StatsCache(
+        redis_client=InMemoryRedis(),  # type: ignore
+        ttl=60,
+    )
+    with patch(
+        "fittrackee.workouts.stats_cache.get_stats_cache",
+        return_value=stats_cache,
+    ):
+        yield stats_cache
+
+
+class TestStatsCache:
+    def test_it_returns_same_key_for_same_params(self) -> None:
+        assert StatsCache.get_key(
+            1, 2, "by_time", {"time": "week", "type": "total"}
+        ) == StatsCache.get_key(
+            1, 2, "by_time", {"type": "total", "time": "week"}
+        )
+
+    @pytest.mark.parametrize(
+        "input_key_args",
+        [
+            (2, 2, "by_time", {"time": "week"}),
+            (1, 3, "by_time", {"time": "week"}),
+            (1, 2, "by_sport", {"time": "week"}),
+            (1, 2, "by_time", {"time": "month"}),
+        ],
+    )
+    def test_it_returns_different_keys(self, input_key_args: tuple) -> None:
+        assert StatsCache.get_key(
+            1, 2, "by_time", {"time": "week"}
+        ) != StatsCache.get_key(*input_key_args)
+
+    def test_it_is_disabled_without_redis_client(self, app: Flask) -> None:
+        stats_cache = StatsCache(ttl=60)
+        responses = iter([{"status": "success", "value": i} for i in [1, 2]])
+
+        assert not stats_cache.enabled
+        for value in [1, 2]:
+            assert stats_cache.get_or_set(
+                1, "records", {}, lambda: next(responses)
+            ) == {"status": "success", "value": value}
+
+    def test_it_is_disabled_when_ttl_is_0(self) -> None:
+        stats_cache = StatsCache(
+            redis_client=InMemoryRedis(),  # type: ignore
+            ttl=0,
+        )
+
+        assert not stats_cache.enabled
+
+    def test_it_returns_cached_response(
+        self, app: Flask, stats_cache: StatsCache
+    ) -> None:
+        responses = iter([{"status": "success", "value": i} for i in [1, 2]])
+
+        for _ in range(2):
+            assert stats_cache.get_or_set(
+                1, "records", {}, lambda: next(responses)
+            ) == {"status": "success", "value": 1}
+
+        assert stats_cache.get_stats() == {
+            "records": {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        }
+
+    def test_it_does_not_store_error_response(
+        self, app: Flask, stats_cache: StatsCache
+    ) -> None:
+        responses: Iterator[Union[Dict, HttpResponse]] = iter(
+            [
+                NotFoundErrorResponse("sport does not exist"),
+                {"status": "success"},
+            ]
+        )
+
+        stats_cache.get_or_set(1, "by_sport", {}, lambda: next(responses))
+
+        assert stats_cache.get_or_set(
+            1, "by_sport", {}, lambda: next(responses)
+        ) == {"status": "success"}
+
+    def test_it_does_not_return_response_once_user_cache_is_invalidated(
+        self, app: Flask, stats_cache: StatsCache
+    ) -> None:
+        responses = iter([{"status": "success", "value": i} for i in [1, 2]])
+        stats_cache.get_or_set(1, "records", {}, lambda: next(responses))
+
+        stats_cache.invalidate({1})
+
+        assert stats_cache.get_or_set(
+            1, "records", {}, lambda: next(responses)
+        ) == {"status": "success", "value": 2}
+
+    def test_it_initializes_new_generation_when_generation_is_lost(
+        self, app: Flask, stats_cache: StatsCache
+    ) -> None:
+        generation = stats_cache.get_generation(1)
+        stats_cache.invalidate({1})
+        del stats_cache.redis_client.values[  # type: ignore
+            StatsCache.get_generation_key(1)
+        ]
+
+        assert stats_cache.get_generation(1) > generation + 1
+
+
+class TestStatsCacheInvalidation:
+    def test_it_invalidates_user_cache_when_workout_is_created(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        sport_1_cycling: Sport,
+        stats_cache: StatsCache,
+    ) -> None:
+        generations = {
+            user.id: stats_cache.get_generation(user.id)
+            for user in [user_1, user_2]
+        }
+        workout = Workout(
+            user_id=user_1.id,
+            sport_id=sport_1_cycling.id,
+            workout_date=datetime(2018, 1, 1, tzinfo=timezone.utc),
+            distance=10,
+            duration=timedelta(hours=1),
+        )
+        db.session.add(workout)
+        db.session.flush()
+
+        # generation is incremented once transaction is committed
+        assert stats_cache.get_generation(user_1.id) == generations[user_1.id]
+
+        db.session.commit()
+
+        assert (
+            stats_cache.get_generation(user_1.id) == generations[user_1.id] + 1
+        )
+        assert stats_cache.get_generation(user_2.id) == generations[user_2.id]
+
+    def test_it_invalidates_user_cache_when_workout_distance_changes(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        generation = stats_cache.get_generation(user_1.id)
+
+        workout_cycling_user_1.distance = 12
+        db.session.commit()
+
+        assert stats_cache.get_generation(user_1.id) == generation + 1
+
+    def test_it_does_not_invalidate_user_cache_when_workout_title_changes(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        generation = stats_cache.get_generation(user_1.id)
+
+        workout_cycling_user_1.title = "new title"
+        db.session.commit()
+
+        assert stats_cache.get_generation(user_1.id) == generation
+
+    def test_it_invalidates_user_cache_when_workout_is_deleted(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        generation = stats_cache.get_generation(user_1.id)
+
+        db.session.delete(workout_cycling_user_1)
+        db.session.commit()
+
+        assert stats_cache.get_generation(user_1.id) == generation + 1
+
+    def test_it_invalidates_user_cache_when_user_timezone_changes(
+        self, app: Flask, user_1: User, stats_cache: StatsCache
+    ) -> None:
+        generation = stats_cache.get_generation(user_1.id)
+
+        user_1.timezone = "Europe/Paris"
+        db.session.commit()
+
+        assert stats_cache.get_generation(user_1.id) == generation + 1
+
+
+class TestStatsCacheOnStatsEndpoints(ApiTestCaseMixin):
+    def test_it_returns_updated_stats_by_time_after_workout_creation(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        url = f"/api/stats/{user_1.username}/by_time?time=year"
+        response = client.get(
+            url, headers=dict(Authorization=f"Bearer {auth_token}")
+        )
+        assert json.loads(response.data.decode()) == json.loads(
+            client.get(
+                # ignored param
+                f"{url}&_=1",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            ).data.decode()
+        )
+        workout = Workout(
+            user_id=user_1.id,
+            sport_id=sport_1_cycling.id,
+            workout_date=datetime(2018, 1, 2, tzinfo=timezone.utc),
+            distance=5,
+            duration=timedelta(hours=1),
+        )
+        workout.moving = workout.duration
+        workout.ave_speed = 5
+        db.session.add(workout)
+        db.session.commit()
+
+        response = client.get(
+            url, headers=dict(Authorization=f"Bearer {auth_token}")
+        )
+
+        data = json.loads(response.data.decode())
+        assert (
+            data["data"]["statistics"]["2018"][str(sport_1_cycling.id)][
+                "total_workouts"
+            ]
+            == 2
+        )
+        assert stats_cache.get_stats() == {
+            "by_time": {"hits": 1, "misses": 2, "hit_rate": 0.3333}
+        }
+
+    def test_it_does_not_return_cached_stats_to_another_user(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        client.get(
+            f"/api/stats/{user_1.username}/by_sport",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_2.email
+        )
+
+        response = client.get(
+            f"/api/stats/{user_1.username}/by_sport",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_403(response)
+
+    @pytest.mark.disable_autouse_update_records_patch
+    def test_it_returns_cached_records(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        stats_cache: StatsCache,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        responses = [
+            client.get(
+                "/api/records",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+            for _ in range(2)
+        ]
+
+        assert responses[0].data == responses[1].data
+        assert (
+            "Mon, 01 Jan 2018 00:00:00 GMT"
+            == json.loads(responses[1].data.decode())["data"]["records"][0][
+                "workout_date"
+            ]
+        )
+        assert stats_cache.get_stats() == {
+            "records": {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        }
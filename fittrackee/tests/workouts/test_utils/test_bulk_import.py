@@ -0,0 +1,217 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+from typing import Dict
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import FileStorage
+
+from fittrackee import db
+from fittrackee.equipments.models import Equipment
+from fittrackee.users.models import User
+from fittrackee.workouts.exceptions import WorkoutException
+from fittrackee.workouts.models import Record, Sport, Workout, update_records
+from fittrackee.workouts.utils.bulk_import import (
+    BULK_IMPORT_KEY,
+    WorkoutsBulkImport,
+)
+from fittrackee.workouts.utils.workouts import (
+    create_workout_from_gpx_file,
+    process_files,
+    workouts_bulk_import,
+)
+
+
+def get_zip_file_storage(app: Flask, archive_name: str) -> FileStorage:
+    file_path = os.path.join(app.root_path, f"tests/files/{archive_name}")
+    with open(file_path, "rb") as zip_file:
+        content = zip_file.read()
+    return FileStorage(stream=BytesIO(content), filename=archive_name)
+
+
+class TestWorkoutsBulkImport:
+    def test_it_returns_true_when_batch_is_complete(self) -> None:
+        bulk_import = WorkoutsBulkImport(batch_size=2)
+
+        assert [bulk_import.add_workout() for _ in range(5)] == [
+            False,
+            True,
+            False,
+            True,
+            False,
+        ]
+
+
+class TestWorkoutsBulkImportContext:
+    def test_it_stores_bulk_import_in_session_info_during_import(
+        self, app: Flask
+    ) -> None:
+        with workouts_bulk_import() as bulk_import:
+            assert db.session.info[BULK_IMPORT_KEY] == bulk_import
+
+        assert BULK_IMPORT_KEY not in db.session.info
+
+    def test_it_removes_bulk_import_from_session_info_on_error(
+        self, app: Flask
+    ) -> None:
+        with pytest.raises(WorkoutException), workouts_bulk_import():
+            raise WorkoutException("error", "some error")
+
+        assert BULK_IMPORT_KEY not in db.session.info
+
+    def test_it_removes_bulk_import_from_session_info_when_interrupted(
+        self, app: Flask
+    ) -> None:
+        with pytest.raises(KeyboardInterrupt), workouts_bulk_import():
+            raise KeyboardInterrupt()
+
+        assert BULK_IMPORT_KEY not in db.session.info
+
+    def test_it_raises_original_error_after_database_error(
+        self, app: Flask, sport_1_cycling: Sport
+    ) -> None:
+        with pytest.raises(IntegrityError), workouts_bulk_import():
+            db.session.add(Sport(label=sport_1_cycling.label))
+            db.session.flush()
+
+        assert BULK_IMPORT_KEY not in db.session.info
+        assert db.session.is_active
+
+
+class TestProcessFilesInBulkImportMode:
+    def test_it_updates_records_once_per_user_and_sport(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        # 'gpx_test.zip' contains 3 gpx files (same data) and 1 non-gpx file
+        with patch(
+            "fittrackee.workouts.utils.workouts.update_records",
+            wraps=update_records,
+        ) as update_records_mock:
+            process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=get_zip_file_storage(app, "gpx_test.zip"),
+            )
+
+        update_records_mock.assert_called_once()
+        assert update_records_mock.call_args.args[:2] == (
+            user_1.id,
+            sport_1_cycling.id,
+        )
+        # workouts have the same data, records are the first workout ones
+        first_workout = Workout.query.order_by(Workout.id).first()
+        records = Record.query.filter_by(
+            user_id=user_1.id, sport_id=sport_1_cycling.id
+        ).all()
+        assert len(records) == 5
+        assert {record.workout_id for record in records} == {
+            first_workout.id  # type: ignore
+        }
+
+    def test_it_creates_records_for_valid_files_when_import_is_interrupted(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        # 'gpx_test_incorrect.zip' contains 2 gpx files, one is incorrect
+        with pytest.raises(WorkoutException):
+            process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=get_zip_file_storage(
+                    app, "gpx_test_incorrect.zip"
+                ),
+            )
+
+        workout = Workout.query.one()
+        assert {
+            record.workout_id
+            for record in Record.query.filter_by(user_id=user_1.id).all()
+        } == {workout.id}
+
+    def test_it_calculates_equipment_totals_at_the_end_of_import(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        equipment_bike_user_1: Equipment,
+    ) -> None:
+        process_files(
+            auth_user=user_1,
+            workout_data={
+                "sport_id": sport_1_cycling.id,
+                "equipments_list": [equipment_bike_user_1],
+            },
+            workout_file=get_zip_file_storage(app, "gpx_test.zip"),
+        )
+
+        db.session.refresh(equipment_bike_user_1)
+        assert equipment_bike_user_1.total_workouts == 3
+        assert float(equipment_bike_user_1.total_distance) == 0.96
+        assert equipment_bike_user_1.total_duration == timedelta(
+            minutes=12, seconds=30
+        )
+        assert equipment_bike_user_1.total_moving == timedelta(
+            minutes=12, seconds=30
+        )
+
+    def test_it_commits_workouts_by_batch(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        with (
+            patch(
+                "fittrackee.workouts.utils.bulk_import.BULK_IMPORT_BATCH_SIZE",
+                2,
+            ),
+            patch.object(
+                db.session, "commit", wraps=db.session.commit
+            ) as commit_mock,
+        ):
+            process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=get_zip_file_storage(app, "gpx_test.zip"),
+            )
+
+        # one commit for the first batch, then pending workouts and
+        # records updates are committed at the end of import
+        assert commit_mock.call_count == 3
+        assert Workout.query.count() == 3
+
+    def test_it_updates_records_for_committed_workouts_after_database_error(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        calls_count = 0
+
+        def create_workout_or_fail(*args: Dict) -> Workout:
+            nonlocal calls_count
+            calls_count += 1
+            if calls_count == 3:
+                db.session.add(Sport(label=sport_1_cycling.label))
+                db.session.flush()
+            return create_workout_from_gpx_file(*args)  # type: ignore
+
+        with (
+            patch(
+                "fittrackee.workouts.utils.bulk_import.BULK_IMPORT_BATCH_SIZE",
+                2,
+            ),
+            patch(
+                "fittrackee.workouts.utils.workouts.create_workout_from_gpx_file",
+                side_effect=create_workout_or_fail,
+            ),
+            pytest.raises(IntegrityError),
+        ):
+            process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=get_zip_file_storage(app, "gpx_test.zip"),
+            )
+
+        # first batch is committed
+        workouts_ids = {workout.id for workout in Workout.query.all()}
+        assert len(workouts_ids) == 2
+        records = Record.query.filter_by(user_id=user_1.id).all()
+        assert len(records) == 5
+        assert {record.workout_id for record in records} <= workouts_ids
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from fittrackee.workouts.utils.downsampling import get_lttb_indexes
+
+
+class TestGetLttbIndexes:
+    @pytest.mark.parametrize("input_max_points", [10, 20])
+    def test_it_returns_all_indexes_when_max_points_exceeds_points_count(
+        self, input_max_points: int
+    ) -> None:
+        x = np.arange(10.0)
+
+        indexes = get_lttb_indexes(x, [np.zeros(10)], input_max_points)
+
+        assert indexes.tolist() == list(range(10))
+
+    def test_it_returns_first_and_last_points_when_max_points_is_2(
+        self,
+    ) -> None:
+        x = np.arange(10.0)
+
+        indexes = get_lttb_indexes(x, [np.zeros(10)], 2)
+
+        assert indexes.tolist() == [0, 9]
+
+    def test_it_keeps_peaks(self) -> None:
+        x = np.arange(10.0)
+        y = np.array([0.0, 1.0, 0.0, 5.0, 0.0, 1.0, 0.0, 2.0, 0.0, 0.0])
+
+        indexes = get_lttb_indexes(x, [y], 5)
+
+        assert indexes.tolist() == [0, 2, 3, 6, 9]
+
+    def test_it_combines_series(self) -> None:
+        x = np.arange(5.0)
+        # a peak on each series
+        y_1 = np.array([0.0, 100.0, 0.0, 0.0, 0.0])
+        y_2 = np.array([0.0, 0.0, 0.0, 1.0, 0.0])
+
+        indexes = get_lttb_indexes(x, [y_1, y_2], 4)
+
+        assert indexes.tolist() == [0, 1, 3, 4]
+
+    def test_it_ignores_series_without_values(self) -> None:
+        x = np.arange(5.0)
+        y_1 = np.array([0.0, 0.0, 0.0, 1.0, 0.0])
+        y_2 = np.full(5, np.nan)
+
+        indexes = get_lttb_indexes(x, [y_1, y_2], 3)
+
+        assert indexes.tolist() == [0, 3, 4]
+
+    def test_it_returns_sorted_indexes(self) -> None:
+        x = np.cumsum(np.random.rand(1000))
+        y = np.sin(x)
+
+        indexes = get_lttb_indexes(x, [y], 100)
+
+        assert len(indexes) == 100
+        assert indexes[0] == 0
+        assert indexes[-1] == 999
+        assert (np.diff(indexes) > 0).all()
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from fittrackee.workouts.utils.geometry import (
+    MAX_GEOMETRY_ZOOM,
+    encode_polyline,
+    get_geometry,
+    get_mercator_coordinates,
+    get_points_significance,
+    get_zoom_tolerance,
+)
+
+
+def simplify(
+    latitudes: np.ndarray, longitudes: np.ndarray, tolerance: float
+) -> np.ndarray:
+    """
+    Douglas-Peucker reference implementation, returning kept points
+    """
+    points = get_mercator_coordinates(latitudes, longitudes)
+
+    def get_distance(
+        point: np.ndarray, start: np.ndarray, end: np.ndarray
+    ) -> float:
+        segment = end - start
+        if not segment.any():
+            return float(np.hypot(*(point - start)))
+        ratio = min(
+            max(np.dot(point - start, segment) / np.dot(segment, segment), 0),
+            1,
+        )
+        return float(np.hypot(*(point - (start + ratio * segment))))
+
+    def get_kept_indexes(start: int, end: int) -> list:
+        if end - start < 2:
+            return [start]
+        distances = [
+            get_distance(points[index], points[start], points[end])
+            for index in range(start + 1, end)
+        ]
+        max_index = int(np.argmax(distances))
+        if distances[max_index] <= tolerance:
+            return [start]
+        split_index = start + 1 + max_index
+        return get_kept_indexes(start, split_index) + get_kept_indexes(
+            split_index, end
+        )
+
+    kept_points = np.zeros(len(points), dtype=bool)
+    kept_points[get_kept_indexes(0, len(points) - 1)] = True
+    kept_points[-1] = True
+    return kept_points
+
+
+class TestGetZoomTolerance:
+    @pytest.mark.parametrize(
+        "input_zoom,expected_tolerance",
+        [(0, 360 / 256), (1, 360 / 512), (10, 360 / (256 * 1024))],
+    )
+    def test_it_returns_pixel_size(
+        self, input_zoom: int, expected_tolerance: float
+    ) -> None:
+        assert get_zoom_tolerance(input_zoom) == expected_tolerance
+
+
+class TestGetPointsSignificance:
+    def test_it_returns_empty_array_when_no_points(self) -> None:
+        significance = get_points_significance(np.empty(0), np.empty(0))
+
+        assert significance.size == 0
+
+    def test_first_and_last_points_are_always_kept(self) -> None:
+        latitudes = np.array([44.68095, 44.68091, 44.6808])
+        longitudes = np.array([6.07367, 6.07367, 6.07364])
+
+        significance = get_points_significance(latitudes, longitudes)
+
+        assert significance[0] == np.inf
+        assert significance[-1] == np.inf
+        assert significance[1] < np.inf
+
+    @pytest.mark.parametrize("input_zoom", [0, 8, 12, 16, MAX_GEOMETRY_ZOOM])
+    def test_it_returns_same_points_as_douglas_peucker_algorithm(
+        self, input_zoom: int
+    ) -> None:
+        random = np.random.default_rng(0)
+        latitudes = 44.68 + np.cumsum(random.normal(0, 1e-4, 300))
+        longitudes = 6.07 + np.cumsum(random.normal(0, 1e-4, 300))
+        # loop
+        latitudes[-1] = latitudes[0]
+        longitudes[-1] = longitudes[0]
+        tolerance = get_zoom_tolerance(input_zoom)
+
+        significance = get_points_significance(latitudes, longitudes)
+
+        assert np.array_equal(
+            significance > tolerance,
+            simplify(latitudes, longitudes, tolerance),
+        )
+
+
+class TestEncodePolyline:
+    def test_it_encodes_coordinates(self) -> None:
+        # example from Encoded Polyline Algorithm Format documentation
+        polyline = encode_polyline(
+            np.array([38.5, 40.7, 43.252]),
+            np.array([-120.2, -120.95, -126.453]),
+        )
+
+        assert polyline == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+    def test_it_returns_empty_string_when_no_coordinates(self) -> None:
+        assert encode_polyline(np.empty(0), np.empty(0)) == ""
+
+
+class TestGetGeometry:
+    def test_it_returns_geojson_geometry(self) -> None:
+        segments_coordinates = [
+            np.array([[44.68095, 6.07367], [44.68091, 6.07367]]),
+            np.array([[44.6808, 6.07364], [44.68075, 6.07364]]),
+        ]
+
+        geometry = get_geometry(segments_coordinates, "geojson")
+
+        assert geometry == {
+            "type": "MultiLineString",
+            "coordinates": [
+                [[6.07367, 44.68095], [6.07367, 44.68091]],
+                [[6.07364, 44.6808], [6.07364, 44.68075]],
+            ],
+        }
+
+    def test_it_returns_encoded_polylines(self) -> None:
+        segments_coordinates = [
+            np.array([[38.5, -120.2], [40.7, -120.95]]),
+            np.array([[43.252, -126.453]]),
+        ]
+
+        geometry = get_geometry(segments_coordinates, "polyline")
+
+        assert geometry == ["_p~iF~ps|U_ulLnnqC", "_t~fGfzxbW"]
@@ -1,27 +1,35 @@
+import struct
 from datetime import timedelta
-from unittest.mock import call, patch
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import ANY, mock_open, patch
 
+import gpxpy
+import numpy as np
 import pytest
 from flask import Flask
-from gpxpy.gpx import IGNORE_TOP_SPEED_PERCENTILES, MovingData
 from werkzeug.datastructures import FileStorage
 
-from fittrackee.tests.utils import random_string
+from fittrackee.tests.utils import assert_almost_equal, random_string
 from fittrackee.users.models import User, UserSportPreference
 from fittrackee.workouts.models import Sport
+from fittrackee.workouts.utils.gpx import (
+    CHART_DATA_BINARY_TYPES,
+    CHART_DATA_FIELDS,
+    get_binary_chart_data,
+    get_chart_data,
+    get_columnar_chart_data,
+    get_geometry_from_gpx_file,
+)
+from fittrackee.workouts.utils.gpx_stream import parse_gpx_stream
 from fittrackee.workouts.utils.workouts import get_gpx_info, process_files
 
-folders = {
-    "extract_dir": "/tmp/fitTrackee/uploads",
-    "tmp_dir": "/tmp/fitTrackee/uploads/tmp",
-}
-moving_data = MovingData(
-    moving_time=1,
-    stopped_time=1,
-    moving_distance=1,
-    stopped_distance=1,
-    max_speed=1,
-)
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # when gpx file is mocked, track columns file is written next to the
+    # random gpx file path
+    monkeypatch.chdir(tmp_path)
 
 
 class TestStoppedSpeedThreshold:
@@ -29,7 +37,7 @@ class TestStoppedSpeedThreshold:
         "sport_id, expected_threshold",
         [(1, 1.0), (2, 0.1)],
     )
-    def test_it_calls_get_moving_data_with_threshold_depending_on_sport(
+    def test_it_parses_gpx_file_with_threshold_depending_on_sport(
         self,
         app: Flask,
         user_1: User,
@@ -45,28 +53,24 @@ class TestStoppedSpeedThreshold:
                 return_value="/tmp/fitTrackee/uploads/test.png",
             ),
             patch(
-                "gpxpy.gpx.GPXTrackSegment.get_moving_data",
-                return_value=moving_data,
-            ) as gpx_track_segment_mock,
+                "fittrackee.workouts.utils.gpx.parse_gpx_stream",
+                wraps=parse_gpx_stream,
+            ) as parse_gpx_stream_mock,
         ):
             process_files(
                 auth_user=user_1,
-                folders=folders,
                 workout_data={"sport_id": sport_id},
                 workout_file=gpx_file_storage,
             )
 
-        assert gpx_track_segment_mock.call_args_list[0] == call(
-            stopped_speed_threshold=expected_threshold, raw=False
-        )
-        gpx_track_segment_mock.assert_called_with(
-            expected_threshold,  # stopped_speed_threshold
-            False,  # raw
-            IGNORE_TOP_SPEED_PERCENTILES,  # speed_extreemes_percentiles
-            True,  # ignore_nonstandard_distances
+        parse_gpx_stream_mock.assert_called_once_with(
+            ANY,
+            stopped_speed_threshold=expected_threshold,
+            use_raw_gpx_speed=False,
+            with_map_data=False,
         )
 
-    def test_it_calls_get_moving_data_with_threshold_depending_from_user_preference(  # noqa
+    def test_it_parses_gpx_file_with_threshold_depending_from_user_preference(
         self,
         app: Flask,
         user_1: User,
@@ -82,31 +86,27 @@ class TestStoppedSpeedThreshold:
                 return_value="/tmp/fitTrackee/uploads/test.png",
             ),
             patch(
-                "gpxpy.gpx.GPXTrackSegment.get_moving_data",
-                return_value=moving_data,
-            ) as gpx_track_segment_mock,
+                "fittrackee.workouts.utils.gpx.parse_gpx_stream",
+                wraps=parse_gpx_stream,
+            ) as parse_gpx_stream_mock,
         ):
             process_files(
                 auth_user=user_1,
-                folders=folders,
                 workout_data={"sport_id": sport_1_cycling.id},
                 workout_file=gpx_file_storage,
             )
 
-        assert gpx_track_segment_mock.call_args_list[0] == call(
-            stopped_speed_threshold=expected_threshold, raw=False
-        )
-        gpx_track_segment_mock.assert_called_with(
-            expected_threshold,  # stopped_speed_threshold
-            False,  # raw
-            IGNORE_TOP_SPEED_PERCENTILES,  # speed_extreemes_percentiles
-            True,  # ignore_nonstandard_distances
+        parse_gpx_stream_mock.assert_called_once_with(
+            ANY,
+            stopped_speed_threshold=expected_threshold,
+            use_raw_gpx_speed=False,
+            with_map_data=False,
         )
 
 
 class TestUseRawGpxSpeed:
     @pytest.mark.parametrize("input_use_raw_gpx_speed", [True, False])
-    def test_it_calls_get_moving_data_with_user_use_raw_gpx_speed_preference(
+    def test_it_parses_gpx_file_with_user_use_raw_gpx_speed_preference(
         self,
         app: Flask,
         user_1: User,
@@ -121,26 +121,21 @@ class TestUseRawGpxSpeed:
                 return_value="/tmp/fitTrackee/uploads/test.png",
             ),
             patch(
-                "gpxpy.gpx.GPXTrackSegment.get_moving_data",
-                return_value=moving_data,
-            ) as gpx_track_segment_mock,
+                "fittrackee.workouts.utils.gpx.parse_gpx_stream",
+                wraps=parse_gpx_stream,
+            ) as parse_gpx_stream_mock,
         ):
             process_files(
                 auth_user=user_1,
-                folders=folders,
                 workout_data={"sport_id": sport_1_cycling.id},
                 workout_file=gpx_file_storage,
             )
 
-        assert gpx_track_segment_mock.call_args_list[0] == call(
+        parse_gpx_stream_mock.assert_called_once_with(
+            ANY,
             stopped_speed_threshold=sport_1_cycling.stopped_speed_threshold,
-            raw=input_use_raw_gpx_speed,
-        )
-        gpx_track_segment_mock.assert_called_with(
-            sport_1_cycling.stopped_speed_threshold,  # stopped_speed_threshold
-            False,  # raw
-            IGNORE_TOP_SPEED_PERCENTILES,  # speed_extreemes_percentiles
-            True,  # ignore_nonstandard_distances
+            use_raw_gpx_speed=input_use_raw_gpx_speed,
+            with_map_data=False,
         )
 
 
@@ -152,7 +147,9 @@ class TestGetGpxInfoStopTime:
         stopped_speed_threshold to 0 to avoid calculated stopped time
         in segments
         """
-        with patch("builtins.open", return_value=gpx_file):
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
             gpx_data, _, _ = get_gpx_info(
                 gpx_file=random_string(), stopped_speed_threshold=0.0
             )
@@ -166,9 +163,347 @@ class TestGetGpxInfoStopTime:
         stopped_speed_threshold to 0 to avoid calculated stopped time
         in segments
         """
-        with patch("builtins.open", return_value=gpx_file_with_3_segments):
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_3_segments,
+        ):
             gpx_data, _, _ = get_gpx_info(
                 gpx_file=random_string(), stopped_speed_threshold=0.0
             )
 
         assert gpx_data["stop_time"] == timedelta(seconds=120)
+
+
+def get_gpxpy_chart_data(
+    gpx_content: str, segment_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    Chart data calculated with gpxpy objects
+    """
+    segments = gpxpy.parse(gpx_content).tracks[0].segments
+    if segment_id is not None:
+        segments = [segments[segment_id - 1]]
+    chart_data = []
+    first_point = None
+    previous_point = None
+    previous_distance = 0.0
+    for segment in segments:
+        for point_idx, point in enumerate(segment.points):
+            if first_point is None:
+                first_point = point
+            distance = (
+                point.distance_3d(previous_point)
+                if (
+                    point.elevation
+                    and previous_point
+                    and previous_point.elevation
+                )
+                else point.distance_2d(previous_point)  # type: ignore
+            ) or 0.0
+            distance += previous_distance
+            speed = segment.get_speed(point_idx)
+            data = {
+                "distance": round(distance / 1000, 2),
+                "duration": point.time_difference(first_point),
+                "latitude": point.latitude,
+                "longitude": point.longitude,
+                "speed": (
+                    0 if speed is None else round((speed / 1000) * 3600, 2)
+                ),
+                "time": point.time,
+            }
+            if point.elevation:
+                data["elevation"] = round(point.elevation, 1)
+            chart_data.append(data)
+            previous_point = point
+            previous_distance = distance
+    return chart_data
+
+
+class TestGetChartData:
+    @pytest.mark.parametrize(
+        "input_gpx_fixture",
+        [
+            "gpx_file",
+            "gpx_file_with_offset",
+            "gpx_file_without_elevation",
+            "gpx_file_with_segments",
+            "gpx_file_with_3_segments",
+        ],
+    )
+    def test_it_returns_same_chart_data_as_gpxpy(
+        self, request: pytest.FixtureRequest, input_gpx_fixture: str
+    ) -> None:
+        gpx_content = request.getfixturevalue(input_gpx_fixture)
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_content
+        ):
+            chart_data = get_chart_data(gpx_file=random_string())
+
+        assert_almost_equal(chart_data, get_gpxpy_chart_data(gpx_content))
+
+    @pytest.mark.parametrize("input_segment_id", [1, 2])
+    def test_it_returns_same_segment_chart_data_as_gpxpy(
+        self, gpx_file_with_segments: str, input_segment_id: int
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            chart_data = get_chart_data(
+                gpx_file=random_string(), segment_id=input_segment_id
+            )
+
+        assert_almost_equal(
+            chart_data,
+            get_gpxpy_chart_data(gpx_file_with_segments, input_segment_id),
+        )
+
+    def test_it_returns_none_when_gpx_file_has_no_tracks(
+        self, gpx_file_wo_track: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_wo_track,
+        ):
+            chart_data = get_chart_data(gpx_file=random_string())
+
+        assert chart_data is None
+
+    @pytest.mark.parametrize("input_segment_id", [None, 1])
+    def test_it_returns_downsampled_chart_data(
+        self, gpx_file_with_segments: str, input_segment_id: Optional[int]
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            all_chart_data = get_chart_data(
+                gpx_file=random_string(), segment_id=input_segment_id
+            )
+            chart_data = get_chart_data(
+                gpx_file=random_string(),
+                segment_id=input_segment_id,
+                max_points=5,
+            )
+
+        assert all_chart_data and chart_data
+        assert len(chart_data) == 5
+        assert chart_data[0] == all_chart_data[0]
+        assert chart_data[-1] == all_chart_data[-1]
+        assert all(data in all_chart_data for data in chart_data)
+
+    def test_it_returns_all_points_when_max_points_exceeds_points_count(
+        self, gpx_file: str
+    ) -> None:
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            chart_data = get_chart_data(
+                gpx_file=random_string(), max_points=1000
+            )
+
+        assert_almost_equal(chart_data, get_gpxpy_chart_data(gpx_file))
+
+
+class TestGetColumnarChartData:
+    @pytest.mark.parametrize(
+        "input_gpx_fixture", ["gpx_file", "gpx_file_without_elevation"]
+    )
+    def test_it_returns_same_values_as_chart_data(
+        self, request: pytest.FixtureRequest, input_gpx_fixture: str
+    ) -> None:
+        gpx_content = request.getfixturevalue(input_gpx_fixture)
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_content
+        ):
+            chart_data = get_chart_data(gpx_file=random_string())
+            columnar_chart_data = get_columnar_chart_data(
+                gpx_file=random_string()
+            )
+
+        assert chart_data and columnar_chart_data
+        assert columnar_chart_data == {
+            field: [point.get(field) for point in chart_data]
+            for field in CHART_DATA_FIELDS
+        }
+
+    def test_it_returns_none_when_gpx_file_has_no_tracks(
+        self, gpx_file_wo_track: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_wo_track,
+        ):
+            chart_data = get_columnar_chart_data(gpx_file=random_string())
+
+        assert chart_data is None
+
+
+class TestGetBinaryChartData:
+    @pytest.mark.parametrize("input_segment_id", [None, 2])
+    def test_it_returns_packed_chart_data(
+        self, gpx_file_with_segments: str, input_segment_id: Optional[int]
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            chart_data = get_chart_data(
+                gpx_file=random_string(), segment_id=input_segment_id
+            )
+            binary_chart_data = get_binary_chart_data(
+                gpx_file=random_string(), segment_id=input_segment_id
+            )
+
+        assert chart_data
+        (points_count,) = struct.unpack_from("<I", binary_chart_data)
+        assert points_count == len(chart_data)
+        offset = 4
+        columns = {}
+        for field in CHART_DATA_FIELDS:
+            columns[field] = np.frombuffer(
+                binary_chart_data,
+                dtype=CHART_DATA_BINARY_TYPES[field],
+                count=points_count,
+                offset=offset,
+            )
+            offset += columns[field].nbytes
+        assert offset == len(binary_chart_data)
+        assert columns["latitude"].tolist() == [
+            point["latitude"] for point in chart_data
+        ]
+        assert columns["longitude"].tolist() == [
+            point["longitude"] for point in chart_data
+        ]
+        assert columns["time"].tolist() == [
+            point["time"].timestamp() for point in chart_data
+        ]
+        assert np.allclose(
+            columns["distance"],
+            [point["distance"] for point in chart_data],
+            atol=0.01,
+        )
+        assert np.allclose(
+            columns["elevation"],
+            [point["elevation"] for point in chart_data],
+            atol=0.1,
+        )
+        assert np.allclose(
+            columns["speed"],
+            [point["speed"] for point in chart_data],
+            atol=0.01,
+        )
+
+    def test_it_returns_no_points_when_gpx_file_has_no_tracks(
+        self, gpx_file_wo_track: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_wo_track,
+        ):
+            chart_data = get_binary_chart_data(gpx_file=random_string())
+
+        assert chart_data == struct.pack("<I", 0)
+
+
+class TestGetGeometryFromGpxFile:
+    def test_it_returns_one_line_per_segment(
+        self, gpx_file_with_segments: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            geometry = get_geometry_from_gpx_file(gpx_file=random_string())
+
+        assert isinstance(geometry, dict)
+        assert geometry["type"] == "MultiLineString"
+        segments = gpxpy.parse(gpx_file_with_segments).tracks[0].segments
+        assert len(geometry["coordinates"]) == len(segments)
+        for line, segment in zip(geometry["coordinates"], segments):
+            segment_coordinates = [
+                [point.longitude, point.latitude] for point in segment.points
+            ]
+            assert 2 < len(line) <= len(segment_coordinates)
+            assert line[0] == segment_coordinates[0]
+            assert line[-1] == segment_coordinates[-1]
+            assert all(
+                coordinates in segment_coordinates for coordinates in line
+            )
+
+    def test_it_returns_only_given_segment(
+        self, gpx_file_with_segments: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            geometry = get_geometry_from_gpx_file(
+                gpx_file=random_string(), segment_id=2
+            )
+            all_segments_geometry = get_geometry_from_gpx_file(
+                gpx_file=random_string()
+            )
+
+        assert isinstance(geometry, dict)
+        assert isinstance(all_segments_geometry, dict)
+        assert geometry["coordinates"] == [
+            all_segments_geometry["coordinates"][1]
+        ]
+
+    def test_it_returns_simplified_geometry(self, gpx_file: str) -> None:
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            geometry = get_geometry_from_gpx_file(
+                gpx_file=random_string(), zoom=0
+            )
+
+        points = gpxpy.parse(gpx_file).tracks[0].segments[0].points
+        assert geometry == {
+            "type": "MultiLineString",
+            "coordinates": [
+                [
+                    [points[0].longitude, points[0].latitude],
+                    [points[-1].longitude, points[-1].latitude],
+                ]
+            ],
+        }
+
+    def test_it_returns_encoded_polylines(
+        self, gpx_file_with_segments: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            geometry = get_geometry_from_gpx_file(
+                gpx_file=random_string(), geometry_format="polyline"
+            )
+
+        assert isinstance(geometry, list)
+        assert len(geometry) == 2
+        assert all(isinstance(polyline, str) for polyline in geometry)
+
+    def test_it_returns_none_when_gpx_file_has_no_tracks(
+        self, gpx_file_wo_track: str
+    ) -> None:
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_wo_track,
+        ):
+            geometry = get_geometry_from_gpx_file(gpx_file=random_string())
+
+        assert geometry is None
@@ -0,0 +1,287 @@
+import os
+import struct
+from pathlib import Path
+from unittest.mock import patch
+
+import gpxpy
+import numpy as np
+import pytest
+from flask import Flask
+
+from fittrackee.workouts.exceptions import TrackColumnsException
+from fittrackee.workouts.utils.gpx import (
+    extract_segment_from_gpx_file,
+    get_chart_data,
+)
+from fittrackee.workouts.utils.gpx_columns import (
+    TRACK_COLUMNS_VERSION,
+    TrackColumns,
+    get_track_columns,
+    get_track_columns_file_path,
+    remove_track_columns_file,
+)
+from fittrackee.workouts.utils.gpx_stream import (
+    get_timestamp,
+    parse_gpx_stream,
+)
+
+
+def write_gpx_file(tmp_path: Path, gpx_content: str) -> str:
+    gpx_file_path = str(tmp_path / "workout.gpx")
+    with open(gpx_file_path, "w") as f:
+        f.write(gpx_content)
+    return gpx_file_path
+
+
+class TestTrackColumns:
+    def test_it_returns_none_when_gpx_has_no_tracks(
+        self, gpx_file_wo_track: str
+    ) -> None:
+        gpx = parse_gpx_stream(gpx_file_wo_track)
+
+        assert TrackColumns.from_gpx_stats(gpx) is None
+
+    def test_it_stores_first_track_points(
+        self, gpx_file_with_segments: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(
+            parse_gpx_stream(gpx_file_with_segments)
+        )
+
+        assert track_columns
+        segments = gpxpy.parse(gpx_file_with_segments).tracks[0].segments
+        assert track_columns.segments_count == len(segments)
+        assert track_columns.segments_offsets.tolist() == [
+            0,
+            len(segments[0].points),
+            len(segments[0].points) + len(segments[1].points),
+        ]
+        for segment_index, segment in enumerate(segments):
+            points = track_columns.get_segment_points(segment_index)
+            assert points.latitudes.tolist() == [
+                point.latitude for point in segment.points
+            ]
+            assert points.longitudes.tolist() == [
+                point.longitude for point in segment.points
+            ]
+            assert points.elevations.tolist() == [
+                point.elevation for point in segment.points
+            ]
+            assert points.times.tolist() == [
+                get_timestamp(point.time)  # type: ignore
+                for point in segment.points
+            ]
+
+    def test_it_stores_nan_when_elevation_is_missing(
+        self, gpx_file_without_elevation: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(
+            parse_gpx_stream(gpx_file_without_elevation)
+        )
+
+        assert track_columns
+        assert np.isnan(track_columns.elevations).all()
+
+    def test_it_writes_and_reads_columns(
+        self, tmp_path: Path, gpx_file_with_segments: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(
+            parse_gpx_stream(gpx_file_with_segments)
+        )
+        assert track_columns
+        file_path = str(tmp_path / "workout.gpx.columns")
+
+        track_columns.write(file_path)
+        read_track_columns = TrackColumns.read(file_path)
+
+        for column in [
+            "latitudes",
+            "longitudes",
+            "elevations",
+            "times",
+            "distances",
+            "significances",
+            "segments_offsets",
+        ]:
+            assert np.array_equal(
+                getattr(read_track_columns, column),
+                getattr(track_columns, column),
+            )
+        assert os.listdir(tmp_path) == ["workout.gpx.columns"]
+
+    def test_it_removes_temporary_file_when_write_fails(
+        self, tmp_path: Path, gpx_file_with_segments: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(
+            parse_gpx_stream(gpx_file_with_segments)
+        )
+        assert track_columns
+        file_path = str(tmp_path / "workout.gpx.columns")
+
+        with (
+            patch(
+                "fittrackee.workouts.utils.gpx_columns.os.replace",
+                side_effect=OSError("error"),
+            ),
+            pytest.raises(OSError),
+        ):
+            track_columns.write(file_path)
+
+        assert os.listdir(tmp_path) == []
+
+    def test_it_raises_error_when_file_version_differs(
+        self, tmp_path: Path, gpx_file: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(parse_gpx_stream(gpx_file))
+        assert track_columns
+        file_path = str(tmp_path / "workout.gpx.columns")
+        track_columns.write(file_path)
+        with open(file_path, "r+b") as f:
+            f.seek(8)
+            f.write(struct.pack("<H", TRACK_COLUMNS_VERSION + 1))
+
+        with pytest.raises(
+            TrackColumnsException,
+            match="unsupported track columns file version",
+        ):
+            TrackColumns.read(file_path)
+
+    @pytest.mark.parametrize(
+        "input_description,input_content",
+        [
+            ("empty file", b""),
+            ("invalid magic bytes", b"0" * 100),
+        ],
+    )
+    def test_it_raises_error_when_file_is_invalid(
+        self, tmp_path: Path, input_description: str, input_content: bytes
+    ) -> None:
+        file_path = str(tmp_path / "workout.gpx.columns")
+        with open(file_path, "wb") as f:
+            f.write(input_content)
+
+        with pytest.raises(
+            TrackColumnsException, match="invalid track columns file"
+        ):
+            TrackColumns.read(file_path)
+
+    def test_it_raises_error_when_file_is_truncated(
+        self, tmp_path: Path, gpx_file: str
+    ) -> None:
+        track_columns = TrackColumns.from_gpx_stats(parse_gpx_stream(gpx_file))
+        assert track_columns
+        file_path = str(tmp_path / "workout.gpx.columns")
+        track_columns.write(file_path)
+        with open(file_path, "r+b") as f:
+            f.truncate(100)
+
+        with pytest.raises(
+            TrackColumnsException, match="invalid track columns file"
+        ):
+            TrackColumns.read(file_path)
+
+
+class TestGetTrackColumns:
+    def test_it_creates_file_when_missing(
+        self, app: Flask, tmp_path: Path, gpx_file: str
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file)
+
+        track_columns = get_track_columns(gpx_file_path)
+
+        assert track_columns
+        assert track_columns.points_count == gpx_file.count("</trkpt>")
+        assert os.path.exists(get_track_columns_file_path(gpx_file_path))
+
+    def test_it_does_not_parse_gpx_file_when_columns_file_exists(
+        self, app: Flask, tmp_path: Path, gpx_file: str
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file)
+        get_track_columns(gpx_file_path)
+
+        with patch(
+            "fittrackee.workouts.utils.gpx_columns.parse_gpx_stream"
+        ) as parse_gpx_stream_mock:
+            track_columns = get_track_columns(gpx_file_path)
+
+        parse_gpx_stream_mock.assert_not_called()
+        assert track_columns
+        assert track_columns.points_count == gpx_file.count("</trkpt>")
+
+    def test_it_rebuilds_file_when_invalid(
+        self, app: Flask, tmp_path: Path, gpx_file: str
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file)
+        with open(get_track_columns_file_path(gpx_file_path), "wb") as f:
+            f.write(b"invalid")
+
+        track_columns = get_track_columns(gpx_file_path)
+
+        assert track_columns
+        assert TrackColumns.read(
+            get_track_columns_file_path(gpx_file_path)
+        ).points_count == gpx_file.count("</trkpt>")
+
+    def test_it_returns_none_when_gpx_has_no_tracks(
+        self, app: Flask, tmp_path: Path, gpx_file_wo_track: str
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file_wo_track)
+
+        assert get_track_columns(gpx_file_path) is None
+        assert not os.path.exists(get_track_columns_file_path(gpx_file_path))
+
+    def test_it_removes_columns_file(
+        self, app: Flask, tmp_path: Path, gpx_file: str
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file)
+        get_track_columns(gpx_file_path)
+
+        remove_track_columns_file(gpx_file_path)
+
+        assert not os.path.exists(get_track_columns_file_path(gpx_file_path))
+
+
+class TestGetDataFromTrackColumns:
+    @pytest.mark.parametrize("input_segment_id", [None, 1, 2])
+    def test_chart_data_from_columns_file_are_same_as_from_gpx_file(
+        self,
+        app: Flask,
+        tmp_path: Path,
+        gpx_file_with_segments: str,
+        input_segment_id: int,
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file_with_segments)
+        # columns file is created
+        chart_data = get_chart_data(gpx_file_path, input_segment_id)
+
+        assert get_chart_data(gpx_file_path, input_segment_id) == chart_data
+
+    @pytest.mark.parametrize("input_segment_id", [1, 2])
+    def test_it_extracts_segment_from_columns_file(
+        self,
+        app: Flask,
+        tmp_path: Path,
+        gpx_file_with_segments: str,
+        input_segment_id: int,
+    ) -> None:
+        gpx_file_path = write_gpx_file(tmp_path, gpx_file_with_segments)
+        get_track_columns(gpx_file_path)
+
+        segment_content = extract_segment_from_gpx_file(
+            gpx_file_path, input_segment_id
+        )
+
+        assert segment_content
+        segment = gpxpy.parse(segment_content).tracks[0].segments[0]
+        expected_segment = (
+            gpxpy.parse(gpx_file_with_segments)
+            .tracks[0]
+            .segments[input_segment_id - 1]
+        )
+        assert [
+            (point.latitude, point.longitude, point.elevation)
+            for point in segment.points
+        ] == [
+            (point.latitude, point.longitude, point.elevation)
+            for point in expected_segment.points
+        ]
@@ -0,0 +1,212 @@
+from typing import List
+
+import gpxpy
+import numpy as np
+import pytest
+from gpxpy.geo import distance
+
+from fittrackee.tests.utils import assert_almost_equal
+from fittrackee.workouts.utils import gpx_metrics
+from fittrackee.workouts.utils.gpx_metrics import SegmentPoints
+from fittrackee.workouts.utils.gpx_stream import get_timestamp
+
+GPX_FIXTURES = [
+    "gpx_file",
+    "gpx_file_with_offset",
+    "gpx_file_without_elevation",
+    "gpx_file_with_segments",
+    "gpx_file_with_3_segments",
+]
+
+
+def get_segments(gpx_content: str) -> List[gpxpy.gpx.GPXTrackSegment]:
+    return gpxpy.parse(gpx_content).tracks[0].segments
+
+
+def get_segment_points(segment: gpxpy.gpx.GPXTrackSegment) -> SegmentPoints:
+    return SegmentPoints(
+        np.array([point.latitude for point in segment.points]),
+        np.array([point.longitude for point in segment.points]),
+        np.array(
+            [
+                np.nan if point.elevation is None else point.elevation
+                for point in segment.points
+            ]
+        ),
+        np.array(
+            [
+                np.nan if point.time is None else get_timestamp(point.time)
+                for point in segment.points
+            ]
+        ),
+    )
+
+
+class TestGetDistances:
+    def test_it_returns_same_distances_as_gpxpy(self) -> None:
+        points = [
+            # latitude, longitude, elevation
+            (44.68095, 6.07367, 998.0),
+            (44.68091, 6.07367, None),
+            (44.6808, 6.07364, 994.0),
+            (44.6808, 6.07364, 994.0),
+            (44.68075, 6.07364, 0.0),
+            # distant point: haversine distance is used
+            (45.1, 6.5, 1200.0),
+            (45.1, 6.5, 1190.0),
+            (-12.3, -77.1, 150.0),
+        ]
+        latitudes = np.array([point[0] for point in points])
+        longitudes = np.array([point[1] for point in points])
+        elevations = np.array(
+            [np.nan if point[2] is None else point[2] for point in points]
+        )
+
+        distances = gpx_metrics.get_distances(
+            latitudes[1:],
+            longitudes[1:],
+            elevations[1:],
+            latitudes[:-1],
+            longitudes[:-1],
+            elevations[:-1],
+        )
+
+        assert_almost_equal(
+            distances.tolist(),
+            [
+                distance(*point, *previous_point)
+                for previous_point, point in zip(points, points[1:])
+            ],
+        )
+
+
+class TestGetMovingData:
+    @pytest.mark.parametrize("input_gpx_fixture", GPX_FIXTURES)
+    @pytest.mark.parametrize("input_threshold", [0.0, 0.1, 1.0, 5.0])
+    def test_it_returns_same_moving_data_as_gpxpy(
+        self,
+        request: pytest.FixtureRequest,
+        input_gpx_fixture: str,
+        input_threshold: float,
+    ) -> None:
+        for segment in get_segments(
+            request.getfixturevalue(input_gpx_fixture)
+        ):
+            moving_data, _, _ = gpx_metrics.get_moving_data(
+                get_segment_points(segment), input_threshold
+            )
+
+            expected_moving_data = segment.get_moving_data(
+                stopped_speed_threshold=input_threshold
+            )
+            assert_almost_equal(
+                moving_data[:4],
+                expected_moving_data[:4],  # type: ignore
+            )
+
+    def test_it_returns_empty_moving_data_when_segment_has_one_point(
+        self, gpx_file: str
+    ) -> None:
+        segment = get_segments(gpx_file)[0]
+        segment.points = segment.points[:1]
+
+        moving_data, speeds, distances = gpx_metrics.get_moving_data(
+            get_segment_points(segment), 1.0
+        )
+
+        assert moving_data == (0.0, 0.0, 0.0, 0.0, 0.0)
+        assert speeds.size == 0
+        assert distances.size == 0
+
+
+class TestGetMaxSpeed:
+    @pytest.mark.parametrize("input_gpx_fixture", GPX_FIXTURES)
+    @pytest.mark.parametrize("input_threshold", [0.1, 1.0, 5.0])
+    @pytest.mark.parametrize("input_raw", [True, False])
+    def test_it_returns_same_max_speed_as_gpxpy(
+        self,
+        request: pytest.FixtureRequest,
+        input_gpx_fixture: str,
+        input_threshold: float,
+        input_raw: bool,
+    ) -> None:
+        for segment in get_segments(
+            request.getfixturevalue(input_gpx_fixture)
+        ):
+            _, speeds, distances = gpx_metrics.get_moving_data(
+                get_segment_points(segment), input_threshold
+            )
+
+            max_speed = gpx_metrics.get_max_speed(
+                speeds, distances, raw=input_raw
+            )
+
+            expected_moving_data = segment.get_moving_data(
+                stopped_speed_threshold=input_threshold, raw=input_raw
+            )
+            assert max_speed == pytest.approx(
+                expected_moving_data.max_speed  # type: ignore
+            )
+
+
+class TestGetUphillDownhill:
+    @pytest.mark.parametrize("input_gpx_fixture", GPX_FIXTURES)
+    def test_it_returns_same_uphill_and_downhill_as_gpxpy(
+        self, request: pytest.FixtureRequest, input_gpx_fixture: str
+    ) -> None:
+        for segment in get_segments(
+            request.getfixturevalue(input_gpx_fixture)
+        ):
+            uphill_downhill = gpx_metrics.get_uphill_downhill(
+                get_segment_points(segment).elevations
+            )
+
+            assert_almost_equal(
+                uphill_downhill, tuple(segment.get_uphill_downhill())
+            )
+
+
+class TestGetSpeeds:
+    @pytest.mark.parametrize("input_gpx_fixture", GPX_FIXTURES)
+    def test_it_returns_same_speeds_as_gpxpy(
+        self, request: pytest.FixtureRequest, input_gpx_fixture: str
+    ) -> None:
+        for segment in get_segments(
+            request.getfixturevalue(input_gpx_fixture)
+        ):
+            speeds = gpx_metrics.get_speeds(get_segment_points(segment))
+
+            assert_almost_equal(
+                [None if np.isnan(speed) else speed for speed in speeds],
+                [
+                    segment.get_speed(point_idx)
+                    for point_idx in range(len(segment.points))
+                ],
+            )
+
+
+class TestGetCumulativeDistances:
+    def test_it_returns_distances_from_first_point(
+        self, gpx_file_with_segments: str
+    ) -> None:
+        segments = get_segments(gpx_file_with_segments)
+        points = gpx_metrics.concatenate_points(
+            [get_segment_points(segment) for segment in segments]
+        )
+
+        distances = gpx_metrics.get_cumulative_distances(points)
+
+        gpx_points = [
+            point for segment in segments for point in segment.points
+        ]
+        expected_distances = [0.0]
+        for previous_point, point in zip(gpx_points, gpx_points[1:]):
+            expected_distances.append(
+                expected_distances[-1]  # type: ignore
+                + (
+                    point.distance_3d(previous_point)
+                    if point.elevation and previous_point.elevation
+                    else point.distance_2d(previous_point)
+                )
+            )
+        assert_almost_equal(distances.tolist(), expected_distances)
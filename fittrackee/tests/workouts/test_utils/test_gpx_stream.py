@@ -0,0 +1,159 @@
+from typing import Any, Dict
+
+import gpxpy
+import pytest
+
+from fittrackee.tests.utils import assert_almost_equal
+from fittrackee.workouts.utils.gpx_stream import parse_gpx_stream
+
+
+def get_gpxpy_stats(
+    gpx_content: str, stopped_speed_threshold: float, raw: bool
+) -> Dict[str, Any]:
+    gpx = gpxpy.parse(gpx_content)
+    segments = gpx.tracks[0].segments
+    return {
+        "segments": [
+            (
+                segment.get_duration(),
+                segment.get_elevation_extremes(),
+                segment.get_uphill_downhill(),
+                segment.get_moving_data(
+                    stopped_speed_threshold=stopped_speed_threshold
+                ),
+                segment.get_moving_data(  # type: ignore
+                    stopped_speed_threshold=stopped_speed_threshold, raw=raw
+                ).max_speed,
+            )
+            for segment in segments
+        ],
+        "duration": gpx.get_duration(),
+        "elevation": gpx.get_elevation_extremes(),
+        "hill": gpx.get_uphill_downhill(),
+        "moving_data": gpx.get_moving_data(
+            stopped_speed_threshold=stopped_speed_threshold
+        ),
+        "bounds": list(gpx.get_bounds()),  # type: ignore
+        "map_data": [
+            [point.longitude, point.latitude]
+            for segment in segments
+            for point in segment.points
+        ],
+        "first_point": segments[0].points[0],
+        "last_point": segments[-1].points[-1],
+    }
+
+
+def get_streaming_stats(
+    gpx_content: str, stopped_speed_threshold: float, raw: bool
+) -> Dict[str, Any]:
+    gpx = parse_gpx_stream(
+        gpx_content,
+        stopped_speed_threshold=stopped_speed_threshold,
+        use_raw_gpx_speed=raw,
+    )
+    return {
+        "segments": [
+            (
+                segment.get_duration(),
+                segment.get_elevation_extremes(),
+                segment.get_uphill_downhill(),
+                segment.get_moving_data(),
+                segment.get_max_speed(raw=raw),
+            )
+            for segment in gpx.tracks[0].segments
+        ],
+        "duration": gpx.get_duration(),
+        "elevation": gpx.get_elevation_extremes(),
+        "hill": gpx.get_uphill_downhill(),
+        "moving_data": gpx.get_moving_data(),
+        "bounds": list(gpx.get_bounds()),  # type: ignore
+        "map_data": gpx.map_data,
+        "first_point": gpx.first_point,
+        "last_point": gpx.last_point,
+    }
+
+
+class TestParseGpxStream:
+    @pytest.mark.parametrize(
+        "input_gpx_fixture",
+        [
+            "gpx_file",
+            "gpx_file_with_offset",
+            "gpx_file_without_elevation",
+            "gpx_file_with_segments",
+            "gpx_file_with_3_segments",
+        ],
+    )
+    @pytest.mark.parametrize("input_threshold", [0.0, 1.0, 5.0])
+    @pytest.mark.parametrize("input_raw", [True, False])
+    def test_it_returns_same_statistics_as_gpxpy(
+        self,
+        request: pytest.FixtureRequest,
+        input_gpx_fixture: str,
+        input_threshold: float,
+        input_raw: bool,
+    ) -> None:
+        gpx_content = request.getfixturevalue(input_gpx_fixture)
+
+        stats = get_streaming_stats(gpx_content, input_threshold, input_raw)
+
+        expected_stats = get_gpxpy_stats(
+            gpx_content, input_threshold, input_raw
+        )
+        for key in ["first_point", "last_point"]:
+            point = stats.pop(key)
+            expected_point = expected_stats.pop(key)
+            assert (
+                point.latitude,
+                point.longitude,
+                point.elevation,
+                point.time,
+            ) == (
+                expected_point.latitude,
+                expected_point.longitude,
+                expected_point.elevation,
+                expected_point.time,
+            )
+        assert_almost_equal(stats, expected_stats)
+
+    def test_it_ignores_extensions(self, gpx_file: str) -> None:
+        gpx_content = gpx_file.replace(
+            "<ele>998</ele>",
+            "<ele>998</ele><extensions>"
+            '<ns3:TrackPointExtension xmlns:ns3="http://example.com/ext">'
+            "<ns3:ele>1</ns3:ele><ns3:time>invalid</ns3:time>"
+            "</ns3:TrackPointExtension></extensions>",
+            1,
+        )
+        assert gpx_content != gpx_file
+
+        stats = parse_gpx_stream(gpx_content, stopped_speed_threshold=1.0)
+
+        assert stats.get_elevation_extremes() == (
+            parse_gpx_stream(
+                gpx_file, stopped_speed_threshold=1.0
+            ).get_elevation_extremes()
+        )
+
+    def test_it_does_not_return_map_data_when_disabled(
+        self, gpx_file: str
+    ) -> None:
+        stats = parse_gpx_stream(
+            gpx_file, stopped_speed_threshold=1.0, with_map_data=False
+        )
+
+        assert stats.map_data == []
+
+    def test_it_flags_missing_time(self, gpx_file_without_time: str) -> None:
+        stats = parse_gpx_stream(
+            gpx_file_without_time, stopped_speed_threshold=1.0
+        )
+
+        assert stats.is_time_missing is True
+
+    def test_it_raises_error_when_xml_is_invalid(
+        self, gpx_file_invalid_xml: str
+    ) -> None:
+        with pytest.raises(Exception):  # noqa: B017
+            parse_gpx_stream(gpx_file_invalid_xml, stopped_speed_threshold=1.0)
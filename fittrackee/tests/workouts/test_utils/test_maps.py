@@ -1,8 +1,34 @@
-from unittest.mock import patch
+import fcntl
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, List
+from unittest.mock import Mock, patch
 
 import pytest
+from flask import Flask
+from PIL import Image
 
-from fittrackee.workouts.utils.maps import get_static_map_tile_server_url
+from fittrackee.workouts.exceptions import WorkoutGPXException
+from fittrackee.workouts.utils.maps import (
+    MAP_SIZES,
+    MAPS_LOCK_FILE,
+    CachedStaticMap,
+    StaticMap,
+    generate_map,
+    generate_missing_map,
+    get_map_variant_filepath,
+    get_map_variants_filepaths,
+    get_static_map_tile_server_url,
+)
+from fittrackee.workouts.utils.tile_cache import (
+    EVICTION_LOCK_FILE,
+    TileCache,
+    get_tile_cache,
+)
+
+TILE_URL = "https://{s}.tile-cyclosm.openstreetmap.fr/cyclosm/{z}/{x}/{y}.png"
 
 
 class TestGetStaticMapTileServerUrl:
@@ -70,3 +96,326 @@ class TestGetStaticMapTileServerUrl:
                 "https://b.tile-cyclosm.openstreetmap.fr/cyclosm/"
                 "{z}/{x}/{y}.png"
             )
+
+
+class TestTileCache:
+    def test_it_returns_none_when_tile_is_not_cached(
+        self, tmp_path: Path
+    ) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=0)
+
+        assert tile_cache.get("server", 10, 1, 2) is None
+
+    def test_it_returns_cached_tile(self, tmp_path: Path) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=0)
+        tile_cache.set("server", 10, 1, 2, b"tile")
+
+        assert tile_cache.get("server", 10, 1, 2) == b"tile"
+        assert tile_cache.get("other_server", 10, 1, 2) is None
+        # no temporary file left
+        assert os.listdir(tmp_path / "server" / "10" / "1") == ["2.tile"]
+
+    def test_it_returns_none_when_tile_is_expired(
+        self, tmp_path: Path
+    ) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=60)
+        tile_cache.set("server", 10, 1, 2, b"tile")
+        tile_path = tile_cache.get_tile_path("server", 10, 1, 2)
+        downloaded_at = time.time() - 61
+        os.utime(tile_path, (downloaded_at, downloaded_at))
+
+        assert tile_cache.get("server", 10, 1, 2) is None
+
+    def test_it_evicts_expired_tiles(self, tmp_path: Path) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=60)
+        tile_cache.set("server", 10, 1, 2, b"tile")
+        tile_cache.set("server", 10, 1, 3, b"tile")
+        tile_path = tile_cache.get_tile_path("server", 10, 1, 2)
+        downloaded_at = time.time() - 61
+        os.utime(tile_path, (downloaded_at, downloaded_at))
+
+        assert tile_cache.evict() == {"removed_tiles": 1, "cache_size": 4}
+        assert not os.path.exists(tile_path)
+
+    def test_it_evicts_least_recently_used_tiles_when_cache_is_full(
+        self, tmp_path: Path
+    ) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=10, ttl=0)
+        now = time.time()
+        for y in range(3):
+            tile_cache.set("server", 10, 1, y, b"tile")
+            tile_path = tile_cache.get_tile_path("server", 10, 1, y)
+            os.utime(tile_path, (now - 10 + y, now - 10 + y))
+        # tile 0 is used after tile 1
+        tile_cache.get("server", 10, 1, 0)
+
+        assert tile_cache.evict() == {"removed_tiles": 1, "cache_size": 8}
+
+        assert tile_cache.get("server", 10, 1, 0) == b"tile"
+        assert tile_cache.get("server", 10, 1, 1) is None
+        assert tile_cache.get("server", 10, 1, 2) == b"tile"
+
+    def test_it_does_not_evict_when_eviction_is_in_progress(
+        self, tmp_path: Path
+    ) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=60)
+        tile_cache.set("server", 10, 1, 2, b"tile")
+        tile_path = tile_cache.get_tile_path("server", 10, 1, 2)
+        downloaded_at = time.time() - 61
+        os.utime(tile_path, (downloaded_at, downloaded_at))
+
+        with open(tmp_path / EVICTION_LOCK_FILE, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            assert tile_cache.evict() is None
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        assert os.path.exists(tile_path)
+
+    def test_it_requests_eviction_after_writes_interval(
+        self, tmp_path: Path
+    ) -> None:
+        eviction_handler = Mock()
+        tile_cache = TileCache(
+            str(tmp_path),
+            max_size=4,
+            ttl=0,
+            eviction_writes_interval=3,
+            eviction_handler=eviction_handler,
+        )
+
+        for y in range(5):
+            tile_cache.set("server", 10, 1, y, b"tile")
+
+        eviction_handler.assert_called_once_with()
+        # tiles are not evicted on write
+        for y in range(5):
+            assert tile_cache.get("server", 10, 1, y) == b"tile"
+
+    def test_it_does_not_request_eviction_when_cache_is_not_limited(
+        self, tmp_path: Path
+    ) -> None:
+        eviction_handler = Mock()
+        tile_cache = TileCache(
+            str(tmp_path),
+            max_size=0,
+            ttl=0,
+            eviction_writes_interval=1,
+            eviction_handler=eviction_handler,
+        )
+
+        tile_cache.set("server", 10, 1, 2, b"tile")
+
+        eviction_handler.assert_not_called()
+
+    def test_it_sends_eviction_task(self, app: Flask, tmp_path: Path) -> None:
+        tile_cache = get_tile_cache(
+            {
+                "CACHE_FOLDER": str(tmp_path),
+                "CACHE_MAX_SIZE": 10,
+                "CACHE_TTL": 0,
+            }
+        )
+        assert tile_cache
+        tile_cache.eviction_writes_interval = 1
+
+        with patch("fittrackee.workouts.tasks.evict_tile_cache") as task_mock:
+            tile_cache.set("server", 10, 1, 2, b"tile")
+
+        task_mock.send.assert_called_once_with()
+
+
+class TestCachedStaticMap:
+    def test_it_fetches_tile_from_tile_server_with_subdomain(
+        self, tmp_path: Path, static_map_get_mock: Mock
+    ) -> None:
+        static_map_get_mock.reset_mock()
+        static_map = CachedStaticMap(
+            400,
+            225,
+            10,
+            tile_url_template=TILE_URL.replace("{s}", "b"),
+            tile_cache=TileCache(str(tmp_path), max_size=0, ttl=0),
+            tile_server_key=TileCache.get_server_key(TILE_URL),
+        )
+
+        status_code, _ = static_map.get("10/1/2", timeout=None)
+
+        assert status_code == 200
+        static_map_get_mock.assert_called_once_with(
+            "https://b.tile-cyclosm.openstreetmap.fr/cyclosm/10/1/2.png",
+            timeout=None,
+        )
+
+    def test_it_returns_cached_tile_for_another_subdomain(
+        self, tmp_path: Path, static_map_get_mock: Mock
+    ) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=0)
+        for subdomain in ["a", "b"]:
+            static_map = CachedStaticMap(
+                400,
+                225,
+                10,
+                tile_url_template=TILE_URL.replace("{s}", subdomain),
+                tile_cache=tile_cache,
+                tile_server_key=TileCache.get_server_key(TILE_URL),
+            )
+            static_map_get_mock.reset_mock()
+
+            static_map.get("10/1/2")
+
+        static_map_get_mock.assert_not_called()
+
+    def test_it_does_not_cache_tile_on_error(self, tmp_path: Path) -> None:
+        tile_cache = TileCache(str(tmp_path), max_size=0, ttl=0)
+        static_map = CachedStaticMap(
+            400,
+            225,
+            10,
+            tile_url_template=TILE_URL.replace("{s}", "a"),
+            tile_cache=tile_cache,
+        )
+
+        with patch.object(StaticMap, "get", return_value=(503, b"")):
+            status_code, _ = static_map.get("10/1/2")
+
+        assert status_code == 503
+        assert tile_cache.get(static_map.tile_server_key, 10, 1, 2) is None
+
+
+class TestGetMapVariantFilepath:
+    def test_it_returns_workout_map_filepath_for_default_variant(
+        self,
+    ) -> None:
+        assert (
+            get_map_variant_filepath("workouts/1/map.png", "card", "png")
+            == "workouts/1/map.png"
+        )
+
+    @pytest.mark.parametrize(
+        "input_size,input_format,expected_filepath",
+        [
+            ("card", "webp", "workouts/1/map_card.webp"),
+            ("thumbnail", "png", "workouts/1/map_thumbnail.png"),
+            ("retina", "webp", "workouts/1/map_retina.webp"),
+        ],
+    )
+    def test_it_returns_variant_filepath(
+        self, input_size: str, input_format: str, expected_filepath: str
+    ) -> None:
+        assert (
+            get_map_variant_filepath(
+                "workouts/1/map.png", input_size, input_format
+            )
+            == expected_filepath
+        )
+
+
+class TestGenerateMap:
+    def test_it_generates_map_variants(
+        self, app: Flask, tmp_path: Path
+    ) -> None:
+        map_filepath = str(tmp_path / "map.png")
+
+        generate_map(map_filepath, [[2.0, 1.0], [2.1, 1.1]])
+
+        for size, expected_size in MAP_SIZES.items():
+            for image_format in ["png", "webp"]:
+                image = Image.open(
+                    get_map_variant_filepath(map_filepath, size, image_format)
+                )
+                assert image.format == image_format.upper()
+                assert image.size == expected_size
+        # no temporary files left
+        assert len(os.listdir(tmp_path)) == 6
+
+
+class TestGenerateMissingMap:
+    def test_it_generates_missing_variants(self, tmp_path: Path) -> None:
+        # map generated before size variants were introduced
+        map_filepath = str(tmp_path / "map.png")
+        Path(map_filepath).write_bytes(b"map")
+        track_columns = Mock(latitudes=[1.0, 1.1], longitudes=[2.0, 2.1])
+
+        with (
+            patch(
+                "fittrackee.workouts.utils.maps.get_track_columns",
+                return_value=track_columns,
+            ),
+            patch(
+                "fittrackee.workouts.utils.maps.generate_map"
+            ) as generate_map_mock,
+        ):
+            assert generate_missing_map(map_filepath, "workout.gpx", {})
+
+        generate_map_mock.assert_called_once()
+
+    def test_it_generates_map_once_for_concurrent_calls(
+        self, tmp_path: Path
+    ) -> None:
+        map_filepath = str(tmp_path / "map.png")
+        generation_started = threading.Event()
+        errors: List[BaseException] = []
+
+        def generate_map(map_filepath: str, *args: Any) -> None:
+            generation_started.set()
+            time.sleep(0.1)
+            for filepath in get_map_variants_filepaths(map_filepath):
+                Path(filepath).write_bytes(b"map")
+
+        def generate_missing_map_in_thread() -> None:
+            try:
+                generate_missing_map(map_filepath, "workout.gpx", {})
+            except BaseException as e:
+                errors.append(e)
+
+        track_columns = Mock(latitudes=[1.0, 1.1], longitudes=[2.0, 2.1])
+        with (
+            patch(
+                "fittrackee.workouts.utils.maps.get_track_columns",
+                return_value=track_columns,
+            ),
+            patch(
+                "fittrackee.workouts.utils.maps.generate_map",
+                side_effect=generate_map,
+            ) as generate_map_mock,
+        ):
+            threads = [
+                threading.Thread(target=generate_missing_map_in_thread)
+                for _ in range(3)
+            ]
+            threads[0].start()
+            generation_started.wait(timeout=5)
+            for thread in threads[1:]:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        assert errors == []
+        generate_map_mock.assert_called_once_with(
+            map_filepath, [[2.0, 1.0], [2.1, 1.1]], {}
+        )
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            [
+                MAPS_LOCK_FILE,
+                *[
+                    os.path.basename(filepath)
+                    for filepath in get_map_variants_filepaths(map_filepath)
+                ],
+            ]
+        )
+
+    def test_it_keeps_lock_file_after_generation_error(
+        self, tmp_path: Path
+    ) -> None:
+        map_filepath = str(tmp_path / "map.png")
+
+        with (
+            patch(
+                "fittrackee.workouts.utils.maps.get_track_columns",
+                return_value=None,
+            ),
+            pytest.raises(WorkoutGPXException),
+        ):
+            generate_missing_map(map_filepath, "workout.gpx", {})
+
+        assert os.listdir(tmp_path) == [MAPS_LOCK_FILE]
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from PIL import Image
+
+from fittrackee.workouts.exceptions import MBTilesException
+from fittrackee.workouts.utils.maps import generate_map
+from fittrackee.workouts.utils.mbtiles import MBTiles, get_mbtiles
+from fittrackee.workouts.utils.tile_proxy import (
+    MBTilesTileProxy,
+    get_tile_proxy,
+)
+
+
+def get_tile_image(color: str) -> bytes:
+    tile = BytesIO()
+    Image.new("RGB", (256, 256), color).save(tile, format="PNG")
+    return tile.getvalue()
+
+
+def create_mbtiles(file_path: str, tile_format: str = "png") -> None:
+    connection = sqlite3.connect(file_path)
+    connection.executescript(
+        "CREATE TABLE metadata (name TEXT, value TEXT);"
+        "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, "
+        "tile_row INTEGER, tile_data BLOB);"
+    )
+    connection.execute(
+        "INSERT INTO metadata VALUES ('format', ?)", (tile_format,)
+    )
+    # tile 1/0/0 (XYZ scheme) is stored with row 1 (TMS scheme)
+    connection.execute(
+        "INSERT INTO tiles VALUES (1, 0, 1, ?)", (get_tile_image("red"),)
+    )
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture()
+def mbtiles_file(tmp_path: Path) -> str:
+    file_path = str(tmp_path / "tiles.mbtiles")
+    create_mbtiles(file_path)
+    return file_path
+
+
+class TestMBTiles:
+    def test_it_raises_error_when_file_does_not_exist(
+        self, tmp_path: Path
+    ) -> None:
+        with pytest.raises(MBTilesException, match="does not exist"):
+            MBTiles(str(tmp_path / "tiles.mbtiles"))
+
+    def test_it_raises_error_when_tiles_format_is_not_supported(
+        self, tmp_path: Path
+    ) -> None:
+        file_path = str(tmp_path / "tiles.mbtiles")
+        create_mbtiles(file_path, tile_format="pbf")
+
+        with pytest.raises(MBTilesException, match="unsupported"):
+            MBTiles(file_path)
+
+    def test_it_returns_content_type(self, mbtiles_file: str) -> None:
+        assert MBTiles(mbtiles_file).content_type == "image/png"
+
+    def test_it_returns_tile_with_xyz_coordinates(
+        self, mbtiles_file: str
+    ) -> None:
+        mbtiles = MBTiles(mbtiles_file)
+
+        assert mbtiles.get_tile_data(1, 0, 0) == get_tile_image("red")
+        assert mbtiles.get_tile_data(1, 0, 1) is None
+
+    def test_it_does_not_allow_writes(self, mbtiles_file: str) -> None:
+        mbtiles = MBTiles(mbtiles_file)
+
+        with (
+            pytest.raises(sqlite3.OperationalError),
+            mbtiles._connection() as connection,
+        ):
+            connection.execute("DELETE FROM tiles")
+
+    def test_it_limits_connections_to_pool_size(
+        self, mbtiles_file: str
+    ) -> None:
+        mbtiles = MBTiles(mbtiles_file, pool_size=2)
+
+        with ThreadPoolExecutor(4) as executor:
+            tiles = list(
+                executor.map(
+                    lambda _: mbtiles.get_tile_data(1, 0, 0), range(20)
+                )
+            )
+
+        assert tiles == [get_tile_image("red")] * 20
+        assert mbtiles._connections_count <= 2
+
+    def test_get_mbtiles_returns_none_when_not_configured(self) -> None:
+        assert get_mbtiles({"MBTILES_FILE": None}) is None
+
+    def test_get_mbtiles_returns_same_instance(
+        self, mbtiles_file: str
+    ) -> None:
+        config = {"MBTILES_FILE": mbtiles_file}
+
+        assert get_mbtiles(config) is get_mbtiles(config)
+
+
+class TestMBTilesTileProxy:
+    def test_it_returns_tile_with_etag(self, mbtiles_file: str) -> None:
+        tile_proxy = get_tile_proxy({"MBTILES_FILE": mbtiles_file})
+
+        tile = tile_proxy.get_tile("a", 1, 0, 0)
+
+        assert isinstance(tile_proxy, MBTilesTileProxy)
+        assert tile.status_code == 200
+        assert tile.content == get_tile_image("red")
+        assert tile.content_type == "image/png"
+        assert tile.etag is not None
+
+    def test_it_returns_404_when_tile_does_not_exist(
+        self, mbtiles_file: str
+    ) -> None:
+        tile_proxy = get_tile_proxy({"MBTILES_FILE": mbtiles_file})
+
+        assert tile_proxy.get_tile("a", 1, 1, 1).status_code == 404
+
+
+class TestGenerateMapWithMBTiles:
+    def test_it_generates_map_without_calling_tile_server(
+        self, tmp_path: Path, mbtiles_file: str, static_map_get_mock: Mock
+    ) -> None:
+        static_map_get_mock.reset_mock()
+        map_filepath = str(tmp_path / "map.png")
+        config = {"MBTILES_FILE": mbtiles_file}
+        mbtiles = MBTiles(mbtiles_file)
+
+        with (
+            patch(
+                "fittrackee.workouts.utils.maps.get_mbtiles",
+                return_value=mbtiles,
+            ),
+            patch.object(
+                mbtiles, "get_tile_data", wraps=mbtiles.get_tile_data
+            ) as get_tile_data_mock,
+        ):
+            generate_map(map_filepath, [[-10, 10], [-9, 11]], config)
+
+        assert os.path.exists(map_filepath)
+        static_map_get_mock.assert_not_called()
+        get_tile_data_mock.assert_called()
@@ -0,0 +1,200 @@
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from fittrackee.workouts.utils.tile_cache import TileCache
+from fittrackee.workouts.utils.tile_proxy import TileProxy
+
+TILE_URL = "https://{s}.tile.example.com/{z}/{x}/{y}.png"
+
+
+def get_response_mock(
+    status_code: int = 200,
+    content: bytes = b"tile",
+    headers: Optional[Dict] = None,
+) -> Mock:
+    response = Mock(status_code=status_code, content=content)
+    response.headers = {"content-type": "image/png", **(headers or {})}
+    return response
+
+
+@pytest.fixture()
+def tile_cache(tmp_path: Path) -> TileCache:
+    return TileCache(str(tmp_path), max_size=0, ttl=60)
+
+
+def expire_tile(tile_cache: TileCache, tile_proxy: TileProxy) -> None:
+    with patch("time.time", return_value=0):
+        tile_cache.refresh(tile_proxy.server_key, 13, 1, 2)
+    assert tile_cache.get(tile_proxy.server_key, 13, 1, 2) is None
+
+
+class TestTileProxy:
+    def test_it_fetches_tile_from_tile_server(self) -> None:
+        tile_proxy = TileProxy(TILE_URL)
+
+        with patch.object(
+            tile_proxy.session, "get", return_value=get_response_mock()
+        ) as get_mock:
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert (tile.content, tile.status_code) == (b"tile", 200)
+        get_mock.assert_called_once_with(
+            "https://a.tile.example.com/13/1/2.png",
+            headers={},
+            timeout=tile_proxy.timeout,
+        )
+
+    def test_it_returns_cached_tile(self, tile_cache: TileCache) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            return_value=get_response_mock(headers={"etag": '"abc"'}),
+        ) as get_mock:
+            tile_proxy.get_tile("a", 13, 1, 2)
+
+            # from another subdomain
+            tile = tile_proxy.get_tile("b", 13, 1, 2)
+
+        get_mock.assert_called_once()
+        assert (tile.content, tile.status_code) == (b"tile", 200)
+        assert tile.etag == '"abc"'
+
+    def test_it_revalidates_expired_tile(self, tile_cache: TileCache) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            return_value=get_response_mock(
+                headers={
+                    "etag": '"abc"',
+                    "last-modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+                }
+            ),
+        ):
+            tile_proxy.get_tile("a", 13, 1, 2)
+        expire_tile(tile_cache, tile_proxy)
+
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            return_value=get_response_mock(status_code=304, content=b""),
+        ) as get_mock:
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert (tile.content, tile.status_code) == (b"tile", 200)
+        get_mock.assert_called_once_with(
+            "https://a.tile.example.com/13/1/2.png",
+            headers={
+                "If-None-Match": '"abc"',
+                "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+            },
+            timeout=tile_proxy.timeout,
+        )
+        # tile expiration is reset
+        assert tile_cache.get(tile_proxy.server_key, 13, 1, 2) == b"tile"
+
+    def test_it_replaces_expired_tile_when_modified(
+        self, tile_cache: TileCache
+    ) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+        with patch.object(
+            tile_proxy.session, "get", return_value=get_response_mock()
+        ):
+            tile_proxy.get_tile("a", 13, 1, 2)
+        expire_tile(tile_cache, tile_proxy)
+
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            return_value=get_response_mock(content=b"new tile"),
+        ):
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert tile.content == b"new tile"
+        assert tile_cache.get(tile_proxy.server_key, 13, 1, 2) == b"new tile"
+
+    def test_it_returns_expired_tile_when_tile_server_is_not_reachable(
+        self, tile_cache: TileCache
+    ) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+        with patch.object(
+            tile_proxy.session, "get", return_value=get_response_mock()
+        ):
+            tile_proxy.get_tile("a", 13, 1, 2)
+        expire_tile(tile_cache, tile_proxy)
+
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            side_effect=requests.exceptions.ConnectionError(),
+        ):
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert (tile.content, tile.status_code) == (b"tile", 200)
+
+    def test_it_returns_502_when_tile_server_is_not_reachable(
+        self, tile_cache: TileCache
+    ) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            side_effect=requests.exceptions.ConnectionError(),
+        ):
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert tile.status_code == 502
+
+    def test_it_does_not_cache_tile_server_error(
+        self, tile_cache: TileCache
+    ) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+
+        with patch.object(
+            tile_proxy.session,
+            "get",
+            return_value=get_response_mock(status_code=404, content=b"error"),
+        ):
+            tile = tile_proxy.get_tile("a", 13, 1, 2)
+
+        assert tile.status_code == 404
+        assert tile_cache.get_tile(tile_proxy.server_key, 13, 1, 2) is None
+
+    def test_it_fetches_tile_once_for_concurrent_requests(
+        self, tile_cache: TileCache
+    ) -> None:
+        tile_proxy = TileProxy(TILE_URL, tile_cache)
+        first_request_started = threading.Event()
+        release_first_request = threading.Event()
+
+        def get_tile_from_server(*args: str, **kwargs: Dict) -> Mock:
+            first_request_started.set()
+            release_first_request.wait(timeout=5)
+            return get_response_mock()
+
+        with patch.object(
+            tile_proxy.session, "get", side_effect=get_tile_from_server
+        ) as get_mock:
+            threads = [
+                threading.Thread(
+                    target=tile_proxy.get_tile, args=("a", 13, 1, 2)
+                )
+                for _ in range(3)
+            ]
+            threads[0].start()
+            first_request_started.wait(timeout=5)
+            for thread in threads[1:]:
+                thread.start()
+            release_first_request.set()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        get_mock.assert_called_once()
+        assert tile_proxy._tile_locks == {}
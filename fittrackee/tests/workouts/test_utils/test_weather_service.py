@@ -10,6 +10,7 @@ from gpxpy.gpx import GPXTrackPoint
 from fittrackee.dates import get_datetime_in_utc
 from fittrackee.tests.mixins import BaseTestMixin
 from fittrackee.tests.utils import random_string
+from fittrackee.workouts.utils.weather.cache import WeatherCache
 from fittrackee.workouts.utils.weather.visual_crossing import VisualCrossing
 from fittrackee.workouts.utils.weather.weather_service import WeatherService
 
@@ -109,7 +110,7 @@ class TestVisualCrossingGetWeather(WeatherTestCase):
         )
         point = self.get_gpx_point(time)
         visual_crossing = VisualCrossing(api_key=self.api_key)
-        with patch.object(requests, "get") as get_mock:
+        with patch.object(visual_crossing.session, "get") as get_mock:
             visual_crossing.get_weather(point)
 
         args = self.get_args(get_mock.call_args)
@@ -121,7 +122,7 @@ class TestVisualCrossingGetWeather(WeatherTestCase):
 
     def test_it_calls_api_with_expected_params(self) -> None:
         visual_crossing = VisualCrossing(api_key=self.api_key)
-        with patch.object(requests, "get") as get_mock:
+        with patch.object(visual_crossing.session, "get") as get_mock:
             visual_crossing.get_weather(
                 self.get_gpx_point(datetime.now(timezone.utc))
             )
@@ -152,7 +153,9 @@ class TestVisualCrossingGetWeather(WeatherTestCase):
             ).astimezone(pytz.timezone("Europe/Paris"))
         )
         visual_crossing = VisualCrossing(api_key=self.api_key)
-        with patch.object(requests, "get", return_value=self.get_response()):
+        with patch.object(
+            visual_crossing.session, "get", return_value=self.get_response()
+        ):
             weather_data = visual_crossing.get_weather(point)
 
         current_conditions: Dict = VISUAL_CROSSING_RESPONSE[  # type: ignore
@@ -167,6 +170,133 @@ class TestVisualCrossingGetWeather(WeatherTestCase):
         }
 
 
+class TestVisualCrossingGetWeatherWithCache(WeatherTestCase):
+    @staticmethod
+    def get_response() -> Mock:
+        response_mock = Mock()
+        response_mock.json.return_value = VISUAL_CROSSING_RESPONSE
+        return response_mock
+
+    def test_it_calls_api_once_for_the_same_location_and_hour(self) -> None:
+        cache = WeatherCache()
+        visual_crossing = VisualCrossing(api_key=self.api_key, cache=cache)
+        time = datetime(2022, 11, 15, 12, 50, tzinfo=timezone.utc)
+        with patch.object(
+            visual_crossing.session, "get", return_value=self.get_response()
+        ) as get_mock:
+            first_weather_data = visual_crossing.get_weather(
+                GPXTrackPoint(
+                    latitude=48.866667, longitude=2.333333, time=time
+                )
+            )
+            second_weather_data = visual_crossing.get_weather(
+                GPXTrackPoint(
+                    latitude=48.8671,
+                    longitude=2.3329,
+                    time=time.replace(minute=40),
+                )
+            )
+
+        get_mock.assert_called_once()
+        assert first_weather_data == second_weather_data
+        assert cache.get_stats() == {
+            "hits": 1,
+            "misses": 1,
+            "hit_rate": 0.5,
+        }
+
+    def test_it_calls_api_for_another_hour(self) -> None:
+        visual_crossing = VisualCrossing(
+            api_key=self.api_key, cache=WeatherCache()
+        )
+        time = datetime(2022, 11, 15, 12, 00, tzinfo=timezone.utc)
+        with patch.object(
+            visual_crossing.session, "get", return_value=self.get_response()
+        ) as get_mock:
+            visual_crossing.get_weather(self.get_gpx_point(time))
+            visual_crossing.get_weather(
+                self.get_gpx_point(time.replace(hour=13))
+            )
+
+        assert get_mock.call_count == 2
+
+    def test_it_does_not_store_data_when_api_raises_exception(
+        self,
+    ) -> None:
+        cache = WeatherCache()
+        visual_crossing = VisualCrossing(api_key=self.api_key, cache=cache)
+        point = self.get_gpx_point(datetime.now(timezone.utc))
+        with (
+            patch.object(
+                visual_crossing.session,
+                "get",
+                side_effect=requests.exceptions.Timeout(),
+            ),
+            pytest.raises(requests.exceptions.Timeout),
+        ):
+            visual_crossing.get_weather(point)
+
+        assert cache._entries == {}
+
+
+class TestWeatherCache(WeatherTestCase):
+    def test_it_returns_none_when_key_does_not_exist(self) -> None:
+        cache = WeatherCache()
+
+        assert cache.get(random_string()) is None
+        assert cache.get_stats() == {
+            "hits": 0,
+            "misses": 1,
+            "hit_rate": 0,
+        }
+
+    def test_it_returns_stored_value(self) -> None:
+        cache = WeatherCache()
+        key = random_string()
+        cache.set(key, {"icon": "rain"})
+
+        assert cache.get(key) == {"icon": "rain"}
+        assert cache.get_stats() == {
+            "hits": 1,
+            "misses": 0,
+            "hit_rate": 1,
+        }
+
+    def test_it_returns_none_when_entry_is_expired(self) -> None:
+        cache = WeatherCache(ttl=0)
+        key = random_string()
+        cache.set(key, {"icon": "rain"})
+
+        assert cache.get(key) is None
+
+    def test_it_evicts_least_recently_used_entry(self) -> None:
+        cache = WeatherCache(max_size=2)
+        cache.set("key_1", {"icon": "rain"})
+        cache.set("key_2", {"icon": "snow"})
+        cache.get("key_1")
+
+        cache.set("key_3", {"icon": "fog"})
+
+        assert cache.get("key_1") == {"icon": "rain"}
+        assert cache.get("key_2") is None
+        assert cache.get("key_3") == {"icon": "fog"}
+
+    def test_it_returns_no_hit_rate_when_cache_is_not_used(self) -> None:
+        cache = WeatherCache()
+
+        assert cache.get_stats() == {
+            "hits": 0,
+            "misses": 0,
+            "hit_rate": None,
+        }
+
+    def test_it_returns_key_with_rounded_coordinates(self) -> None:
+        assert (
+            WeatherCache.get_key("provider", 48.866667, 2.333333, 1668513600)
+            == "fittrackee:weather:provider:48.87:2.33:1668513600"
+        )
+
+
 class TestWeatherService(WeatherTestCase):
     @pytest.mark.parametrize(
         "input_api_key,input_provider",
@@ -206,6 +336,24 @@ class TestWeatherService(WeatherTestCase):
 
         assert isinstance(weather_service.weather_api, VisualCrossing)
 
+    def test_it_connects_to_redis_on_first_use(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("WEATHER_API_KEY", "valid_api_key")
+        monkeypatch.setenv("WEATHER_API_PROVIDER", "visualcrossing")
+        with patch(
+            "fittrackee.workouts.utils.weather.weather_service.get_redis_client",
+            return_value=None,
+        ) as get_redis_client_mock:
+            weather_service = WeatherService()
+            get_redis_client_mock.assert_not_called()
+            cache = weather_service.weather_api.cache  # type: ignore
+
+            cache.get(random_string())  # type: ignore
+            cache.get(random_string())  # type: ignore
+
+        get_redis_client_mock.assert_called_once_with()
+
     def test_it_returns_none_when_no_weather_api(self) -> None:
         weather_service = WeatherService()
         weather_service.weather_api = None
@@ -247,3 +395,17 @@ class TestWeatherService(WeatherTestCase):
         weather_data = weather_service.get_weather(point)
 
         assert weather_data == sentinel
+
+    def test_it_returns_weather_data_for_all_points(self) -> None:
+        weather_api = Mock()
+        weather_api.get_weather = Mock(side_effect=lambda point: point.time)
+        weather_service = WeatherService()
+        weather_service.weather_api = weather_api
+        points = [
+            self.get_gpx_point(datetime(2022, 11, 15, hour, tzinfo=pytz.utc))
+            for hour in [12, 14]
+        ]
+
+        weather_data = weather_service.get_weather_data(points)
+
+        assert weather_data == [point.time for point in points]
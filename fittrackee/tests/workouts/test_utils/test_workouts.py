@@ -1,6 +1,9 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 from statistics import mean
-from typing import List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from unittest.mock import patch
 
 import pytest
 import pytz
@@ -9,14 +12,21 @@ from gpxpy.gpxfield import SimpleTZ
 
 from fittrackee.users.models import FollowRequest, User
 from fittrackee.visibility_levels import VisibilityLevel
-from fittrackee.workouts.exceptions import WorkoutForbiddenException
+from fittrackee.workouts.exceptions import (
+    WorkoutException,
+    WorkoutForbiddenException,
+)
 from fittrackee.workouts.models import Sport, Workout
 from fittrackee.workouts.utils.workouts import (
     create_segment,
     get_average_speed,
+    get_gpx_file_params,
+    get_gpx_filenames_from_zip_archive,
+    get_gpx_files_data,
     get_ordered_workouts,
     get_workout,
     get_workout_datetime,
+    read_gpx_files_from_zip_archive,
 )
 
 utc_datetime = datetime(
@@ -562,3 +572,266 @@ class TestGetWorkoutForPrivateWorkout(GetWorkoutTestCase):
         self.assert_workout_is_returned(
             workout_cycling_user_1, user_2_admin, True
         )
+
+
+class TestGetGpxFilesData:
+    @staticmethod
+    def get_gpx_files(contents: List[str]) -> List[Tuple[str, bytes]]:
+        return [
+            (f"workout_{index}.gpx", str.encode(content))
+            for index, content in enumerate(contents)
+        ]
+
+    @staticmethod
+    def assert_files_are_stored(
+        app: Flask, gpx_data: Dict, map_filepath: str
+    ) -> None:
+        assert os.path.exists(
+            os.path.join(app.config["UPLOAD_FOLDER"], gpx_data["filename"])
+        )
+        # map is generated once workout is created
+        assert map_filepath.endswith(".png")
+        assert not os.path.exists(
+            os.path.join(app.config["UPLOAD_FOLDER"], map_filepath)
+        )
+
+    def test_it_returns_data_for_each_file(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file, gpx_file])
+
+        gpx_files_data = list(
+            get_gpx_files_data(
+                gpx_files,
+                get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+                len(gpx_files),
+            )
+        )
+
+        assert len(gpx_files_data) == 2
+        for gpx_file_data in gpx_files_data:
+            assert isinstance(gpx_file_data, tuple)
+            gpx_data, map_filepath = gpx_file_data
+            assert gpx_data["distance"] == pytest.approx(0.32, abs=1e-3)
+            assert gpx_data["filename"].startswith(
+                f"workouts/{user_1.id}/2018-03-13_12-44-45_{sport_1_cycling.id}_"
+            )
+            self.assert_files_are_stored(app, gpx_data, map_filepath)
+
+    def test_it_stores_gpx_file_content(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file])
+
+        [(gpx_data, _)] = list(  # type: ignore
+            get_gpx_files_data(
+                gpx_files,
+                get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+                len(gpx_files),
+            )
+        )
+
+        with open(
+            os.path.join(app.config["UPLOAD_FOLDER"], gpx_data["filename"])
+        ) as stored_file:
+            assert stored_file.read() == gpx_file
+
+    def test_it_returns_error_for_invalid_file(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        gpx_file_wo_track: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file_wo_track, gpx_file])
+
+        gpx_files_data = list(
+            get_gpx_files_data(
+                gpx_files,
+                get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+                len(gpx_files),
+            )
+        )
+
+        assert isinstance(gpx_files_data[0], WorkoutException)
+        assert gpx_files_data[0].message == "no tracks in gpx file"
+        assert isinstance(gpx_files_data[1], tuple)
+        # only valid file is stored
+        user_directory = os.path.join(
+            app.config["UPLOAD_FOLDER"], "workouts", str(user_1.id)
+        )
+        assert [
+            file_name
+            for file_name in os.listdir(user_directory)
+            if file_name.endswith(".gpx")
+        ] == [os.path.basename(gpx_files_data[1][0]["filename"])]
+
+    def test_it_does_not_use_process_pool_when_one_worker_is_configured(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file, gpx_file])
+
+        with patch(
+            "fittrackee.workouts.utils.workouts.ProcessPoolExecutor"
+        ) as process_pool_mock:
+            list(
+                get_gpx_files_data(
+                    gpx_files,
+                    get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+                    len(gpx_files),
+                )
+            )
+
+        process_pool_mock.assert_not_called()
+
+    def test_it_returns_same_data_when_files_are_processed_in_process_pool(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        gpx_file_wo_track: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file, gpx_file_wo_track, gpx_file])
+        file_params = get_gpx_file_params(user_1, sport_1_cycling.id, 1)
+        expected_gpx_files_data = list(
+            get_gpx_files_data(gpx_files, file_params, len(gpx_files))
+        )
+        app.config["WORKOUTS_PROCESSING_WORKERS"] = 2
+
+        gpx_files_data = list(
+            get_gpx_files_data(gpx_files, file_params, len(gpx_files))
+        )
+
+        for index in [0, 2]:
+            gpx_file_data = gpx_files_data[index]
+            expected_gpx_file_data = expected_gpx_files_data[index]
+            assert isinstance(gpx_file_data, tuple)
+            assert isinstance(expected_gpx_file_data, tuple)
+            gpx_data, map_filepath = gpx_file_data
+            expected_gpx_data, _ = expected_gpx_file_data
+            # file names contain a random part
+            assert {
+                key: value
+                for key, value in gpx_data.items()
+                if key != "filename"
+            } == {
+                key: value
+                for key, value in expected_gpx_data.items()
+                if key != "filename"
+            }
+            self.assert_files_are_stored(app, gpx_data, map_filepath)
+        assert isinstance(gpx_files_data[1], WorkoutException)
+        assert gpx_files_data[1].message == "no tracks in gpx file"
+
+    def test_it_reads_files_only_when_they_can_be_processed_in_process_pool(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file] * 8)
+        read_files: List[str] = []
+
+        def read_gpx_files() -> Iterator[Tuple[str, bytes]]:
+            for filename, gpx_content in gpx_files:
+                read_files.append(filename)
+                yield filename, gpx_content
+
+        app.config["WORKOUTS_PROCESSING_WORKERS"] = 2
+        gpx_files_data = get_gpx_files_data(
+            read_gpx_files(),
+            get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+            len(gpx_files),
+        )
+
+        next(gpx_files_data)
+        # 2 files per worker are read, then one file when a result is
+        # consumed
+        assert len(read_files) == 5
+        assert len(list(gpx_files_data)) == 7
+        assert len(read_files) == 8
+
+    def test_it_does_not_fork_application_process(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        gpx_files = self.get_gpx_files([gpx_file, gpx_file])
+        app.config["WORKOUTS_PROCESSING_WORKERS"] = 2
+
+        with patch(
+            "fittrackee.workouts.utils.workouts.ProcessPoolExecutor",
+            wraps=ProcessPoolExecutor,
+        ) as process_pool_mock:
+            list(
+                get_gpx_files_data(
+                    gpx_files,
+                    get_gpx_file_params(user_1, sport_1_cycling.id, 1),
+                    len(gpx_files),
+                )
+            )
+
+        assert (
+            process_pool_mock.call_args.kwargs["mp_context"].get_start_method()
+            == "forkserver"
+        )
+
+
+class TestGpxFilesFromZipArchive:
+    def test_it_returns_gpx_filenames_at_archive_root(
+        self, app: Flask
+    ) -> None:
+        zip_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+
+        assert get_gpx_filenames_from_zip_archive(zip_path) == [
+            "test_1.gpx",
+            "test_2.gpx",
+            "test_3.gpx",
+        ]
+
+    def test_it_raises_error_when_files_exceed_limit(
+        self, app_with_max_workouts: Flask
+    ) -> None:
+        zip_path = os.path.join(
+            app_with_max_workouts.root_path, "tests/files/gpx_test.zip"
+        )
+
+        with pytest.raises(
+            WorkoutException,
+            match="the number of files in the archive exceeds the limit",
+        ):
+            get_gpx_filenames_from_zip_archive(zip_path)
+
+    def test_it_reads_files_one_at_a_time(self, app: Flask) -> None:
+        zip_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+
+        with patch(
+            "fittrackee.workouts.utils.workouts.zipfile.ZipFile.read",
+            autospec=True,
+            return_value=b"content",
+        ) as read_mock:
+            gpx_files = read_gpx_files_from_zip_archive(
+                zip_path, ["test_1.gpx", "test_3.gpx"]
+            )
+            read_mock.assert_not_called()
+
+            assert next(gpx_files) == ("test_1.gpx", b"content")
+            assert read_mock.call_count == 1
+            assert list(gpx_files) == [("test_3.gpx", b"content")]
@@ -1,16 +1,19 @@
 import json
+import os
 from datetime import datetime, timezone
 from typing import List
-from unittest.mock import mock_open, patch
+from unittest.mock import ANY, mock_open, patch
 
 import pytest
-from flask import Flask
+from flask import Flask, Response
 
 from fittrackee import db
+from fittrackee.files import get_absolute_file_path
 from fittrackee.tests.comments.mixins import CommentMixin
 from fittrackee.users.models import FollowRequest, User
 from fittrackee.visibility_levels import VisibilityLevel
 from fittrackee.workouts.models import Sport, Workout, WorkoutSegment
+from fittrackee.workouts.utils.tile_proxy import Tile, TileProxy
 
 from ..utils import OAUTH_SCOPES, jsonify_dict
 from .mixins import WorkoutApiTestCaseMixin
@@ -1052,6 +1055,166 @@ class TestGetWorkoutChartDataAsWorkoutOwner(GetWorkoutChartDataTestCase):
         assert "success" in data["status"]
         assert data["data"]["chart_data"] == chart_data
 
+    @pytest.mark.parametrize(
+        "input_query,expected_max_points",
+        [("", 2000), ("?max_points=500", 500)],
+    )
+    def test_it_calls_get_chart_data_with_max_points(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        input_query: str,
+        expected_max_points: int,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_chart_data", return_value=[]
+        ) as get_chart_data_mock:
+            client.get(
+                self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+                + input_query,
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        get_chart_data_mock.assert_called_once_with(
+            ANY, None, expected_max_points
+        )
+
+    @pytest.mark.parametrize("input_max_points", ["invalid", "-1", "0", "1"])
+    def test_it_returns_400_when_max_points_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        input_max_points: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+            + f"?max_points={input_max_points}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(
+            response,
+            "max_points must be an integer greater than or equal to 2",
+        )
+
+    def test_it_returns_columnar_chart_data(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        chart_data = {"distance": [0.0, 0.01]}
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_columnar_chart_data",
+            return_value=chart_data,
+        ) as get_columnar_chart_data_mock:
+            response = client.get(
+                self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+                + "?format=columnar",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["data"]["chart_data"] == chart_data
+        get_columnar_chart_data_mock.assert_called_once_with(ANY, None, 2000)
+
+    @pytest.mark.parametrize("input_format", ["", "columnar"])
+    def test_it_returns_binary_chart_data_when_requested(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        input_format: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        chart_data = b"\x00\x00\x00\x00"
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_binary_chart_data",
+            return_value=chart_data,
+        ) as get_binary_chart_data_mock:
+            response = client.get(
+                self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+                + f"?format={input_format}&max_points=500",
+                headers=dict(
+                    Authorization=f"Bearer {auth_token}",
+                    Accept="application/octet-stream",
+                ),
+            )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/octet-stream"
+        assert response.data == chart_data
+        get_binary_chart_data_mock.assert_called_once_with(ANY, None, 500)
+
+    def test_it_returns_json_when_all_mimetypes_are_accepted(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_chart_data", return_value=[]
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id
+                ),
+                headers=dict(
+                    Authorization=f"Bearer {auth_token}", Accept="*/*"
+                ),
+            )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/json"
+
+    def test_it_returns_400_when_format_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+            + "?format=invalid",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(response, "invalid format")
+
     def test_it_returns_error_when_user_is_suspended(
         self,
         app: Flask,
@@ -1920,6 +2083,119 @@ class TestGetWorkoutSegmentChartDataAsWorkoutOwner(
         assert "success" in data["status"]
         assert data["data"]["chart_data"] == chart_data
 
+    def test_it_calls_get_chart_data_with_max_points(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_1_segment: WorkoutSegment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_chart_data", return_value=[]
+        ) as get_chart_data_mock:
+            client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id, segment_id=1
+                )
+                + "?max_points=500",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        get_chart_data_mock.assert_called_once_with(ANY, 1, 500)
+
+    def test_it_returns_400_when_max_points_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_1_segment: WorkoutSegment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_cycling_user_1.gpx = "file.gpx"
+
+        response = client.get(
+            self.route.format(
+                workout_uuid=workout_cycling_user_1.short_id, segment_id=1
+            )
+            + "?max_points=1",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(
+            response,
+            "max_points must be an integer greater than or equal to 2",
+        )
+
+    def test_it_returns_columnar_chart_data(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_1_segment: WorkoutSegment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        chart_data = {"distance": [0.0, 0.01]}
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_columnar_chart_data",
+            return_value=chart_data,
+        ) as get_columnar_chart_data_mock:
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id, segment_id=1
+                )
+                + "?format=columnar",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["data"]["chart_data"] == chart_data
+        get_columnar_chart_data_mock.assert_called_once_with(ANY, 1, 2000)
+
+    def test_it_returns_binary_chart_data_when_requested(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_1_segment: WorkoutSegment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        chart_data = b"\x00\x00\x00\x00"
+        workout_cycling_user_1.gpx = "file.gpx"
+        with patch(
+            "fittrackee.workouts.workouts.get_binary_chart_data",
+            return_value=chart_data,
+        ) as get_binary_chart_data_mock:
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id, segment_id=1
+                ),
+                headers=dict(
+                    Authorization=f"Bearer {auth_token}",
+                    Accept="application/octet-stream",
+                ),
+            )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/octet-stream"
+        assert response.data == chart_data
+        get_binary_chart_data_mock.assert_called_once_with(ANY, 1, 2000)
+
     def test_it_returns_error_when_user_is_suspended(
         self,
         app: Flask,
@@ -2295,6 +2571,325 @@ class TestGetWorkoutSegmentChartDataAsUnauthenticatedUser(
         assert data["data"]["chart_data"] == chart_data
 
 
+class GetWorkoutGeometryTestCase(WorkoutApiTestCaseMixin):
+    route = "/api/workouts/{workout_uuid}/geometry"
+
+
+class TestGetWorkoutGeometryAsWorkoutOwner(GetWorkoutGeometryTestCase):
+    def test_it_returns_404_if_workout_have_no_gpx(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_short_id = workout_cycling_user_1.short_id
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_short_id),
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_404_with_message(
+            response, f"no gpx file for this workout (id: {workout_short_id})"
+        )
+
+    def test_it_returns_geojson_geometry(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id
+                ),
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert "success" in data["status"]
+        geometry = data["data"]["geometry"]
+        assert geometry["type"] == "MultiLineString"
+        assert len(geometry["coordinates"]) == 1
+        assert geometry["coordinates"][0][0] == [6.07367, 44.68095]
+
+    def test_it_returns_encoded_polylines(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            response = client.get(
+                self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+                + "?format=polyline&zoom=0",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        # first and last points only
+        assert data["data"]["geometry"] == ["}vuoGmgad@`PuC"]
+
+    def test_it_calls_get_geometry_with_zoom_and_format(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "fittrackee.workouts.workouts.get_geometry_from_gpx_file",
+            return_value=[],
+        ) as get_geometry_mock:
+            client.get(
+                self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+                + "?format=polyline&zoom=12",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        get_geometry_mock.assert_called_once_with(ANY, None, 12, "polyline")
+
+    @pytest.mark.parametrize("input_zoom", ["invalid", "-1", "21"])
+    def test_it_returns_400_when_zoom_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        input_zoom: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+            + f"?zoom={input_zoom}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(response, "zoom must be an integer between 0 and 20")
+
+    def test_it_returns_400_when_format_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id)
+            + "?format=columnar",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_400(response, "invalid format")
+
+    def test_it_returns_403_when_user_is_suspended(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        user_1.suspended_at = datetime.now(timezone.utc)
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id),
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_403(response)
+
+
+class TestGetWorkoutGeometryAsUnauthenticatedUser(
+    GetWorkoutGeometryTestCase, GetWorkoutGpxPublicVisibilityMixin
+):
+    @pytest.mark.parametrize(
+        "input_desc,input_map_visibility",
+        [
+            ("map visibility: private", VisibilityLevel.PRIVATE),
+            ("map visibility: followers_only", VisibilityLevel.FOLLOWERS),
+        ],
+    )
+    def test_it_returns_404_when_map_visibility_is_not_public(
+        self,
+        input_desc: str,
+        input_map_visibility: VisibilityLevel,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file: str,
+    ) -> None:
+        self.init_test_data_for_public_workout(
+            workout_cycling_user_1, map_visibility=input_map_visibility
+        )
+        client = app.test_client()
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id
+                ),
+            )
+
+        data = self.assert_404_with_message(
+            response,
+            f"workout not found (id: {workout_cycling_user_1.short_id})",
+        )
+        assert data["data"]["geometry"] == ""
+
+    def test_it_returns_geometry_when_map_visibility_is_public(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file: str,
+    ) -> None:
+        self.init_test_data_for_public_workout(
+            workout_cycling_user_1, map_visibility=VisibilityLevel.PUBLIC
+        )
+        client = app.test_client()
+        with patch(
+            "builtins.open", new_callable=mock_open, read_data=gpx_file
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id
+                ),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["data"]["geometry"]["type"] == "MultiLineString"
+
+
+class TestGetWorkoutSegmentGeometryAsWorkoutOwner(WorkoutApiTestCaseMixin):
+    route = "/api/workouts/{workout_uuid}/geometry/segment/{segment_id}"
+
+    def test_it_returns_404_if_segment_does_not_exist(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file_with_segments: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id,
+                    segment_id=100,
+                ),
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        self.assert_404_with_message(response, "No segment with id '100'")
+
+    def test_it_returns_segment_geometry(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file_with_segments: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "builtins.open",
+            new_callable=mock_open,
+            read_data=gpx_file_with_segments,
+        ):
+            response = client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id, segment_id=2
+                ),
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert "success" in data["status"]
+        assert len(data["data"]["geometry"]["coordinates"]) == 1
+
+    def test_it_calls_get_geometry_with_segment_id(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.gpx = "file.gpx"
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with patch(
+            "fittrackee.workouts.workouts.get_geometry_from_gpx_file",
+            return_value={},
+        ) as get_geometry_mock:
+            client.get(
+                self.route.format(
+                    workout_uuid=workout_cycling_user_1.short_id, segment_id=1
+                )
+                + "?zoom=10",
+                headers=dict(Authorization=f"Bearer {auth_token}"),
+            )
+
+        get_geometry_mock.assert_called_once_with(ANY, 1, 10, "geojson")
+
+
 class TestGetWorkoutMap(WorkoutApiTestCaseMixin):
     def test_it_returns_404_if_workout_has_no_map(self, app: Flask) -> None:
         client = app.test_client()
@@ -2304,7 +2899,7 @@ class TestGetWorkoutMap(WorkoutApiTestCaseMixin):
 
         self.assert_404_with_message(response, "Map does not exist")
 
-    def test_it_calls_send_from_directory_if_workout_has_map(
+    def test_it_calls_send_upload_file_if_workout_has_map(
         self,
         app: Flask,
         user_1: User,
@@ -2317,8 +2912,8 @@ class TestGetWorkoutMap(WorkoutApiTestCaseMixin):
         workout_cycling_user_1.map = map_file_path
         client = app.test_client()
         with patch(
-            "fittrackee.workouts.workouts.send_from_directory",
-            return_value="file",
+            "fittrackee.workouts.workouts.send_upload_file",
+            return_value=Response("file"),
         ) as mock:
             response = client.get(
                 f"/api/workouts/map/{map_id}",
@@ -2326,7 +2921,7 @@ class TestGetWorkoutMap(WorkoutApiTestCaseMixin):
 
         assert response.status_code == 200
         mock.assert_called_once_with(
-            app.config["UPLOAD_FOLDER"], map_file_path
+            map_file_path, mimetype="image/png", immutable=True
         )
 
     def test_it_returns_404_if_map_file_not_found(
@@ -2351,6 +2946,62 @@ class TestGetWorkoutMap(WorkoutApiTestCaseMixin):
         self.assert_404_with_message(response, "Map file does not exist")
 
 
+class TestGetMapTile(WorkoutApiTestCaseMixin):
+    def test_it_returns_tile_with_cache_headers(self, app: Flask) -> None:
+        client = app.test_client()
+        with patch.object(
+            TileProxy,
+            "get_tile",
+            return_value=Tile(b"tile", 200, "image/png", etag='"abc"'),
+        ) as get_tile_mock:
+            response = client.get("/api/workouts/map_tile/a/13/4109/2930.png")
+
+        assert response.status_code == 200
+        assert response.data == b"tile"
+        assert response.content_type == "image/png"
+        assert response.headers["Cache-Control"] == "public, max-age=86400"
+        assert response.headers["ETag"] == '"abc"'
+        get_tile_mock.assert_called_once_with("a", 13, 4109, 2930)
+
+    def test_it_returns_304_when_etag_matches(self, app: Flask) -> None:
+        client = app.test_client()
+        with patch.object(
+            TileProxy,
+            "get_tile",
+            return_value=Tile(b"tile", 200, "image/png", etag='"abc"'),
+        ):
+            response = client.get(
+                "/api/workouts/map_tile/a/13/4109/2930.png",
+                headers={"If-None-Match": '"abc"'},
+            )
+
+        assert response.status_code == 304
+        assert response.data == b""
+
+    def test_it_returns_tile_server_error_without_caching(
+        self, app: Flask
+    ) -> None:
+        client = app.test_client()
+        with patch.object(
+            TileProxy,
+            "get_tile",
+            return_value=Tile(b"", 404, "text/html"),
+        ):
+            response = client.get("/api/workouts/map_tile/a/13/4109/2930.png")
+
+        assert response.status_code == 404
+        assert response.headers["Cache-Control"] == "no-store"
+
+    def test_it_does_not_call_tile_server_when_coordinates_are_invalid(
+        self, app: Flask
+    ) -> None:
+        client = app.test_client()
+        with patch.object(TileProxy, "get_tile") as get_tile_mock:
+            client.get("/api/workouts/map_tile/a/13/abc/2930.png")
+
+        get_tile_mock.assert_not_called()
+
+
 class TestWorkoutScope(WorkoutApiTestCaseMixin):
     @pytest.mark.parametrize(
         "client_scope, can_access",
@@ -2417,7 +3068,7 @@ class TestDownloadWorkoutGpxAsWorkoutOwner(DownloadWorkoutGpxTestCase):
 
         self.assert_404_with_message(response, "no gpx file for workout")
 
-    def test_it_calls_send_from_directory_if_workout_has_gpx(
+    def test_it_calls_send_upload_file_if_workout_has_gpx(
         self,
         app: Flask,
         user_1: User,
@@ -2427,7 +3078,7 @@ class TestDownloadWorkoutGpxAsWorkoutOwner(DownloadWorkoutGpxTestCase):
         gpx_file_path = "file.gpx"
         workout_cycling_user_1.gpx = "file.gpx"
         with patch(
-            "fittrackee.workouts.workouts.send_from_directory",
+            "fittrackee.workouts.workouts.send_upload_file",
             return_value="file",
         ) as mock:
             client, auth_token = self.get_test_client_and_auth_token(
@@ -2442,12 +3093,42 @@ class TestDownloadWorkoutGpxAsWorkoutOwner(DownloadWorkoutGpxTestCase):
             )
 
         mock.assert_called_once_with(
-            app.config["UPLOAD_FOLDER"],
             gpx_file_path,
             mimetype="application/gpx+xml",
             as_attachment=True,
         )
 
+    def test_it_returns_requested_range_of_gpx_file(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        gpx_file: str,
+    ) -> None:
+        workout_cycling_user_1.gpx = "workouts/1/file.gpx"
+        gpx_file_path = get_absolute_file_path(workout_cycling_user_1.gpx)
+        os.makedirs(os.path.dirname(gpx_file_path), exist_ok=True)
+        with open(gpx_file_path, "w") as file:
+            file.write(gpx_file)
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            self.route.format(workout_uuid=workout_cycling_user_1.short_id),
+            headers={
+                "Authorization": f"Bearer {auth_token}",
+                "Range": "bytes=0-99",
+            },
+        )
+
+        assert response.status_code == 206
+        assert response.data == gpx_file.encode()[:100]
+        assert response.headers["Content-Range"] == (
+            f"bytes 0-99/{len(gpx_file.encode())}"
+        )
+
     def test_it_returns_error_when_user_is_suspended(
         self,
         app: Flask,
@@ -1,6 +1,7 @@
 import json
 import os
 from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from io import BytesIO
 from typing import Any, Dict, Optional
 from unittest.mock import Mock, patch
@@ -25,6 +26,7 @@ from fittrackee.workouts.models import (
     TITLE_MAX_CHARACTERS,
     Sport,
     Workout,
+    WorkoutsUploadTask,
 )
 
 from ..mixins import BaseTestMixin, ReportMixin
@@ -1471,6 +1473,12 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
             ),
         )
 
+        # map is generated on first access
+        client.get(
+            f"/api/workouts/map/{Workout.query.one().map_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
         call_args = self.get_args(static_map_get_mock.call_args)
         assert (
             app.config["TILE_SERVER"]["URL"]
@@ -1502,6 +1510,12 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
             ),
         )
 
+        # map is generated on first access
+        client.get(
+            f"/api/workouts/map/{Workout.query.one().map_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
         call_kwargs = self.get_kwargs(static_map_get_mock.call_args)
 
         assert call_kwargs["headers"] == {
@@ -1532,6 +1546,12 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
             ),
         )
 
+        # map is generated on first access
+        client.get(
+            f"/api/workouts/map/{Workout.query.one().map_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
         call_args = self.get_args(static_map_get_mock.call_args)
         assert (
             app_default_static_map.config["TILE_SERVER"]["URL"]
@@ -1563,6 +1583,12 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
             ),
         )
 
+        # map is generated on first access
+        client.get(
+            f"/api/workouts/map/{Workout.query.one().map_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
         call_kwargs = self.get_kwargs(static_map_get_mock.call_args)
         assert call_kwargs["headers"] == {
             "User-Agent": f"FitTrackee v{VERSION}"
@@ -1772,7 +1798,7 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
         )
 
         with patch(
-            "fittrackee.workouts.utils.workouts.generate_map",
+            "fittrackee.workouts.utils.workouts.write_track_columns_file",
             side_effect=Exception(),
         ):
             client.post(
@@ -1808,7 +1834,7 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
         )
 
         with patch(
-            "fittrackee.workouts.utils.workouts.generate_map",
+            "fittrackee.workouts.utils.workouts.write_track_columns_file",
             side_effect=Exception(),
         ):
             client.post(
@@ -1823,11 +1849,14 @@ class TestPostWorkoutWithGpx(WorkoutApiTestCaseMixin, BaseTestMixin):
                 ),
             )
 
+        # gpx file and track columns file (map is generated on first access)
         assert_files_are_deleted(app, user_1, expected_count=2)
         upload_directory = os.path.join(app.config["UPLOAD_FOLDER"])
         workout = Workout.query.one()
         os.path.exists(os.path.join(upload_directory, workout.gpx))
-        os.path.exists(os.path.join(upload_directory, workout.map))
+        os.path.exists(
+            os.path.join(upload_directory, f"{workout.gpx}.columns")
+        )
 
     def test_it_cleans_uploaded_file_and_static_map_on_segments_creation_error(
         self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
@@ -2906,6 +2935,73 @@ class TestPostWorkoutWithZipArchive(WorkoutApiTestCaseMixin):
             assert segment["moving"] == "0:04:10"
             assert segment["pauses"] is None
 
+    def test_it_adds_workouts_with_zip_archive_when_processing_files_in_parallel(  # noqa
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        app.config["WORKOUTS_PROCESSING_WORKERS"] = 2
+        # 'gpx_test.zip' contains 3 gpx files (same data) and 1 non-gpx file
+        file_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+        with open(file_path, "rb") as zip_file:
+            client, auth_token = self.get_test_client_and_auth_token(
+                app, user_1.email
+            )
+
+            response = client.post(
+                "/api/workouts",
+                data=dict(
+                    file=(zip_file, "gpx_test.zip"), data='{"sport_id": 1}'
+                ),
+                headers=dict(
+                    content_type="multipart/form-data",
+                    Authorization=f"Bearer {auth_token}",
+                ),
+            )
+
+        assert response.status_code == 201
+        data = json.loads(response.data.decode())
+        assert len(data["data"]["workouts"]) == 3
+        for workout in Workout.query.all():
+            assert workout.distance == Decimal("0.320")
+            assert os.path.exists(
+                os.path.join(app.config["UPLOAD_FOLDER"], workout.gpx)
+            )
+            # maps of workouts imported from archive are generated on first
+            # access
+            assert not os.path.exists(
+                os.path.join(app.config["UPLOAD_FOLDER"], workout.map)
+            )
+
+    def test_it_does_not_extract_zip_archive(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        # 'gpx_test.zip' contains 3 gpx files (same data) and 1 non-gpx file
+        file_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+        with open(file_path, "rb") as zip_file:
+            client, auth_token = self.get_test_client_and_auth_token(
+                app, user_1.email
+            )
+
+            with patch("zipfile.ZipFile.extractall") as extractall_mock:
+                response = client.post(
+                    "/api/workouts",
+                    data=dict(
+                        file=(zip_file, "gpx_test.zip"),
+                        data='{"sport_id": 1}',
+                    ),
+                    headers=dict(
+                        content_type="multipart/form-data",
+                        Authorization=f"Bearer {auth_token}",
+                    ),
+                )
+
+        assert response.status_code == 201
+        extractall_mock.assert_not_called()
+        # only gpx files and track columns files are stored
+        assert_files_are_deleted(app, user_1, expected_count=6)
+        assert os.listdir(
+            os.path.join(app.config["UPLOAD_FOLDER"], "workouts")
+        ) == [str(user_1.id)]
+
     def test_it_returns_400_if_folder_is_present_in_zip_archive(
         self, app: Flask, user_1: User, sport_1_cycling: Sport
     ) -> None:
@@ -3164,7 +3260,7 @@ class TestPostWorkoutWithZipArchive(WorkoutApiTestCaseMixin):
         with (
             open(file_path, "rb") as zip_file,
             patch(
-                "fittrackee.workouts.utils.workouts.generate_map",
+                "fittrackee.workouts.utils.workouts.write_track_columns_file",
                 side_effect=Exception(),
             ),
         ):
@@ -3361,6 +3457,410 @@ class TestPostWorkoutWithZipArchive(WorkoutApiTestCaseMixin):
             )
 
 
+@patch("fittrackee.workouts.workouts.upload_workouts")
+class TestPostWorkoutInAsyncMode(WorkoutApiTestCaseMixin):
+    def test_it_returns_upload_task_for_gpx_file(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 1}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        assert response.status_code == 202
+        data = json.loads(response.data.decode())
+        assert data["status"] == "accepted"
+        upload_task = WorkoutsUploadTask.query.one()
+        assert data["data"]["upload_task"] == jsonify_dict(
+            upload_task.serialize()
+        )
+        assert data["data"]["upload_task"]["status"] == "queued"
+        assert data["data"]["upload_task"]["file_name"] == "example.gpx"
+
+    def test_it_does_not_create_workout(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 1}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        assert Workout.query.count() == 0
+
+    def test_it_stores_uploaded_file(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 1}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        upload_task = WorkoutsUploadTask.query.one()
+        assert upload_task.file_path == (
+            f"workouts/{user_1.id}/uploads/{upload_task.uuid.hex}/example.gpx"
+        )
+        with open(
+            os.path.join(app.config["UPLOAD_FOLDER"], upload_task.file_path)
+        ) as uploaded_file:
+            assert uploaded_file.read() == gpx_file
+
+    def test_it_stores_workout_data_with_equipment_ids(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        equipment_bike_user_1: Equipment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        workout_data = {
+            "sport_id": 1,
+            "equipment_ids": [equipment_bike_user_1.short_id],
+        }
+
+        client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data=json.dumps(workout_data),
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        upload_task = WorkoutsUploadTask.query.one()
+        assert upload_task.workout_data == workout_data
+
+    def test_it_sends_upload_task_to_workers(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 1}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        upload_task = WorkoutsUploadTask.query.one()
+        upload_workouts_mock.send.assert_called_once_with(
+            upload_task_id=upload_task.id
+        )
+
+    def test_it_sets_error_when_task_can_not_be_queued(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        upload_workouts_mock.send.side_effect = Exception("broker error")
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 1}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        self.assert_500(response, "error during workouts upload")
+        upload_task = WorkoutsUploadTask.query.one()
+        assert upload_task.status == "errored"
+        assert upload_task.error_message == "unable to queue workouts upload"
+        assert upload_task.file_path is None
+        assert not os.path.exists(
+            os.path.join(
+                app.config["UPLOAD_FOLDER"],
+                "workouts",
+                str(user_1.id),
+                "uploads",
+                upload_task.uuid.hex,
+            )
+        )
+
+    def test_it_returns_upload_task_for_zip_archive(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        file_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+        with open(file_path, "rb") as zip_file:
+            response = client.post(
+                "/api/workouts?async=true",
+                data=dict(
+                    file=(zip_file, "gpx_test.zip"), data='{"sport_id": 1}'
+                ),
+                headers=dict(
+                    content_type="multipart/form-data",
+                    Authorization=f"Bearer {auth_token}",
+                ),
+            )
+
+        assert response.status_code == 202
+        data = json.loads(response.data.decode())
+        assert data["data"]["upload_task"]["file_name"] == "gpx_test.zip"
+        assert data["data"]["upload_task"]["files_count"] == 0
+
+    def test_it_returns_500_if_sport_id_does_not_exist(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data='{"sport_id": 2}',
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        self.assert_500(response, "Sport id: 2 does not exist")
+        assert WorkoutsUploadTask.query.count() == 0
+        upload_workouts_mock.send.assert_not_called()
+
+    def test_it_returns_error_when_equipment_is_invalid_for_given_sport(
+        self,
+        upload_workouts_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        equipment_shoes_user_1: Equipment,
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.post(
+            "/api/workouts?async=true",
+            data=dict(
+                file=(BytesIO(str.encode(gpx_file)), "example.gpx"),
+                data=(
+                    f'{{"sport_id": 1, "equipment_ids": '
+                    f'["{equipment_shoes_user_1.short_id}"]}}'
+                ),
+            ),
+            headers=dict(
+                content_type="multipart/form-data",
+                Authorization=f"Bearer {auth_token}",
+            ),
+        )
+
+        assert response.status_code == 400
+        assert WorkoutsUploadTask.query.count() == 0
+        upload_workouts_mock.send.assert_not_called()
+
+
+class TestGetWorkoutsUploadTask(WorkoutApiTestCaseMixin):
+    def test_it_returns_error_if_user_is_not_authenticated(
+        self, app: Flask, user_1: User
+    ) -> None:
+        upload_task = WorkoutsUploadTask(
+            user_id=user_1.id, file_name="example.gpx", workout_data={}
+        )
+        db.session.add(upload_task)
+        db.session.commit()
+        client = app.test_client()
+
+        response = client.get(
+            f"/api/workouts/upload_tasks/{upload_task.short_id}"
+        )
+
+        self.assert_401(response)
+
+    def test_it_returns_404_when_upload_task_does_not_exist(
+        self, app: Flask, user_1: User
+    ) -> None:
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/workouts/upload_tasks/{self.random_short_id()}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_404_with_message(response, "upload task not found")
+
+    def test_it_returns_404_when_upload_task_belongs_to_another_user(
+        self, app: Flask, user_1: User, user_2: User
+    ) -> None:
+        upload_task = WorkoutsUploadTask(
+            user_id=user_2.id, file_name="example.gpx", workout_data={}
+        )
+        db.session.add(upload_task)
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/workouts/upload_tasks/{upload_task.short_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        self.assert_404_with_message(response, "upload task not found")
+
+    def test_it_returns_upload_task_with_files_results(
+        self, app: Flask, user_1: User
+    ) -> None:
+        upload_task = WorkoutsUploadTask(
+            user_id=user_1.id, file_name="gpx_test.zip", workout_data={}
+        )
+        upload_task.status = "in_progress"
+        upload_task.files_count = 3
+        upload_task.files = [
+            {
+                "error": None,
+                "file_name": "test_1.gpx",
+                "status": "successful",
+                "workout_id": self.random_short_id(),
+            },
+            {
+                "error": "no tracks in gpx file",
+                "file_name": "test_2.gpx",
+                "status": "errored",
+                "workout_id": None,
+            },
+        ]
+        db.session.add(upload_task)
+        db.session.commit()
+        client, auth_token = self.get_test_client_and_auth_token(
+            app, user_1.email
+        )
+
+        response = client.get(
+            f"/api/workouts/upload_tasks/{upload_task.short_id}",
+            headers=dict(Authorization=f"Bearer {auth_token}"),
+        )
+
+        assert response.status_code == 200
+        data = json.loads(response.data.decode())
+        assert data["status"] == "success"
+        assert data["data"]["upload_task"] == jsonify_dict(
+            upload_task.serialize()
+        )
+        assert data["data"]["upload_task"]["processed_files_count"] == 2
+
+    @pytest.mark.parametrize(
+        "client_scope, can_access",
+        {**OAUTH_SCOPES, "workouts:read": True}.items(),
+    )
+    def test_expected_scopes_are_defined(
+        self,
+        app: Flask,
+        user_1: User,
+        client_scope: str,
+        can_access: bool,
+    ) -> None:
+        (
+            client,
+            oauth_client,
+            access_token,
+            _,
+        ) = self.create_oauth2_client_and_issue_token(
+            app, user_1, scope=client_scope
+        )
+
+        response = client.get(
+            f"/api/workouts/upload_tasks/{self.random_short_id()}",
+            headers=dict(Authorization=f"Bearer {access_token}"),
+        )
+
+        self.assert_response_scope(response, can_access)
+
+
 class TestPostAndGetWorkoutWithGpx(WorkoutApiTestCaseMixin):
     def workout_assertion(
         self, app: Flask, user_1: User, gpx_file: str, with_segments: bool
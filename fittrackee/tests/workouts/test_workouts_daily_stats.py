@@ -0,0 +1,338 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import Connection, text
+
+from fittrackee import db
+from fittrackee.users.models import User
+from fittrackee.workouts.daily_stats import (
+    get_users_with_invalid_daily_stats,
+    rebuild_users_daily_stats,
+)
+from fittrackee.workouts.models import (
+    Sport,
+    Workout,
+    WorkoutDailyStats,
+    update_user_daily_stats,
+)
+from fittrackee.workouts.utils.workouts import workouts_bulk_import
+
+
+def get_daily_stats(user: User) -> List[Tuple[int, date, int, float]]:
+    return [
+        (
+            daily_stats.sport_id,
+            daily_stats.day,
+            daily_stats.total_workouts,
+            float(daily_stats.total_distance),
+        )
+        for daily_stats in WorkoutDailyStats.query.filter_by(
+            user_id=user.id
+        ).order_by(WorkoutDailyStats.day, WorkoutDailyStats.sport_id)
+    ]
+
+
+def add_workout(
+    user: User, sport: Sport, workout_date: datetime, distance: float = 10
+) -> Workout:
+    workout = Workout(
+        user_id=user.id,
+        sport_id=sport.id,
+        workout_date=workout_date,
+        distance=distance,
+        duration=timedelta(hours=1),
+    )
+    workout.moving = workout.duration
+    workout.ave_speed = distance
+    workout.max_speed = distance
+    db.session.add(workout)
+    db.session.commit()
+    return workout
+
+
+class TestWorkoutDailyStatsUpdate:
+    def test_it_creates_daily_stats_when_workout_is_created(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        daily_stats = WorkoutDailyStats.query.one()
+        assert daily_stats.user_id == user_1.id
+        assert daily_stats.sport_id == sport_1_cycling.id
+        assert daily_stats.day == date(2018, 1, 1)
+        assert daily_stats.total_workouts == 1
+        assert float(daily_stats.total_distance) == 10
+        assert daily_stats.total_duration == timedelta(hours=1)
+        assert daily_stats.total_ascent is None
+        assert daily_stats.ascent_count == 0
+        assert daily_stats.total_descent is None
+        assert daily_stats.descent_count == 0
+        assert float(daily_stats.total_ave_speed) == 10
+        assert daily_stats.ave_speed_count == 1
+
+    def test_it_adds_workout_to_existing_day(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        add_workout(
+            user_1,
+            sport_1_cycling,
+            datetime(2018, 1, 1, 18, tzinfo=timezone.utc),
+            distance=5,
+        )
+
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 1), 2, 15.0)
+        ]
+
+    def test_it_calculates_day_in_user_timezone(
+        self,
+        app: Flask,
+        user_1_paris: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        add_workout(
+            user_1_paris,
+            sport_1_cycling,
+            datetime(2018, 1, 1, 23, 30, tzinfo=timezone.utc),
+        )
+
+        assert get_daily_stats(user_1_paris) == [
+            (sport_1_cycling.id, date(2018, 1, 2), 1, 10.0)
+        ]
+
+    def test_it_updates_previous_and_new_days_when_workout_date_changes(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        sport_2_running: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.workout_date = datetime(
+            2018, 1, 3, tzinfo=timezone.utc
+        )
+        workout_cycling_user_1.sport_id = sport_2_running.id
+        db.session.commit()
+
+        assert get_daily_stats(user_1) == [
+            (sport_2_running.id, date(2018, 1, 3), 1, 10.0)
+        ]
+
+    def test_it_updates_daily_stats_when_workout_distance_changes(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        workout_cycling_user_1.distance = 12
+        db.session.commit()
+
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 1), 1, 12.0)
+        ]
+
+    def test_it_removes_day_when_last_workout_is_deleted(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        another_workout = add_workout(
+            user_1,
+            sport_1_cycling,
+            datetime(2018, 1, 2, tzinfo=timezone.utc),
+        )
+
+        db.session.delete(workout_cycling_user_1)
+        db.session.commit()
+
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 2), 1, 10.0)
+        ]
+
+        db.session.delete(another_workout)
+        db.session.commit()
+
+        assert get_daily_stats(user_1) == []
+
+    def test_it_recalculates_days_when_user_timezone_changes(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        add_workout(
+            user_1,
+            sport_1_cycling,
+            datetime(2018, 1, 1, 23, 30, tzinfo=timezone.utc),
+        )
+
+        user_1.timezone = "Europe/Paris"
+        db.session.commit()
+
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 2), 1, 10.0)
+        ]
+
+    def test_it_updates_daily_stats_at_the_end_of_bulk_import(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        with workouts_bulk_import():
+            for day in [1, 1, 2]:
+                add_workout(
+                    user_1,
+                    sport_1_cycling,
+                    datetime(2018, 1, day, tzinfo=timezone.utc),
+                )
+            assert get_daily_stats(user_1) == []
+
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 1), 2, 20.0),
+            (sport_1_cycling.id, date(2018, 1, 2), 1, 10.0),
+        ]
+
+
+class TestWorkoutDailyStatsConcurrentUpdates:
+    @staticmethod
+    def add_workout_and_update_daily_stats(
+        connection: Connection, user: User, sport: Sport
+    ) -> None:
+        workout_date = datetime(2018, 1, 1, 10, tzinfo=timezone.utc)
+        connection.execute(
+            Workout.__table__.insert().values(  # type: ignore
+                user_id=user.id,
+                sport_id=sport.id,
+                workout_date=workout_date,
+                distance=10,
+                duration=timedelta(hours=1),
+                moving=timedelta(hours=1),
+            )
+        )
+        update_user_daily_stats(
+            connection, user.id, user.timezone, [workout_date]
+        )
+
+    @staticmethod
+    def wait_for_locked_transaction() -> None:
+        for _ in range(100):
+            if db.session.execute(
+                text("SELECT count(*) FROM pg_locks WHERE NOT granted")
+            ).scalar():
+                return
+            db.session.rollback()
+            time.sleep(0.05)
+        raise AssertionError("second transaction is not waiting")
+
+    def test_it_updates_same_day_in_concurrent_transactions(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        error: Optional[Exception] = None
+
+        def update_in_second_transaction() -> None:
+            nonlocal error
+            with app.app_context():
+                try:
+                    with db.engine.connect() as connection:
+                        self.add_workout_and_update_daily_stats(
+                            connection, user_1, sport_1_cycling
+                        )
+                        connection.commit()
+                except Exception as e:
+                    error = e
+
+        with db.engine.connect() as connection:
+            self.add_workout_and_update_daily_stats(
+                connection, user_1, sport_1_cycling
+            )
+            thread = threading.Thread(target=update_in_second_transaction)
+            thread.start()
+            self.wait_for_locked_transaction()
+            connection.commit()
+        thread.join()
+
+        assert error is None
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 1), 2, 20.0)
+        ]
+
+
+class TestVerifyDailyStats:
+    def test_it_returns_empty_list_when_daily_stats_are_valid(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_2: Workout,
+    ) -> None:
+        assert get_users_with_invalid_daily_stats() == []
+
+    def test_it_returns_users_with_missing_or_incorrect_daily_stats(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        user_3: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        workout_cycling_user_2: Workout,
+    ) -> None:
+        add_workout(
+            user_3, sport_1_cycling, datetime(2018, 1, 1, tzinfo=timezone.utc)
+        )
+        WorkoutDailyStats.query.filter_by(user_id=user_1.id).delete()
+        WorkoutDailyStats.query.filter_by(user_id=user_3.id).update(
+            {"total_workouts": 3}
+        )
+        db.session.commit()
+
+        assert get_users_with_invalid_daily_stats() == [user_1.id, user_3.id]
+
+    def test_it_rebuilds_daily_stats(
+        self,
+        app: Flask,
+        user_1: User,
+        user_2: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        WorkoutDailyStats.query.delete()
+        # obsolete daily stats
+        db.session.execute(
+            WorkoutDailyStats.__table__.insert().values(  # type: ignore
+                user_id=user_2.id,
+                sport_id=sport_1_cycling.id,
+                day=date(2018, 1, 1),
+                total_workouts=1,
+                total_distance=10,
+                total_duration=timedelta(hours=1),
+                ascent_count=0,
+                descent_count=0,
+                total_ave_speed=10,
+                ave_speed_count=1,
+            )
+        )
+        db.session.commit()
+
+        rebuild_users_daily_stats([user_1.id, user_2.id])
+
+        assert get_users_with_invalid_daily_stats() == []
+        assert get_daily_stats(user_1) == [
+            (sport_1_cycling.id, date(2018, 1, 1), 1, 10.0)
+        ]
+        assert get_daily_stats(user_2) == []
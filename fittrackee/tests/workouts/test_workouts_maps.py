@@ -0,0 +1,287 @@
+import os
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from fittrackee import db
+from fittrackee.files import get_absolute_file_path
+from fittrackee.users.models import User
+from fittrackee.workouts.maps import (
+    enqueue_workouts_maps_generation,
+    generate_workout_map,
+    generate_workouts_maps,
+)
+from fittrackee.workouts.models import Sport, Workout
+from fittrackee.workouts.utils.maps import get_map_variants_filepaths
+from fittrackee.workouts.utils.workouts import process_files
+
+from .mixins import WorkoutApiTestCaseMixin
+
+
+def create_workout_with_gpx(
+    user: User, sport: Sport, gpx_file: str
+) -> Workout:
+    with patch("fittrackee.workouts.tasks.generate_maps"):
+        return process_files(
+            auth_user=user,
+            workout_data={"sport_id": sport.id},
+            workout_file=FileStorage(
+                stream=BytesIO(str.encode(gpx_file)), filename="example.gpx"
+            ),
+        )[0]
+
+
+def get_map_path(workout: Workout) -> str:
+    return get_absolute_file_path(workout.map)  # type: ignore
+
+
+def map_exists(workout: Workout) -> bool:
+    return os.path.exists(get_map_path(workout))
+
+
+class TestGenerateWorkoutMap:
+    def test_it_does_not_generate_map_when_workout_has_no_gpx(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        assert generate_workout_map(workout_cycling_user_1) is False
+
+    def test_it_generates_map(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        assert generate_workout_map(workout) is True
+
+        assert all(
+            os.path.exists(map_filepath)
+            for map_filepath in get_map_variants_filepaths(
+                get_map_path(workout)
+            )
+        )
+        # no lock file left
+        assert not os.path.exists(f"{get_map_path(workout)}.lock")
+
+    def test_it_does_not_generate_existing_map(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        generate_workout_map(workout)
+
+        with patch(
+            "fittrackee.workouts.utils.maps.generate_map"
+        ) as generate_map_mock:
+            assert generate_workout_map(workout) is False
+
+        generate_map_mock.assert_not_called()
+
+
+class TestGenerateWorkoutsMaps:
+    def test_it_generates_missing_maps(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workouts = [
+            create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+            for _ in range(2)
+        ]
+        generate_workout_map(workouts[0])
+
+        generated_count = generate_workouts_maps(
+            [workout.id for workout in workouts]
+        )
+
+        assert generated_count == 1
+        assert all(map_exists(workout) for workout in workouts)
+
+    def test_it_does_not_raise_error_when_map_generation_fails(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        with patch(
+            "fittrackee.workouts.utils.maps.generate_map",
+            side_effect=Exception(),
+        ):
+            generated_count = generate_workouts_maps([workout.id])
+
+        assert generated_count == 0
+        assert not map_exists(workout)
+
+
+class TestEnqueueWorkoutsMapsGeneration:
+    def test_it_sends_task_with_workouts_ids(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        with patch("fittrackee.workouts.tasks.generate_maps") as task_mock:
+            enqueue_workouts_maps_generation([workout_cycling_user_1])
+
+        task_mock.send.assert_called_once_with(
+            workout_ids=[workout_cycling_user_1.id]
+        )
+
+    def test_it_does_not_generate_map_during_upload(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        with patch("fittrackee.workouts.tasks.generate_maps") as task_mock:
+            workout = process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=FileStorage(
+                    stream=BytesIO(str.encode(gpx_file)),
+                    filename="example.gpx",
+                ),
+            )[0]
+
+        assert workout.map is not None
+        assert workout.map_id is not None
+        assert not map_exists(workout)
+        task_mock.send.assert_called_once_with(workout_ids=[workout.id])
+
+    def test_it_does_not_send_task_for_workouts_from_archive(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport
+    ) -> None:
+        file_path = os.path.join(app.root_path, "tests/files/gpx_test.zip")
+
+        with (
+            open(file_path, "rb") as zip_file,
+            patch("fittrackee.workouts.tasks.generate_maps") as task_mock,
+        ):
+            process_files(
+                auth_user=user_1,
+                workout_data={"sport_id": sport_1_cycling.id},
+                workout_file=FileStorage(
+                    stream=zip_file, filename="gpx_test.zip"
+                ),
+            )
+
+        task_mock.send.assert_not_called()
+
+
+class TestGetWorkoutMapOnDemand(WorkoutApiTestCaseMixin):
+    def test_it_generates_map_on_first_access(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        client = app.test_client()
+
+        response = client.get(f"/api/workouts/map/{workout.map_id}")
+
+        assert response.status_code == 200
+        assert response.content_type == "image/png"
+        assert response.headers["Cache-Control"] == (
+            "private, max-age=31536000, immutable"
+        )
+        assert map_exists(workout)
+
+    def test_it_returns_404_when_gpx_file_is_missing(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        os.remove(get_absolute_file_path(workout.gpx))  # type: ignore
+        os.remove(get_absolute_file_path(f"{workout.gpx}.columns"))
+        client = app.test_client()
+
+        response = client.get(f"/api/workouts/map/{workout.map_id}")
+
+        self.assert_404_with_message(response, "Map file does not exist")
+
+    def test_it_returns_webp_image_when_client_accepts_it(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        client = app.test_client()
+
+        response = client.get(
+            f"/api/workouts/map/{workout.map_id}",
+            headers={"Accept": "image/avif,image/webp,*/*"},
+        )
+
+        assert response.status_code == 200
+        assert response.content_type == "image/webp"
+        assert response.headers["Vary"] == "Accept"
+
+    @pytest.mark.parametrize(
+        "input_size,input_format,expected_size,expected_content_type",
+        [
+            ("thumbnail", "png", (200, 113), "image/png"),
+            ("card", "webp", (400, 225), "image/webp"),
+            ("retina", "png", (800, 450), "image/png"),
+        ],
+    )
+    def test_it_returns_map_for_given_size_and_format(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        input_size: str,
+        input_format: str,
+        expected_size: tuple,
+        expected_content_type: str,
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        client = app.test_client()
+
+        response = client.get(
+            f"/api/workouts/map/{workout.map_id}"
+            f"?size={input_size}&format={input_format}",
+            headers={"Accept": "image/webp,*/*"},
+        )
+
+        assert response.status_code == 200
+        assert response.content_type == expected_content_type
+        assert "Vary" not in response.headers
+        assert Image.open(BytesIO(response.data)).size == expected_size
+
+    @pytest.mark.parametrize(
+        "input_params,expected_message",
+        [
+            ("size=large", "invalid size"),
+            ("format=gif", "invalid format"),
+        ],
+    )
+    def test_it_returns_400_when_parameter_is_invalid(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        input_params: str,
+        expected_message: str,
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        client = app.test_client()
+
+        response = client.get(
+            f"/api/workouts/map/{workout.map_id}?{input_params}"
+        )
+
+        self.assert_400(response, expected_message)
+        assert not map_exists(workout)
+
+
+class TestDeleteWorkoutMaps:
+    def test_it_deletes_all_map_variants(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        generate_workout_map(workout)
+        map_filepaths = get_map_variants_filepaths(get_map_path(workout))
+
+        db.session.delete(workout)
+        db.session.commit()
+
+        assert not any(
+            os.path.exists(map_filepath) for map_filepath in map_filepaths
+        )
@@ -0,0 +1,287 @@
+import os
+from io import BytesIO
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from fittrackee import db
+from fittrackee.equipments.models import Equipment
+from fittrackee.users.models import User
+from fittrackee.workouts.models import Sport, Workout, WorkoutsUploadTask
+from fittrackee.workouts.upload_tasks import (
+    create_upload_task,
+    process_upload_task,
+)
+
+from ..utils import random_int
+
+
+def create_task_with_file(
+    user: User, file_content: bytes, filename: str, workout_data: dict
+) -> WorkoutsUploadTask:
+    return create_upload_task(
+        user,
+        workout_data,
+        FileStorage(stream=BytesIO(file_content), filename=filename),
+    )
+
+
+def create_task_with_zip_archive(
+    app: Flask, user: User, archive_name: str
+) -> WorkoutsUploadTask:
+    file_path = os.path.join(app.root_path, f"tests/files/{archive_name}")
+    with open(file_path, "rb") as zip_file:
+        return create_task_with_file(
+            user, zip_file.read(), archive_name, {"sport_id": 1}
+        )
+
+
+@patch("fittrackee.workouts.upload_tasks.appLog")
+class TestProcessUploadTask:
+    def test_it_logs_error_if_no_upload_task_for_given_id(
+        self, logger_mock: Mock, app: Flask
+    ) -> None:
+        upload_task_id = random_int()
+
+        process_upload_task(upload_task_id)
+
+        logger_mock.error.assert_called_once_with(
+            f"No upload task to process for id '{upload_task_id}'"
+        )
+
+    def test_it_logs_info_if_upload_task_already_processed(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        upload_task = create_task_with_file(
+            user_1, str.encode(gpx_file), "example.gpx", {"sport_id": 1}
+        )
+        upload_task.status = "successful"
+        db.session.commit()
+
+        process_upload_task(upload_task.id)
+
+        logger_mock.info.assert_called_once_with(
+            f"Upload task id '{upload_task.id}' already processed"
+        )
+        assert Workout.query.count() == 0
+
+    def test_it_creates_workout_from_gpx_file(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+    ) -> None:
+        upload_task = create_task_with_file(
+            user_1, str.encode(gpx_file), "example.gpx", {"sport_id": 1}
+        )
+
+        process_upload_task(upload_task.id)
+
+        workout = Workout.query.one()
+        assert workout.user_id == user_1.id
+        assert workout.sport_id == sport_1_cycling.id
+        assert upload_task.status == "successful"
+        assert upload_task.files_count == 1
+        assert upload_task.files == [
+            {
+                "error": None,
+                "file_name": "example.gpx",
+                "status": "successful",
+                "workout_id": workout.short_id,
+            }
+        ]
+        assert upload_task.error_message is None
+
+    def test_it_creates_workout_with_given_equipments(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        equipment_bike_user_1: Equipment,
+    ) -> None:
+        upload_task = create_task_with_file(
+            user_1,
+            str.encode(gpx_file),
+            "example.gpx",
+            {
+                "sport_id": 1,
+                "equipment_ids": [equipment_bike_user_1.short_id],
+            },
+        )
+
+        process_upload_task(upload_task.id)
+
+        workout = Workout.query.one()
+        assert workout.equipments == [equipment_bike_user_1]
+
+    def test_it_creates_workouts_from_zip_archive(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        # 'gpx_test.zip' contains 3 gpx files (same data) and 1 non-gpx file
+        upload_task = create_task_with_zip_archive(app, user_1, "gpx_test.zip")
+
+        process_upload_task(upload_task.id)
+
+        assert Workout.query.count() == 3
+        assert upload_task.status == "successful"
+        assert upload_task.files_count == 3
+        assert sorted(
+            file_result["file_name"] for file_result in upload_task.files
+        ) == ["test_1.gpx", "test_2.gpx", "test_3.gpx"]
+        assert {
+            file_result["workout_id"] for file_result in upload_task.files
+        } == {workout.short_id for workout in Workout.query.all()}
+
+    def test_it_processes_all_files_when_one_file_is_invalid(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        # 'gpx_test_incorrect.zip' contains 2 gpx files, one is incorrect
+        upload_task = create_task_with_zip_archive(
+            app, user_1, "gpx_test_incorrect.zip"
+        )
+
+        process_upload_task(upload_task.id)
+
+        workout = Workout.query.one()
+        assert upload_task.status == "errored"
+        assert upload_task.files_count == 2
+        assert sorted(
+            upload_task.files, key=lambda file_result: file_result["status"]
+        ) == [
+            {
+                "error": "no tracks in gpx file",
+                "file_name": "test_4.gpx",
+                "status": "errored",
+                "workout_id": None,
+            },
+            {
+                "error": None,
+                "file_name": "test_1.gpx",
+                "status": "successful",
+                "workout_id": workout.short_id,
+            },
+        ]
+
+    def test_it_sets_error_when_files_in_archive_exceed_limit(
+        self,
+        logger_mock: Mock,
+        app_with_max_workouts: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        upload_task = create_task_with_zip_archive(
+            app_with_max_workouts, user_1, "gpx_test.zip"
+        )
+
+        process_upload_task(upload_task.id)
+
+        assert Workout.query.count() == 0
+        assert upload_task.status == "errored"
+        assert upload_task.files_count == 0
+        assert upload_task.error_message == (
+            "the number of files in the archive exceeds the limit"
+        )
+
+    def test_it_sets_error_when_equipment_is_inactive(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        equipment_bike_user_1: Equipment,
+    ) -> None:
+        upload_task = create_task_with_file(
+            user_1,
+            str.encode(gpx_file),
+            "example.gpx",
+            {
+                "sport_id": 1,
+                "equipment_ids": [equipment_bike_user_1.short_id],
+            },
+        )
+        equipment_bike_user_1.is_active = False
+        db.session.commit()
+
+        process_upload_task(upload_task.id)
+
+        assert Workout.query.count() == 0
+        assert upload_task.status == "errored"
+        assert upload_task.error_message == (
+            f"equipment with id {equipment_bike_user_1.short_id} is inactive"
+        )
+
+    def test_it_deletes_uploaded_files(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        upload_task = create_task_with_zip_archive(
+            app, user_1, "gpx_test_incorrect.zip"
+        )
+        task_directory = os.path.dirname(
+            os.path.join(
+                app.config["UPLOAD_FOLDER"], str(upload_task.file_path)
+            )
+        )
+
+        process_upload_task(upload_task.id)
+
+        assert upload_task.file_path is None
+        assert not os.path.exists(task_directory)
+
+    def test_it_sets_error_when_interrupted_task_is_retried(
+        self,
+        logger_mock: Mock,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+    ) -> None:
+        upload_task = create_task_with_zip_archive(app, user_1, "gpx_test.zip")
+        task_directory = os.path.dirname(
+            os.path.join(
+                app.config["UPLOAD_FOLDER"], str(upload_task.file_path)
+            )
+        )
+        with (
+            patch(
+                "fittrackee.workouts.upload_tasks.create_workout_from_gpx_file",
+                side_effect=KeyboardInterrupt(),
+            ),
+            pytest.raises(KeyboardInterrupt),
+        ):
+            process_upload_task(upload_task.id)
+        assert upload_task.status == "in_progress"
+
+        # task is retried by task queue
+        process_upload_task(upload_task.id)
+
+        logger_mock.error.assert_called_once_with(
+            f"Upload task id '{upload_task.id}' was interrupted"
+        )
+        assert Workout.query.count() == 0
+        assert upload_task.status == "errored"
+        assert upload_task.error_message == "workouts upload was interrupted"
+        assert upload_task.file_path is None
+        assert not os.path.exists(task_directory)
@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from typing import Iterator
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from fittrackee import db
+from fittrackee.users.models import User
+from fittrackee.workouts.models import Sport, Workout
+from fittrackee.workouts.utils.gpx import weather_service
+from fittrackee.workouts.utils.weather.cache import WeatherCache
+from fittrackee.workouts.utils.weather.visual_crossing import VisualCrossing
+from fittrackee.workouts.utils.workouts import process_files
+from fittrackee.workouts.weather import (
+    RateLimiter,
+    backfill_workouts_weather,
+    enqueue_workouts_weather_update,
+    get_weather_cache,
+    get_workout_weather_points,
+    update_workouts_weather,
+)
+
+WEATHER_DATA = {
+    "humidity": 0.69,
+    "icon": "partly-cloudy-day",
+    "temperature": 12.26,
+    "wind": 3.49,
+    "windBearing": 315,
+}
+
+
+@pytest.fixture()
+def weather_api() -> Iterator[Mock]:
+    weather_api = Mock()
+    with (
+        patch.object(weather_service, "weather_api", weather_api),
+        patch.object(
+            weather_service, "get_weather", return_value=WEATHER_DATA
+        ) as get_weather_mock,
+    ):
+        yield get_weather_mock
+
+
+def create_workout_with_gpx(
+    user: User, sport: Sport, gpx_file: str
+) -> Workout:
+    return process_files(
+        auth_user=user,
+        workout_data={"sport_id": sport.id},
+        workout_file=FileStorage(
+            stream=BytesIO(str.encode(gpx_file)), filename="example.gpx"
+        ),
+    )[0]
+
+
+class TestGetWorkoutWeatherPoints:
+    def test_it_returns_empty_list_when_workout_has_no_gpx(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        assert get_workout_weather_points(workout_cycling_user_1) == []
+
+    def test_it_returns_start_and_end_points(
+        self, app: Flask, user_1: User, sport_1_cycling: Sport, gpx_file: str
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        points = get_workout_weather_points(workout)
+
+        assert len(points) == 2
+        assert points[0].time == datetime(
+            2018, 3, 13, 12, 44, 45, tzinfo=timezone.utc
+        )
+        assert points[1].time - points[0].time == timedelta(  # type: ignore
+            minutes=4, seconds=10
+        )
+
+
+class TestUpdateWorkoutsWeather:
+    def test_it_stores_weather_data(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        weather_api: Mock,
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+
+        updated_count = update_workouts_weather([workout.id])
+
+        assert updated_count == 1
+        db.session.refresh(workout)
+        assert workout.weather_start == WEATHER_DATA
+        assert workout.weather_end == WEATHER_DATA
+
+    def test_it_does_not_replace_existing_data_when_lookup_fails(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        weather_api: Mock,
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        workout.weather_start = WEATHER_DATA
+        db.session.commit()
+        weather_api.return_value = None
+
+        updated_count = update_workouts_weather([workout.id])
+
+        assert updated_count == 0
+        db.session.refresh(workout)
+        assert workout.weather_start == WEATHER_DATA
+        assert workout.weather_end is None
+
+
+class TestEnqueueWorkoutsWeatherUpdate:
+    def test_it_does_not_send_task_when_weather_is_not_configured(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+    ) -> None:
+        with patch("fittrackee.workouts.tasks.update_weather") as task_mock:
+            enqueue_workouts_weather_update([workout_cycling_user_1])
+
+        task_mock.send.assert_not_called()
+
+    def test_it_sends_task_with_workouts_ids(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        workout_cycling_user_1: Workout,
+        weather_api: Mock,
+    ) -> None:
+        with patch("fittrackee.workouts.tasks.update_weather") as task_mock:
+            enqueue_workouts_weather_update([workout_cycling_user_1])
+
+        task_mock.send.assert_called_once_with(
+            workout_ids=[workout_cycling_user_1.id]
+        )
+
+    def test_it_does_not_fetch_weather_during_upload(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        weather_api: Mock,
+    ) -> None:
+        with patch("fittrackee.workouts.tasks.update_weather") as task_mock:
+            workout = create_workout_with_gpx(
+                user_1, sport_1_cycling, gpx_file
+            )
+
+        weather_api.assert_not_called()
+        assert workout.weather_start is None
+        task_mock.send.assert_called_once_with(workout_ids=[workout.id])
+
+
+class TestBackfillWorkoutsWeather:
+    def test_it_updates_workouts_with_missing_weather_data(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        workout_cycling_user_1: Workout,
+        weather_api: Mock,
+    ) -> None:
+        workout = create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+        workout_with_weather = create_workout_with_gpx(
+            user_1, sport_1_cycling, gpx_file
+        )
+        workout_with_weather.weather_start = WEATHER_DATA
+        workout_with_weather.weather_end = WEATHER_DATA
+        db.session.commit()
+
+        processed_count, updated_count = backfill_workouts_weather(workers=2)
+
+        # workout without gpx is not processed
+        assert (processed_count, updated_count) == (1, 1)
+        db.session.refresh(workout)
+        assert workout.weather_start == WEATHER_DATA
+        assert workout.weather_end == WEATHER_DATA
+        assert weather_api.call_count == 2
+
+    def test_it_processes_given_maximum_number_of_workouts(
+        self,
+        app: Flask,
+        user_1: User,
+        sport_1_cycling: Sport,
+        gpx_file: str,
+        weather_api: Mock,
+    ) -> None:
+        workouts = [
+            create_workout_with_gpx(user_1, sport_1_cycling, gpx_file)
+            for _ in range(3)
+        ]
+
+        processed_count, _ = backfill_workouts_weather(max_workouts=2)
+
+        assert processed_count == 2
+        assert [workout.weather_start for workout in workouts] == [
+            WEATHER_DATA,
+            WEATHER_DATA,
+            None,
+        ]
+
+
+class TestRateLimiter:
+    def test_it_does_not_wait_when_rate_is_zero(self) -> None:
+        rate_limiter = RateLimiter(0)
+
+        with patch("fittrackee.workouts.weather.time.sleep") as sleep_mock:
+            for _ in range(3):
+                rate_limiter.wait()
+
+        sleep_mock.assert_not_called()
+
+    def test_it_waits_between_calls(self) -> None:
+        rate_limiter = RateLimiter(2)
+
+        with (
+            patch(
+                "fittrackee.workouts.weather.time.monotonic", return_value=10
+            ),
+            patch("fittrackee.workouts.weather.time.sleep") as sleep_mock,
+        ):
+            for _ in range(3):
+                rate_limiter.wait()
+
+        assert [call.args[0] for call in sleep_mock.call_args_list] == [
+            0.5,
+            1,
+        ]
+
+
+class TestGetWeatherCache:
+    def test_it_returns_none_when_weather_is_disabled(self) -> None:
+        with patch.object(weather_service, "weather_api", None):
+            assert get_weather_cache() is None
+
+    def test_it_returns_weather_api_cache(self) -> None:
+        cache = WeatherCache()
+        with patch.object(
+            weather_service,
+            "weather_api",
+            VisualCrossing("api_key", cache=cache),
+        ):
+            assert get_weather_cache() is cache
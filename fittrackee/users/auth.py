@@ -10,7 +10,6 @@ from flask import (
     Response,
     current_app,
     request,
-    send_from_directory,
 )
 from sqlalchemy import exc, func
 from sqlalchemy.dialects.postgresql import insert
@@ -31,7 +30,7 @@ from fittrackee.equipments.exceptions import (
     InvalidEquipmentsException,
 )
 from fittrackee.equipments.utils import handle_equipments
-from fittrackee.files import get_absolute_file_path
+from fittrackee.files import get_absolute_file_path, send_upload_file
 from fittrackee.oauth2.server import require_auth
 from fittrackee.reports.models import ReportAction, ReportActionAppeal
 from fittrackee.responses import (
@@ -67,6 +66,7 @@ from .models import (
     UserSportPreferenceEquipment,
 )
 from .roles import UserRole
+from .storage import track_storage_usage
 from .tasks import export_data
 from .utils.controls import check_password, is_valid_email
 from .utils.language import get_language
@@ -1582,11 +1582,12 @@ def edit_picture(auth_user: User) -> Union[Dict, HttpResponse]:
     )
 
     try:
-        if auth_user.picture is not None:
-            old_picture_path = get_absolute_file_path(auth_user.picture)
-            if os.path.isfile(get_absolute_file_path(old_picture_path)):
-                os.remove(old_picture_path)
-        file.save(absolute_picture_path)
+        with track_storage_usage(db.session, dirpath):
+            if auth_user.picture is not None:
+                old_picture_path = get_absolute_file_path(auth_user.picture)
+                if os.path.isfile(get_absolute_file_path(old_picture_path)):
+                    os.remove(old_picture_path)
+            file.save(absolute_picture_path)
         auth_user.picture = relative_picture_path
         db.session.commit()
         return {
@@ -1639,8 +1640,9 @@ def del_picture(auth_user: User) -> Union[Tuple[Dict, int], HttpResponse]:
 
     try:
         picture_path = get_absolute_file_path(auth_user.picture)
-        if os.path.isfile(picture_path):
-            os.remove(picture_path)
+        with track_storage_usage(db.session, picture_path):
+            if os.path.isfile(picture_path):
+                os.remove(picture_path)
         auth_user.picture = None
         db.session.commit()
         return {"status": "no content"}, 204
@@ -2296,9 +2298,8 @@ def download_data_export(
             data_type="archive", message="file not found"
         )
 
-    return send_from_directory(
-        f"{current_app.config['UPLOAD_FOLDER']}/exports/{auth_user.id}",
-        export_request.file_name,
+    return send_upload_file(
+        f"exports/{auth_user.id}/{export_request.file_name}",
         mimetype="application/zip",
         as_attachment=True,
     )
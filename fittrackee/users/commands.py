@@ -12,7 +12,9 @@ from fittrackee.users.export_data import (
     clean_user_data_export,
     generate_user_data_archives,
 )
+from fittrackee.users.models import User
 from fittrackee.users.roles import UserRole
+from fittrackee.users.storage import reconcile_users_storage_usage
 from fittrackee.users.users_service import UserManagerService
 from fittrackee.users.utils.language import get_language
 from fittrackee.users.utils.tokens import clean_blacklisted_tokens
@@ -202,3 +204,30 @@ def export_archives(
     with app.app_context():
         count = generate_user_data_archives(max_reports)
         logger.info(f"Generated data export archives: {count}.")
+
+
+@users_cli.command("reconcile_storage_usage")
+@click.option(
+    "--username",
+    type=str,
+    help="Username of user whose storage usage must be reconciled.",
+)
+def reconcile_storage_usage(username: Optional[str]) -> None:
+    """
+    Correct users storage usage by scanning users files.
+    Users are processed one at a time, command can be run while
+    application is running.
+    """
+    with app.app_context():
+        users_ids = None
+        if username:
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                logger.error(f"User '{username}' not found.")
+                return
+            users_ids = [user.id]
+        processed_count, corrected_count = reconcile_users_storage_usage(
+            users_ids
+        )
+        logger.info(f"Processed users: {processed_count}.")
+        logger.info(f"Corrected users: {corrected_count}.")
@@ -75,3 +75,5 @@ NOTIFICATIONS_PREFERENCES_SCHEMA = {
     },
     "additionalProperties": False,
 }
+
+STORAGE_CATEGORIES = ["gpx", "maps", "pictures", "exports"]
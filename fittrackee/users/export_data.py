@@ -12,6 +12,7 @@ from fittrackee.emails.tasks import data_export_email
 from fittrackee.files import get_absolute_file_path
 
 from .models import User, UserDataExport
+from .storage import track_storage_usage
 from .utils.language import get_language
 
 
@@ -150,7 +151,8 @@ def export_user_data(export_request_id: int) -> None:
 
     user = User.query.filter_by(id=export_request.user_id).one()
     exporter = UserDataExporter(user)
-    archive_file_path, archive_file_name = exporter.generate_archive()
+    with track_storage_usage(db.session, exporter.export_directory):
+        archive_file_path, archive_file_name = exporter.generate_archive()
 
     try:
         export_request.completed = True
@@ -1,12 +1,12 @@
 import os
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
 import jwt
 from flask import current_app
 from jsonschema import validate
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, tuple_
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine.base import Connection
 from sqlalchemy.event import listens_for
@@ -24,9 +24,11 @@ from fittrackee.comments.models import Comment
 from fittrackee.database import TZDateTime
 from fittrackee.dates import aware_utc_now
 from fittrackee.files import get_absolute_file_path
+from fittrackee.flush_events import add_flush_event
 from fittrackee.utils import encode_uuid
 from fittrackee.visibility_levels import VisibilityLevel
-from fittrackee.workouts.models import Workout
+from fittrackee.workouts.models import Workout, update_user_daily_stats
+from fittrackee.workouts.stats_cache import invalidate_user_stats_cache
 
 from .constants import (
     NOTIFICATION_TYPES,
@@ -107,23 +109,30 @@ class FollowRequest(BaseModel):
         }
 
 
-@listens_for(FollowRequest, "after_insert")
-def on_follow_request_insert(
-    mapper: Mapper, connection: Connection, new_follow_request: FollowRequest
+def create_follow_requests_notifications(
+    session: Session, new_follow_requests: List[FollowRequest]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        to_user = User.query.filter_by(
-            id=new_follow_request.followed_user_id
-        ).first()
+    recipients = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_(
+                {
+                    follow_request.followed_user_id
+                    for follow_request in new_follow_requests
+                }
+            )
+        ).all()
+    }
+    for new_follow_request in new_follow_requests:
+        to_user = recipients.get(new_follow_request.followed_user_id)
         if not to_user:
-            return
+            continue
         event_type = (
             "follow" if new_follow_request.is_approved else "follow_request"
         )
 
         if not to_user.is_notification_enabled(event_type):
-            return
+            continue
 
         notification = Notification(
             from_user_id=new_follow_request.follower_user_id,
@@ -134,6 +143,79 @@ def on_follow_request_insert(
         session.add(notification)
 
 
+@listens_for(FollowRequest, "after_insert")
+def on_follow_request_insert(
+    mapper: Mapper, connection: Connection, new_follow_request: FollowRequest
+) -> None:
+    add_flush_event(
+        object_session(new_follow_request),
+        "follow_requests_insert",
+        create_follow_requests_notifications,
+        new_follow_request,
+    )
+
+
+def update_follow_requests_notifications(
+    session: Session, follow_requests: List[FollowRequest]
+) -> None:
+    connection = session.connection()
+    for follow_request in follow_requests:
+        if follow_request.is_approved:
+            if follow_request.to_user.is_notification_enabled("follow"):
+                follow_request_notification = Notification.query.filter_by(
+                    from_user_id=follow_request.follower_user_id,
+                    to_user_id=follow_request.followed_user_id,
+                    event_type="follow_request",
+                ).first()
+
+                if follow_request_notification:
+                    notification_table = Notification.__table__  # type: ignore
+                    connection.execute(
+                        notification_table.update()
+                        .where(
+                            notification_table.c.from_user_id
+                            == follow_request.follower_user_id,
+                            notification_table.c.to_user_id
+                            == follow_request.followed_user_id,
+                            notification_table.c.event_type
+                            == "follow_request",
+                        )
+                        .values(
+                            event_type="follow",
+                            marked_as_read=False,
+                        )
+                    )
+                else:
+                    follow_notification = Notification(
+                        from_user_id=follow_request.follower_user_id,
+                        to_user_id=follow_request.followed_user_id,
+                        created_at=datetime.now(timezone.utc),
+                        event_type="follow",
+                    )
+                    session.add(follow_notification)
+
+            if follow_request.from_user.is_notification_enabled(
+                "follow_request_approved"
+            ):
+                notification = Notification(
+                    from_user_id=follow_request.followed_user_id,
+                    to_user_id=follow_request.follower_user_id,
+                    created_at=datetime.now(timezone.utc),
+                    event_type="follow_request_approved",
+                )
+                session.add(notification)
+
+        if (
+            not follow_request.is_approved
+            and follow_request.updated_at is not None
+        ):
+            Notification.query.filter_by(
+                from_user_id=follow_request.follower_user_id,
+                to_user_id=follow_request.followed_user_id,
+                event_type="follow_request",
+            ).delete()
+
+
 @listens_for(FollowRequest, "after_update")
 def on_follow_request_update(
     mapper: Mapper, connection: Connection, follow_request: FollowRequest
@@ -142,81 +224,53 @@ def on_follow_request_update(
     if follow_request_object and follow_request_object.is_modified(
         follow_request
     ):
+        add_flush_event(
+            follow_request_object,
+            "follow_requests_update",
+            update_follow_requests_notifications,
+            follow_request,
+        )
 
-        @listens_for(db.Session, "after_flush", once=True)
-        def receive_after_flush(session: Session, context: Connection) -> None:
-            if follow_request.is_approved:
-                if follow_request.to_user.is_notification_enabled("follow"):
-                    follow_request_notification = Notification.query.filter_by(
-                        from_user_id=follow_request.follower_user_id,
-                        to_user_id=follow_request.followed_user_id,
-                        event_type="follow_request",
-                    ).first()
-
-                    if follow_request_notification:
-                        notification_table = Notification.__table__  # type: ignore
-                        connection.execute(
-                            notification_table.update()
-                            .where(
-                                notification_table.c.from_user_id
-                                == follow_request.follower_user_id,
-                                notification_table.c.to_user_id
-                                == follow_request.followed_user_id,
-                                notification_table.c.event_type
-                                == "follow_request",
-                            )
-                            .values(
-                                event_type="follow",
-                                marked_as_read=False,
-                            )
-                        )
-                    else:
-                        follow_notification = Notification(
-                            from_user_id=follow_request.follower_user_id,
-                            to_user_id=follow_request.followed_user_id,
-                            created_at=datetime.now(timezone.utc),
-                            event_type="follow",
-                        )
-                        session.add(follow_notification)
-
-                if follow_request.from_user.is_notification_enabled(
-                    "follow_request_approved"
-                ):
-                    notification = Notification(
-                        from_user_id=follow_request.followed_user_id,
-                        to_user_id=follow_request.follower_user_id,
-                        created_at=datetime.now(timezone.utc),
-                        event_type="follow_request_approved",
-                    )
-                    session.add(notification)
 
-            if (
-                not follow_request.is_approved
-                and follow_request.updated_at is not None
-            ):
-                Notification.query.filter_by(
-                    from_user_id=follow_request.follower_user_id,
-                    to_user_id=follow_request.followed_user_id,
-                    event_type="follow_request",
-                ).delete()
+def delete_follow_requests_notifications(
+    session: Session, old_follow_requests: List[FollowRequest]
+) -> None:
+    Notification.query.filter(
+        tuple_(Notification.from_user_id, Notification.to_user_id).in_(
+            [
+                (
+                    old_follow_request.follower_user_id,
+                    old_follow_request.followed_user_id,
+                )
+                for old_follow_request in old_follow_requests
+            ]
+        ),
+        Notification.event_type.in_(["follow", "follow_request"]),
+    ).delete()
+    Notification.query.filter(
+        tuple_(Notification.from_user_id, Notification.to_user_id).in_(
+            [
+                (
+                    old_follow_request.followed_user_id,
+                    old_follow_request.follower_user_id,
+                )
+                for old_follow_request in old_follow_requests
+            ]
+        ),
+        Notification.event_type == "follow_request_approved",
+    ).delete()
 
 
 @listens_for(FollowRequest, "after_delete")
 def on_follow_request_delete(
     mapper: Mapper, connection: Connection, old_follow_request: FollowRequest
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        Notification.query.filter(
-            Notification.from_user_id == old_follow_request.follower_user_id,
-            Notification.to_user_id == old_follow_request.followed_user_id,
-            Notification.event_type.in_(["follow", "follow_request"]),
-        ).delete()
-        Notification.query.filter(
-            Notification.from_user_id == old_follow_request.followed_user_id,
-            Notification.to_user_id == old_follow_request.follower_user_id,
-            Notification.event_type == "follow_request_approved",
-        ).delete()
+    add_flush_event(
+        object_session(old_follow_request),
+        "follow_requests_delete",
+        delete_follow_requests_notifications,
+        old_follow_request,
+    )
 
 
 class BlockedUser(BaseModel):
@@ -839,6 +893,15 @@ class User(BaseModel):
         if is_auth_user(role) or has_admin_rights(role):
             serialized_user["email_to_confirm"] = self.email_to_confirm
 
+        if has_admin_rights(role):
+            from .storage import get_user_storage_usage
+
+            storage_usage = get_user_storage_usage(self.id)
+            serialized_user["storage_usage"] = {
+                **storage_usage,
+                "total": sum(storage_usage.values()),
+            }
+
         if current_user and has_moderator_rights(UserRole(current_user.role)):
             reports_count = self.all_reports_count
             serialized_user["created_reports_count"] = reports_count[
@@ -913,6 +976,25 @@ UserSportPreferenceEquipment = db.Table(
 )
 
 
+def update_users_daily_stats(session: Session, users: List["User"]) -> None:
+    connection = session.connection()
+    for user in {user.id: user for user in users}.values():
+        update_user_daily_stats(connection, user.id, user.timezone)
+
+
+@listens_for(User, "after_update")
+def on_user_update(mapper: Mapper, connection: Connection, user: User) -> None:
+    # daily stats days depend on user timezone
+    if db.inspect(user).attrs["timezone"].history.has_changes():
+        invalidate_user_stats_cache(object_session(user), user.id)
+        add_flush_event(
+            object_session(user),
+            "users_daily_stats",
+            update_users_daily_stats,
+            user,
+        )
+
+
 class UserSportPreference(BaseModel):
     __tablename__ = "users_sports_preferences"
 
@@ -999,6 +1081,21 @@ class BlacklistedToken(BaseModel):
         return cls.query.filter_by(token=str(auth_token)).first() is not None
 
 
+class UserStorageUsage(BaseModel):
+    """
+    Size of user files by category (see 'STORAGE_CATEGORIES'), updated
+    when files are written or deleted.
+    """
+
+    __tablename__ = "users_storage_usage"
+
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    category: Mapped[str] = mapped_column(db.String(20), primary_key=True)
+    size: Mapped[int] = mapped_column(db.BigInteger, nullable=False)
+
+
 class UserDataExport(BaseModel):
     __tablename__ = "users_data_export"
 
@@ -1043,20 +1140,33 @@ class UserDataExport(BaseModel):
         }
 
 
+def delete_users_data_exports_files(
+    session: Session, old_records: List["UserDataExport"]
+) -> None:
+    from .storage import track_storage_usage
+
+    for old_record in old_records:
+        if old_record.file_name:
+            file_path = get_absolute_file_path(
+                f"exports/{old_record.user_id}/{old_record.file_name}"
+            )
+            with track_storage_usage(session, file_path):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    appLog.error("archive found when deleting export request")
+
+
 @listens_for(UserDataExport, "after_delete")
 def on_users_data_export_delete(
     mapper: Mapper, connection: Connection, old_record: "UserDataExport"
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        if old_record.file_name:
-            try:
-                file_path = (
-                    f"exports/{old_record.user_id}/{old_record.file_name}"
-                )
-                os.remove(get_absolute_file_path(file_path))
-            except OSError:
-                appLog.error("archive found when deleting export request")
+    add_flush_event(
+        object_session(old_record),
+        "users_data_exports_delete",
+        delete_users_data_exports_files,
+        old_record,
+    )
 
 
 class Notification(BaseModel):
@@ -0,0 +1,213 @@
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from flask import current_app
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm.session import Session
+
+from fittrackee import db
+from fittrackee.files import get_absolute_file_path
+
+from .constants import STORAGE_CATEGORIES
+from .models import User, UserStorageUsage
+
+MAPS_EXTENSIONS = (".png", ".webp")
+# workouts files uploaded for asynchronous processing are temporary files
+WORKOUTS_UPLOADS_DIRECTORY = "uploads"
+# files not counted: lock files (for instance, maps generation lock) and
+# track columns files (derived from gpx files and rebuilt on first access,
+# outside storage usage tracking)
+EXCLUDED_FILES_EXTENSIONS = (".lock", ".columns")
+
+
+def get_storage_size(absolute_path: str) -> int:
+    """
+    Return file size, or size of files in directory (not recursive).
+    Returns 0 if path does not exist.
+    """
+    try:
+        if os.path.isdir(absolute_path):
+            return sum(
+                entry.stat().st_size
+                for entry in os.scandir(absolute_path)
+                if entry.is_file()
+            )
+        return os.path.getsize(absolute_path)
+    except OSError:
+        # path does not exist or file deleted concurrently
+        return 0
+
+
+def get_storage_key(absolute_path: str) -> Optional[Tuple[int, str]]:
+    """
+    Return user id and storage category from path in upload folder
+    ('<directory>/<user_id>/...'), or None if path does not belong to
+    a user.
+    """
+    relative_path = os.path.relpath(
+        absolute_path, current_app.config["UPLOAD_FOLDER"]
+    )
+    parts = relative_path.split(os.sep)
+    if (
+        len(parts) < 2
+        or not parts[1].isdigit()
+        or parts[-1].endswith(EXCLUDED_FILES_EXTENSIONS)
+    ):
+        return None
+    directory, user_id = parts[0], int(parts[1])
+    if directory == "workouts":
+        if len(parts) > 2 and parts[2] == WORKOUTS_UPLOADS_DIRECTORY:
+            return None
+        category = "maps" if parts[-1].endswith(MAPS_EXTENSIONS) else "gpx"
+    elif directory in ["pictures", "exports"]:
+        category = directory
+    else:
+        return None
+    return user_id, category
+
+
+def update_storage_usage(
+    session: Union[Session, scoped_session], size_changes: Dict[str, int]
+) -> None:
+    """
+    Update users storage usage with size changes of files or directories
+    (absolute path => size difference in bytes).
+
+    Changes are executed in session transaction (storage usage can be
+    reconciled with files with 'ftcli users reconcile_storage_usage').
+    """
+    changes: Dict[Tuple[int, str], int] = defaultdict(int)
+    for absolute_path, size_change in size_changes.items():
+        storage_key = get_storage_key(absolute_path)
+        if storage_key and size_change:
+            changes[storage_key] += size_change
+
+    storage_usage_table = UserStorageUsage.__table__  # type: ignore
+    for (user_id, category), size_change in sorted(changes.items()):
+        if not size_change:
+            continue
+        # row is not created if user is deleted in current transaction
+        insert_stmt = postgresql.insert(storage_usage_table).from_select(
+            ["user_id", "category", "size"],
+            select(User.id, literal(category), literal(size_change)).where(
+                User.id == user_id
+            ),
+        )
+        session.connection().execute(
+            insert_stmt.on_conflict_do_update(
+                index_elements=["user_id", "category"],
+                set_={
+                    "size": storage_usage_table.c.size
+                    + insert_stmt.excluded.size
+                },
+            )
+        )
+
+
+@contextmanager
+def track_storage_usage(
+    session: Union[Session, scoped_session], *absolute_paths: str
+) -> Iterator[None]:
+    """
+    Update users storage usage with size changes of given files or
+    directories once block is executed.
+    """
+    sizes = {path: get_storage_size(path) for path in absolute_paths}
+    try:
+        yield
+    finally:
+        update_storage_usage(
+            session,
+            {
+                path: get_storage_size(path) - size
+                for path, size in sizes.items()
+            },
+        )
+
+
+def get_user_storage_usage(user_id: int) -> Dict[str, int]:
+    storage_usage = {category: 0 for category in STORAGE_CATEGORIES}
+    for category, size in db.session.execute(
+        select(UserStorageUsage.category, UserStorageUsage.size).where(
+            UserStorageUsage.user_id == user_id
+        )
+    ).all():
+        storage_usage[category] = size
+    return storage_usage
+
+
+def get_total_storage_usage() -> int:
+    return int(
+        db.session.execute(
+            select(func.coalesce(func.sum(UserStorageUsage.size), 0))
+        ).scalar_one()
+    )
+
+
+def get_user_storage_usage_from_files(user_id: int) -> Dict[str, int]:
+    """
+    Calculate user storage usage by scanning user directories
+    """
+    storage_usage = {category: 0 for category in STORAGE_CATEGORIES}
+    for directory in ["workouts", "pictures", "exports"]:
+        user_directory = get_absolute_file_path(
+            os.path.join(directory, str(user_id))
+        )
+        for dir_path, dir_names, file_names in os.walk(user_directory):
+            if dir_path == user_directory and directory == "workouts":
+                dir_names[:] = [
+                    dir_name
+                    for dir_name in dir_names
+                    if dir_name != WORKOUTS_UPLOADS_DIRECTORY
+                ]
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                storage_key = get_storage_key(file_path)
+                if storage_key is None:
+                    continue
+                try:
+                    storage_usage[storage_key[1]] += os.path.getsize(file_path)
+                except OSError:
+                    # file deleted during scan
+                    pass
+    return storage_usage
+
+
+def reconcile_users_storage_usage(
+    users_ids: Optional[List[int]] = None,
+) -> Tuple[int, int]:
+    """
+    Correct storage usage of users (all users if no ids are provided) from
+    files, one user at a time (one transaction per user).
+    Returns numbers of processed and corrected users.
+    """
+    users_query = select(User.id).order_by(User.id)
+    if users_ids is not None:
+        users_query = users_query.where(User.id.in_(users_ids))
+    processed_count = 0
+    corrected_count = 0
+    for user_id in db.session.execute(users_query).scalars().all():
+        processed_count += 1
+        storage_usage = get_user_storage_usage_from_files(user_id)
+        if storage_usage == get_user_storage_usage(user_id):
+            continue
+        corrected_count += 1
+        storage_usage_table = UserStorageUsage.__table__  # type: ignore
+        insert_stmt = postgresql.insert(storage_usage_table).values(
+            [
+                {"user_id": user_id, "category": category, "size": size}
+                for category, size in storage_usage.items()
+            ]
+        )
+        db.session.execute(
+            insert_stmt.on_conflict_do_update(
+                index_elements=["user_id", "category"],
+                set_={"size": insert_stmt.excluded.size},
+            )
+        )
+        db.session.commit()
+    return processed_count, corrected_count
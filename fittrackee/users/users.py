@@ -2,7 +2,7 @@ import os
 import shutil
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-from flask import Blueprint, current_app, request, send_file
+from flask import Blueprint, current_app, request
 from sqlalchemy import and_, asc, desc, exc, func, nullslast, or_
 
 from fittrackee import appLog, db, limiter
@@ -13,7 +13,7 @@ from fittrackee.emails.tasks import (
     reset_password_email,
 )
 from fittrackee.equipments.models import Equipment
-from fittrackee.files import get_absolute_file_path
+from fittrackee.files import get_absolute_file_path, send_upload_file
 from fittrackee.oauth2.server import require_auth
 from fittrackee.reports.models import ReportAction
 from fittrackee.responses import (
@@ -532,8 +532,7 @@ def get_picture(user_name: str) -> Any:
         if not user:
             return UserNotFoundErrorResponse()
         if user.picture is not None:
-            picture_path = get_absolute_file_path(user.picture)
-            return send_file(picture_path)
+            return send_upload_file(user.picture)
     except UserNotFoundException:
         return UserNotFoundErrorResponse()
     except Exception:  # nosec
@@ -0,0 +1,149 @@
+import logging
+from typing import Optional
+
+import click
+
+from fittrackee.cli.app import app
+
+from .daily_stats import (
+    get_users_with_invalid_daily_stats,
+    rebuild_users_daily_stats,
+)
+from .stats_cache import get_stats_cache
+from .utils.tile_cache import get_tile_cache
+from .weather import (
+    backfill_workouts_weather,
+    get_weather_cache,
+    is_weather_enabled,
+)
+
+handler = logging.StreamHandler()
+logger = logging.getLogger("fittrackee_workouts_cli")
+logger.setLevel(logging.INFO)
+logger.addHandler(handler)
+
+
+@click.group(name="workouts")
+def workouts_cli() -> None:
+    """Manage workouts."""
+    pass
+
+
+@workouts_cli.command("backfill_weather")
+@click.option(
+    "--max",
+    "max_workouts",
+    type=int,
+    help="Maximum number of workouts to process.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Number of concurrent weather lookups.",
+)
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0),
+    default=1,
+    show_default=True,
+    help="Maximum number of weather lookups per second (0: no limit).",
+)
+def backfill_weather(
+    max_workouts: Optional[int], workers: int, rate: float
+) -> None:
+    """
+    Fetch weather data for workouts with gpx file and missing weather data.
+    """
+    with app.app_context():
+        if not is_weather_enabled():
+            click.echo("Weather API is not configured.", err=True)
+            return
+        processed_count, updated_count = backfill_workouts_weather(
+            max_workouts=max_workouts, workers=workers, rate=rate
+        )
+        logger.info(f"Processed workouts: {processed_count}.")
+        logger.info(f"Updated workouts: {updated_count}.")
+
+
+@workouts_cli.command("verify_daily_stats")
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    help="Rebuild daily stats of users with invalid daily stats.",
+)
+def verify_daily_stats(rebuild: bool) -> None:
+    """
+    Compare daily stats used for statistics by time with workouts.
+    """
+    with app.app_context():
+        users_ids = get_users_with_invalid_daily_stats()
+        logger.info(f"Users with invalid daily stats: {len(users_ids)}.")
+        if rebuild and users_ids:
+            rebuild_users_daily_stats(users_ids)
+            logger.info(f"Daily stats rebuilt for {len(users_ids)} users.")
+
+
+@workouts_cli.command("stats_cache")
+def stats_cache() -> None:
+    """
+    Display stats cache hits and misses by endpoint.
+    """
+    with app.app_context():
+        cache = get_stats_cache()
+        if not cache.enabled:
+            logger.info("Stats cache is disabled.")
+            return
+        for endpoint, endpoint_stats in sorted(cache.get_stats().items()):
+            hit_rate = (
+                "-"
+                if endpoint_stats["hit_rate"] is None
+                else f"{endpoint_stats['hit_rate']:.2%}"
+            )
+            logger.info(
+                f"{endpoint}: {endpoint_stats['hits']} hits, "
+                f"{endpoint_stats['misses']} misses (hit rate: {hit_rate})."
+            )
+
+
+@workouts_cli.command("weather_cache")
+def weather_cache() -> None:
+    """
+    Display weather cache hits and misses.
+    """
+    with app.app_context():
+        cache = get_weather_cache()
+        if cache is None:
+            logger.info("Weather data are disabled.")
+            return
+        if cache.redis_client is None:
+            # in-memory cache counters are not shared between processes
+            logger.info("Weather cache statistics require Redis.")
+            return
+        stats = cache.get_stats()
+        hit_rate = (
+            "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.2%}"
+        )
+        logger.info(
+            f"Weather cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"(hit rate: {hit_rate})."
+        )
+
+
+@workouts_cli.command("evict_tile_cache")
+def evict_tile_cache() -> None:
+    """
+    Remove expired and least recently used tiles from map tiles cache.
+    """
+    with app.app_context():
+        tile_cache = get_tile_cache(app.config["TILE_SERVER"])
+        if tile_cache is None:
+            logger.info("Tile cache is disabled.")
+            return
+        eviction = tile_cache.evict()
+        if eviction is None:
+            logger.info("Eviction already in progress.")
+            return
+        logger.info(f"Removed tiles: {eviction['removed_tiles']}.")
+        logger.info(f"Cache size: {eviction['cache_size']} bytes.")
@@ -0,0 +1,67 @@
+from typing import List
+
+from sqlalchemy import func, select, union, union_all
+
+from fittrackee import db
+from fittrackee.users.models import User
+
+from .models import (
+    DAILY_STATS_COLUMNS,
+    Workout,
+    WorkoutDailyStats,
+    get_workouts_daily_stats_query,
+    update_user_daily_stats,
+)
+from .stats_cache import invalidate_user_stats_cache
+
+
+def get_users_with_invalid_daily_stats() -> List[int]:
+    """
+    Compare stored daily stats with daily stats calculated from workouts,
+    for each user with workouts or daily stats.
+    Returns ids of users with missing, obsolete or incorrect daily stats.
+    """
+    daily_stats_table = WorkoutDailyStats.__table__  # type: ignore
+    users_ids = union(
+        select(Workout.user_id),
+        select(daily_stats_table.c.user_id),
+    ).subquery()
+    users = db.session.execute(
+        select(User.id, User.timezone)
+        .where(User.id.in_(select(users_ids.c.user_id)))
+        .order_by(User.id)
+    ).all()
+
+    invalid_users_ids = []
+    for user_id, user_timezone in users:
+        expected_daily_stats = get_workouts_daily_stats_query(
+            user_id, user_timezone
+        )
+        stored_daily_stats = select(
+            *[daily_stats_table.c[column] for column in DAILY_STATS_COLUMNS]
+        ).where(daily_stats_table.c.user_id == user_id)
+        differences_count = db.session.execute(
+            select(func.count()).select_from(
+                union_all(
+                    expected_daily_stats.except_(stored_daily_stats),
+                    stored_daily_stats.except_(expected_daily_stats),
+                ).subquery()
+            )
+        ).scalar()
+        if differences_count:
+            invalid_users_ids.append(user_id)
+    return invalid_users_ids
+
+
+def rebuild_users_daily_stats(users_ids: List[int]) -> None:
+    """
+    Recalculate all daily stats of given users (one transaction per user).
+    """
+    for user_id, user_timezone in db.session.execute(
+        select(User.id, User.timezone).where(User.id.in_(users_ids))
+    ).all():
+        update_user_daily_stats(
+            db.session.connection(), user_id, user_timezone
+        )
+        invalidate_user_stats_cache(db.session, user_id)
+        db.session.commit()
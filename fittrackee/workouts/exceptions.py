@@ -5,6 +5,10 @@ class InvalidGPXException(GenericException):
     pass
 
 
+class TrackColumnsException(GenericException):
+    pass
+
+
 class WorkoutException(GenericException):
     pass
 
@@ -16,3 +20,7 @@ class WorkoutGPXException(GenericException):
 class WorkoutForbiddenException(GenericException):
     def __init__(self) -> None:
         super().__init__("error", "you do not have permissions")
+
+
+class MBTilesException(GenericException):
+    pass
@@ -0,0 +1,71 @@
+from typing import List
+
+from fittrackee import appLog, db
+from fittrackee.files import get_absolute_file_path
+from fittrackee.users.storage import get_storage_size, update_storage_usage
+
+from .models import Workout
+from .utils.maps import generate_missing_map, get_map_variants_filepaths
+
+
+def generate_workout_map(workout: Workout) -> bool:
+    """
+    Generate workout map image if not generated yet, and update user
+    storage usage.
+    Returns True if map is generated.
+    """
+    if not workout.map or not workout.gpx:
+        return False
+    map_filepath = get_absolute_file_path(workout.map)
+    sizes = {
+        filepath: get_storage_size(filepath)
+        for filepath in get_map_variants_filepaths(map_filepath)
+    }
+    if not generate_missing_map(
+        map_filepath, get_absolute_file_path(workout.gpx)
+    ):
+        return False
+    update_storage_usage(
+        db.session,
+        {
+            filepath: get_storage_size(filepath) - size
+            for filepath, size in sizes.items()
+        },
+    )
+    db.session.commit()
+    return True
+
+
+def generate_workouts_maps(workout_ids: List[int]) -> int:
+    """
+    Generate missing maps for given workouts.
+    Returns number of generated maps.
+    """
+    generated_count = 0
+    for workout in Workout.query.filter(Workout.id.in_(workout_ids)).all():
+        try:
+            if generate_workout_map(workout):
+                generated_count += 1
+        except Exception as e:
+            # map will be generated on first access
+            appLog.error(
+                f"unable to generate map for workout {workout.id}: {e}"
+            )
+    return generated_count
+
+
+def enqueue_workouts_maps_generation(workouts: List[Workout]) -> None:
+    """
+    Send workouts to task queue to generate map images once workouts are
+    created, in order not to wait for map rendering during upload.
+    """
+    if not workouts:
+        return
+
+    from .tasks import generate_maps
+
+    try:
+        generate_maps.send(workout_ids=[workout.id for workout in workouts])
+    except Exception as e:
+        # map will be generated on first access
+        appLog.error(f"unable to send workouts maps generation task: {e}")
@@ -1,16 +1,24 @@
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
 from uuid import UUID, uuid4
 
+from sqlalchemy import column as sql_column
+from sqlalchemy import func, or_, select, tuple_, values
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine.base import Connection
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import (
+    InstrumentedAttribute,
+    Mapped,
+    mapped_column,
+    relationship,
+)
 from sqlalchemy.orm.mapper import Mapper
 from sqlalchemy.orm.session import Session, object_session
+from sqlalchemy.sql import ColumnElement, Select
 from sqlalchemy.sql.expression import nulls_last
 from sqlalchemy.types import JSON, Enum
 
@@ -19,6 +27,7 @@ from fittrackee.database import TZDateTime
 from fittrackee.dates import aware_utc_now
 from fittrackee.equipments.models import WorkoutEquipment
 from fittrackee.files import get_absolute_file_path
+from fittrackee.flush_events import add_flush_event
 from fittrackee.utils import encode_uuid
 from fittrackee.visibility_levels import (
     VisibilityLevel,
@@ -27,7 +36,14 @@ from fittrackee.visibility_levels import (
 )
 
 from .exceptions import WorkoutForbiddenException
+from .stats_cache import invalidate_user_stats_cache
+from .utils.bulk_import import get_bulk_import
 from .utils.convert import convert_in_duration, convert_value_to_integer
+from .utils.gpx_columns import (
+    get_track_columns_file_path,
+    remove_track_columns_file,
+)
+from .utils.maps import get_map_variants_filepaths
 
 if TYPE_CHECKING:
     from sqlalchemy.orm.attributes import AttributeEvent
@@ -70,7 +86,16 @@ record_types = [
     "LD",  # 'Longest Duration'
     "MS",  # 'Max speed'
 ]
+RECORD_TYPES_COLUMNS = {
+    "AS": "ave_speed",  # 'Average speed'
+    "FD": "distance",  # 'Farthest Distance'
+    "HA": "ascent",  # 'Highest Ascent'
+    "LD": "moving",  # 'Longest Duration'
+    "MS": "max_speed",  # 'Max speed'
+}
 DESCRIPTION_MAX_CHARACTERS = 10000
+# columns used to sort workouts list, in addition to workout date
+WORKOUTS_SORTING_COLUMNS = ["ave_speed", "distance", "max_speed", "moving"]
 NOTES_MAX_CHARACTERS = 500
 TITLE_MAX_CHARACTERS = 255
 
@@ -78,13 +103,20 @@ TITLE_MAX_CHARACTERS = 255
 def update_records(
     user_id: int, sport_id: int, connection: Connection, session: Session
 ) -> None:
+    """
+    Recalculate all records for given user and sport
+    """
     record_table = Record.__table__  # type: ignore
     new_records = Workout.get_user_workout_records(user_id, sport_id)
+    records = {
+        record.record_type: record
+        for record in Record.query.filter_by(
+            user_id=user_id, sport_id=sport_id
+        ).all()
+    }
     for record_type, record_data in new_records.items():
         if record_data["record_value"]:
-            record = Record.query.filter_by(
-                user_id=user_id, sport_id=sport_id, record_type=record_type
-            ).first()
+            record = records.get(record_type)
             if record:
                 value = convert_value_to_integer(
                     record_type, record_data["record_value"]
@@ -105,7 +137,7 @@ def update_records(
                 )
                 new_record.value = record_data["record_value"]  # type: ignore
                 session.add(new_record)
-        else:
+        elif record_type in records:
             connection.execute(
                 record_table.delete()
                 .where(record_table.c.user_id == user_id)
@@ -114,46 +146,222 @@ def update_records(
             )
 
 
+def update_records_with_workout(
+    workout: "Workout", connection: Connection, session: Session
+) -> None:
+    """
+    Update records only when workout values beat current records values,
+    without querying all user workouts.
+    Records are recalculated when values are too close to be compared
+    with stored records values.
+
+    Must not be used when workout is a record holder.
+    """
+    record_table = Record.__table__  # type: ignore
+    records = {
+        record.record_type: record
+        for record in Record.query.filter_by(
+            user_id=workout.user_id, sport_id=workout.sport_id
+        ).all()
+    }
+    # stored values are used, since workout attributes are not rounded
+    # to columns precision
+    workout_values = (
+        db.session.query(
+            *[
+                getattr(Workout, column)
+                for column in RECORD_TYPES_COLUMNS.values()
+            ]
+        )
+        .filter(Workout.id == workout.id)
+        .one()
+    )
+    new_values = {}
+    for record_type, value in zip(RECORD_TYPES_COLUMNS, workout_values):
+        if not value:
+            continue
+        record = records.get(record_type)
+        if record is None or record._value is None:
+            new_values[record_type] = value
+            continue
+        new_value = convert_value_to_integer(record_type, value)
+        if new_value is None or new_value < record._value - 1:
+            continue
+        if new_value <= record._value + 1:
+            # record depends on values rounding and workouts dates
+            update_records(
+                workout.user_id, workout.sport_id, connection, session
+            )
+            return
+        new_values[record_type] = value
+
+    for record_type, value in new_values.items():
+        record = records.get(record_type)
+        if record is None:
+            new_record = Record(workout=workout, record_type=record_type)
+            new_record.value = value  # type: ignore
+            session.add(new_record)
+            continue
+        connection.execute(
+            record_table.update()
+            .where(record_table.c.id == record.id)
+            .values(
+                value=convert_value_to_integer(record_type, value),
+                workout_id=workout.id,
+                workout_uuid=workout.uuid,
+                workout_date=workout.workout_date,
+            )
+        )
+
+
+def has_records_data_changes(workout: "Workout") -> bool:
+    instance_state = db.inspect(workout)
+    return any(
+        instance_state.attrs[attribute].history.has_changes()
+        for attribute in [
+            *RECORD_TYPES_COLUMNS.values(),
+            "sport_id",
+            "workout_date",
+        ]
+    )
+
+
+DAILY_STATS_WORKOUT_ATTRIBUTES = [
+    "sport_id",
+    "workout_date",
+    "distance",
+    "moving",
+    "ascent",
+    "descent",
+    "ave_speed",
+]
+
+
+def get_daily_stats_changes(workout: "Workout") -> List[datetime]:
+    """
+    Return workout dates (current and previous) of days whose daily stats
+    must be updated, or an empty list if workout changes have no effect
+    on daily stats.
+    """
+    instance_state = db.inspect(workout)
+    if not any(
+        instance_state.attrs[attribute].history.has_changes()
+        for attribute in DAILY_STATS_WORKOUT_ATTRIBUTES
+    ):
+        return []
+    return [
+        workout.workout_date,
+        *instance_state.attrs["workout_date"].history.deleted,
+    ]
+
+
 def format_value(
     value: Union[Decimal, timedelta], attribute: str
 ) -> Union[float, timedelta]:
     return float(value) if attribute == "distance" else value  # type: ignore
 
 
-def update_equipments(workout: "Workout", connection: Connection) -> None:
+def update_equipments(session: Session, workouts: List["Workout"]) -> None:
+    """
+    Update equipments totals with updated workouts values, each equipment
+    being updated once
+    """
     from fittrackee.equipments.models import Equipment
 
-    instance_state = db.inspect(workout)
-    workout_values = {}
-
-    for attribute in ["distance", "duration", "moving"]:
-        state_history = instance_state.attrs[attribute].load_history()
-        if len(state_history.added) > 0 and len(state_history.deleted) > 0:
-            workout_values[attribute] = {
-                "new": format_value(state_history.added[0], attribute),
-                "old": format_value(state_history.deleted[0], attribute),
-            }
-    if not workout_values:
-        return
+    equipments: Dict[int, "Equipment"] = {}
+    equipments_values: Dict[int, Dict] = {}
+    for workout in workouts:
+        instance_state = db.inspect(workout)
+        workout_values = {}
+
+        for attribute in ["distance", "duration", "moving"]:
+            state_history = instance_state.attrs[attribute].load_history()
+            if len(state_history.added) > 0 and len(state_history.deleted) > 0:
+                workout_values[attribute] = {
+                    "new": format_value(state_history.added[0], attribute),
+                    "old": format_value(state_history.deleted[0], attribute),
+                }
+        if not workout_values:
+            continue
+
+        for equipment in workout.equipments:
+            equipments[equipment.id] = equipment
+            equipment_values = equipments_values.setdefault(equipment.id, {})
+            for attribute, value in workout_values.items():
+                column = f"total_{attribute}"
+                equipment_values[column] = (
+                    equipment_values.get(
+                        column,
+                        format_value(
+                            getattr(equipment, column),
+                            attribute,  # type: ignore
+                        ),
+                    )
+                    - value["old"]
+                    + value["new"]
+                )
 
+    connection = session.connection()
     equipment_table = Equipment.__table__  # type: ignore
-    for equipment in workout.equipments:
-        equipment_values = {}
-        for attribute, value in workout_values.items():
-            column = getattr(equipment, f"total_{attribute}")
-            equipment_values[f"total_{attribute}"] = (
-                format_value(column, attribute)  # type: ignore
-                - value["old"]
-                + value["new"]
-            )
-
+    for equipment_id, equipment_values in equipments_values.items():
         connection.execute(
             equipment_table.update()
-            .where(equipment_table.c.id == equipment.id)
+            .where(equipment_table.c.id == equipment_id)
             .values(**equipment_values)
         )
 
 
+def update_workouts_records(
+    session: Session, workouts_changes: List[Tuple["Workout", bool]]
+) -> None:
+    """
+    Update records for workouts inserted or updated during a flush.
+
+    Records are recalculated once per user and sport when a record holder
+    is updated or when several workouts are flushed for the same sport.
+    Otherwise, records are compared with workout values.
+    """
+    connection = session.connection()
+    workouts = list(
+        {workout.id: workout for workout, _ in workouts_changes}.values()
+    )
+    updated_workouts_ids = [
+        workout.id for workout, is_new in workouts_changes if not is_new
+    ]
+    records_sports: Dict[int, Set[int]] = {}
+    if updated_workouts_ids:
+        for record in Record.query.filter(
+            Record.workout_id.in_(updated_workouts_ids)
+        ).all():
+            records_sports.setdefault(record.workout_id, set()).add(
+                record.sport_id
+            )
+
+    records_to_update: Set[Tuple[int, int]] = set()
+    sports_workouts: Dict[Tuple[int, int], List["Workout"]] = {}
+    for workout in workouts:
+        if workout.id in records_sports:
+            for sport_id in records_sports[workout.id] | {workout.sport_id}:
+                records_to_update.add((workout.user_id, sport_id))
+        else:
+            sports_workouts.setdefault(
+                (workout.user_id, workout.sport_id), []
+            ).append(workout)
+
+    for user_sport, user_sport_workouts in sports_workouts.items():
+        if user_sport in records_to_update:
+            continue
+        if len(user_sport_workouts) > 1:
+            records_to_update.add(user_sport)
+            continue
+        update_records_with_workout(
+            user_sport_workouts[0], connection, session
+        )
+
+    for user_id, sport_id in sorted(records_to_update):
+        update_records(user_id, sport_id, connection, session)
+
+
 class Sport(BaseModel):
     __tablename__ = "sports"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -228,6 +436,30 @@ class Sport(BaseModel):
 
 class Workout(BaseModel):
     __tablename__ = "workouts"
+    __table_args__ = (
+        # indexes for user workouts lists, statistics and records, ordered
+        # by date (b-tree indexes can be scanned in both directions)
+        db.Index(
+            "ix_workouts_user_id_workout_date", "user_id", "workout_date"
+        ),
+        db.Index(
+            "ix_workouts_user_id_sport_id_workout_date",
+            "user_id",
+            "sport_id",
+            "workout_date",
+        ),
+        # partial indexes for user workouts list sorted by a value
+        # (suspended workouts are not displayed)
+        *[
+            db.Index(
+                f"ix_workouts_user_id_{column}_not_suspended",
+                "user_id",
+                column,
+                postgresql_where=sql_column("suspended_at").is_(None),
+            )
+            for column in WORKOUTS_SORTING_COLUMNS
+        ],
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     uuid: Mapped[UUID] = mapped_column(
         postgresql.UUID(as_uuid=True),
@@ -236,7 +468,7 @@ class Workout(BaseModel):
         nullable=False,
     )
     user_id: Mapped[int] = mapped_column(
-        db.ForeignKey("users.id"), index=True, nullable=False
+        db.ForeignKey("users.id"), nullable=False
     )
     sport_id: Mapped[int] = mapped_column(
         db.ForeignKey("sports.id"), index=True, nullable=False
@@ -251,8 +483,9 @@ class Workout(BaseModel):
     modification_date: Mapped[Optional[datetime]] = mapped_column(
         TZDateTime, onupdate=aware_utc_now, nullable=True
     )
+    # previous value is needed to update daily stats
     workout_date: Mapped[datetime] = mapped_column(
-        TZDateTime, index=True, nullable=False
+        TZDateTime, index=True, nullable=False, active_history=True
     )
     duration: Mapped[timedelta] = mapped_column(nullable=False)
     pauses: Mapped[Optional[timedelta]] = mapped_column(nullable=True)
@@ -701,25 +934,59 @@ class Workout(BaseModel):
     @classmethod
     def get_user_workout_records(cls, user_id: int, sport_id: int) -> Dict:
         """
+        Get all records workouts in a single query, ranking workouts for
+        each record type with window functions.
+
         Note:
         Values for ascent are null for workouts without gpx
         """
-        record_types_columns = {
-            "AS": "ave_speed",  # 'Average speed'
-            "FD": "distance",  # 'Farthest Distance'
-            "HA": "ascent",  # 'Highest Ascent'
-            "LD": "moving",  # 'Longest Duration'
-            "MS": "max_speed",  # 'Max speed'
-        }
-        records = {}
-        for record_type, column in record_types_columns.items():
-            column_sorted = getattr(Workout, column).desc()
-            record_workout = (
-                Workout.query.filter(
-                    Workout.user_id == user_id, Workout.sport_id == sport_id
+        ranked_workouts = (
+            db.session.query(
+                Workout.id.label("workout_id"),
+                *[
+                    func.row_number()
+                    .over(
+                        order_by=(
+                            nulls_last(getattr(Workout, column).desc()),
+                            Workout.workout_date,
+                        )
+                    )
+                    .label(record_type)
+                    for record_type, column in RECORD_TYPES_COLUMNS.items()
+                ],
+            )
+            .filter(Workout.user_id == user_id, Workout.sport_id == sport_id)
+            .subquery()
+        )
+        records_workouts = (
+            db.session.query(
+                Workout,
+                *[
+                    ranked_workouts.c[record_type]
+                    for record_type in RECORD_TYPES_COLUMNS
+                ],
+            )
+            .join(ranked_workouts, Workout.id == ranked_workouts.c.workout_id)
+            .filter(
+                or_(
+                    *[
+                        ranked_workouts.c[record_type] == 1
+                        for record_type in RECORD_TYPES_COLUMNS
+                    ]
                 )
-                .order_by(nulls_last(column_sorted), Workout.workout_date)
-                .first()
+            )
+            .all()
+        )
+
+        records = {}
+        for record_type, column in RECORD_TYPES_COLUMNS.items():
+            record_workout = next(
+                (
+                    row[0]
+                    for row in records_workouts
+                    if row._mapping[record_type] == 1
+                ),
+                None,
             )
             records[record_type] = dict(
                 record_value=(
@@ -730,77 +997,193 @@ class Workout(BaseModel):
         return records
 
 
+def get_workout_files_paths(workout: Workout) -> List[str]:
+    files_paths = []
+    if workout.gpx:
+        gpx_filepath = get_absolute_file_path(workout.gpx)
+        files_paths.extend(
+            [gpx_filepath, get_track_columns_file_path(gpx_filepath)]
+        )
+    if workout.map:
+        files_paths.extend(
+            get_map_variants_filepaths(get_absolute_file_path(workout.map))
+        )
+    return files_paths
+
+
+def add_workouts_files_to_storage_usage(
+    session: Session, workouts: List[Workout]
+) -> None:
+    # files are written before workouts creation
+    from fittrackee.users.storage import (
+        get_storage_size,
+        update_storage_usage,
+    )
+
+    update_storage_usage(
+        session,
+        {
+            file_path: get_storage_size(file_path)
+            for workout in workouts
+            for file_path in get_workout_files_paths(workout)
+        },
+    )
+
+
 @listens_for(Workout, "after_insert")
 def on_workout_insert(
     mapper: Mapper, connection: Connection, workout: Workout
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        update_records(workout.user_id, workout.sport_id, connection, session)
+    invalidate_user_stats_cache(object_session(workout), workout.user_id)
+    if workout.gpx:
+        add_flush_event(
+            object_session(workout),
+            "workouts_storage_usage",
+            add_workouts_files_to_storage_usage,
+            workout,
+        )
+    bulk_import = get_bulk_import(object_session(workout))
+    if bulk_import is not None:
+        # records and daily stats are updated at the end of import
+        bulk_import.records_to_update.add((workout.user_id, workout.sport_id))
+        bulk_import.daily_stats_to_update.add(
+            (workout.user_id, workout.workout_date)
+        )
+        return
+
+    add_flush_event(
+        object_session(workout),
+        "workouts_records",
+        update_workouts_records,
+        (workout, True),
+    )
+    add_flush_event(
+        object_session(workout),
+        "workouts_daily_stats",
+        update_workouts_daily_stats,
+        (workout.user_id, workout.workout_date),
+    )
 
 
 @listens_for(Workout, "after_update")
 def on_workout_update(
     mapper: Mapper, connection: Connection, workout: Workout
 ) -> None:
-    workout_object = object_session(workout)
-    if workout_object and workout_object.is_modified(
-        workout, include_collections=True
-    ):
+    session = object_session(workout)
+    if session and session.is_modified(workout, include_collections=True):
+        if workout.equipments:
+            add_flush_event(
+                session, "equipments_totals", update_equipments, workout
+            )
+        has_records_changes = has_records_data_changes(workout)
+        if has_records_changes:
+            add_flush_event(
+                session,
+                "workouts_records",
+                update_workouts_records,
+                (workout, False),
+            )
+        daily_stats_changes = get_daily_stats_changes(workout)
+        for workout_date in daily_stats_changes:
+            add_flush_event(
+                session,
+                "workouts_daily_stats",
+                update_workouts_daily_stats,
+                (workout.user_id, workout_date),
+            )
+        if has_records_changes or daily_stats_changes:
+            invalidate_user_stats_cache(session, workout.user_id)
+
 
-        @listens_for(db.Session, "after_flush", once=True)
-        def receive_after_flush(session: Session, context: Any) -> None:
-            if workout.equipments:
-                update_equipments(workout, connection)
-            sports_list = [workout.sport_id]
-            records = Record.query.filter_by(workout_id=workout.id).all()
-            for rec in records:
-                if rec.sport_id not in sports_list:
-                    sports_list.append(rec.sport_id)
-            for sport_id in sports_list:
-                update_records(workout.user_id, sport_id, connection, session)
+def delete_workout_files(old_workout: "Workout") -> None:
+    if old_workout.map:
+        for map_filepath in get_map_variants_filepaths(
+            get_absolute_file_path(old_workout.map)
+        ):
+            try:
+                os.remove(map_filepath)
+            except FileNotFoundError:
+                # map is generated on first access
+                pass
+            except OSError:
+                appLog.error("map file can not be deleted")
+    if old_workout.gpx:
+        try:
+            os.remove(get_absolute_file_path(old_workout.gpx))
+        except OSError:
+            appLog.error("gpx file not found when deleting workout")
+        try:
+            remove_track_columns_file(get_absolute_file_path(old_workout.gpx))
+        except OSError:
+            appLog.error(
+                "unable to delete track columns file when deleting workout"
+            )
 
 
-@listens_for(Workout, "after_delete")
-def on_workout_delete(
-    mapper: Mapper, connection: Connection, old_workout: "Workout"
+def delete_workouts_files_and_notifications(
+    session: Session, old_workouts: List["Workout"]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        from fittrackee.users.models import Notification
+    from fittrackee.users.models import Notification
+    from fittrackee.users.storage import track_storage_usage
 
+    for old_workout in old_workouts:
         # Equipments must be removed before deleting workout
         # in order to recalculate equipments totals
         if old_workout.equipments:
             raise Exception("equipments exists, remove them first")
 
-        if old_workout.map:
-            try:
-                os.remove(get_absolute_file_path(old_workout.map))
-            except OSError:
-                appLog.error("map file not found when deleting workout")
-        if old_workout.gpx:
-            try:
-                os.remove(get_absolute_file_path(old_workout.gpx))
-            except OSError:
-                appLog.error("gpx file not found when deleting workout")
-
-        Notification.query.filter(
-            Notification.event_object_id == old_workout.id,
-            Notification.to_user_id == old_workout.user_id,
-            Notification.event_type.in_(
-                [
-                    "workout_comment",
-                    "workout_like",
-                ]
-            ),
-        ).delete()
+        with track_storage_usage(
+            session, *get_workout_files_paths(old_workout)
+        ):
+            delete_workout_files(old_workout)
+
+    Notification.query.filter(
+        tuple_(Notification.event_object_id, Notification.to_user_id).in_(
+            [
+                (old_workout.id, old_workout.user_id)
+                for old_workout in old_workouts
+            ]
+        ),
+        Notification.event_type.in_(
+            [
+                "workout_comment",
+                "workout_like",
+            ]
+        ),
+    ).delete()
+
+
+@listens_for(Workout, "after_delete")
+def on_workout_delete(
+    mapper: Mapper, connection: Connection, old_workout: "Workout"
+) -> None:
+    invalidate_user_stats_cache(
+        object_session(old_workout), old_workout.user_id
+    )
+    add_flush_event(
+        object_session(old_workout),
+        "workouts_delete",
+        delete_workouts_files_and_notifications,
+        old_workout,
+    )
+    add_flush_event(
+        object_session(old_workout),
+        "workouts_daily_stats",
+        update_workouts_daily_stats,
+        (old_workout.user_id, old_workout.workout_date),
+    )
 
 
 @listens_for(Workout.equipments, "append")
 def on_workout_equipments_append(
     target: Workout, value: "Equipment", initiator: "AttributeEvent"
 ) -> None:
+    bulk_import = get_bulk_import(db.session)
+    if bulk_import is not None:
+        # totals are calculated at the end of import
+        bulk_import.equipments_to_update.add(value.id)
+        return
+
     value.total_distance = float(value.total_distance) + (
         0.0 if target.distance is None else float(target.distance)
     )
@@ -977,21 +1360,26 @@ class Record(BaseModel):
         }
 
 
-@listens_for(Record, "after_delete")
-def on_record_delete(
-    mapper: Mapper, connection: Connection, old_record: Record
+def replace_deleted_records(
+    session: Session, old_records: List["Record"]
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        workout = old_record.workout
-        new_records = Workout.get_user_workout_records(
-            workout.user_id, workout.sport_id
-        )
+    """
+    Create new records for deleted records types, records being
+    calculated once per user and sport
+    """
+    users_sports_records_types: Dict[Tuple[int, int], Set[str]] = {}
+    for old_record in old_records:
+        users_sports_records_types.setdefault(
+            (old_record.user_id, old_record.sport_id), set()
+        ).add(old_record.record_type)
+
+    for (
+        user_id,
+        sport_id,
+    ), records_types in users_sports_records_types.items():
+        new_records = Workout.get_user_workout_records(user_id, sport_id)
         for record_type, record_data in new_records.items():
-            if (
-                record_data["record_value"]
-                and record_type == old_record.record_type
-            ):
+            if record_data["record_value"] and record_type in records_types:
                 new_record = Record(
                     workout=record_data["workout"], record_type=record_type
                 )
@@ -999,6 +1387,18 @@ def on_record_delete(
                 session.add(new_record)
 
 
+@listens_for(Record, "after_delete")
+def on_record_delete(
+    mapper: Mapper, connection: Connection, old_record: Record
+) -> None:
+    add_flush_event(
+        object_session(old_record),
+        "records_delete",
+        replace_deleted_records,
+        old_record,
+    )
+
+
 class WorkoutLike(BaseModel):
     __tablename__ = "workout_likes"
     __table_args__ = (
@@ -1034,52 +1434,365 @@ class WorkoutLike(BaseModel):
         )
 
 
+def create_workout_likes_notifications(
+    session: Session, new_workout_likes: List["WorkoutLike"]
+) -> None:
+    from fittrackee.users.models import Notification, User
+
+    workouts = {
+        workout.id: workout
+        for workout in Workout.query.filter(
+            Workout.id.in_(
+                {workout_like.workout_id for workout_like in new_workout_likes}
+            )
+        ).all()
+    }
+    recipients = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_({workout.user_id for workout in workouts.values()})
+        ).all()
+    }
+    for new_workout_like in new_workout_likes:
+        workout = workouts.get(new_workout_like.workout_id)
+        if not workout or new_workout_like.user_id == workout.user_id:
+            continue
+        to_user = recipients.get(workout.user_id)
+        if not to_user or not to_user.is_notification_enabled("workout_like"):
+            continue
+
+        notification = Notification(
+            from_user_id=new_workout_like.user_id,
+            to_user_id=workout.user_id,
+            created_at=new_workout_like.created_at,
+            event_type="workout_like",
+            event_object_id=workout.id,
+        )
+        session.add(notification)
+
+
 @listens_for(WorkoutLike, "after_insert")
 def on_workout_like_insert(
     mapper: Mapper, connection: Connection, new_workout_like: WorkoutLike
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Connection) -> None:
-        from fittrackee.users.models import Notification, User
-
-        workout = Workout.query.filter_by(
-            id=new_workout_like.workout_id
-        ).first()
-        if not workout:
-            return
-        if new_workout_like.user_id != workout.user_id:
-            to_user = User.query.filter_by(id=workout.user_id).first()
-            if not to_user or not to_user.is_notification_enabled(
-                "workout_like"
-            ):
-                return
-
-            notification = Notification(
-                from_user_id=new_workout_like.user_id,
-                to_user_id=workout.user_id,
-                created_at=new_workout_like.created_at,
-                event_type="workout_like",
-                event_object_id=workout.id,
+    add_flush_event(
+        object_session(new_workout_like),
+        "workout_likes_insert",
+        create_workout_likes_notifications,
+        new_workout_like,
+    )
+
+
+def delete_workout_likes_notifications(
+    session: Session, old_workout_likes: List["WorkoutLike"]
+) -> None:
+    from fittrackee.users.models import Notification
+
+    workouts_owners: Dict[int, int] = {
+        workout_id: user_id
+        for workout_id, user_id in db.session.query(
+            Workout.id, Workout.user_id
+        )
+        .filter(
+            Workout.id.in_(
+                {workout_like.workout_id for workout_like in old_workout_likes}
             )
-            session.add(notification)
+        )
+        .all()
+    }
+    notifications_keys = [
+        (
+            old_workout_like.user_id,
+            workouts_owners[old_workout_like.workout_id],
+            old_workout_like.workout_id,
+        )
+        for old_workout_like in old_workout_likes
+        if old_workout_like.workout_id in workouts_owners
+    ]
+    if not notifications_keys:
+        return
+    Notification.query.filter(
+        tuple_(
+            Notification.from_user_id,
+            Notification.to_user_id,
+            Notification.event_object_id,
+        ).in_(notifications_keys),
+        Notification.event_type == "workout_like",
+    ).delete()
 
 
 @listens_for(WorkoutLike, "after_delete")
 def on_workout_like_delete(
     mapper: Mapper, connection: Connection, old_workout_like: WorkoutLike
 ) -> None:
-    @listens_for(db.Session, "after_flush", once=True)
-    def receive_after_flush(session: Session, context: Any) -> None:
-        from fittrackee.users.models import Notification
-
-        workout = Workout.query.filter_by(
-            id=old_workout_like.workout_id
-        ).first()
-        if not workout:
+    add_flush_event(
+        object_session(old_workout_like),
+        "workout_likes_delete",
+        delete_workout_likes_notifications,
+        old_workout_like,
+    )
+
+
+class WorkoutsUploadTask(BaseModel):
+    """
+    Workout file (gpx file or zip archive) uploaded in asynchronous mode,
+    processed by a task queue worker
+    """
+
+    __tablename__ = "workouts_upload_tasks"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    uuid: Mapped[UUID] = mapped_column(
+        postgresql.UUID(as_uuid=True),
+        default=uuid4,
+        unique=True,
+        nullable=False,
+    )
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TZDateTime, nullable=False, default=aware_utc_now
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        TZDateTime, nullable=True, onupdate=aware_utc_now
+    )
+    status: Mapped[str] = mapped_column(
+        db.String(20), nullable=False, default="queued"
+    )
+    file_name: Mapped[str] = mapped_column(db.String(255), nullable=False)
+    # relative path of uploaded file, removed once processed
+    file_path: Mapped[Optional[str]] = mapped_column(
+        db.String(255), nullable=True
+    )
+    workout_data: Mapped[Dict] = mapped_column(JSON, nullable=False)
+    files_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    files: Mapped[List[Dict]] = mapped_column(
+        JSON, nullable=False, default=list
+    )
+    error_message: Mapped[Optional[str]] = mapped_column(
+        db.String(255), nullable=True
+    )
+
+    def __init__(
+        self,
+        user_id: int,
+        file_name: str,
+        workout_data: Dict,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        self.uuid = uuid4()
+        self.user_id = user_id
+        self.file_name = file_name
+        self.workout_data = workout_data
+        self.status = "queued"
+        self.files_count = 0
+        self.files = []
+        self.created_at = (
+            datetime.now(timezone.utc) if created_at is None else created_at
+        )
+
+    @property
+    def short_id(self) -> str:
+        return encode_uuid(self.uuid)
+
+    def serialize(self) -> Dict:
+        return {
+            "created_at": self.created_at,
+            "error_message": self.error_message,
+            "file_name": self.file_name,
+            "files": self.files,
+            "files_count": self.files_count,
+            "id": self.short_id,
+            "processed_files_count": len(self.files),
+            "status": self.status,
+            "updated_at": self.updated_at,
+        }
+
+
+class WorkoutDailyStats(BaseModel):
+    """
+    Workouts totals by user, sport and day (in user timezone), used to
+    calculate statistics by time without aggregating all user workouts.
+
+    Rows are recalculated for days of inserted, updated or deleted workouts,
+    and for all user workouts when user timezone changes.
+
+    Counts of ascent, descent and average speed values are stored in order
+    to calculate averages, since these values are not always available.
+    """
+
+    __tablename__ = "workouts_daily_stats"
+
+    user_id: Mapped[int] = mapped_column(
+        db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    sport_id: Mapped[int] = mapped_column(
+        db.ForeignKey("sports.id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    total_workouts: Mapped[int] = mapped_column(nullable=False)
+    total_distance: Mapped[Decimal] = mapped_column(
+        db.Numeric(12, 3), nullable=False
+    )  # kilometers
+    # moving time
+    total_duration: Mapped[timedelta] = mapped_column(nullable=False)
+    total_ascent: Mapped[Optional[Decimal]] = mapped_column(
+        db.Numeric(14, 3), nullable=True
+    )  # meters
+    ascent_count: Mapped[int] = mapped_column(nullable=False)
+    total_descent: Mapped[Optional[Decimal]] = mapped_column(
+        db.Numeric(14, 3), nullable=True
+    )  # meters
+    descent_count: Mapped[int] = mapped_column(nullable=False)
+    # sum of workouts average speeds
+    total_ave_speed: Mapped[Decimal] = mapped_column(
+        db.Numeric(12, 2), nullable=False
+    )  # km/h
+    ave_speed_count: Mapped[int] = mapped_column(nullable=False)
+
+
+# first key of advisory lock on user daily stats (second key is user id)
+DAILY_STATS_LOCK_KEY = 1
+DAILY_STATS_COLUMNS = [
+    "user_id",
+    "sport_id",
+    "day",
+    "total_workouts",
+    "total_distance",
+    "total_duration",
+    "total_ascent",
+    "ascent_count",
+    "total_descent",
+    "descent_count",
+    "total_ave_speed",
+    "ave_speed_count",
+]
+
+
+def get_local_day(
+    user_timezone: Optional[str],
+    workout_date: Union[InstrumentedAttribute, ColumnElement],
+) -> ColumnElement:
+    return func.date(
+        func.timezone(
+            user_timezone if user_timezone else "UTC",
+            # workout date is stored without timezone in database
+            func.timezone("Z", workout_date),
+        )
+    )
+
+
+def get_workouts_daily_stats_query(
+    user_id: int, user_timezone: Optional[str], *filters: ColumnElement
+) -> Select:
+    """
+    Return query calculating daily stats rows from user workouts
+    """
+    workout_day = get_local_day(user_timezone, Workout.workout_date)
+    return (
+        select(
+            Workout.user_id,
+            Workout.sport_id,
+            workout_day,
+            func.count(Workout.id),
+            func.coalesce(func.sum(Workout.distance), 0),
+            func.coalesce(func.sum(Workout.moving), timedelta()),
+            func.sum(Workout.ascent),
+            func.count(Workout.ascent),
+            func.sum(Workout.descent),
+            func.count(Workout.descent),
+            func.coalesce(func.sum(Workout.ave_speed), 0),
+            func.count(Workout.ave_speed),
+        )
+        .where(Workout.user_id == user_id, *filters)
+        .group_by(Workout.user_id, Workout.sport_id, workout_day)
+    )
+
+
+def update_user_daily_stats(
+    connection: Connection,
+    user_id: int,
+    user_timezone: Optional[str],
+    workout_dates: Optional[List[datetime]] = None,
+) -> None:
+    """
+    Recalculate user daily stats for days of given workout dates, or for
+    all days if no dates are provided.
+    """
+    daily_stats_table = WorkoutDailyStats.__table__  # type: ignore
+    delete_filters = [daily_stats_table.c.user_id == user_id]
+    workouts_filters = []
+    if workout_dates is not None:
+        if not workout_dates:
             return
-        Notification.query.filter_by(
-            from_user_id=old_workout_like.user_id,
-            to_user_id=workout.user_id,
-            event_type="workout_like",
-            event_object_id=workout.id,
-        ).delete()
+        dates = values(
+            sql_column("workout_date", TZDateTime), name="workout_dates"
+        ).data([(workout_date,) for workout_date in workout_dates])
+        days = select(get_local_day(user_timezone, dates.c.workout_date))
+        delete_filters.append(daily_stats_table.c.day.in_(days))
+        workouts_filters = [
+            # whatever the timezone, workouts of a day are in this range
+            # (allows to use index on workout date)
+            Workout.workout_date >= min(workout_dates) - timedelta(days=2),
+            Workout.workout_date <= max(workout_dates) + timedelta(days=2),
+            get_local_day(user_timezone, Workout.workout_date).in_(days),
+        ]
+
+    # daily stats of a user are recalculated by only one transaction at a
+    # time (lock is released at the end of transaction), otherwise
+    # concurrent transactions may insert the same rows.
+    # Statements executed after the lock is acquired see workouts committed
+    # by the previous transaction.
+    connection.execute(
+        select(func.pg_advisory_xact_lock(DAILY_STATS_LOCK_KEY, user_id))
+    )
+    connection.execute(daily_stats_table.delete().where(*delete_filters))
+    connection.execute(
+        daily_stats_table.insert().from_select(
+            DAILY_STATS_COLUMNS,
+            get_workouts_daily_stats_query(
+                user_id, user_timezone, *workouts_filters
+            ),
+        )
+    )
+
+
+def get_users_timezones(
+    connection: Connection, user_ids: Set[int]
+) -> Dict[int, Optional[str]]:
+    from fittrackee.users.models import User
+
+    return {
+        user_id: user_timezone
+        for user_id, user_timezone in connection.execute(
+            select(User.id, User.timezone).where(User.id.in_(user_ids))
+        ).all()
+    }
+
+
+def update_workouts_daily_stats(
+    session: Session, workouts_dates: List[Tuple[int, datetime]]
+) -> None:
+    """
+    Update daily stats of days of workouts inserted, updated or deleted
+    during a flush (old and new workout dates), once per user.
+    """
+    users_workout_dates: Dict[int, Set[datetime]] = {}
+    for user_id, workout_date in workouts_dates:
+        users_workout_dates.setdefault(user_id, set()).add(workout_date)
+
+    connection = session.connection()
+    users_timezones = get_users_timezones(connection, set(users_workout_dates))
+    for user_id in sorted(users_workout_dates):
+        if user_id not in users_timezones:
+            # user is deleted
+            continue
+        update_user_daily_stats(
+            connection,
+            user_id,
+            users_timezones[user_id],
+            sorted(users_workout_dates[user_id]),
+        )
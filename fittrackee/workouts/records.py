@@ -6,12 +6,14 @@ from fittrackee.oauth2.server import require_auth
 from fittrackee.users.models import User
 
 from .models import Record
+from .stats_cache import cache_user_stats
 
 records_blueprint = Blueprint("records", __name__)
 
 
 @records_blueprint.route("/records", methods=["GET"])
 @require_auth(scopes=["workouts:read"])
+@cache_user_stats("records", params_keys=[])
 def get_records(auth_user: User) -> Dict:
     """
     Get all records for authenticated user.
@@ -1,5 +1,5 @@
-from datetime import timedelta
-from typing import Dict, List, Union
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Union
 
 from flask import Blueprint, current_app, request
 from sqlalchemy import func
@@ -17,13 +17,20 @@ from fittrackee.responses import (
 )
 from fittrackee.users.models import User
 from fittrackee.users.roles import UserRole
+from fittrackee.users.storage import get_total_storage_usage
 
-from .models import Sport, Workout
-from .utils.uploads import get_upload_dir_size
-from .utils.workouts import get_average_speed, get_datetime_from_request_args
+from .models import Sport, Workout, WorkoutDailyStats
+from .stats_cache import cache_user_stats
 
 stats_blueprint = Blueprint("stats", __name__)
 
+CALENDAR_MAX_DAYS = 366
+
+
+def get_day_from_request_args(params: Dict, key: str) -> Optional[date]:
+    day = params.get(key)
+    return date.fromisoformat(day) if day else None
+
 
 def get_stats_from_row(row: List, stats_type: str) -> Dict:
     row_stats = {
@@ -38,12 +45,15 @@ def get_stats_from_row(row: List, stats_type: str) -> Dict:
         ),
     }
     if stats_type == "average":
-        row_stats["average_speed"] = round(float(row[1]), 2)
+        row_stats["average_speed"] = (
+            None if row[1] is None else round(float(row[1]), 2)
+        )
     return row_stats
 
 
 @stats_blueprint.route("/stats/<user_name>/by_time", methods=["GET"])
 @require_auth(scopes=["workouts:read"])
+@cache_user_stats("by_time", params_keys=["from", "to", "time", "type"])
 def get_workouts_by_time(
     auth_user: User, user_name: str
 ) -> Union[Dict, HttpResponse]:
@@ -206,7 +216,9 @@ def get_workouts_by_time(
             return ForbiddenErrorResponse()
 
         params = request.args.copy()
-        date_from, date_to = get_datetime_from_request_args(params, user)
+        # daily stats are stored by day in user timezone
+        day_from = get_day_from_request_args(params, "from")
+        day_to = get_day_from_request_args(params, "to")
         time = params.get("time")
         stats_type = params.get("type", "total")
         if stats_type not in ["total", "average"]:
@@ -229,84 +241,54 @@ def get_workouts_by_time(
         # For 'week' timeframe, the workaround is to add 1 day
         delta = timedelta(days=1 if time and time == "week" else 0)
 
-        calculation_method = func.avg if stats_type == "average" else func.sum
-        stats_key = func.to_char(
-            func.timezone(
-                # user has always timezone set
-                auth_user.timezone if auth_user.timezone else "UTC",
-                # workout date is stored without timezone in database
-                func.timezone("Z", Workout.workout_date),
-            )
-            + delta,
-            time_format,
-        )
-        filters = [Workout.user_id == user.id]
-        if date_from:
-            filters.append(Workout.workout_date >= date_from)
-        if date_to:
-            filters.append(
-                Workout.workout_date < date_to + timedelta(seconds=1)
-            )
+        stats_key = func.to_char(WorkoutDailyStats.day + delta, time_format)
+        total_workouts = func.sum(WorkoutDailyStats.total_workouts)
+        columns: List[Any]
+        if stats_type == "average":
+            # averages are calculated from totals, speed, ascent and
+            # descent averages only on workouts with values
+            columns = [
+                func.sum(WorkoutDailyStats.total_ave_speed)
+                / func.nullif(func.sum(WorkoutDailyStats.ave_speed_count), 0),
+                total_workouts,
+                func.sum(WorkoutDailyStats.total_distance) / total_workouts,
+                func.sum(WorkoutDailyStats.total_duration) / total_workouts,
+                func.sum(WorkoutDailyStats.total_ascent)
+                / func.nullif(func.sum(WorkoutDailyStats.ascent_count), 0),
+                func.sum(WorkoutDailyStats.total_descent)
+                / func.nullif(func.sum(WorkoutDailyStats.descent_count), 0),
+            ]
+        else:
+            columns = [
+                True,
+                total_workouts,
+                func.sum(WorkoutDailyStats.total_distance),
+                func.sum(WorkoutDailyStats.total_duration),
+                func.sum(WorkoutDailyStats.total_ascent),
+                func.sum(WorkoutDailyStats.total_descent),
+            ]
+        filters = [WorkoutDailyStats.user_id == user.id]
+        if day_from:
+            filters.append(WorkoutDailyStats.day >= day_from)
+        if day_to:
+            filters.append(WorkoutDailyStats.day <= day_to)
         results = (
-            db.session.query(
-                Workout.sport_id,
-                (
-                    func.avg(Workout.ave_speed)  # type: ignore
-                    if stats_type == "average"
-                    else True
-                ),
-                func.count(Workout.id),
-                calculation_method(Workout.distance),
-                calculation_method(Workout.moving),
-                calculation_method(Workout.ascent),
-                calculation_method(Workout.descent),
-                stats_key,
-            )
+            db.session.query(WorkoutDailyStats.sport_id, *columns, stats_key)
             .filter(*filters)
-            .group_by(stats_key, Workout.sport_id)
+            .group_by(stats_key, WorkoutDailyStats.sport_id)
             .all()
         )
 
-        statistics = {}
+        statistics: Dict[str, Dict] = {}
         for row in results:
             date_key = row[7]
             if time and time.startswith("week"):
                 date_key = (
                     get_datetime_in_utc(date_key + "-1", "%G-%V-%u") - delta
                 ).strftime("%Y-%m-%d")
-            sport_key = row[0]
-            if date_key not in statistics:
-                statistics[date_key] = {
-                    sport_key: get_stats_from_row(list(row), stats_type)
-                }
-            elif sport_key not in statistics[date_key]:
-                statistics[date_key][sport_key] = get_stats_from_row(
-                    list(row), stats_type
-                )
-            else:
-                statistics[date_key][sport_key]["total_workouts"] += row[2]
-                if stats_type == "average":
-                    statistics[date_key][sport_key]["average_speed"] = (
-                        get_average_speed(
-                            statistics[date_key][sport_key]["total_workouts"],
-                            statistics[date_key][sport_key]["average_speed"],
-                            row[1],
-                        )
-                    )
-                statistics[date_key][sport_key][f"{stats_type}_distance"] += (
-                    round(float(row[3]), 2)
-                )
-                statistics[date_key][sport_key][f"{stats_type}_duration"] += (
-                    int(row[4].total_seconds())
-                )
-                if row[5]:
-                    statistics[date_key][sport_key][
-                        f"{stats_type}_ascent"
-                    ] += round(float(row[5]), 2)
-                if row[6]:
-                    statistics[date_key][sport_key][
-                        f"{stats_type}_ascent"
-                    ] += round(float(row[6]), 2)
+            statistics.setdefault(date_key, {})[row[0]] = get_stats_from_row(
+                list(row), stats_type
+            )
 
         return {
             "status": "success",
@@ -318,6 +300,11 @@ def get_workouts_by_time(
 
 @stats_blueprint.route("/stats/<user_name>/by_sport", methods=["GET"])
 @require_auth(scopes=["workouts:read"])
+@cache_user_stats(
+    "by_sport",
+    params_keys=["sport_id"],
+    config_keys=["stats_workouts_limit"],
+)
 def get_workouts_by_sport(
     auth_user: User, user_name: str
 ) -> Union[Dict, HttpResponse]:
@@ -534,12 +521,174 @@ def get_workouts_by_sport(
         return handle_error_and_return_response(e)
 
 
+@stats_blueprint.route("/stats/<user_name>/calendar", methods=["GET"])
+@require_auth(scopes=["workouts:read"])
+@cache_user_stats("calendar", params_keys=["from", "to"])
+def get_workouts_calendar(
+    auth_user: User, user_name: str
+) -> Union[Dict, HttpResponse]:
+    """
+    Get daily workouts statistics for a user on a given date range (for
+    instance to display an activity calendar).
+
+    Each list contains one value per day from ``from`` to ``to`` dates
+    (days in user timezone), including days without workouts. Lists by
+    sport are only returned for sports with workouts in date range.
+    For now only authenticated users can access their statistics.
+
+    **Scope**: ``workouts:read``
+
+    **Example request**:
+
+    .. sourcecode:: http
+
+      GET /api/stats/admin/calendar?from=2018-01-01&to=2018-01-03 HTTP/1.1
+
+    **Example responses**:
+
+    - success:
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "calendar": {
+            "from": "2018-01-01",
+            "sports": {
+              "1": {
+                "total_distance": [10.0, 0, 5.0],
+                "total_duration": [3600, 0, 1024],
+                "total_workouts": [1, 0, 1]
+              },
+              "2": {
+                "total_distance": [0, 0, 12.0],
+                "total_duration": [0, 0, 6000],
+                "total_workouts": [0, 0, 1]
+              }
+            },
+            "to": "2018-01-03",
+            "total_distance": [10.0, 0, 17.0],
+            "total_duration": [3600, 0, 7024],
+            "total_workouts": [1, 0, 2]
+          }
+        },
+        "status": "success"
+      }
+
+    :param integer user_name: username
+
+    :query string from: start date (format: ``%Y-%m-%d``)
+    :query string to: end date (format: ``%Y-%m-%d``), date range can not
+                      exceed 366 days
+
+    :reqheader Authorization: OAuth 2.0 Bearer Token
+
+    :statuscode 200: ``success``
+    :statuscode 400:
+        - ``missing date range``
+        - ``invalid date format``
+        - ``invalid date range``
+    :statuscode 401:
+        - ``provide a valid auth token``
+        - ``signature expired, please log in again``
+        - ``invalid token, please log in again``
+    :statuscode 403:
+        - ``you do not have permissions, your account is suspended``
+    :statuscode 404:
+        - ``user does not exist``
+
+    """
+    try:
+        user = User.query.filter_by(username=user_name).first()
+        if not user:
+            return UserNotFoundErrorResponse()
+        if user.id != auth_user.id:
+            return ForbiddenErrorResponse()
+
+        params = request.args.copy()
+        if not params.get("from") or not params.get("to"):
+            return InvalidPayloadErrorResponse("missing date range", "fail")
+        try:
+            day_from = date.fromisoformat(params["from"])
+            day_to = date.fromisoformat(params["to"])
+        except ValueError:
+            return InvalidPayloadErrorResponse("invalid date format", "fail")
+        days_count = (day_to - day_from).days + 1
+        if days_count < 1 or days_count > CALENDAR_MAX_DAYS:
+            return InvalidPayloadErrorResponse("invalid date range", "fail")
+
+        # daily stats already contain totals by sport and day in user
+        # timezone, no aggregation is needed
+        results = (
+            db.session.query(
+                WorkoutDailyStats.day,
+                WorkoutDailyStats.sport_id,
+                WorkoutDailyStats.total_workouts,
+                WorkoutDailyStats.total_distance,
+                WorkoutDailyStats.total_duration,
+            )
+            .filter(
+                WorkoutDailyStats.user_id == user.id,
+                WorkoutDailyStats.day >= day_from,
+                WorkoutDailyStats.day <= day_to,
+            )
+            .order_by(WorkoutDailyStats.sport_id)
+            .all()
+        )
+
+        def get_empty_calendar() -> Dict[str, List]:
+            return {
+                "total_distance": [0] * days_count,
+                "total_duration": [0] * days_count,
+                "total_workouts": [0] * days_count,
+            }
+
+        calendar = get_empty_calendar()
+        sports_calendars: Dict[int, Dict[str, List]] = {}
+        for day, sport_id, workouts, distance, duration in results:
+            index = (day - day_from).days
+            if sport_id not in sports_calendars:
+                sports_calendars[sport_id] = get_empty_calendar()
+            sports_calendars[sport_id]["total_workouts"][index] = workouts
+            sports_calendars[sport_id]["total_distance"][index] = round(
+                float(distance), 2
+            )
+            sports_calendars[sport_id]["total_duration"][index] = int(
+                duration.total_seconds()
+            )
+            calendar["total_workouts"][index] += workouts
+            calendar["total_distance"][index] = round(
+                calendar["total_distance"][index] + float(distance), 2
+            )
+            calendar["total_duration"][index] += int(duration.total_seconds())
+
+        return {
+            "status": "success",
+            "data": {
+                "calendar": {
+                    "from": day_from.isoformat(),
+                    "to": day_to.isoformat(),
+                    **calendar,
+                    "sports": sports_calendars,
+                }
+            },
+        }
+    except Exception as e:
+        return handle_error_and_return_response(e)
+
+
 @stats_blueprint.route("/stats/all", methods=["GET"])
 @require_auth(scopes=["workouts:read"], role=UserRole.MODERATOR)
 def get_application_stats(auth_user: User) -> Dict:
     """
     Get all application statistics.
 
+    ``uploads_dir_size`` is the total size of users files (workouts files,
+    maps, pictures and data exports archives).
+
     **Scope**: ``workouts:read``
 
     **Minimum role**: Moderator
@@ -593,6 +742,6 @@ def get_application_stats(auth_user: User) -> Dict:
             "workouts": total_workouts,
             "sports": nb_sports,
             "users": nb_users,
-            "uploads_dir_size": get_upload_dir_size(),
+            "uploads_dir_size": get_total_storage_usage(),
         },
     }
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+import redis
+from flask import current_app, request
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm.session import Session
+
+from fittrackee import REDIS_URL, appLog, db
+from fittrackee.responses import HttpResponse
+
+STATS_CACHE_PREFIX = "fittrackee:stats"
+STATS_CACHE_TTL = 24 * 60 * 60  # 1 day
+STATS_CACHE_INVALIDATION_KEY = "stats_cache_users"
+
+
+def get_stats_cache_ttl() -> int:
+    return int(os.getenv("STATS_CACHE_TTL", STATS_CACHE_TTL))
+
+
+class StatsCache:
+    """
+    Cache for user statistics and records responses, stored in Redis.
+
+    Keys contain a generation number per user, incremented when user
+    workouts change: previous entries are no longer reachable and expire
+    after TTL.
+
+    Cache is disabled when Redis is not available or when TTL is 0.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        ttl: Optional[int] = None,
+    ) -> None:
+        self.redis_client = redis_client
+        self.ttl = get_stats_cache_ttl() if ttl is None else ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.redis_client is not None and self.ttl > 0
+
+    @staticmethod
+    def get_generation_key(user_id: int) -> str:
+        return f"{STATS_CACHE_PREFIX}:{user_id}:generation"
+
+    @staticmethod
+    def get_key(
+        user_id: int, generation: int, endpoint: str, params: Dict
+    ) -> str:
+        params_hash = hashlib.sha1(
+            json.dumps(params, sort_keys=True).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        return (
+            f"{STATS_CACHE_PREFIX}:{user_id}:{generation}:"
+            f"{endpoint}:{params_hash}"
+        )
+
+    def get_generation(self, user_id: int) -> int:
+        key = self.get_generation_key(user_id)
+        generation = self.redis_client.get(key)  # type: ignore
+        if generation is None:
+            # if generation is lost (for instance after eviction), a new
+            # one is initialized with a value greater than previous ones,
+            # in order not to reach stale entries
+            self.redis_client.set(  # type: ignore
+                key, time.time_ns(), nx=True
+            )
+            generation = self.redis_client.get(key)  # type: ignore
+        return int(generation)  # type: ignore
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.redis_client.get(key)  # type: ignore
+        return (
+            None if value is None else current_app.json.loads(value)  # type: ignore
+        )
+
+    def set(self, key: str, value: Dict) -> None:
+        self.redis_client.set(  # type: ignore
+            key, current_app.json.dumps(value), ex=self.ttl
+        )
+
+    def get_or_set(
+        self,
+        user_id: int,
+        endpoint: str,
+        params: Dict,
+        get_response: Callable[[], Union[Dict, HttpResponse]],
+    ) -> Union[Dict, HttpResponse]:
+        """
+        Return cached response if it exists, otherwise store response
+        returned by 'get_response' if successful.
+        """
+        if not self.enabled:
+            return get_response()
+
+        try:
+            # generation must be read before calculating response, in
+            # order not to store obsolete response after invalidation
+            key = self.get_key(
+                user_id, self.get_generation(user_id), endpoint, params
+            )
+            value = self.get(key)
+        except redis.exceptions.RedisError as e:
+            appLog.error(f"error when getting stats from cache: {e}")
+            return get_response()
+
+        self._increment_stat(endpoint, "misses" if value is None else "hits")
+        if value is not None:
+            return value
+
+        response = get_response()
+        if isinstance(response, dict) and response.get("status") == "success":
+            try:
+                self.set(key, response)
+            except redis.exceptions.RedisError as e:
+                appLog.error(f"error when storing stats in cache: {e}")
+        return response
+
+    def invalidate(self, users_ids: Set[int]) -> None:
+        if not self.enabled:
+            return
+        try:
+            pipeline = self.redis_client.pipeline()  # type: ignore
+            for user_id in sorted(users_ids):
+                pipeline.incr(self.get_generation_key(user_id))
+            pipeline.execute()
+        except redis.exceptions.RedisError as e:
+            appLog.error(f"error when invalidating stats cache: {e}")
+
+    def _increment_stat(self, endpoint: str, stat: str) -> None:
+        # shared counters for all processes
+        try:
+            self.redis_client.hincrby(  # type: ignore
+                f"{STATS_CACHE_PREFIX}:cache_stats", f"{endpoint}:{stat}", 1
+            )
+        except redis.exceptions.RedisError:
+            pass
+
+    def get_stats(self) -> Dict:
+        """
+        Return hits, misses and hit rate for each endpoint
+        """
+        if not self.enabled:
+            return {}
+        stats: Dict = {}
+        for field, count in (
+            self.redis_client.hgetall(  # type: ignore
+                f"{STATS_CACHE_PREFIX}:cache_stats"
+            ).items()  # type: ignore
+        ):
+            endpoint, stat = field.decode().rsplit(":", 1)
+            stats.setdefault(endpoint, {"hits": 0, "misses": 0})[stat] = int(
+                count
+            )
+        for endpoint_stats in stats.values():
+            total = endpoint_stats["hits"] + endpoint_stats["misses"]
+            endpoint_stats["hit_rate"] = (
+                round(endpoint_stats["hits"] / total, 4) if total else None
+            )
+        return stats
+
+
+_stats_cache: Optional[StatsCache] = None
+
+
+def get_stats_cache() -> StatsCache:
+    """
+    Return stats cache (shared by all requests in a process)
+    """
+    global _stats_cache
+    if _stats_cache is None:
+        client: Optional[redis.Redis] = redis.from_url(REDIS_URL)
+        try:
+            client.ping()  # type: ignore
+        except redis.exceptions.ConnectionError:
+            appLog.warning("Redis not available, stats cache is disabled.")
+            client = None
+        _stats_cache = StatsCache(redis_client=client)
+    return _stats_cache
+
+
+def cache_user_stats(
+    endpoint: str, params_keys: List[str], config_keys: Optional[List] = None
+) -> Callable:
+    """
+    Cache successful responses for authenticated user.
+
+    Cache key depends on endpoint, route arguments, request params listed
+    in 'params_keys' (other params and empty values are ignored) and
+    application config values listed in 'config_keys'.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(
+            auth_user: Any, *args: Any, **kwargs: Any
+        ) -> Union[Dict, HttpResponse]:
+            params = {
+                "args": kwargs,
+                "params": {
+                    key: request.args.get(key)
+                    for key in params_keys
+                    if request.args.get(key)
+                },
+                "config": {
+                    key: current_app.config.get(key)
+                    for key in (config_keys if config_keys else [])
+                },
+            }
+            return get_stats_cache().get_or_set(
+                auth_user.id,
+                endpoint,
+                params,
+                lambda: f(auth_user, *args, **kwargs),
+            )
+
+        return decorated_function
+
+    return decorator
+
+
+def invalidate_user_stats_cache(
+    session: Union[Session, scoped_session, None], user_id: int
+) -> None:
+    """
+    Mark user cache as obsolete, generation is incremented once
+    transaction is committed.
+    """
+    session_info = db.session.info if session is None else session.info
+    session_info.setdefault(STATS_CACHE_INVALIDATION_KEY, set()).add(user_id)
+
+
+@listens_for(db.Session, "after_commit")
+def on_commit(session: Session) -> None:
+    # users whose cache invalidation was requested in a rolled-back
+    # transaction are also invalidated, since an unnecessary invalidation
+    # has no other effect than a cache miss.
+    users_ids = session.info.pop(STATS_CACHE_INVALIDATION_KEY, None)
+    if users_ids:
+        get_stats_cache().invalidate(users_ids)
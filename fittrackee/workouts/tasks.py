@@ -0,0 +1,31 @@
+from typing import List
+
+from flask import current_app
+
+from fittrackee import dramatiq
+from fittrackee.workouts.maps import generate_workouts_maps
+from fittrackee.workouts.upload_tasks import process_upload_task
+from fittrackee.workouts.utils.tile_cache import get_tile_cache
+from fittrackee.workouts.weather import update_workouts_weather
+
+
+@dramatiq.actor(queue_name="fittrackee_workouts_uploads")
+def upload_workouts(upload_task_id: int) -> None:
+    process_upload_task(upload_task_id)
+
+
+@dramatiq.actor(queue_name="fittrackee_workouts_weather")
+def update_weather(workout_ids: List[int]) -> None:
+    update_workouts_weather(workout_ids)
+
+
+@dramatiq.actor(queue_name="fittrackee_workouts_maps")
+def generate_maps(workout_ids: List[int]) -> None:
+    generate_workouts_maps(workout_ids)
+
+
+@dramatiq.actor(queue_name="fittrackee_workouts_maps")
+def evict_tile_cache() -> None:
+    tile_cache = get_tile_cache(current_app.config["TILE_SERVER"])
+    if tile_cache:
+        tile_cache.evict()
@@ -0,0 +1,237 @@
+import os
+import shutil
+from typing import Dict, Iterable, List, Tuple
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from fittrackee import appLog, db
+from fittrackee.equipments.exceptions import (
+    InvalidEquipmentException,
+    InvalidEquipmentsException,
+)
+from fittrackee.equipments.utils import handle_equipments
+from fittrackee.files import get_absolute_file_path
+from fittrackee.users.models import User
+
+from .models import Sport, WorkoutsUploadTask
+from .utils.workouts import (
+    WorkoutException,
+    create_workout_from_gpx_file,
+    get_gpx_file_params,
+    get_gpx_filenames_from_zip_archive,
+    get_gpx_files_data,
+    get_sport_and_stopped_speed_threshold,
+    read_gpx_files_from_zip_archive,
+    workouts_bulk_import,
+)
+from .weather import enqueue_workouts_weather_update
+
+
+def create_upload_task(
+    auth_user: User, workout_data: Dict, workout_file: FileStorage
+) -> WorkoutsUploadTask:
+    """
+    Store uploaded file (gpx file or zip archive) in a dedicated directory,
+    and create upload task to be processed by task queue workers.
+    """
+    if workout_file.filename is None:
+        raise WorkoutException("error", "File has no filename.")
+    filename = secure_filename(workout_file.filename)
+    if not Sport.query.filter_by(id=workout_data.get("sport_id")).first():
+        raise WorkoutException(
+            "error",
+            f"Sport id: {workout_data.get('sport_id')} does not exist",
+        )
+
+    # equipments are stored with ids and retrieved when processing task
+    upload_task = WorkoutsUploadTask(
+        user_id=auth_user.id,
+        file_name=filename,
+        workout_data={
+            key: value
+            for key, value in workout_data.items()
+            if key != "equipments_list"
+        },
+    )
+    file_path = os.path.join(
+        "workouts",
+        str(auth_user.id),
+        "uploads",
+        upload_task.uuid.hex,
+        filename,
+    )
+    absolute_file_path = get_absolute_file_path(file_path)
+    try:
+        os.makedirs(os.path.dirname(absolute_file_path), exist_ok=True)
+        workout_file.save(absolute_file_path)
+    except Exception as e:
+        raise WorkoutException(
+            "error", "Error during workout file save.", e
+        ) from e
+    upload_task.file_path = file_path
+    db.session.add(upload_task)
+    db.session.commit()
+    return upload_task
+
+
+def _process_upload_task_files(
+    upload_task: WorkoutsUploadTask, user: User, task_dir: str
+) -> None:
+    workout_data = dict(upload_task.workout_data)
+    if "equipment_ids" in workout_data:
+        workout_data["equipments_list"] = handle_equipments(
+            workout_data["equipment_ids"], user, workout_data["sport_id"]
+        )
+    sport, stopped_speed_threshold = get_sport_and_stopped_speed_threshold(
+        user, workout_data
+    )
+
+    file_path = os.path.join(task_dir, upload_task.file_name)
+    gpx_files: Iterable[Tuple[str, bytes]]
+    if upload_task.file_name.lower().endswith(".zip"):
+        gpx_filenames = get_gpx_filenames_from_zip_archive(file_path)
+        # files are read from archive when they are processed
+        gpx_files = read_gpx_files_from_zip_archive(file_path, gpx_filenames)
+    else:
+        with open(file_path, "rb") as gpx_file:
+            gpx_files = [(upload_task.file_name, gpx_file.read())]
+        gpx_filenames = [upload_task.file_name]
+    upload_task.files_count = len(gpx_filenames)
+    db.session.commit()
+
+    file_params = get_gpx_file_params(user, sport.id, stopped_speed_threshold)
+    params = {
+        "auth_user": user,
+        "workout_data": workout_data,
+        "file_params": file_params,
+    }
+    files_results: List[Dict] = []
+    new_workouts = []
+    # files can be processed in parallel, but workouts are created one
+    # at a time, and committed by batch with files results
+    with workouts_bulk_import():
+        for filename, gpx_file_data in zip(
+            gpx_filenames,
+            get_gpx_files_data(gpx_files, file_params, len(gpx_filenames)),
+        ):
+            try:
+                if isinstance(gpx_file_data, WorkoutException):
+                    raise gpx_file_data
+                new_workout = create_workout_from_gpx_file(
+                    params, *gpx_file_data
+                )
+                new_workouts.append(new_workout)
+                files_results.append(
+                    {
+                        "error": None,
+                        "file_name": filename,
+                        "status": "successful",
+                        "workout_id": new_workout.short_id,
+                    }
+                )
+            except WorkoutException as e:
+                # on error, workout savepoint is already rolled back
+                if e.e:
+                    appLog.error(e.e)
+                files_results.append(
+                    {
+                        "error": e.message,
+                        "file_name": filename,
+                        "status": "errored",
+                        "workout_id": None,
+                    }
+                )
+            # a new list is assigned to update JSON column
+            upload_task.files = list(files_results)
+
+    enqueue_workouts_weather_update(new_workouts)
+    if not gpx_filenames:
+        upload_task.error_message = "no gpx files to process"
+    upload_task.status = (
+        "successful"
+        if gpx_filenames
+        and all(result["status"] == "successful" for result in files_results)
+        else "errored"
+    )
+
+
+def process_upload_task(upload_task_id: int) -> None:
+    """
+    Create workouts from uploaded file and store each file result.
+    Processing continues when a file from zip archive is invalid.
+    """
+    upload_task = WorkoutsUploadTask.query.filter_by(id=upload_task_id).first()
+
+    if not upload_task:
+        appLog.error(f"No upload task to process for id '{upload_task_id}'")
+        return
+
+    if not upload_task.file_path or upload_task.status not in [
+        "queued",
+        "in_progress",
+    ]:
+        appLog.info(f"Upload task id '{upload_task_id}' already processed")
+        return
+
+    task_dir = os.path.dirname(get_absolute_file_path(upload_task.file_path))
+
+    if upload_task.status == "in_progress":
+        # processing was interrupted and task is retried: files are not
+        # processed again, since workouts from committed batches would be
+        # duplicated
+        appLog.error(f"Upload task id '{upload_task_id}' was interrupted")
+        set_upload_task_as_errored(
+            upload_task, "workouts upload was interrupted"
+        )
+        return
+
+    upload_task.status = "in_progress"
+    db.session.commit()
+
+    user = User.query.filter_by(id=upload_task.user_id).one()
+    try:
+        _process_upload_task_files(upload_task, user, task_dir)
+    except (WorkoutException, InvalidEquipmentException) as e:
+        db.session.rollback()
+        if isinstance(e, WorkoutException) and e.e:
+            appLog.error(e.e)
+        upload_task.status = "errored"
+        upload_task.error_message = e.message
+    except InvalidEquipmentsException as e:
+        db.session.rollback()
+        upload_task.status = "errored"
+        upload_task.error_message = str(e)
+    except Exception as e:
+        db.session.rollback()
+        appLog.error(f"Error when processing upload task: {e!s}")
+        upload_task.status = "errored"
+        upload_task.error_message = "error during workouts upload"
+
+    _remove_upload_task_files(upload_task, task_dir)
+
+
+def set_upload_task_as_errored(
+    upload_task: WorkoutsUploadTask, error_message: str
+) -> None:
+    """
+    Set error on upload task that can not be processed and remove uploaded
+    file.
+    """
+    upload_task.status = "errored"
+    upload_task.error_message = error_message
+    if upload_task.file_path:
+        _remove_upload_task_files(
+            upload_task,
+            os.path.dirname(get_absolute_file_path(upload_task.file_path)),
+        )
+    else:
+        db.session.commit()
+
+
+def _remove_upload_task_files(
+    upload_task: WorkoutsUploadTask, task_dir: str
+) -> None:
+    shutil.rmtree(task_dir, ignore_errors=True)
+    upload_task.file_path = None
+    db.session.commit()
@@ -0,0 +1,49 @@
+from typing import TYPE_CHECKING, Optional, Set, Tuple, Union
+
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm.session import Session
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+BULK_IMPORT_KEY = "workouts_bulk_import"
+BULK_IMPORT_BATCH_SIZE = 50
+
+
+class WorkoutsBulkImport:
+    """
+    Bulk import state, stored in session info.
+
+    When a bulk import is in progress, records, daily stats and equipments
+    totals are not updated on each workout insertion: (user, sport) pairs,
+    (user, workout date) pairs and equipments ids are collected to be
+    updated once, at the end of import.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None) -> None:
+        self.batch_size = (
+            BULK_IMPORT_BATCH_SIZE if batch_size is None else batch_size
+        )
+        self.pending_workouts_count = 0
+        self.records_to_update: Set[Tuple[int, int]] = set()
+        self.equipments_to_update: Set[int] = set()
+        self.daily_stats_to_update: Set[Tuple[int, "datetime"]] = set()
+
+    def add_workout(self) -> bool:
+        """
+        Increment pending workouts count and return True when batch is
+        complete and must be committed.
+        """
+        self.pending_workouts_count += 1
+        if self.pending_workouts_count < self.batch_size:
+            return False
+        self.pending_workouts_count = 0
+        return True
+
+
+def get_bulk_import(
+    session: Union[Session, scoped_session, None],
+) -> Optional[WorkoutsBulkImport]:
+    if session is None:
+        return None
+    return session.info.get(BULK_IMPORT_KEY)
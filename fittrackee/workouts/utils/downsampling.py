@@ -0,0 +1,87 @@
+"""
+Shape-preserving downsampling of chart data with Largest-Triangle-Three-
+Buckets algorithm (Sveinn Steinarsson, "Downsampling Time Series for Visual
+Representation", 2013).
+"""
+
+from typing import List
+
+import numpy as np
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """
+    Scales values between 0 and 1, in order to combine series with different
+    units (missing values are replaced with 0)
+    """
+    values_range = np.nanmax(values) - np.nanmin(values)
+    normalized_values = (values - np.nanmin(values)) / (
+        values_range if values_range else 1
+    )
+    return np.nan_to_num(normalized_values, nan=0.0)
+
+
+def get_lttb_indexes(
+    x: np.ndarray, y_series: List[np.ndarray], max_points: int
+) -> np.ndarray:
+    """
+    Returns indexes of points to keep, first and last points included.
+
+    When several series are provided (for instance speed and elevation), the
+    selected point in each bucket is the one with the largest sum of
+    triangle areas calculated on normalized series. Series without values
+    are ignored.
+    """
+    points_count = len(x)
+    if max_points >= points_count:
+        return np.arange(points_count)
+    if max_points < 3:
+        return np.array([0, points_count - 1])[:max_points]
+
+    series = [
+        _normalize(values)
+        for values in y_series
+        if values.size and not np.isnan(values).all()
+    ]
+    if not series:
+        series = [np.zeros(points_count)]
+    y = np.stack(series)
+
+    # first and last points are not included in buckets
+    buckets_count = max_points - 2
+    bucket_size = (points_count - 2) / buckets_count
+    bounds = (
+        np.floor(np.arange(buckets_count + 1) * bucket_size).astype(int) + 1
+    )
+    bounds[-1] = points_count - 1
+
+    # average point of each bucket, last point for the last bucket
+    buckets_x_averages = np.append(
+        np.add.reduceat(x[1:-1], bounds[:-1] - 1) / np.diff(bounds), x[-1]
+    )
+    buckets_y_averages = np.column_stack(
+        [
+            np.add.reduceat(y[:, 1:-1], bounds[:-1] - 1, axis=1)
+            / np.diff(bounds),
+            y[:, -1],
+        ]
+    )
+
+    indexes = np.empty(max_points, dtype=int)
+    indexes[0] = 0
+    indexes[-1] = points_count - 1
+    selected_index = 0
+    for bucket_index in range(buckets_count):
+        start = bounds[bucket_index]
+        end = bounds[bucket_index + 1]
+        next_x = buckets_x_averages[bucket_index + 1]
+        next_y = buckets_y_averages[:, bucket_index + 1 : bucket_index + 2]
+        selected_x = x[selected_index]
+        selected_y = y[:, selected_index : selected_index + 1]
+        areas = np.abs(
+            (selected_x - next_x) * (y[:, start:end] - selected_y)
+            - (selected_x - x[start:end]) * (next_y - selected_y)
+        ).sum(axis=0)
+        selected_index = start + int(np.argmax(areas))
+        indexes[bucket_index + 1] = selected_index
+    return indexes
@@ -0,0 +1,148 @@
+"""
+Simplified geometry of workout tracks, displayed on map with Leaflet.
+
+Tracks are simplified with Douglas-Peucker algorithm, with a tolerance of
+one pixel at the requested zoom level.
+Instead of simplifying the track on each request, the tolerance above which
+each point is removed (its significance) is calculated once, and stored in
+track columns file (see 'gpx_columns'). Simplifying a track for any zoom
+level only requires to keep points with a significance greater than the
+zoom tolerance.
+"""
+
+from typing import Dict, List, Union
+
+import numpy as np
+
+# tile size used by Leaflet
+TILE_SIZE = 256
+MAX_GEOMETRY_ZOOM = 20
+GEOMETRY_FORMATS = ["geojson", "polyline"]
+MAX_MERCATOR_LATITUDE = 85.0511
+
+
+def get_zoom_tolerance(zoom: int) -> float:
+    """
+    Returns the size of one pixel at given zoom level, in degrees of
+    Web Mercator projection
+    """
+    return 360 / (TILE_SIZE * 2**zoom)
+
+
+# below this tolerance, points are not displayed separately at any
+# supported zoom level
+MIN_TOLERANCE = get_zoom_tolerance(MAX_GEOMETRY_ZOOM)
+
+
+def get_mercator_coordinates(
+    latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Returns coordinates projected with Web Mercator projection, in degrees
+    (one degree has the same length on both axes)
+    """
+    radian_latitudes = np.radians(
+        np.clip(latitudes, -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE)
+    )
+    return np.column_stack(
+        [
+            longitudes,
+            np.degrees(np.log(np.tan(np.pi / 4 + radian_latitudes / 2))),
+        ]
+    )
+
+
+def _get_distances_to_segment(
+    points: np.ndarray, start: np.ndarray, end: np.ndarray
+) -> np.ndarray:
+    segment = end - start
+    segment_length = float(segment @ segment)
+    if segment_length == 0:
+        projections = np.broadcast_to(start, points.shape)
+    else:
+        ratios = np.clip((points - start) @ segment / segment_length, 0, 1)
+        projections = start + ratios[:, None] * segment
+    return np.hypot(*(points - projections).T)
+
+
+def get_points_significance(
+    latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Returns for each point of a segment the Douglas-Peucker tolerance
+    above which the point is removed (in degrees of Web Mercator projection).
+
+    First and last points are always kept (infinite significance).
+    A point significance is never greater than the significance of the
+    point that splits the range containing it, so that keeping points with a
+    significance greater than a tolerance returns the same points as
+    Douglas-Peucker algorithm with this tolerance.
+    """
+    points_count = len(latitudes)
+    significance = np.zeros(points_count)
+    if points_count == 0:
+        return significance
+    significance[[0, -1]] = np.inf
+    points = get_mercator_coordinates(latitudes, longitudes)
+
+    ranges = [(0, points_count - 1, np.inf)]
+    while ranges:
+        start, end, parent_significance = ranges.pop()
+        if end - start < 2:
+            continue
+        distances = _get_distances_to_segment(
+            points[start + 1 : end], points[start], points[end]
+        )
+        index = int(np.argmax(distances))
+        max_distance = min(float(distances[index]), parent_significance)
+        if max_distance < MIN_TOLERANCE:
+            # no need to split further, points are never displayed
+            significance[start + 1 : end] = np.minimum(
+                distances, parent_significance
+            )
+            continue
+        split_index = start + 1 + index
+        significance[split_index] = max_distance
+        ranges.append((start, split_index, max_distance))
+        ranges.append((split_index, end, max_distance))
+    return significance
+
+
+def encode_polyline(latitudes: np.ndarray, longitudes: np.ndarray) -> str:
+    """
+    Returns coordinates encoded with Encoded Polyline Algorithm Format
+    (precision: 5 decimal places)
+    """
+    values = np.rint(np.column_stack([latitudes, longitudes]) * 1e5).astype(
+        np.int64
+    )
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    chunks = []
+    for delta in deltas.ravel().tolist():
+        value = ~(delta << 1) if delta < 0 else delta << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def get_geometry(
+    segments_coordinates: List[np.ndarray], geometry_format: str
+) -> Union[Dict, List[str]]:
+    """
+    Returns segments coordinates (arrays of latitudes and longitudes) as a
+    GeoJSON MultiLineString geometry or a list of encoded polylines.
+    """
+    if geometry_format == "polyline":
+        return [
+            encode_polyline(coordinates[:, 0], coordinates[:, 1])
+            for coordinates in segments_coordinates
+        ]
+    return {
+        "type": "MultiLineString",
+        "coordinates": [
+            coordinates[:, ::-1].tolist()
+            for coordinates in segments_coordinates
+        ],
+    }
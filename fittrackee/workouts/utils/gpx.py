@@ -1,24 +1,45 @@
+import struct
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple, Union
+from math import isnan
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
 
 import gpxpy.gpx
+import numpy as np
 
 from ..exceptions import InvalidGPXException, WorkoutGPXException
+from . import gpx_metrics
+from .downsampling import get_lttb_indexes
+from .geometry import MAX_GEOMETRY_ZOOM, get_geometry, get_zoom_tolerance
+from .gpx_columns import get_track_columns
+from .gpx_stream import GPXStats, SegmentStats, parse_gpx_stream
 from .weather import WeatherService
 
 weather_service = WeatherService()
 
-
-def open_gpx_file(gpx_file: str) -> Optional[gpxpy.gpx.GPX]:
-    gpx_file = open(gpx_file, "r")  # type: ignore
-    gpx = gpxpy.parse(gpx_file)
-    if len(gpx.tracks) == 0:
-        return None
-    return gpx
+CHART_DATA_FIELDS = (
+    "distance",
+    "duration",
+    "elevation",
+    "latitude",
+    "longitude",
+    "speed",
+    "time",
+)
+CHART_DATA_BINARY_TYPES = {
+    "distance": "<f4",
+    "duration": "<f4",
+    "elevation": "<f4",
+    "latitude": "<f8",
+    "longitude": "<f8",
+    "speed": "<f4",
+    "time": "<f8",
+}
 
 
 def get_gpx_data(
-    parsed_gpx: Union[gpxpy.gpx.GPX, gpxpy.gpx.GPXTrackSegment],
+    parsed_gpx: Union[
+        gpxpy.gpx.GPX, gpxpy.gpx.GPXTrackSegment, GPXStats, SegmentStats
+    ],
     max_speed: float,
     start: Union[datetime, None],
     stopped_time_between_seg: timedelta,
@@ -73,89 +94,79 @@ def get_gpx_data(
     return gpx_data
 
 
-def get_gpx_info(
-    gpx_file: str,
+def parse_gpx_file(
+    gpx_file: Union[str, IO],
     stopped_speed_threshold: float,
-    update_map_data: Optional[bool] = True,
-    update_weather_data: Optional[bool] = True,
     use_raw_gpx_speed: bool = False,
-) -> Tuple:
+    with_map_data: bool = True,
+) -> GPXStats:
     """
-    Parse and return gpx, map and weather data from gpx file
+    Parse gpx file (file path or file object) in a single pass (see
+    'parse_gpx_stream') and check it contains a track with time
     """
     try:
-        gpx = open_gpx_file(gpx_file)
+        if isinstance(gpx_file, str):
+            with open(gpx_file, "r") as f:
+                gpx = parse_gpx_stream(
+                    f,
+                    stopped_speed_threshold=stopped_speed_threshold,
+                    use_raw_gpx_speed=use_raw_gpx_speed,
+                    with_map_data=with_map_data,
+                )
+        else:
+            gpx = parse_gpx_stream(
+                gpx_file,
+                stopped_speed_threshold=stopped_speed_threshold,
+                use_raw_gpx_speed=use_raw_gpx_speed,
+                with_map_data=with_map_data,
+            )
     except Exception as e:
         raise InvalidGPXException("error", "gpx file is invalid") from e
-    if gpx is None:
+    if len(gpx.tracks) == 0:
         raise InvalidGPXException("error", "no tracks in gpx file")
+    if gpx.is_time_missing:
+        raise InvalidGPXException("error", "<time> is missing in gpx file")
+    return gpx
 
+
+def get_gpx_stats_info(
+    gpx: GPXStats,
+    stopped_speed_threshold: float,
+    update_map_data: Optional[bool] = True,
+    update_weather_data: Optional[bool] = True,
+) -> Tuple:
+    """
+    Return gpx, map and weather data from parsed gpx file
+    """
+    track = gpx.tracks[0]
     gpx_data: Dict = {
-        "name": gpx.tracks[0].name,
-        "description": gpx.tracks[0].description,
+        "name": track.name,
+        "description": track.description,
         "segments": [],
     }
     max_speed = 0.0
-    start: Optional[datetime] = None
-    map_data = []
-    weather_data = []
-    segments_nb = len(gpx.tracks[0].segments)
-    prev_seg_last_point = None
+    start = gpx.first_point.time if gpx.first_point else None
     no_stopped_time = timedelta(seconds=0)
-    stopped_time_between_seg = no_stopped_time
-
-    for segment_idx, segment in enumerate(gpx.tracks[0].segments):
-        segment_start: Optional[datetime] = None
-        segment_points_nb = len(segment.points)
-        for point_idx, point in enumerate(segment.points):
-            if point.time is None:
-                raise InvalidGPXException(
-                    "error", "<time> is missing in gpx file"
-                )
-            if point_idx == 0:
-                segment_start = point.time
-                # first gpx point => get weather
-                if start is None:
-                    start = point.time
-                    if point.time and update_weather_data:
-                        weather_data.append(weather_service.get_weather(point))
-
-                # if a previous segment exists, calculate stopped time between
-                # the two segments
-                if prev_seg_last_point:
-                    stopped_time_between_seg += (
-                        point.time - prev_seg_last_point
-                    )
-
-            # last segment point
-            if point_idx == (segment_points_nb - 1):
-                prev_seg_last_point = point.time
-
-                # last gpx point => get weather
-                if segment_idx == (segments_nb - 1) and update_weather_data:
-                    weather_data.append(weather_service.get_weather(point))
-
-            if update_map_data:
-                map_data.append([point.longitude, point.latitude])
-        moving_data = segment.get_moving_data(
-            stopped_speed_threshold=stopped_speed_threshold,
-            raw=use_raw_gpx_speed,
+
+    weather_data = []
+    if update_weather_data:
+        weather_data = weather_service.get_weather_data(
+            [
+                point
+                for point in [gpx.first_point, gpx.last_point]
+                if point is not None
+            ]
         )
-        if moving_data:
-            calculated_max_speed = moving_data.max_speed
-            segment_max_speed = (
-                calculated_max_speed if calculated_max_speed else 0
-            )
 
-            if segment_max_speed > max_speed:
-                max_speed = segment_max_speed
-        else:
-            segment_max_speed = 0.0
+    for segment_idx, segment in enumerate(track.segments):
+        segment_max_speed = segment.get_max_speed()
+        if segment_max_speed > max_speed:
+            max_speed = segment_max_speed
 
         segment_data = get_gpx_data(
             segment,
             segment_max_speed,
-            segment_start,
+            segment.start,
             no_stopped_time,
             stopped_speed_threshold,
         )
@@ -166,7 +177,7 @@ def get_gpx_info(
         gpx,
         max_speed,
         start,
-        stopped_time_between_seg,
+        gpx.stopped_time_between_segments,
         stopped_speed_threshold,
     )
     gpx_data = {**gpx_data, **full_gpx_data}
@@ -184,7 +195,28 @@ def get_gpx_info(
             else []
         )
 
-    return gpx_data, map_data, weather_data
+    return gpx_data, gpx.map_data, weather_data
+
+
+def get_gpx_info(
+    gpx_file: Union[str, IO],
+    stopped_speed_threshold: float,
+    update_map_data: Optional[bool] = True,
+    update_weather_data: Optional[bool] = True,
+    use_raw_gpx_speed: bool = False,
+) -> Tuple:
+    """
+    Parse and return gpx, map and weather data from gpx file
+    """
+    gpx = parse_gpx_file(
+        gpx_file,
+        stopped_speed_threshold=stopped_speed_threshold,
+        use_raw_gpx_speed=use_raw_gpx_speed,
+        with_map_data=bool(update_map_data),
+    )
+    return get_gpx_stats_info(
+        gpx, stopped_speed_threshold, update_map_data, update_weather_data
+    )
 
 
 def get_gpx_segments(
@@ -208,80 +240,187 @@ def get_gpx_segments(
     return segments
 
 
+def get_chart_data_columns(
+    gpx_file: str,
+    segment_id: Optional[int] = None,
+    max_points: Optional[int] = None,
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Return data needed to generate chart with speed and elevation, with one
+    array per field (see 'CHART_DATA_FIELDS'):
+    - distance from first point in kilometers
+    - duration from first point in seconds
+    - elevation in meters
+    - latitude and longitude
+    - speed in km/h
+    - time as timestamp in seconds
+
+    Missing values are NaN (except speed, set to 0).
+
+    Data are calculated from track columns file, that is created if missing.
+    If 'max_points' is provided, points are downsampled with
+    Largest-Triangle-Three-Buckets algorithm on speed and elevation.
+    """
+    track_columns = get_track_columns(gpx_file)
+    if track_columns is None:
+        return None
+
+    segment_indexes = get_gpx_segments(
+        list(range(track_columns.segments_count)), segment_id
+    )
+    start = end = 0
+    if segment_indexes:
+        start = track_columns.segments_offsets[segment_indexes[0]]
+        end = track_columns.segments_offsets[segment_indexes[-1] + 1]
+    if start == end:
+        return {field: np.empty(0) for field in CHART_DATA_FIELDS}
+    segments_points = [
+        track_columns.get_segment_points(segment_index)
+        for segment_index in segment_indexes
+    ]
+    points = gpx_metrics.concatenate_points(segments_points)
+
+    # distance from previous point is calculated across segments, but
+    # speed is calculated on each segment
+    distances = (
+        track_columns.distances[start:end] - track_columns.distances[start]
+    ) / 1000
+    speeds = (
+        np.concatenate(
+            [
+                gpx_metrics.get_speeds(segment_points)
+                for segment_points in segments_points
+            ]
+        )
+        / 1000
+    ) * 3600
+    speeds = np.nan_to_num(speeds, nan=0.0)
+    elevations = gpx_metrics.get_elevations_for_distances(points.elevations)
+
+    indexes = (
+        get_lttb_indexes(distances, [speeds, elevations], max_points)
+        if max_points
+        else slice(None)
+    )
+    return {
+        "distance": distances[indexes],
+        "duration": np.abs(points.times - points.times[0])[indexes],
+        "elevation": elevations[indexes],
+        "latitude": points.latitudes[indexes],
+        "longitude": points.longitudes[indexes],
+        "speed": speeds[indexes],
+        "time": points.times[indexes],
+    }
+
+
+def _get_chart_data_values(columns: Dict[str, np.ndarray]) -> Dict[str, List]:
+    """
+    Return values as serialized in JSON responses
+    """
+    return {
+        "distance": [
+            round(distance, 2) for distance in columns["distance"].tolist()
+        ],
+        "duration": [
+            None if isnan(duration) else duration
+            for duration in columns["duration"].tolist()
+        ],
+        "elevation": [
+            None if isnan(elevation) else round(elevation, 1)
+            for elevation in columns["elevation"].tolist()
+        ],
+        "latitude": columns["latitude"].tolist(),
+        "longitude": columns["longitude"].tolist(),
+        "speed": [round(speed, 2) for speed in columns["speed"].tolist()],
+        "time": [
+            None if isnan(time) else datetime.fromtimestamp(time, timezone.utc)
+            for time in columns["time"].tolist()
+        ],
+    }
+
+
 def get_chart_data(
-    gpx_file: str, segment_id: Optional[int] = None
+    gpx_file: str,
+    segment_id: Optional[int] = None,
+    max_points: Optional[int] = None,
 ) -> Optional[List]:
     """
-    Return data needed to generate chart with speed and elevation
+    Return data needed to generate chart with speed and elevation, with one
+    dictionary per point ('elevation' is missing when point has no
+    elevation)
     """
-    gpx = open_gpx_file(gpx_file)
-    if gpx is None:
+    columns = get_chart_data_columns(gpx_file, segment_id, max_points)
+    if columns is None:
         return None
 
     chart_data = []
-    first_point = None
-    previous_point = None
-    previous_distance = 0
-
-    track_segments = gpx.tracks[0].segments
-    segments = get_gpx_segments(track_segments, segment_id)
-
-    for segment_idx, segment in enumerate(segments):
-        for point_idx, point in enumerate(segment.points):
-            if segment_idx == 0 and point_idx == 0:
-                first_point = point
-            distance = (
-                point.distance_3d(previous_point)
-                if (
-                    point.elevation
-                    and previous_point
-                    and previous_point.elevation
-                )
-                else point.distance_2d(previous_point)
-            )
-            distance = 0 if distance is None else distance
-            distance += previous_distance
-            speed = (
-                round((segment.get_speed(point_idx) / 1000) * 3600, 2)
-                if segment.get_speed(point_idx) is not None
-                else 0
-            )
-            data = {
-                "distance": (
-                    round(distance / 1000, 2) if distance is not None else 0
-                ),
-                "duration": point.time_difference(first_point),
-                "latitude": point.latitude,
-                "longitude": point.longitude,
-                "speed": speed,
-                # workaround
-                # https://github.com/tkrajina/gpxpy/issues/209
-                "time": point.time.replace(
-                    tzinfo=timezone(point.time.utcoffset())
-                ),
-            }
-            if point.elevation:
-                data["elevation"] = round(point.elevation, 1)
-            chart_data.append(data)
-            previous_point = point
-            previous_distance = distance
-
+    values = _get_chart_data_values(columns)
+    for point_values in zip(*[values[field] for field in CHART_DATA_FIELDS]):
+        data = dict(zip(CHART_DATA_FIELDS, point_values))
+        if data["elevation"] is None:
+            del data["elevation"]
+        chart_data.append(data)
     return chart_data
 
 
+def get_columnar_chart_data(
+    gpx_file: str,
+    segment_id: Optional[int] = None,
+    max_points: Optional[int] = None,
+) -> Optional[Dict[str, List]]:
+    """
+    Return data needed to generate chart with speed and elevation, with one
+    list per field (elevation is None when point has no elevation)
+    """
+    columns = get_chart_data_columns(gpx_file, segment_id, max_points)
+    if columns is None:
+        return None
+    return _get_chart_data_values(columns)
+
+
+def get_binary_chart_data(
+    gpx_file: str,
+    segment_id: Optional[int] = None,
+    max_points: Optional[int] = None,
+) -> bytes:
+    """
+    Return chart data packed in binary format (little-endian):
+    - points count (unsigned 32-bit integer)
+    - one array per field, in 'CHART_DATA_FIELDS' order, with types
+      listed in 'CHART_DATA_BINARY_TYPES'
+
+    Missing values are NaN (no points are returned if gpx file has no
+    tracks).
+    """
+    columns = get_chart_data_columns(gpx_file, segment_id, max_points)
+    points_count = len(columns["distance"]) if columns else 0
+    chart_data = [struct.pack("<I", points_count)]
+    if columns:
+        chart_data.extend(
+            np.ascontiguousarray(
+                columns[field], dtype=CHART_DATA_BINARY_TYPES[field]
+            ).tobytes()
+            for field in CHART_DATA_FIELDS
+        )
+    return b"".join(chart_data)
+
+
 def extract_segment_from_gpx_file(
-    content: str, segment_id: int
+    gpx_file: str, segment_id: int
 ) -> Optional[str]:
     """
-    Returns segments in xml format from a gpx file content
+    Returns segment in xml format from a gpx file
+
+    Points are read from track columns file, that is created if missing.
     """
-    gpx_content = gpxpy.parse(content)
-    if len(gpx_content.tracks) == 0:
+    track_columns = get_track_columns(gpx_file)
+    if track_columns is None:
         return None
 
-    track_segment = get_gpx_segments(
-        gpx_content.tracks[0].segments, segment_id
-    )
+    segment_index = get_gpx_segments(
+        list(range(track_columns.segments_count)), segment_id
+    )[0]
+    points = track_columns.get_segment_points(segment_index)
 
     gpx = gpxpy.gpx.GPX()
     gpx_track = gpxpy.gpx.GPXTrack()
@@ -289,11 +428,54 @@ def extract_segment_from_gpx_file(
     gpx_segment = gpxpy.gpx.GPXTrackSegment()
     gpx_track.segments.append(gpx_segment)
 
-    for point in track_segment[0].points:
+    for latitude, longitude, elevation in zip(
+        points.latitudes.tolist(),
+        points.longitudes.tolist(),
+        points.elevations.tolist(),
+    ):
         gpx_segment.points.append(
             gpxpy.gpx.GPXTrackPoint(
-                point.latitude, point.longitude, elevation=point.elevation
+                latitude,
+                longitude,
+                elevation=None if isnan(elevation) else elevation,
             )
         )
 
     return gpx.to_xml()
+
+
+def get_geometry_from_gpx_file(
+    gpx_file: str,
+    segment_id: Optional[int] = None,
+    zoom: int = MAX_GEOMETRY_ZOOM,
+    geometry_format: str = "geojson",
+) -> Union[Dict, List[str], None]:
+    """
+    Returns track geometry simplified for given zoom level (all segments or
+    only the given one), as a GeoJSON geometry or a list of encoded
+    polylines (see 'geometry.get_geometry')
+
+    Points are read from track columns file, that is created if missing.
+    """
+    track_columns = get_track_columns(gpx_file)
+    if track_columns is None:
+        return None
+
+    segment_indexes = get_gpx_segments(
+        list(range(track_columns.segments_count)), segment_id
+    )
+    tolerance = get_zoom_tolerance(zoom)
+    segments_coordinates = []
+    for segment_index in segment_indexes:
+        start = track_columns.segments_offsets[segment_index]
+        end = track_columns.segments_offsets[segment_index + 1]
+        kept_points = track_columns.significances[start:end] > tolerance
+        segments_coordinates.append(
+            np.column_stack(
+                [
+                    track_columns.latitudes[start:end][kept_points],
+                    track_columns.longitudes[start:end][kept_points],
+                ]
+            )
+        )
+    return get_geometry(segments_coordinates, geometry_format)
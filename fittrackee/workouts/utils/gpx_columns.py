@@ -0,0 +1,263 @@
+"""
+Columnar cache of gpx files first track.
+
+Points of the first track are stored in a binary file next to the gpx file
+(sidecar file), in order to get chart data and segments without parsing
+the gpx file again.
+
+File format (little-endian):
+- header: magic bytes, format version, points count and segments count
+- columns:
+  - latitudes, longitudes and elevations (float64, NaN when elevation is
+    missing)
+  - times (int64, microseconds since epoch, MISSING_TIME when missing)
+  - distances from first point in meters (float64)
+  - points significance for track simplification (float64, see
+    'geometry.get_points_significance')
+  - segments offsets (int64, segments count + 1 values)
+
+Columns are read from a memory map, without copy.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+from fittrackee import appLog
+
+from ..exceptions import TrackColumnsException
+from . import gpx_metrics
+from .geometry import get_points_significance
+from .gpx_metrics import SegmentPoints
+from .gpx_stream import GPXStats, parse_gpx_stream
+
+TRACK_COLUMNS_EXTENSION = ".columns"
+TRACK_COLUMNS_MAGIC = b"FTTRKCOL"
+# to increment when file format changes (files are then rebuilt)
+TRACK_COLUMNS_VERSION = 2
+HEADER = struct.Struct("<8sHQQ")
+FLOAT_TYPE = np.dtype("<f8")
+INT_TYPE = np.dtype("<i8")
+MISSING_TIME = np.iinfo(np.int64).min
+
+
+class TrackColumns:
+    """
+    Points of first track of a gpx file, stored in columns
+    """
+
+    def __init__(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        elevations: np.ndarray,
+        times: np.ndarray,
+        distances: np.ndarray,
+        significances: np.ndarray,
+        segments_offsets: np.ndarray,
+    ) -> None:
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.elevations = elevations
+        # microseconds since epoch
+        self.times = times
+        self.distances = distances
+        self.significances = significances
+        self.segments_offsets = segments_offsets
+
+    @property
+    def points_count(self) -> int:
+        return len(self.latitudes)
+
+    @property
+    def segments_count(self) -> int:
+        return len(self.segments_offsets) - 1
+
+    @classmethod
+    def from_gpx_stats(cls, gpx: GPXStats) -> Optional["TrackColumns"]:
+        if not gpx.tracks:
+            return None
+        segments_points = [
+            segment.get_points() for segment in gpx.tracks[0].segments
+        ]
+        points = (
+            gpx_metrics.concatenate_points(segments_points)
+            if segments_points
+            else SegmentPoints(*[np.empty(0) for _ in range(4)])
+        )
+        times = np.full(len(points), MISSING_TIME, dtype=INT_TYPE)
+        with_time = ~np.isnan(points.times)
+        times[with_time] = np.rint(points.times[with_time] * 1e6)
+        return cls(
+            latitudes=points.latitudes,
+            longitudes=points.longitudes,
+            elevations=points.elevations,
+            times=times,
+            distances=gpx_metrics.get_cumulative_distances(points),
+            significances=(
+                np.concatenate(
+                    [
+                        get_points_significance(
+                            segment_points.latitudes, segment_points.longitudes
+                        )
+                        for segment_points in segments_points
+                    ]
+                )
+                if segments_points
+                else np.empty(0)
+            ),
+            segments_offsets=np.cumsum(
+                [0] + [len(points) for points in segments_points],
+                dtype=INT_TYPE,
+            ),
+        )
+
+    def get_segment_points(self, segment_index: int) -> SegmentPoints:
+        """
+        Returns points with times as timestamps in seconds (see
+        'gpx_metrics.SegmentPoints')
+        """
+        start = self.segments_offsets[segment_index]
+        end = self.segments_offsets[segment_index + 1]
+        times = self.times[start:end]
+        return SegmentPoints(
+            self.latitudes[start:end],
+            self.longitudes[start:end],
+            self.elevations[start:end],
+            np.where(times == MISSING_TIME, np.nan, times / 1e6),
+        )
+
+    def write(self, file_path: str) -> None:
+        """
+        Write columns in a temporary file before renaming it, to avoid
+        reading an incomplete file.
+        """
+        # a unique temporary file is used, since columns can be written
+        # concurrently by several processes
+        fd, tmp_file_path = tempfile.mkstemp(
+            dir=os.path.dirname(file_path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(
+                    HEADER.pack(
+                        TRACK_COLUMNS_MAGIC,
+                        TRACK_COLUMNS_VERSION,
+                        self.points_count,
+                        self.segments_count,
+                    )
+                )
+                for column, dtype in [
+                    (self.latitudes, FLOAT_TYPE),
+                    (self.longitudes, FLOAT_TYPE),
+                    (self.elevations, FLOAT_TYPE),
+                    (self.times, INT_TYPE),
+                    (self.distances, FLOAT_TYPE),
+                    (self.significances, FLOAT_TYPE),
+                    (self.segments_offsets, INT_TYPE),
+                ]:
+                    f.write(
+                        np.ascontiguousarray(column, dtype=dtype).tobytes()
+                    )
+            os.replace(tmp_file_path, file_path)
+        except BaseException:
+            os.remove(tmp_file_path)
+            raise
+
+    @classmethod
+    def read(cls, file_path: str) -> "TrackColumns":
+        with open(file_path, "rb") as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # empty file
+                raise TrackColumnsException(
+                    "error", "invalid track columns file", e
+                ) from e
+        if len(buffer) < HEADER.size:
+            raise TrackColumnsException("error", "invalid track columns file")
+        magic, version, points_count, segments_count = HEADER.unpack_from(
+            buffer
+        )
+        if magic != TRACK_COLUMNS_MAGIC:
+            raise TrackColumnsException("error", "invalid track columns file")
+        if version != TRACK_COLUMNS_VERSION:
+            raise TrackColumnsException(
+                "error", "unsupported track columns file version"
+            )
+        # all values are stored on 8 bytes
+        expected_size = HEADER.size + 8 * (
+            6 * points_count + segments_count + 1
+        )
+        if len(buffer) != expected_size:
+            raise TrackColumnsException("error", "invalid track columns file")
+
+        offset = HEADER.size
+        columns: List[np.ndarray] = []
+        for dtype, count in [
+            (FLOAT_TYPE, points_count),
+            (FLOAT_TYPE, points_count),
+            (FLOAT_TYPE, points_count),
+            (INT_TYPE, points_count),
+            (FLOAT_TYPE, points_count),
+            (FLOAT_TYPE, points_count),
+            (INT_TYPE, segments_count + 1),
+        ]:
+            columns.append(
+                np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            )
+            offset += count * dtype.itemsize
+        return cls(*columns)
+
+
+def get_track_columns_file_path(gpx_file_path: str) -> str:
+    return f"{gpx_file_path}{TRACK_COLUMNS_EXTENSION}"
+
+
+def write_track_columns_file(gpx: GPXStats, gpx_file_path: str) -> None:
+    track_columns = TrackColumns.from_gpx_stats(gpx)
+    if track_columns:
+        track_columns.write(get_track_columns_file_path(gpx_file_path))
+
+
+def get_track_columns(gpx_file_path: str) -> Optional[TrackColumns]:
+    """
+    Returns track columns from sidecar file.
+
+    If file is missing or invalid, gpx file is parsed and track columns file
+    is written (errors on writing are only logged).
+    Returns None if gpx file has no tracks.
+    """
+    track_columns_file_path = get_track_columns_file_path(gpx_file_path)
+    if os.path.isfile(track_columns_file_path):
+        try:
+            return TrackColumns.read(track_columns_file_path)
+        except (TrackColumnsException, OSError) as e:
+            appLog.warning(
+                f"track columns file '{track_columns_file_path}' can not be "
+                f"read ({e}), rebuilding it"
+            )
+
+    with open(gpx_file_path, "r") as f:
+        track_columns = TrackColumns.from_gpx_stats(
+            parse_gpx_stream(f, with_map_data=False)
+        )
+    if track_columns is None:
+        return None
+    try:
+        track_columns.write(track_columns_file_path)
+    except OSError as e:
+        appLog.error(
+            f"unable to write track columns file '{track_columns_file_path}'"
+            f" ({e})"
+        )
+    return track_columns
+
+
+def remove_track_columns_file(gpx_file_path: str) -> None:
+    track_columns_file_path = get_track_columns_file_path(gpx_file_path)
+    if os.path.exists(track_columns_file_path):
+        os.remove(track_columns_file_path)
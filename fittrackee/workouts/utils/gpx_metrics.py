@@ -0,0 +1,291 @@
+"""
+Vectorized calculation of track segments metrics.
+
+Algorithms are the ones used by gpxpy (distances, moving data, max speed,
+speed at each point and smoothed uphill/downhill), applied on NumPy arrays
+instead of gpxpy points.
+
+Missing elevations and times are stored as NaN.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from gpxpy.geo import EARTH_RADIUS, ONE_DEGREE
+from gpxpy.gpx import (
+    DEFAULT_STOPPED_SPEED_THRESHOLD,
+    IGNORE_TOP_SPEED_PERCENTILES,
+    MovingData,
+)
+
+# above this difference (in degrees), gpxpy calculates haversine distance
+HAVERSINE_MIN_DELTA = 0.2
+
+
+class SegmentPoints:
+    """
+    Track segment points, stored in columns:
+    - latitudes and longitudes (in degrees)
+    - elevations (in meters)
+    - times (timestamp in seconds)
+    """
+
+    def __init__(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        elevations: np.ndarray,
+        times: np.ndarray,
+    ) -> None:
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.elevations = elevations
+        self.times = times
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+
+def get_distances(
+    latitudes_1: np.ndarray,
+    longitudes_1: np.ndarray,
+    elevations_1: np.ndarray,
+    latitudes_2: np.ndarray,
+    longitudes_2: np.ndarray,
+    elevations_2: np.ndarray,
+) -> np.ndarray:
+    """
+    Returns distances in meters between two arrays of points (see
+    'gpxpy.geo.distance').
+
+    3d distance is calculated when both elevations are not NaN.
+    """
+    latitude_deltas = latitudes_1 - latitudes_2
+    longitude_deltas = longitudes_1 - longitudes_2
+    coef = np.cos(np.radians(latitudes_1))
+    x = latitude_deltas
+    y = longitude_deltas * coef
+    distances = np.sqrt(x * x + y * y) * ONE_DEGREE
+
+    elevation_deltas = elevations_1 - elevations_2
+    with_elevation = ~np.isnan(elevation_deltas) & (elevation_deltas != 0)
+    if with_elevation.any():
+        distances[with_elevation] = np.sqrt(
+            distances[with_elevation] ** 2
+            + elevation_deltas[with_elevation] ** 2
+        )
+
+    distant_points = (np.abs(latitude_deltas) > HAVERSINE_MIN_DELTA) | (
+        np.abs(longitude_deltas) > HAVERSINE_MIN_DELTA
+    )
+    if distant_points.any():
+        distances[distant_points] = get_haversine_distances(
+            latitudes_1[distant_points],
+            longitudes_1[distant_points],
+            latitudes_2[distant_points],
+            longitudes_2[distant_points],
+        )
+    return distances
+
+
+def get_haversine_distances(
+    latitudes_1: np.ndarray,
+    longitudes_1: np.ndarray,
+    latitudes_2: np.ndarray,
+    longitudes_2: np.ndarray,
+) -> np.ndarray:
+    """
+    see 'gpxpy.geo.haversine_distance'
+    """
+    longitude_deltas = np.radians(longitudes_1 - longitudes_2)
+    radian_latitudes_1 = np.radians(latitudes_1)
+    radian_latitudes_2 = np.radians(latitudes_2)
+    latitude_deltas = radian_latitudes_1 - radian_latitudes_2
+    a = np.sin(latitude_deltas / 2) ** 2 + np.sin(
+        longitude_deltas / 2
+    ) ** 2 * np.cos(radian_latitudes_1) * np.cos(radian_latitudes_2)
+    return EARTH_RADIUS * (2 * np.arcsin(np.sqrt(a)))
+
+
+def get_elevations_for_distances(elevations: np.ndarray) -> np.ndarray:
+    """
+    gpxpy calculates 3d distances in moving data and chart data only when
+    elevations are not null nor equal to 0.
+    """
+    return np.where(elevations == 0, np.nan, elevations)
+
+
+def get_previous_point_distances(
+    points: SegmentPoints, elevations: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Returns distances between each point and the previous one (first point
+    excluded)
+    """
+    if elevations is None:
+        elevations = get_elevations_for_distances(points.elevations)
+    return get_distances(
+        points.latitudes[1:],
+        points.longitudes[1:],
+        elevations[1:],
+        points.latitudes[:-1],
+        points.longitudes[:-1],
+        elevations[:-1],
+    )
+
+
+def get_moving_data(
+    points: SegmentPoints, stopped_speed_threshold: Optional[float]
+) -> Tuple[MovingData, np.ndarray, np.ndarray]:
+    """
+    Returns moving data (without max speed), and speeds (in m/s) and
+    distances needed to calculate max speed
+    (see 'gpxpy.gpx.GPXTrackSegment.get_moving_data')
+    """
+    if not stopped_speed_threshold:
+        stopped_speed_threshold = DEFAULT_STOPPED_SPEED_THRESHOLD
+    if len(points) < 2:
+        return MovingData(0.0, 0.0, 0.0, 0.0, 0.0), np.empty(0), np.empty(0)
+
+    distances = get_previous_point_distances(points)
+    seconds = points.times[1:] - points.times[:-1]
+    # NaN when time is missing
+    is_valid = (seconds > 0) & (distances != 0)
+    speeds = np.zeros(len(distances))
+    np.divide(distances, seconds, out=speeds, where=is_valid)
+    speeds_kmh = np.zeros(len(distances))
+    np.divide(
+        distances / 1000, seconds / 60**2, out=speeds_kmh, where=is_valid
+    )
+    is_stopped = is_valid & (speeds_kmh <= stopped_speed_threshold)
+    is_moving = is_valid & ~is_stopped
+    # speeds are only kept after first moving point
+    with_speeds = is_valid & np.logical_or.accumulate(is_moving)
+
+    moving_data = MovingData(
+        float(seconds[is_moving].sum()),
+        float(seconds[is_stopped].sum()),
+        float(distances[is_moving].sum()),
+        float(distances[is_stopped].sum()),
+        0.0,
+    )
+    return moving_data, speeds[with_speeds], distances[with_speeds]
+
+
+def get_max_speed(
+    speeds: np.ndarray, distances: np.ndarray, raw: bool = False
+) -> float:
+    """
+    Returns max speed in m/s (see 'gpxpy.geo.calculate_max_speed')
+
+    If not raw, speeds for non-standard distances and top speeds are
+    ignored.
+    """
+    if not speeds.size:
+        return 0.0
+    if raw:
+        return float(speeds.max())
+
+    size = speeds.size
+    if size < 2:
+        return 0.0
+    average_distance = distances.sum() / size
+    standard_distance_deviation = np.sqrt(
+        ((distances - average_distance) ** 2).sum() / size
+    )
+    filtered_speeds = np.sort(
+        speeds[
+            np.abs(distances - average_distance)
+            <= standard_distance_deviation * 1.5
+        ]
+    )
+    if not filtered_speeds.size:
+        return 0.0
+    index = int(filtered_speeds.size * (1 - IGNORE_TOP_SPEED_PERCENTILES))
+    if index >= filtered_speeds.size:
+        index = -1
+    return float(filtered_speeds[index])
+
+
+def get_uphill_downhill(elevations: np.ndarray) -> Tuple[float, float]:
+    """
+    Returns uphill and downhill calculated on smoothed elevations
+    (see 'gpxpy.geo.calculate_uphill_downhill')
+    """
+    elevations = elevations[~np.isnan(elevations)]
+    if elevations.size < 2:
+        return 0.0, 0.0
+    smoothed_elevations = elevations.copy()
+    smoothed_elevations[1:-1] = (
+        elevations[:-2] * 0.3 + elevations[1:-1] * 0.4 + elevations[2:] * 0.3
+    )
+    deltas = np.diff(smoothed_elevations)
+    return (
+        float(deltas[deltas > 0].sum()),
+        float(-deltas[deltas < 0].sum()),
+    )
+
+
+def _get_speeds_between(
+    points: SegmentPoints, start: slice, end: slice
+) -> np.ndarray:
+    """
+    see 'gpxpy.gpx.GPXTrackPoint.speed_between' (returns NaN instead of
+    None)
+    """
+    distances = get_distances(
+        points.latitudes[start],
+        points.longitudes[start],
+        points.elevations[start],
+        points.latitudes[end],
+        points.longitudes[end],
+        points.elevations[end],
+    )
+    seconds = np.abs(points.times[start] - points.times[end])
+    speeds = np.full(len(distances), np.nan)
+    np.divide(distances, seconds, out=speeds, where=seconds > 0)
+    return speeds
+
+
+def get_speeds(points: SegmentPoints) -> np.ndarray:
+    """
+    Returns speed in m/s at each point, NaN if speed can not be calculated
+    (see 'gpxpy.gpx.GPXTrackSegment.get_speed')
+    """
+    speeds = np.full(len(points), np.nan)
+    if len(points) < 2:
+        return speeds
+    previous_speeds = np.full(len(points), np.nan)
+    previous_speeds[1:] = _get_speeds_between(
+        points, slice(1, None), slice(None, -1)
+    )
+    next_speeds = np.full(len(points), np.nan)
+    next_speeds[:-1] = _get_speeds_between(
+        points, slice(None, -1), slice(1, None)
+    )
+    has_previous_speed = ~np.isnan(previous_speeds) & (previous_speeds != 0)
+    has_next_speed = ~np.isnan(next_speeds) & (next_speeds != 0)
+    return np.where(
+        has_previous_speed & has_next_speed,
+        (previous_speeds + next_speeds) / 2,
+        np.where(has_previous_speed, previous_speeds, next_speeds),
+    )
+
+
+def concatenate_points(points_list: List[SegmentPoints]) -> SegmentPoints:
+    return SegmentPoints(
+        np.concatenate([points.latitudes for points in points_list]),
+        np.concatenate([points.longitudes for points in points_list]),
+        np.concatenate([points.elevations for points in points_list]),
+        np.concatenate([points.times for points in points_list]),
+    )
+
+
+def get_cumulative_distances(points: SegmentPoints) -> np.ndarray:
+    """
+    Returns distance from first point in meters, for each point
+    """
+    distances = np.zeros(len(points))
+    if len(points) > 1:
+        np.cumsum(get_previous_point_distances(points), out=distances[1:])
+    return distances
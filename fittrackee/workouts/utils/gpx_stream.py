@@ -0,0 +1,506 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree.ElementTree import XMLParser
+
+import gpxpy.gpx
+import numpy as np
+from gpxpy.gpxfield import FLOAT_TYPE, TIME_TYPE
+
+from . import gpx_metrics
+from .gpx_metrics import SegmentPoints
+
+# size of chunks read from gpx file and fed to the XML parser
+CHUNK_SIZE = 64 * 1024
+
+TRACK_PATH = ("trk",)
+TRACK_SEGMENT_PATH = ("trk", "trkseg")
+TRACK_POINT_PATH = ("trk", "trkseg", "trkpt")
+TRACK_FIELDS = {("trk", "name"): "name", ("trk", "desc"): "description"}
+TRACK_POINT_FIELDS = {
+    ("trk", "trkseg", "trkpt", "ele"): "elevation",
+    ("trk", "trkseg", "trkpt", "time"): "time",
+}
+
+
+class SegmentStats:
+    """
+    Statistics of a track segment.
+
+    Points are stored in columns while parsing (4 floats per point), and
+    statistics are calculated with vectorized operations (see
+    'gpx_metrics'), once all points are added.
+    Methods return the same values as the corresponding gpxpy
+    GPXTrackSegment methods.
+    """
+
+    def __init__(
+        self,
+        stopped_speed_threshold: Optional[float] = None,
+        use_raw_gpx_speed: bool = False,
+    ) -> None:
+        # as gpxpy, default threshold is used when threshold is 0
+        self.stopped_speed_threshold = (
+            stopped_speed_threshold
+            if stopped_speed_threshold
+            else gpxpy.gpx.DEFAULT_STOPPED_SPEED_THRESHOLD
+        )
+        self.use_raw_gpx_speed = use_raw_gpx_speed
+        self.start: Optional[datetime] = None
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._elevations = array("d")
+        self._times = array("d")
+        self._points: Optional[SegmentPoints] = None
+        self._moving_data: Optional[
+            Tuple[gpxpy.gpx.MovingData, np.ndarray, np.ndarray]
+        ] = None
+
+    @property
+    def points_count(self) -> int:
+        return len(self._latitudes)
+
+    def add_point(
+        self,
+        latitude: float,
+        longitude: float,
+        elevation: Optional[float],
+        time: Optional[datetime],
+    ) -> None:
+        if not self._latitudes:
+            self.start = time
+        self._latitudes.append(latitude)
+        self._longitudes.append(longitude)
+        self._elevations.append(np.nan if elevation is None else elevation)
+        self._times.append(np.nan if time is None else get_timestamp(time))
+        self._points = None
+        self._moving_data = None
+
+    def get_points(self) -> SegmentPoints:
+        if self._points is None:
+            # arrays share memory with columns
+            self._points = SegmentPoints(
+                np.frombuffer(self._latitudes),
+                np.frombuffer(self._longitudes),
+                np.frombuffer(self._elevations),
+                np.frombuffer(self._times),
+            )
+        return self._points
+
+    def _get_moving_data(
+        self,
+    ) -> Tuple[gpxpy.gpx.MovingData, np.ndarray, np.ndarray]:
+        if self._moving_data is None:
+            self._moving_data = gpx_metrics.get_moving_data(
+                self.get_points(), self.stopped_speed_threshold
+            )
+        return self._moving_data
+
+    def get_duration(self) -> Optional[float]:
+        if self.points_count < 2:
+            return 0.0
+        times = self.get_points().times
+        first = times[0] if not np.isnan(times[0]) else times[1]
+        last = times[-1] if not np.isnan(times[-1]) else times[-2]
+        # comparisons are False with NaN
+        if not last >= first:
+            return None
+        return float(last - first)
+
+    def get_elevation_extremes(self) -> gpxpy.gpx.MinimumMaximum:
+        elevations = self.get_points().elevations
+        elevations = elevations[~np.isnan(elevations)]
+        if not elevations.size:
+            return gpxpy.gpx.MinimumMaximum(None, None)
+        return gpxpy.gpx.MinimumMaximum(
+            float(elevations.min()), float(elevations.max())
+        )
+
+    def get_uphill_downhill(self) -> gpxpy.gpx.UphillDownhill:
+        uphill, downhill = gpx_metrics.get_uphill_downhill(
+            self.get_points().elevations
+        )
+        return gpxpy.gpx.UphillDownhill(uphill, downhill)
+
+    def get_max_speed(self, raw: Optional[bool] = None) -> float:
+        """
+        Returns max speed in m/s
+
+        If 'raw' is not provided, 'use_raw_gpx_speed' is used.
+        """
+        _, speeds, distances = self._get_moving_data()
+        return gpx_metrics.get_max_speed(
+            speeds,
+            distances,
+            raw=self.use_raw_gpx_speed if raw is None else raw,
+        )
+
+    def get_moving_data(
+        self, stopped_speed_threshold: Optional[float] = None
+    ) -> gpxpy.gpx.MovingData:
+        """
+        Stopped speed threshold is the one provided on initialization, the
+        parameter is only kept for compatibility with gpxpy objects.
+        As with gpxpy, max speed is not calculated with raw speed.
+        """
+        moving_data, _, _ = self._get_moving_data()
+        return moving_data._replace(max_speed=self.get_max_speed(raw=False))
+
+    def get_bounds(self) -> Optional[gpxpy.gpx.GPXBounds]:
+        if not self.points_count:
+            return None
+        points = self.get_points()
+        bounds = (
+            float(points.latitudes.min()),
+            float(points.latitudes.max()),
+            float(points.longitudes.min()),
+            float(points.longitudes.max()),
+        )
+        # as gpxpy, no bounds are returned if one value is 0
+        if not all(bounds):
+            return None
+        return gpxpy.gpx.GPXBounds(*bounds)
+
+
+class TrackStats:
+    """
+    Statistics of a track, aggregated from its segments statistics (same
+    values as gpxpy GPXTrack methods).
+    """
+
+    def __init__(
+        self, name: Optional[str] = None, description: Optional[str] = None
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.segments: List[SegmentStats] = []
+
+    def get_duration(self) -> Optional[float]:
+        result = 0.0
+        for segment in self.segments:
+            duration = segment.get_duration()
+            if duration is None:
+                return None
+            result += duration
+        return result
+
+    def get_elevation_extremes(self) -> gpxpy.gpx.MinimumMaximum:
+        elevations = []
+        for segment in self.segments:
+            minimum, maximum = segment.get_elevation_extremes()
+            if minimum is not None:
+                elevations.append(minimum)
+            if maximum is not None:
+                elevations.append(maximum)
+        if not elevations:
+            return gpxpy.gpx.MinimumMaximum(None, None)
+        return gpxpy.gpx.MinimumMaximum(min(elevations), max(elevations))
+
+    def get_uphill_downhill(self) -> gpxpy.gpx.UphillDownhill:
+        uphill = 0.0
+        downhill = 0.0
+        for segment in self.segments:
+            segment_uphill, segment_downhill = segment.get_uphill_downhill()
+            uphill += segment_uphill or 0.0
+            downhill += segment_downhill or 0.0
+        return gpxpy.gpx.UphillDownhill(uphill, downhill)
+
+    def get_moving_data(
+        self, stopped_speed_threshold: Optional[float] = None
+    ) -> gpxpy.gpx.MovingData:
+        moving_time = 0.0
+        stopped_time = 0.0
+        moving_distance = 0.0
+        stopped_distance = 0.0
+        max_speed = 0.0
+        for segment in self.segments:
+            segment_moving_data = segment.get_moving_data()
+            moving_time += segment_moving_data.moving_time
+            stopped_time += segment_moving_data.stopped_time
+            moving_distance += segment_moving_data.moving_distance
+            stopped_distance += segment_moving_data.stopped_distance
+            if segment_moving_data.max_speed > max_speed:
+                max_speed = segment_moving_data.max_speed
+        return gpxpy.gpx.MovingData(
+            moving_time,
+            stopped_time,
+            moving_distance,
+            stopped_distance,
+            max_speed,
+        )
+
+    def get_bounds(self) -> Optional[gpxpy.gpx.GPXBounds]:
+        bounds = None
+        for segment in self.segments:
+            segment_bounds = segment.get_bounds()
+            if bounds is None:
+                bounds = segment_bounds
+            elif segment_bounds:
+                bounds = bounds.max_bounds(segment_bounds)
+        return bounds
+
+
+class GPXStats:
+    """
+    Statistics of all tracks contained in a gpx file (same values as gpxpy
+    GPX methods).
+    """
+
+    def __init__(self) -> None:
+        self.tracks: List[TrackStats] = []
+        # first track data, needed to create workout
+        self.map_data: List[List[float]] = []
+        self.first_point: Optional[gpxpy.gpx.GPXTrackPoint] = None
+        self.last_point: Optional[gpxpy.gpx.GPXTrackPoint] = None
+        self.stopped_time_between_segments = timedelta(seconds=0)
+        self.is_time_missing = False
+
+    def get_duration(self) -> Optional[float]:
+        result = 0.0
+        for track in self.tracks:
+            duration = track.get_duration()
+            if duration is None:
+                return None
+            result += duration
+        return result
+
+    def get_elevation_extremes(self) -> gpxpy.gpx.MinimumMaximum:
+        elevations = []
+        for track in self.tracks:
+            minimum, maximum = track.get_elevation_extremes()
+            if minimum is not None:
+                elevations.append(minimum)
+            if maximum is not None:
+                elevations.append(maximum)
+        if not elevations:
+            return gpxpy.gpx.MinimumMaximum(None, None)
+        return gpxpy.gpx.MinimumMaximum(min(elevations), max(elevations))
+
+    def get_uphill_downhill(self) -> gpxpy.gpx.UphillDownhill:
+        uphill = 0.0
+        downhill = 0.0
+        for track in self.tracks:
+            track_uphill, track_downhill = track.get_uphill_downhill()
+            uphill += track_uphill or 0.0
+            downhill += track_downhill or 0.0
+        return gpxpy.gpx.UphillDownhill(uphill, downhill)
+
+    def get_moving_data(
+        self, stopped_speed_threshold: Optional[float] = None
+    ) -> gpxpy.gpx.MovingData:
+        moving_time = 0.0
+        stopped_time = 0.0
+        moving_distance = 0.0
+        stopped_distance = 0.0
+        max_speed = 0.0
+        for track in self.tracks:
+            track_moving_data = track.get_moving_data()
+            moving_time += track_moving_data.moving_time
+            stopped_time += track_moving_data.stopped_time
+            moving_distance += track_moving_data.moving_distance
+            stopped_distance += track_moving_data.stopped_distance
+            if track_moving_data.max_speed > max_speed:
+                max_speed = track_moving_data.max_speed
+        return gpxpy.gpx.MovingData(
+            moving_time,
+            stopped_time,
+            moving_distance,
+            stopped_distance,
+            max_speed,
+        )
+
+    def get_bounds(self) -> Optional[gpxpy.gpx.GPXBounds]:
+        bounds = None
+        for track in self.tracks:
+            track_bounds = track.get_bounds()
+            if not bounds:
+                bounds = track_bounds
+            elif track_bounds:
+                bounds = track_bounds.max_bounds(bounds)
+        return bounds
+
+
+class GPXStreamTarget:
+    """
+    Target for XMLParser, calculating statistics while the gpx file is
+    parsed, without building XML tree or gpxpy objects.
+
+    Only elements in the gpx namespace are taken into account
+    (extensions are ignored).
+    """
+
+    def __init__(
+        self,
+        stopped_speed_threshold: Optional[float] = None,
+        use_raw_gpx_speed: bool = False,
+        with_map_data: bool = True,
+    ) -> None:
+        self.stopped_speed_threshold = stopped_speed_threshold
+        self.use_raw_gpx_speed = use_raw_gpx_speed
+        self.with_map_data = with_map_data
+        self.gpx = GPXStats()
+        self._namespace: Optional[str] = None
+        # paths from root element (root excluded), None for elements
+        # outside gpx namespace and their children
+        self._paths: List[Optional[Tuple[str, ...]]] = []
+        self._text: Optional[List[str]] = None
+        self._point: List = []
+        self._segment: Optional[SegmentStats] = None
+        self._first_point: Optional[Tuple] = None
+        self._last_point: Optional[Tuple] = None
+        self._previous_segment_last_time: Optional[datetime] = None
+
+    def _get_path(self, tag: str) -> Optional[Tuple[str, ...]]:
+        namespace, _, local_name = tag.rpartition("}")
+        if not self._paths:
+            self._namespace = namespace
+            return ()
+        parent_path = self._paths[-1]
+        if parent_path is None or namespace != self._namespace:
+            return None
+        return (*parent_path, local_name)
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        path = self._get_path(tag)
+        self._paths.append(path)
+        # only text before first child is kept (as gpxpy does)
+        self._text = None
+        if path == TRACK_POINT_PATH:
+            # latitude, longitude, elevation, time
+            self._point = [
+                _get_mandatory_float(attrib, "lat"),
+                _get_mandatory_float(attrib, "lon"),
+                None,
+                None,
+            ]
+        elif path in TRACK_POINT_FIELDS or path in TRACK_FIELDS:
+            self._text = []
+        elif path == TRACK_SEGMENT_PATH:
+            self._segment = SegmentStats(
+                self.stopped_speed_threshold, self.use_raw_gpx_speed
+            )
+            self.gpx.tracks[-1].segments.append(self._segment)
+            if len(self.gpx.tracks) == 1:
+                # last point of first track must belong to last segment
+                self._last_point = None
+        elif path == TRACK_PATH:
+            self.gpx.tracks.append(TrackStats())
+
+    def data(self, data: str) -> None:
+        if self._text is not None:
+            self._text.append(data)
+
+    def end(self, tag: str) -> None:
+        path = self._paths.pop()
+        if path is None:
+            return
+        text = "".join(self._text) if self._text else None
+        self._text = None
+        if path == TRACK_POINT_PATH:
+            self._add_point(*self._point)
+        elif path in TRACK_POINT_FIELDS:
+            if path[-1] == "ele":
+                self._point[2] = FLOAT_TYPE.from_string(text)  # type: ignore
+            else:
+                self._point[3] = TIME_TYPE.from_string(text)  # type: ignore
+        elif path in TRACK_FIELDS:
+            setattr(self.gpx.tracks[-1], TRACK_FIELDS[path], text)
+        elif path == TRACK_SEGMENT_PATH:
+            self._segment = None
+
+    def _add_point(
+        self,
+        latitude: float,
+        longitude: float,
+        elevation: Optional[float],
+        time: Optional[datetime],
+    ) -> None:
+        if self._segment is None:
+            return
+        self._segment.add_point(latitude, longitude, elevation, time)
+        if len(self.gpx.tracks) > 1:
+            return
+
+        # first track points are used to create workout
+        if time is None:
+            self.gpx.is_time_missing = True
+        if self._segment.points_count == 1:
+            if self._first_point is None:
+                self._first_point = (latitude, longitude, elevation, time)
+            # stopped time between segments
+            if self._previous_segment_last_time and time:
+                self.gpx.stopped_time_between_segments += (
+                    time - self._previous_segment_last_time
+                )
+        self._previous_segment_last_time = time
+        self._last_point = (latitude, longitude, elevation, time)
+        if self.with_map_data:
+            self.gpx.map_data.append([longitude, latitude])
+
+    def close(self) -> GPXStats:
+        # gpxpy points are only created for first and last points (needed
+        # for weather data)
+        if self._first_point:
+            self.gpx.first_point = _get_gpx_track_point(*self._first_point)
+        if self._last_point:
+            self.gpx.last_point = _get_gpx_track_point(*self._last_point)
+        return self.gpx
+
+
+def get_timestamp(time: datetime) -> float:
+    """
+    Returns timestamp in seconds, naive datetime being considered as UTC
+    """
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return time.timestamp()
+
+
+def _get_gpx_track_point(
+    latitude: float,
+    longitude: float,
+    elevation: Optional[float],
+    time: Optional[datetime],
+) -> gpxpy.gpx.GPXTrackPoint:
+    return gpxpy.gpx.GPXTrackPoint(
+        latitude, longitude, elevation=elevation, time=time
+    )
+
+
+def _get_mandatory_float(attrib: Dict[str, str], attribute: str) -> float:
+    value = attrib.get(attribute)
+    if value is None:
+        raise gpxpy.gpx.GPXException(f"{attribute} is mandatory in trkpt")
+    return FLOAT_TYPE.from_string(value)  # type: ignore
+
+
+def _read_chunks(gpx_file: Union[IO, str]) -> Iterator[Union[str, bytes]]:
+    if not hasattr(gpx_file, "read"):
+        yield gpx_file  # type: ignore
+        return
+    while True:
+        chunk = gpx_file.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_gpx_stream(
+    gpx_file: Union[IO, str],
+    stopped_speed_threshold: Optional[float] = None,
+    use_raw_gpx_speed: bool = False,
+    with_map_data: bool = True,
+) -> GPXStats:
+    """
+    Parse gpx content (file object or string) in a single pass and return
+    statistics
+    """
+    target = GPXStreamTarget(
+        stopped_speed_threshold=stopped_speed_threshold,
+        use_raw_gpx_speed=use_raw_gpx_speed,
+        with_map_data=with_map_data,
+    )
+    parser = XMLParser(target=target)
+    for chunk in _read_chunks(gpx_file):
+        parser.feed(chunk)
+    return parser.close()  # type: ignore[return-value]
@@ -1,12 +1,44 @@
-import hashlib
+import fcntl
+import os
 import random
-from typing import Dict, List
+import secrets
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from flask import current_app
+from PIL import Image
 from staticmap import Line, StaticMap
 
 from fittrackee import VERSION
-from fittrackee.files import get_absolute_file_path
+
+from ..exceptions import WorkoutGPXException
+from .gpx_columns import get_track_columns
+from .mbtiles import MBTiles, get_mbtiles
+from .tile_cache import TileCache, get_tile_cache
+
+# template used by staticmap to build tiles url, replaced with tile
+# coordinates in order to retrieve tiles from cache or MBTiles file
+TILE_COORDINATES_TEMPLATE = "{z}/{x}/{y}"
+# staticmap default tile server
+DEFAULT_STATICMAP_URL = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+# map image sizes (width, height)
+MAP_SIZES = {
+    "thumbnail": (200, 113),
+    "card": (400, 225),
+    "retina": (800, 450),
+}
+# size and format of image stored in workout 'map' column
+DEFAULT_MAP_SIZE = "card"
+DEFAULT_MAP_FORMAT = "png"
+MAP_FORMATS = {"png": "image/png", "webp": "image/webp"}
+MAP_WEBP_QUALITY = 80
+# lock file in maps directory, kept on disk since other processes may be
+# waiting for lock
+MAPS_LOCK_FILE = ".maps.lock"
 
 
 def get_static_map_tile_server_url(tile_server_config: Dict) -> str:
@@ -18,30 +50,249 @@ def get_static_map_tile_server_url(tile_server_config: Dict) -> str:
     return tile_server_config["URL"].replace("{s}.", subdomain)
 
 
-def generate_map(map_filepath: str, map_data: List) -> None:
+class CachedStaticMap(StaticMap):
     """
-    Generate and save map image from map data
+    Static map fetching tiles from cache when available.
     """
-    m = StaticMap(400, 225, 10)
-    m.headers = {"User-Agent": f"FitTrackee v{VERSION}"}
-    if not current_app.config["TILE_SERVER"]["DEFAULT_STATICMAP"]:
-        m.url_template = get_static_map_tile_server_url(
-            current_app.config["TILE_SERVER"]
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        padding_x: int,
+        tile_url_template: str,
+        tile_cache: Optional[TileCache] = None,
+        tile_server_key: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            width, height, padding_x, url_template=TILE_COORDINATES_TEMPLATE
+        )
+        self.tile_url_template = tile_url_template
+        self.tile_cache = tile_cache
+        # same key for all tile server subdomains
+        self.tile_server_key = (
+            TileCache.get_server_key(tile_url_template)
+            if tile_server_key is None
+            else tile_server_key
         )
-    line = Line(map_data, "#3388FF", 4)
-    m.add_line(line)
-    image = m.render()
-    image.save(map_filepath)
 
+    def get(self, url: str, **kwargs: Any) -> Tuple[int, bytes]:
+        z, x, y = (int(value) for value in url.split("/"))
+        tile_url = self.tile_url_template.format(z=z, x=x, y=y)
+        if self.tile_cache is None:
+            return super().get(tile_url, **kwargs)
+
+        content = self.tile_cache.get(self.tile_server_key, z, x, y)
+        if content is not None:
+            return 200, content
 
-def get_map_hash(map_filepath: str) -> str:
+        status_code, content = super().get(tile_url, **kwargs)
+        if status_code == 200 and content:
+            self.tile_cache.set(self.tile_server_key, z, x, y, content)
+        return status_code, content
+
+
+@lru_cache(maxsize=1)
+def get_blank_tile(tile_size: int) -> bytes:
+    blank_tile = BytesIO()
+    Image.new("RGBA", (tile_size, tile_size), (0, 0, 0, 0)).save(
+        blank_tile, format="PNG"
+    )
+    return blank_tile.getvalue()
+
+
+class MBTilesStaticMap(StaticMap):
     """
-    Generate a md5 hash used as id instead of workout id, to retrieve map
-    image (maps are sensitive data)
+    Static map reading tiles from a local MBTiles file.
+
+    Tiles missing in MBTiles file are rendered blank.
+    """
+
+    def __init__(
+        self, width: int, height: int, padding_x: int, mbtiles: MBTiles
+    ) -> None:
+        super().__init__(
+            width, height, padding_x, url_template=TILE_COORDINATES_TEMPLATE
+        )
+        self.mbtiles = mbtiles
+
+    def get(self, url: str, **kwargs: Any) -> Tuple[int, bytes]:
+        z, x, y = (int(value) for value in url.split("/"))
+        content = self.mbtiles.get_tile_data(z, x, y)
+        return 200, (
+            get_blank_tile(self.tile_size) if content is None else content
+        )
+
+
+def get_static_map(
+    tile_server_config: Dict,
+    width: int = 400,
+    height: int = 225,
+    padding_x: int = 10,
+) -> StaticMap:
+    mbtiles = get_mbtiles(tile_server_config)
+    if mbtiles:
+        return MBTilesStaticMap(width, height, padding_x, mbtiles=mbtiles)
+
+    if tile_server_config["DEFAULT_STATICMAP"]:
+        tile_url_template = DEFAULT_STATICMAP_URL
+        tile_server_key = TileCache.get_server_key(DEFAULT_STATICMAP_URL)
+    else:
+        tile_url_template = get_static_map_tile_server_url(tile_server_config)
+        tile_server_key = TileCache.get_server_key(tile_server_config["URL"])
+    return CachedStaticMap(
+        width,
+        height,
+        padding_x,
+        tile_url_template=tile_url_template,
+        tile_cache=get_tile_cache(tile_server_config),
+        tile_server_key=tile_server_key,
+    )
+
+
+def get_map_variant_filepath(
+    map_filepath: str, size: str, image_format: str
+) -> str:
+    """
+    Return path of map image variant for given size and format.
+
+    Default variant (card size in PNG) is stored in workout 'map' column,
+    other variants are stored next to it.
+    """
+    if size == DEFAULT_MAP_SIZE and image_format == DEFAULT_MAP_FORMAT:
+        return map_filepath
+    return f"{os.path.splitext(map_filepath)[0]}_{size}.{image_format}"
+
+
+def get_map_variants_filepaths(map_filepath: str) -> List[str]:
+    return [
+        get_map_variant_filepath(map_filepath, size, image_format)
+        for size in MAP_SIZES
+        for image_format in MAP_FORMATS
+    ]
+
+
+def save_map_image(
+    image: Image.Image, map_filepath: str, image_format: str
+) -> None:
+    """
+    Image is written in a temporary file and then renamed, in order not to
+    serve a partially written image.
+    """
+    fd, tmp_map_filepath = tempfile.mkstemp(
+        dir=os.path.dirname(map_filepath), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as map_file:
+            if image_format == "webp":
+                image.save(map_file, format="WEBP", quality=MAP_WEBP_QUALITY)
+            else:
+                image.save(map_file, format="PNG", optimize=True)
+        os.replace(tmp_map_filepath, map_filepath)
+    except BaseException:
+        os.remove(tmp_map_filepath)
+        raise
+
+
+def render_map(
+    map_data: List, tile_server_config: Dict, scale: int = 1
+) -> Image.Image:
+    width, height = MAP_SIZES[DEFAULT_MAP_SIZE]
+    m = get_static_map(
+        tile_server_config, width * scale, height * scale, 10 * scale
+    )
+    m.headers = {"User-Agent": f"FitTrackee v{VERSION}"}
+    m.add_line(Line(map_data, "#3388FF", 4 * scale))
+    return m.render()
+
+
+def generate_map(
+    map_filepath: str,
+    map_data: List,
+    tile_server_config: Optional[Dict] = None,
+) -> None:
+    """
+    Generate and save map image variants (sizes and formats) from map data.
+
+    Retina image is rendered with tiles from next zoom level, in order to
+    get a sharp image on high density screens. Thumbnail is downscaled from
+    card image.
+
+    Tile server configuration can be provided when generating map outside
+    application context.
+    """
+    if tile_server_config is None:
+        tile_server_config = current_app.config["TILE_SERVER"]
+    card_image = render_map(map_data, tile_server_config)
+    images = {
+        "thumbnail": card_image.resize(
+            MAP_SIZES["thumbnail"], Image.Resampling.LANCZOS
+        ),
+        "card": card_image,
+        "retina": render_map(map_data, tile_server_config, scale=2),
+    }
+    os.makedirs(os.path.dirname(map_filepath), exist_ok=True)
+    for size, image in images.items():
+        for image_format in MAP_FORMATS:
+            save_map_image(
+                image,
+                get_map_variant_filepath(map_filepath, size, image_format),
+                image_format,
+            )
+
+
+def has_map_variants(map_filepath: str) -> bool:
+    return all(
+        os.path.exists(filepath)
+        for filepath in get_map_variants_filepaths(map_filepath)
+    )
+
+
+def generate_missing_map(
+    map_filepath: str,
+    gpx_filepath: str,
+    tile_server_config: Optional[Dict] = None,
+) -> bool:
+    """
+    Generate map image variants from gpx file track (stored in track
+    columns file) if images do not exist yet (maps generated before size
+    variants were introduced are also generated again).
+
+    A lock on a file in maps directory prevents concurrent generation of
+    the same map (by several requests or background tasks).
+    Returns True if map is generated.
+    """
+    if has_map_variants(map_filepath):
+        return False
+
+    maps_directory = os.path.dirname(map_filepath)
+    os.makedirs(maps_directory, exist_ok=True)
+    with open(os.path.join(maps_directory, MAPS_LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # map may have been generated while waiting for lock
+            if has_map_variants(map_filepath):
+                return False
+            track_columns = get_track_columns(gpx_filepath)
+            if track_columns is None:
+                raise WorkoutGPXException("error", "no tracks in gpx file")
+            map_data = np.column_stack(
+                (track_columns.longitudes, track_columns.latitudes)
+            ).tolist()
+            generate_map(map_filepath, map_data, tile_server_config)
+            return True
+        finally:
+            # requests waiting for lock check if map exists once lock
+            # released
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_map_id() -> str:
+    """
+    Generate a random id used instead of workout id, to retrieve map image
+    (maps are sensitive data)
+
+    Map image may not be generated yet when workout is created, so id can
+    not be calculated from image content.
     """
-    md5 = hashlib.md5(usedforsecurity=False)
-    absolute_map_filepath = get_absolute_file_path(map_filepath)
-    with open(absolute_map_filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(128 * md5.block_size), b""):
-            md5.update(chunk)
-    return md5.hexdigest()
+    return secrets.token_hex(16)
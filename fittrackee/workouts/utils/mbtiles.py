@@ -0,0 +1,133 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from ..exceptions import MBTilesException
+
+MBTILES_POOL_SIZE = 4
+# only raster tiles are supported
+MBTILES_CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+
+class MBTiles:
+    """
+    Read tiles from a MBTiles file (SQLite database), with a pool of
+    read-only connections shared between threads.
+
+    see: https://github.com/mapbox/mbtiles-spec
+    """
+
+    def __init__(
+        self, file_path: str, pool_size: int = MBTILES_POOL_SIZE
+    ) -> None:
+        if not os.path.isfile(file_path):
+            raise MBTilesException(
+                "error", f"MBTiles file '{file_path}' does not exist"
+            )
+        self.file_path = file_path
+        self.pool_size = pool_size
+        self._connections: "queue.LifoQueue[sqlite3.Connection]" = (
+            queue.LifoQueue()
+        )
+        self._connections_count = 0
+        self._lock = threading.Lock()
+        self.content_type = self._get_content_type()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            f"file:{self.file_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self._connections.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_connect = self._connections_count < self.pool_size
+                if can_connect:
+                    self._connections_count += 1
+            if can_connect:
+                try:
+                    connection = self._connect()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._connections_count -= 1
+                    raise
+            else:
+                connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def _get_content_type(self) -> str:
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT value FROM metadata WHERE name = 'format'"
+                ).fetchone()
+        except sqlite3.Error as e:
+            raise MBTilesException(
+                "error", f"invalid MBTiles file '{self.file_path}'", e
+            ) from e
+        # 'format' is required since MBTiles 1.1, default format is png
+        tile_format = row[0].lower() if row else "png"
+        if tile_format not in MBTILES_CONTENT_TYPES:
+            raise MBTilesException(
+                "error", f"unsupported MBTiles tiles format '{tile_format}'"
+            )
+        return MBTILES_CONTENT_TYPES[tile_format]
+
+    def get_tile_data(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        Return tile data for XYZ coordinates, or None if tile does not
+        exist.
+        """
+        # MBTiles uses TMS scheme (y axis pointing north)
+        tile_row = (2**z - 1) - y
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT tile_data FROM tiles "
+                    "WHERE zoom_level = ? AND tile_column = ? "
+                    "AND tile_row = ?",
+                    (z, x, tile_row),
+                ).fetchone()
+        except sqlite3.Error as e:
+            raise MBTilesException(
+                "error", f"error when reading MBTiles file: {e}", e
+            ) from e
+        return None if row is None else bytes(row[0])
+
+
+_mbtiles: Dict[Tuple[str, int], MBTiles] = {}
+
+
+def get_mbtiles(tile_server_config: Dict) -> Optional[MBTiles]:
+    """
+    Return MBTiles if configured, or None if tiles are fetched from tile
+    server.
+
+    Connections are not shared between processes (for instance when
+    generating maps in task queue worker processes).
+    """
+    file_path = tile_server_config.get("MBTILES_FILE")
+    if not file_path:
+        return None
+    key = (file_path, os.getpid())
+    if key not in _mbtiles:
+        _mbtiles[key] = MBTiles(file_path)
+    return _mbtiles[key]
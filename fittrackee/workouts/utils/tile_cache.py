@@ -0,0 +1,293 @@
+"""
+Shared on-disk cache for map tiles.
+
+Tiles are stored by tile server, zoom and coordinates:
+    <cache folder>/<tile server hash>/<z>/<x>/<y>.tile
+
+- files modification time is the tile download time, used for expiration
+  (TTL),
+- files access time is updated on each read, used to evict least recently
+  used tiles when cache exceeds maximum size (eviction requires to scan
+  cache folder, it is executed in a background task or with CLI, never
+  when a tile is written),
+- files are written in a temporary file and then renamed, in order not to
+  read partially written tiles (cache can be shared between processes),
+- tile server response headers used for revalidation (ETag, Last-Modified)
+  can be stored in a metadata file next to tile file.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from fittrackee import appLog
+
+TILE_EXTENSION = ".tile"
+METADATA_EXTENSION = ".json"
+# eviction is requested after a given number of writes
+EVICTION_WRITES_INTERVAL = 100
+# lock preventing concurrent evictions (by several processes)
+EVICTION_LOCK_FILE = ".eviction.lock"
+# when evicting, cache size is reduced to this ratio of maximum size
+EVICTION_TARGET_RATIO = 0.9
+
+
+class CachedTile(NamedTuple):
+    content: bytes
+    metadata: Dict
+    # tile is expired and must be revalidated
+    expired: bool
+    # download or last revalidation time
+    updated_at: float
+
+
+class TileCache:
+    def __init__(
+        self,
+        folder: str,
+        max_size: int,
+        ttl: int,
+        eviction_writes_interval: int = EVICTION_WRITES_INTERVAL,
+        eviction_handler: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.folder = folder
+        # in bytes, no size limit if 0
+        self.max_size = max_size
+        # in seconds, tiles do not expire if 0
+        self.ttl = ttl
+        self.eviction_writes_interval = eviction_writes_interval
+        # called to request eviction (for instance by sending a task)
+        self.eviction_handler = eviction_handler
+        self._writes_count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_server_key(url_template: str) -> str:
+        return hashlib.md5(
+            url_template.encode(), usedforsecurity=False
+        ).hexdigest()
+
+    def get_tile_path(self, server_key: str, z: int, x: int, y: int) -> str:
+        return os.path.join(
+            self.folder, server_key, str(z), str(x), f"{y}{TILE_EXTENSION}"
+        )
+
+    def _is_expired(self, modification_time: float, now: float) -> bool:
+        return self.ttl > 0 and modification_time + self.ttl < now
+
+    def get_tile(
+        self, server_key: str, z: int, x: int, y: int
+    ) -> Optional[CachedTile]:
+        """
+        Return cached tile, including expired tile
+        """
+        tile_path = self.get_tile_path(server_key, z, x, y)
+        try:
+            stat = os.stat(tile_path)
+            now = time.time()
+            with open(tile_path, "rb") as tile_file:
+                content = tile_file.read()
+            # access time is explicitly updated, since file systems may be
+            # mounted with 'noatime' or 'relatime'
+            os.utime(tile_path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            appLog.error(f"unable to read tile from cache: {e}")
+            return None
+        return CachedTile(
+            content=content,
+            metadata=self._get_metadata(tile_path),
+            expired=self._is_expired(stat.st_mtime, now),
+            updated_at=stat.st_mtime,
+        )
+
+    def get(self, server_key: str, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        Return tile content if tile is cached and not expired
+        """
+        cached_tile = self.get_tile(server_key, z, x, y)
+        if cached_tile is None or cached_tile.expired:
+            return None
+        return cached_tile.content
+
+    @staticmethod
+    def _get_metadata(tile_path: str) -> Dict:
+        try:
+            with open(f"{tile_path}{METADATA_EXTENSION}") as metadata_file:
+                return json.load(metadata_file)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write(file_path: str, content: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(file_path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def set(
+        self,
+        server_key: str,
+        z: int,
+        x: int,
+        y: int,
+        content: bytes,
+        metadata: Optional[Dict] = None,
+    ) -> None:
+        tile_path = self.get_tile_path(server_key, z, x, y)
+        try:
+            os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+            # metadata are written first, so that a new tile is never
+            # associated with previous tile metadata
+            metadata_path = f"{tile_path}{METADATA_EXTENSION}"
+            if metadata:
+                self._write(metadata_path, json.dumps(metadata).encode())
+            elif os.path.exists(metadata_path):
+                os.remove(metadata_path)
+            self._write(tile_path, content)
+        except OSError as e:
+            appLog.error(f"unable to store tile in cache: {e}")
+            return
+
+        if self.eviction_handler is None or (
+            self.max_size == 0 and self.ttl == 0
+        ):
+            return
+        with self._lock:
+            self._writes_count += 1
+            if self._writes_count < self.eviction_writes_interval:
+                return
+            self._writes_count = 0
+        self.eviction_handler()
+
+    def refresh(self, server_key: str, z: int, x: int, y: int) -> None:
+        """
+        Reset tile expiration, when tile server confirms that tile is not
+        modified.
+        """
+        tile_path = self.get_tile_path(server_key, z, x, y)
+        now = time.time()
+        try:
+            os.utime(tile_path, (now, now))
+        except OSError as e:
+            appLog.error(f"unable to refresh tile in cache: {e}")
+
+    def _get_tiles(self) -> List[Tuple[str, float, float, int]]:
+        tiles = []
+        for root, _, files in os.walk(self.folder):
+            for file_name in files:
+                if not file_name.endswith(TILE_EXTENSION):
+                    continue
+                tile_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(tile_path)
+                except OSError:
+                    continue
+                tiles.append(
+                    (tile_path, stat.st_atime, stat.st_mtime, stat.st_size)
+                )
+        return tiles
+
+    def evict(self) -> Optional[Dict]:
+        """
+        Remove expired tiles, then least recently used tiles if cache
+        size exceeds maximum size.
+
+        Returns None if an eviction is already in progress.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        with open(
+            os.path.join(self.folder, EVICTION_LOCK_FILE), "w"
+        ) as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                return self._evict()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _evict(self) -> Dict:
+        removed_tiles = 0
+        now = time.time()
+        tiles = []
+        for tile in self._get_tiles():
+            if self._is_expired(tile[2], now):
+                removed_tiles += self._remove(tile[0])
+            else:
+                tiles.append(tile)
+
+        cache_size = sum(tile[3] for tile in tiles)
+        if self.max_size > 0 and cache_size > self.max_size:
+            target_size = self.max_size * EVICTION_TARGET_RATIO
+            for tile_path, _, _, size in sorted(
+                tiles, key=lambda tile: tile[1]
+            ):
+                if cache_size <= target_size:
+                    break
+                if self._remove(tile_path):
+                    removed_tiles += 1
+                    cache_size -= size
+
+        return {"removed_tiles": removed_tiles, "cache_size": cache_size}
+
+    @staticmethod
+    def _remove(tile_path: str) -> int:
+        try:
+            os.remove(tile_path)
+        except OSError:
+            return 0
+        try:
+            os.remove(f"{tile_path}{METADATA_EXTENSION}")
+        except OSError:
+            pass
+        return 1
+
+
+_tile_caches: Dict[Tuple, TileCache] = {}
+
+
+def get_tile_cache(tile_server_config: Dict) -> Optional[TileCache]:
+    """
+    Return tile cache for configuration (shared by all maps generated in a
+    process), or None if cache is disabled.
+    """
+    if not tile_server_config.get("CACHE_FOLDER"):
+        return None
+    cache_params = (
+        tile_server_config["CACHE_FOLDER"],
+        tile_server_config["CACHE_MAX_SIZE"],
+        tile_server_config["CACHE_TTL"],
+    )
+    if cache_params not in _tile_caches:
+        _tile_caches[cache_params] = TileCache(
+            *cache_params, eviction_handler=enqueue_tile_cache_eviction
+        )
+    return _tile_caches[cache_params]
+
+
+def enqueue_tile_cache_eviction() -> None:
+    """
+    Send eviction task to task queue, in order not to scan cache folder
+    when rendering a map or serving a tile.
+    """
+    from fittrackee.workouts.tasks import evict_tile_cache
+
+    try:
+        evict_tile_cache.send()
+    except Exception as e:
+        # cache can be evicted with CLI
+        appLog.error(f"unable to send tile cache eviction task: {e}")
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fittrackee import appLog
+
+from ..exceptions import MBTilesException
+from .mbtiles import MBTiles, get_mbtiles
+from .tile_cache import CachedTile, TileCache, get_tile_cache
+
+TILE_PROXY_POOL_SIZE = 10
+# connect and read timeouts (in seconds)
+TILE_PROXY_TIMEOUT = (5, 15)
+TILE_PROXY_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:88.0)"
+DEFAULT_TILE_CONTENT_TYPE = "image/png"
+
+
+class Tile(NamedTuple):
+    content: bytes
+    status_code: int
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @classmethod
+    def from_cached_tile(cls, cached_tile: CachedTile) -> "Tile":
+        return cls(
+            content=cached_tile.content,
+            status_code=200,
+            content_type=cached_tile.metadata.get(
+                "content_type", DEFAULT_TILE_CONTENT_TYPE
+            ),
+            etag=cached_tile.metadata.get("etag"),
+            last_modified=cached_tile.metadata.get("last_modified"),
+        )
+
+
+class TileProxy:
+    """
+    Fetch tiles from tile server, with:
+    - a pool of keep-alive connections,
+    - a cache (if provided), expired tiles being revalidated with ETag and
+      Last-Modified headers returned by tile server,
+    - only one request to tile server for concurrent requests on the same
+      tile (in the same process).
+
+    If tile server is not reachable or returns an error, expired tile is
+    returned when available.
+    """
+
+    def __init__(
+        self,
+        url_template: str,
+        tile_cache: Optional[TileCache] = None,
+        pool_size: int = TILE_PROXY_POOL_SIZE,
+        timeout: Tuple[int, int] = TILE_PROXY_TIMEOUT,
+    ) -> None:
+        self.url_template = url_template
+        self.server_key = TileCache.get_server_key(url_template)
+        self.tile_cache = tile_cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": TILE_PROXY_USER_AGENT})
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._tile_locks: Dict[Tuple[int, int, int], Tuple] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _tile_lock(self, z: int, x: int, y: int) -> Iterator[None]:
+        key = (z, x, y)
+        with self._lock:
+            tile_lock, count = self._tile_locks.get(key, (threading.Lock(), 0))
+            self._tile_locks[key] = (tile_lock, count + 1)
+        try:
+            with tile_lock:
+                yield
+        finally:
+            with self._lock:
+                tile_lock, count = self._tile_locks[key]
+                if count == 1:
+                    del self._tile_locks[key]
+                else:
+                    self._tile_locks[key] = (tile_lock, count - 1)
+
+    def _get_cached_tile(self, z: int, x: int, y: int) -> Optional[CachedTile]:
+        if self.tile_cache is None:
+            return None
+        return self.tile_cache.get_tile(self.server_key, z, x, y)
+
+    def get_tile(self, s: str, z: int, x: int, y: int) -> Tile:
+        cached_tile = self._get_cached_tile(z, x, y)
+        if cached_tile and not cached_tile.expired:
+            return Tile.from_cached_tile(cached_tile)
+
+        with self._tile_lock(z, x, y):
+            # tile may have been fetched during a concurrent request
+            cached_tile = self._get_cached_tile(z, x, y)
+            if cached_tile and not cached_tile.expired:
+                return Tile.from_cached_tile(cached_tile)
+            return self._fetch_tile(s, z, x, y, cached_tile)
+
+    def _fetch_tile(
+        self,
+        s: str,
+        z: int,
+        x: int,
+        y: int,
+        cached_tile: Optional[CachedTile],
+    ) -> Tile:
+        headers = {}
+        if cached_tile:
+            if cached_tile.metadata.get("etag"):
+                headers["If-None-Match"] = cached_tile.metadata["etag"]
+            if cached_tile.metadata.get("last_modified"):
+                headers["If-Modified-Since"] = cached_tile.metadata[
+                    "last_modified"
+                ]
+
+        url = self.url_template.format(s=s, z=z, x=x, y=y)
+        try:
+            response = self.session.get(
+                url, headers=headers, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            appLog.error(f"error when fetching tile '{url}': {e}")
+            if cached_tile:
+                return Tile.from_cached_tile(cached_tile)
+            return Tile(b"", 502, DEFAULT_TILE_CONTENT_TYPE)
+
+        if cached_tile and (
+            response.status_code == 304 or response.status_code >= 500
+        ):
+            if response.status_code == 304 and self.tile_cache:
+                self.tile_cache.refresh(self.server_key, z, x, y)
+            return Tile.from_cached_tile(cached_tile)
+
+        tile = Tile(
+            content=response.content,
+            status_code=response.status_code,
+            content_type=response.headers.get(
+                "content-type", DEFAULT_TILE_CONTENT_TYPE
+            ),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        if tile.status_code == 200 and tile.content and self.tile_cache:
+            self.tile_cache.set(
+                self.server_key,
+                z,
+                x,
+                y,
+                tile.content,
+                metadata={
+                    key: value
+                    for key, value in {
+                        "content_type": tile.content_type,
+                        "etag": tile.etag,
+                        "last_modified": tile.last_modified,
+                    }.items()
+                    if value
+                },
+            )
+        return tile
+
+
+class MBTilesTileProxy:
+    """
+    Return tiles from local MBTiles file.
+    """
+
+    def __init__(self, mbtiles: MBTiles) -> None:
+        self.mbtiles = mbtiles
+
+    def get_tile(self, s: str, z: int, x: int, y: int) -> Tile:
+        try:
+            content = self.mbtiles.get_tile_data(z, x, y)
+        except MBTilesException as e:
+            appLog.error(e.message)
+            return Tile(b"", 500, self.mbtiles.content_type)
+        if content is None:
+            return Tile(b"", 404, self.mbtiles.content_type)
+        return Tile(
+            content=content,
+            status_code=200,
+            content_type=self.mbtiles.content_type,
+            etag=(
+                f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"'
+            ),
+        )
+
+
+_tile_proxies: Dict[Tuple, TileProxy] = {}
+
+
+def get_tile_proxy(
+    tile_server_config: Dict,
+) -> Union[TileProxy, MBTilesTileProxy]:
+    """
+    Return tile proxy for configuration (shared by all requests in a
+    process, in order to reuse connections).
+    """
+    mbtiles = get_mbtiles(tile_server_config)
+    if mbtiles:
+        return MBTilesTileProxy(mbtiles)
+
+    tile_cache = get_tile_cache(tile_server_config)
+    key = (tile_server_config["URL"], id(tile_cache))
+    if key not in _tile_proxies:
+        _tile_proxies[key] = TileProxy(tile_server_config["URL"], tile_cache)
+    return _tile_proxies[key]
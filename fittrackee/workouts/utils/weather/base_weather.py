@@ -2,12 +2,32 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import Dict, Optional
 
+import requests
 from gpxpy.gpx import GPXTrackPoint
+from requests.adapters import HTTPAdapter
+
+from .cache import WeatherCache
+
+# connections pool size, must be greater than concurrent requests
+WEATHER_POOL_MAX_SIZE = 10
 
 
 class BaseWeather(ABC):
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self, api_key: str, cache: Optional[WeatherCache] = None
+    ) -> None:
         self.api_key: str = api_key
+        self.cache = cache
+        # session is reused to keep connections to provider API alive
+        self.session = requests.Session()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_maxsize=WEATHER_POOL_MAX_SIZE)
+        )
+
+    @staticmethod
+    def _get_timestamp(time: datetime) -> int:
+        # weather data are retrieved for the hour
+        return int(time.replace(second=0, microsecond=0, minute=0).timestamp())
 
     @abstractmethod
     def _get_data(
@@ -47,4 +67,18 @@ class BaseWeather(ABC):
             # we cannot get weather
             return None
 
-        return self._get_data(point.latitude, point.longitude, point.time)
+        if self.cache is None:
+            return self._get_data(point.latitude, point.longitude, point.time)
+
+        key = self.cache.get_key(
+            self.__class__.__name__.lower(),
+            point.latitude,
+            point.longitude,
+            self._get_timestamp(point.time),
+        )
+        data = self.cache.get(key)
+        if data is None:
+            data = self._get_data(point.latitude, point.longitude, point.time)
+            if data is not None:
+                self.cache.set(key, data)
+        return data
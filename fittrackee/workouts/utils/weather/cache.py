@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import redis
+
+from fittrackee import REDIS_URL, appLog
+
+WEATHER_CACHE_PREFIX = "fittrackee:weather"
+WEATHER_CACHE_MAX_SIZE = 1000
+WEATHER_CACHE_TTL = 7 * 24 * 60 * 60  # 7 days
+# 2 decimals: about 1 km
+WEATHER_CACHE_COORDINATES_PRECISION = 2
+
+
+def get_weather_cache_ttl() -> int:
+    return int(os.getenv("WEATHER_CACHE_TTL", WEATHER_CACHE_TTL))
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    client = redis.from_url(REDIS_URL)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        appLog.warning("Redis not available, weather cache is in memory.")
+        return None
+    return client
+
+
+class WeatherCache:
+    """
+    Weather data cache, with entries expiring after TTL.
+
+    Data are stored in Redis if a client is provided, otherwise in memory
+    (least recently used entries are evicted when max size is reached).
+    A function returning client can be provided instead, in order to
+    connect to Redis on first use (and not when module is imported).
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        ttl: Optional[int] = None,
+        max_size: int = WEATHER_CACHE_MAX_SIZE,
+        get_redis_client: Optional[Callable[[], Optional[redis.Redis]]] = None,
+    ) -> None:
+        self._redis_client = redis_client
+        self._get_redis_client = get_redis_client
+        self._redis_client_lock = threading.Lock()
+        self.ttl = get_weather_cache_ttl() if ttl is None else ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        if self._get_redis_client is not None:
+            with self._redis_client_lock:
+                if self._get_redis_client is not None:
+                    self._redis_client = self._get_redis_client()
+                    self._get_redis_client = None
+        return self._redis_client
+
+    @staticmethod
+    def get_key(
+        provider: str, latitude: float, longitude: float, timestamp: int
+    ) -> str:
+        return (
+            f"{WEATHER_CACHE_PREFIX}:{provider}:"
+            f"{round(latitude, WEATHER_CACHE_COORDINATES_PRECISION)}:"
+            f"{round(longitude, WEATHER_CACHE_COORDINATES_PRECISION)}:"
+            f"{timestamp}"
+        )
+
+    def _get_from_redis(self, key: str) -> Optional[Dict]:
+        try:
+            value = self.redis_client.get(key)  # type: ignore
+        except redis.exceptions.RedisError as e:
+            appLog.error(f"error when getting weather from cache: {e}")
+            return None
+        return None if value is None else json.loads(value)  # type: ignore
+
+    def _get_from_memory(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiration, value = entry
+            if expiration <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = (
+            self._get_from_memory(key)
+            if self.redis_client is None
+            else self._get_from_redis(key)
+        )
+        stat = "hits" if value is not None else "misses"
+        appLog.debug(f"weather cache {stat}: {key}")
+        self._increment_stat(stat)
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, json.dumps(value), ex=self.ttl)
+            except redis.exceptions.RedisError as e:
+                appLog.error(f"error when storing weather in cache: {e}")
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _increment_stat(self, stat: str) -> None:
+        with self._lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+        if self.redis_client is not None:
+            # shared counters for all processes
+            try:
+                self.redis_client.hincrby(
+                    f"{WEATHER_CACHE_PREFIX}:stats", stat, 1
+                )
+            except redis.exceptions.RedisError:
+                pass
+
+    def get_stats(self) -> Dict:
+        """
+        Return hits and misses counts and hit rate (for all processes when
+        Redis is used)
+        """
+        stats = {"hits": self.hits, "misses": self.misses}
+        if self.redis_client is not None:
+            try:
+                redis_stats = self.redis_client.hgetall(
+                    f"{WEATHER_CACHE_PREFIX}:stats"
+                )
+                stats = {
+                    stat: int(redis_stats.get(stat.encode(), 0))  # type: ignore
+                    for stat in ["hits", "misses"]
+                }
+            except redis.exceptions.RedisError:
+                pass
+        total = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": round(stats["hits"] / total, 4) if total else None,
+        }
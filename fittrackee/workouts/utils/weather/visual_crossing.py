@@ -1,16 +1,15 @@
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
-import requests
-
 from fittrackee import appLog
 
 from .base_weather import BaseWeather
+from .cache import WeatherCache
 
 
 class VisualCrossing(BaseWeather):
-    def __init__(self, api_key: str):
-        super().__init__(api_key)
+    def __init__(self, api_key: str, cache: Optional[WeatherCache] = None):
+        super().__init__(api_key, cache)
         self.base_url = (
             "https://weather.visualcrossing.com/"
             "VisualCrossingWebServices/rest/services"
@@ -69,7 +68,7 @@ class VisualCrossing(BaseWeather):
                 self.api_key, "*****"
             )
         )
-        r = requests.get(url, params=self.params, timeout=10)
+        r = self.session.get(url, params=self.params, timeout=10)
         r.raise_for_status()
         res = r.json()
         weather = res["currentConditions"]
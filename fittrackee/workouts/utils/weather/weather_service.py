@@ -1,10 +1,12 @@
 import os
-from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
 
 from gpxpy.gpx import GPXTrackPoint
 
 from fittrackee import appLog
 
+from .cache import WeatherCache, get_redis_client
 from .visual_crossing import VisualCrossing
 
 
@@ -27,7 +29,10 @@ class WeatherService:
         if not weather_api_key:
             return None
         if weather_api_provider == "visualcrossing":
-            return VisualCrossing(weather_api_key)
+            return VisualCrossing(
+                weather_api_key,
+                cache=WeatherCache(get_redis_client=get_redis_client),
+            )
         return None
 
     def get_weather(self, point: GPXTrackPoint) -> Optional[Dict]:
@@ -38,3 +43,14 @@ class WeatherService:
         except Exception as e:
             appLog.error(f"error when getting weather data: {e}")
             return None
+
+    def get_weather_data(
+        self, points: List[GPXTrackPoint]
+    ) -> List[Optional[Dict]]:
+        """
+        Return weather data for given points, fetched concurrently
+        """
+        if not self.weather_api or len(points) < 2:
+            return [self.get_weather(point) for point in points]
+        with ThreadPoolExecutor(max_workers=len(points)) as executor:
+            return list(executor.map(self.get_weather, points))
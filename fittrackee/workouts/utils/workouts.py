@@ -1,8 +1,24 @@
+import multiprocessing
 import os
 import secrets
 import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple, Union
+from io import BytesIO
+from itertools import islice
+from typing import (
+    IO,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from uuid import UUID
 
 import gpxpy.gpx
@@ -12,6 +28,8 @@ from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from fittrackee import appLog, db
+from fittrackee.equipments.models import Equipment
+from fittrackee.equipments.utils import update_equipment_totals
 from fittrackee.files import get_absolute_file_path
 from fittrackee.users.models import User, UserSportPreference
 from fittrackee.utils import decode_short_id
@@ -27,6 +45,7 @@ from ..exceptions import (
     WorkoutException,
     WorkoutForbiddenException,
 )
+from ..maps import enqueue_workouts_maps_generation
 from ..models import (
     DESCRIPTION_MAX_CHARACTERS,
     NOTES_MAX_CHARACTERS,
@@ -34,9 +53,21 @@ from ..models import (
     Sport,
     Workout,
     WorkoutSegment,
+    update_records,
+    update_workouts_daily_stats,
+)
+from ..weather import enqueue_workouts_weather_update
+from .bulk_import import (
+    BULK_IMPORT_KEY,
+    WorkoutsBulkImport,
+    get_bulk_import,
 )
-from .gpx import get_gpx_info
-from .maps import generate_map, get_map_hash
+from .gpx import get_gpx_info, get_gpx_stats_info, parse_gpx_file
+from .gpx_columns import (
+    remove_track_columns_file,
+    write_track_columns_file,
+)
+from .maps import get_map_id, get_map_variants_filepaths
 
 
 def get_workout_datetime(
@@ -353,16 +384,6 @@ def edit_workout(
     return workout
 
 
-def get_file_path(dir_path: str, filename: str) -> str:
-    """
-    Get full path for a file
-    """
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
-    file_path = os.path.join(dir_path, filename)
-    return file_path
-
-
 def get_new_file_path(
     auth_user_id: int,
     workout_date: str,
@@ -388,26 +409,60 @@ def delete_files(
     try:
         if absolute_gpx_filepath and os.path.exists(absolute_gpx_filepath):
             os.remove(absolute_gpx_filepath)
-        if absolute_map_filepath and os.path.exists(absolute_map_filepath):
-            os.remove(absolute_map_filepath)
+        if absolute_gpx_filepath:
+            remove_track_columns_file(absolute_gpx_filepath)
+        if absolute_map_filepath:
+            for map_filepath in get_map_variants_filepaths(
+                absolute_map_filepath
+            ):
+                if os.path.exists(map_filepath):
+                    os.remove(map_filepath)
     except Exception:
         appLog.error("Unable to delete files after processing error.")
 
 
-def process_one_gpx_file(
-    params: Dict, filename: str, stopped_speed_threshold: float
-) -> Workout:
+def get_gpx_file_params(
+    auth_user: User, sport_id: int, stopped_speed_threshold: float
+) -> Dict:
     """
-    Get all data from a gpx file to create a workout with map image
+    Get parameters needed to process gpx files without application context
+    """
+    return {
+        "sport_id": sport_id,
+        "stopped_speed_threshold": stopped_speed_threshold,
+        "upload_folder": current_app.config["UPLOAD_FOLDER"],
+        "use_raw_gpx_speed": auth_user.use_raw_gpx_speed,
+        "user_id": auth_user.id,
+    }
+
+
+def get_gpx_file_data(
+    gpx_content: bytes, filename: str, file_params: Dict
+) -> Tuple[Dict, str]:
+    """
+    Parse gpx content, calculate workout data and store gpx file (with
+    track columns file).
+    Files are written once, since the file path depends on workout date.
+    Map image path is returned, but map is generated after workout creation
+    (see 'enqueue_workouts_maps_generation') or on first access.
+    Weather data are fetched once workout is created (see
+    'enqueue_workouts_weather_update').
+
+    No database queries nor application context are needed, in order to
+    process files in a process pool.
     """
     absolute_gpx_filepath = None
-    absolute_map_filepath = None
     try:
-        auth_user = params["auth_user"]
-        gpx_data, map_data, weather_data = get_gpx_info(
-            gpx_file=params["file_path"],
-            stopped_speed_threshold=stopped_speed_threshold,
-            use_raw_gpx_speed=auth_user.use_raw_gpx_speed,
+        gpx = parse_gpx_file(
+            BytesIO(gpx_content),
+            stopped_speed_threshold=file_params["stopped_speed_threshold"],
+            use_raw_gpx_speed=file_params["use_raw_gpx_speed"],
+            with_map_data=False,
+        )
+        gpx_data, _, _ = get_gpx_stats_info(
+            gpx,
+            file_params["stopped_speed_threshold"],
+            update_weather_data=False,
         )
         workout_date, _ = get_workout_datetime(
             workout_date=gpx_data["start"],
@@ -415,60 +470,172 @@ def process_one_gpx_file(
             user_timezone=None,
         )
         new_filepath = get_new_file_path(
-            auth_user_id=auth_user.id,
+            auth_user_id=file_params["user_id"],
             workout_date=workout_date.strftime("%Y-%m-%d_%H-%M-%S"),
             old_filename=filename,
-            sport_id=params["sport_id"],
+            sport_id=file_params["sport_id"],
         )
-        absolute_gpx_filepath = get_absolute_file_path(new_filepath)
-        os.rename(params["file_path"], absolute_gpx_filepath)
+        absolute_gpx_filepath = os.path.join(
+            file_params["upload_folder"], new_filepath
+        )
+        os.makedirs(os.path.dirname(absolute_gpx_filepath), exist_ok=True)
+        with open(absolute_gpx_filepath, "wb") as gpx_file:
+            gpx_file.write(gpx_content)
+        write_track_columns_file(gpx, absolute_gpx_filepath)
         gpx_data["filename"] = new_filepath
 
         map_filepath = get_new_file_path(
-            auth_user_id=auth_user.id,
+            auth_user_id=file_params["user_id"],
             workout_date=workout_date.strftime("%Y-%m-%d_%H-%M-%S"),
             extension=".png",
-            sport_id=params["sport_id"],
+            sport_id=file_params["sport_id"],
         )
-        absolute_map_filepath = get_absolute_file_path(map_filepath)
-        generate_map(absolute_map_filepath, map_data)
-    except (gpxpy.gpx.GPXXMLSyntaxException, TypeError) as e:
-        delete_files(absolute_gpx_filepath, absolute_map_filepath)
-        raise WorkoutException(
-            "error", "error during gpx file parsing", e
-        ) from e
-    except InvalidGPXException as e:
-        delete_files(absolute_gpx_filepath, absolute_map_filepath)
-        raise WorkoutException("error", str(e)) from e
     except Exception as e:
-        delete_files(absolute_gpx_filepath, absolute_map_filepath)
-        raise WorkoutException(
-            "error", "error during gpx processing", e
-        ) from e
+        delete_files(absolute_gpx_filepath, None)
+        if isinstance(e, InvalidGPXException):
+            raise WorkoutException("error", str(e)) from e
+        message = (
+            "error during gpx file parsing"
+            if isinstance(e, (gpxpy.gpx.GPXXMLSyntaxException, TypeError))
+            else "error during gpx processing"
+        )
+        raise WorkoutException("error", message, e) from e
+    return gpx_data, map_filepath
+
 
+def _get_gpx_file_data_in_process(
+    gpx_content: bytes, filename: str, file_params: Dict
+) -> Tuple[Optional[Tuple[Dict, str]], Optional[Tuple[str, str]]]:
+    # exceptions with additional arguments can not be unpickled in
+    # main process, error status and message are returned instead
     try:
-        new_workout = create_workout(
-            auth_user, params["workout_data"], gpx_data
-        )
-        new_workout.map = map_filepath
-        new_workout.map_id = get_map_hash(map_filepath)
-        new_workout.weather_start = weather_data[0]
-        new_workout.weather_end = weather_data[1]
-        db.session.add(new_workout)
-        db.session.flush()
+        return get_gpx_file_data(gpx_content, filename, file_params), None
+    except WorkoutException as e:
+        if e.e:
+            appLog.error(e.e)
+        return None, (e.status, e.message)
+
+
+def get_gpx_files_data(
+    gpx_files: Iterable[Tuple[str, bytes]],
+    file_params: Dict,
+    files_count: int,
+) -> Iterator[Union[Tuple[Dict, str], WorkoutException]]:
+    """
+    Yield workout data or error for each gpx file (name and content), in
+    files order.
+
+    If more than one worker is configured, files are processed in a
+    process pool (parsing and calculation are CPU-bound, maps are generated
+    later by task queue workers or on first access),
+    otherwise each file is processed when the previous one has been
+    consumed.
+    Files are consumed from iterable only when they can be processed, in
+    order to avoid loading all archive files in memory.
+    """
+    workers = min(
+        current_app.config["WORKOUTS_PROCESSING_WORKERS"], files_count
+    )
+
+    if workers <= 1:
+        for filename, gpx_content in gpx_files:
+            try:
+                yield get_gpx_file_data(gpx_content, filename, file_params)
+            except WorkoutException as e:
+                yield e
+        return
+
+    gpx_files_iterator = iter(gpx_files)
+    futures: Deque[Future] = deque()
+    # processes are not forked from application process, which may have
+    # threads (web server or task queue workers) and open connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+    ) as executor:
+
+        def submit_files(count: int) -> None:
+            for filename, gpx_content in islice(gpx_files_iterator, count):
+                futures.append(
+                    executor.submit(
+                        _get_gpx_file_data_in_process,
+                        gpx_content,
+                        filename,
+                        file_params,
+                    )
+                )
 
-        for segment_data in gpx_data["segments"]:
-            new_segment = create_segment(
-                new_workout.id, new_workout.uuid, segment_data
+        try:
+            # each worker has a file waiting to be processed
+            submit_files(workers * 2)
+            while futures:
+                future = futures.popleft()
+                submit_files(1)
+                try:
+                    gpx_file_data, error = future.result()
+                except Exception as e:
+                    yield WorkoutException(
+                        "error", "error during gpx processing", e
+                    )
+                    continue
+                if error is not None:
+                    yield WorkoutException(*error)
+                elif gpx_file_data is not None:
+                    yield gpx_file_data
+        finally:
+            # when processing is interrupted, pending files are not processed
+            for future in futures:
+                future.cancel()
+
+
+def create_workout_from_gpx_file(
+    params: Dict, gpx_data: Dict, map_filepath: str
+) -> Workout:
+    """
+    Create workout with segments from stored gpx file data.
+
+    During a bulk import, workout is created in a savepoint and changes are
+    committed by batch.
+    """
+    bulk_import = get_bulk_import(db.session)
+    try:
+        with db.session.begin_nested() if bulk_import else nullcontext():
+            new_workout = create_workout(
+                params["auth_user"], params["workout_data"], gpx_data
             )
-            db.session.add(new_segment)
-        db.session.commit()
+            new_workout.map = map_filepath
+            new_workout.map_id = get_map_id()
+            db.session.add(new_workout)
+            db.session.flush()
+
+            for segment_data in gpx_data["segments"]:
+                new_segment = create_segment(
+                    new_workout.id, new_workout.uuid, segment_data
+                )
+                db.session.add(new_segment)
+        if bulk_import is None or bulk_import.add_workout():
+            db.session.commit()
         return new_workout
     except Exception as e:
-        delete_files(absolute_gpx_filepath, absolute_map_filepath)
+        delete_files(
+            get_absolute_file_path(gpx_data["filename"]),
+            get_absolute_file_path(map_filepath),
+        )
         raise WorkoutException("error", "error when saving workout", e) from e
 
 
+def process_one_gpx_file(
+    params: Dict, filename: str, gpx_content: bytes
+) -> Workout:
+    """
+    Get all data from a gpx file to create a workout with map image
+    """
+    gpx_data, map_filepath = get_gpx_file_data(
+        gpx_content, filename, params["file_params"]
+    )
+    return create_workout_from_gpx_file(params, gpx_data, map_filepath)
+
+
 def is_gpx_file(filename: str) -> bool:
     return (
         "." in filename
@@ -477,66 +644,144 @@ def is_gpx_file(filename: str) -> bool:
     )
 
 
-def process_zip_archive(
-    common_params: Dict, extract_dir: str, stopped_speed_threshold: float
-) -> List:
+def get_gpx_filenames_from_zip_archive(
+    zip_file: Union[str, IO],
+) -> List[str]:
     """
-    Get files from a zip archive and create workouts, if number of files
-    does not exceed defined limit.
+    Return names of gpx files from a zip archive (only at archive root), if
+    number of files does not exceed defined limit and files size does not
+    exceed maximum size (sizes are checked from archive information,
+    before reading files).
     """
-    with zipfile.ZipFile(common_params["file_path"], "r") as zip_ref:
+    with zipfile.ZipFile(zip_file, "r") as zip_ref:
         max_file_size = current_app.config["max_single_file_size"]
         gpx_files_count = 0
         files_with_invalid_size_count = 0
+        gpx_filenames = []
         for zip_info in zip_ref.infolist():
             if is_gpx_file(zip_info.filename):
                 gpx_files_count += 1
                 if zip_info.file_size > max_file_size:
                     files_with_invalid_size_count += 1
+                if "/" not in zip_info.filename:
+                    gpx_filenames.append(zip_info.filename)
 
-        if gpx_files_count > current_app.config["gpx_limit_import"]:
-            raise WorkoutException(
-                "fail", "the number of files in the archive exceeds the limit"
-            )
+    if gpx_files_count > current_app.config["gpx_limit_import"]:
+        raise WorkoutException(
+            "fail", "the number of files in the archive exceeds the limit"
+        )
 
-        if files_with_invalid_size_count > 0:
-            raise WorkoutException(
-                "fail",
-                "at least one file in zip archive exceeds size limit, "
-                "please check the archive",
-            )
+    if files_with_invalid_size_count > 0:
+        raise WorkoutException(
+            "fail",
+            "at least one file in zip archive exceeds size limit, "
+            "please check the archive",
+        )
+
+    return gpx_filenames
+
+
+def read_gpx_files_from_zip_archive(
+    zip_file: Union[str, IO], gpx_filenames: List[str]
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield name and content of given gpx files from a zip archive, one file
+    at a time.
+    """
+    with zipfile.ZipFile(zip_file, "r") as zip_ref:
+        for filename in gpx_filenames:
+            yield filename, zip_ref.read(filename)
 
-        zip_ref.extractall(extract_dir)
 
+@contextmanager
+def workouts_bulk_import(
+    batch_size: Optional[int] = None,
+) -> Iterator[WorkoutsBulkImport]:
+    """
+    Create workouts in bulk import mode: workouts are committed by batch,
+    and records, daily stats and equipments totals are updated once at the
+    end of import (including when import is interrupted).
+    """
+    bulk_import = WorkoutsBulkImport(batch_size)
+    db.session.info[BULK_IMPORT_KEY] = bulk_import
+    try:
+        yield bulk_import
+    except BaseException:
+        # import may be interrupted (for instance, by task time limit)
+        del db.session.info[BULK_IMPORT_KEY]
+        try:
+            _complete_workouts_bulk_import(bulk_import)
+        except Exception as e:
+            # original exception must not be hidden
+            db.session.rollback()
+            appLog.error(f"Unable to complete workouts bulk import: {e}")
+        raise
+    del db.session.info[BULK_IMPORT_KEY]
+    _complete_workouts_bulk_import(bulk_import)
+
+
+def _complete_workouts_bulk_import(bulk_import: WorkoutsBulkImport) -> None:
+    if not db.session.is_active:
+        # after a database error, workouts of the current batch can not be
+        # committed (previous batches are already committed)
+        db.session.rollback()
+    # pending workouts are committed, since files are already stored
+    db.session.commit()
+    connection = db.session.connection()
+    for user_id, sport_id in sorted(bulk_import.records_to_update):
+        update_records(
+            user_id,
+            sport_id,
+            connection,
+            db.session,  # type: ignore
+        )
+    if bulk_import.daily_stats_to_update:
+        update_workouts_daily_stats(
+            db.session,  # type: ignore
+            sorted(bulk_import.daily_stats_to_update),
+        )
+    if bulk_import.equipments_to_update:
+        for equipment in Equipment.query.filter(
+            Equipment.id.in_(bulk_import.equipments_to_update)
+        ).all():
+            update_equipment_totals(equipment)
+    db.session.commit()
+
+
+def process_zip_archive(common_params: Dict, zip_file: Union[str, IO]) -> List:
+    """
+    Get files from a zip archive and create workouts, if number of files
+    does not exceed defined limit.
+    """
+    gpx_filenames = get_gpx_filenames_from_zip_archive(zip_file)
     new_workouts = []
 
-    for gpx_file in os.listdir(extract_dir):
-        if is_gpx_file(gpx_file):
-            file_path = os.path.join(extract_dir, gpx_file)
-            params = common_params
-            params["file_path"] = file_path
-            new_workout = process_one_gpx_file(
-                params, gpx_file, stopped_speed_threshold
+    # files can be processed in parallel, but workouts are created one
+    # at a time
+    with workouts_bulk_import():
+        for gpx_file_data in get_gpx_files_data(
+            read_gpx_files_from_zip_archive(zip_file, gpx_filenames),
+            common_params["file_params"],
+            len(gpx_filenames),
+        ):
+            if isinstance(gpx_file_data, WorkoutException):
+                raise gpx_file_data
+            new_workout = create_workout_from_gpx_file(
+                common_params, *gpx_file_data
             )
             new_workouts.append(new_workout)
 
     return new_workouts
 
 
-def process_files(
-    auth_user: User,
-    workout_data: Dict,
-    workout_file: FileStorage,
-    folders: Dict,
-) -> List:
+def get_sport_and_stopped_speed_threshold(
+    auth_user: User, workout_data: Dict
+) -> Tuple[Sport, float]:
     """
-    Store gpx file or zip archive and create workouts
+    Get workout sport and stopped speed threshold from user preferences.
+    Default equipments are added to workout data if no equipments are
+    provided.
     """
-    if workout_file.filename is None:
-        raise WorkoutException("error", "File has no filename.")
-    filename = secure_filename(workout_file.filename)
-    extension = f".{filename.rsplit('.', 1)[1].lower()}"
-    file_path = get_file_path(folders["tmp_dir"], filename)
     sport = Sport.query.filter_by(id=workout_data.get("sport_id")).first()
     if not sport:
         raise WorkoutException(
@@ -560,34 +805,48 @@ def process_files(
             if equipment.is_active is True
         ]
 
+    return sport, stopped_speed_threshold
+
+
+def process_files(
+    auth_user: User,
+    workout_data: Dict,
+    workout_file: FileStorage,
+) -> List:
+    """
+    Create workouts from uploaded gpx file or zip archive.
+    Files are read from request, only gpx files and map images are stored.
+    """
+    if workout_file.filename is None:
+        raise WorkoutException("error", "File has no filename.")
+    filename = secure_filename(workout_file.filename)
+    extension = f".{filename.rsplit('.', 1)[1].lower()}"
+    sport, stopped_speed_threshold = get_sport_and_stopped_speed_threshold(
+        auth_user, workout_data
+    )
+
     common_params = {
         "auth_user": auth_user,
         "workout_data": workout_data,
-        "file_path": file_path,
-        "sport_id": sport.id,
+        "file_params": get_gpx_file_params(
+            auth_user, sport.id, stopped_speed_threshold
+        ),
     }
 
-    try:
-        workout_file.save(file_path)
-    except Exception as e:
-        raise WorkoutException(
-            "error", "Error during workout file save.", e
-        ) from e
-
     if extension == ".gpx":
-        return [
+        new_workouts = [
             process_one_gpx_file(
-                common_params,
-                filename,
-                stopped_speed_threshold,
+                common_params, filename, workout_file.stream.read()
             )
         ]
+        enqueue_workouts_maps_generation(new_workouts)
     else:
-        return process_zip_archive(
-            common_params,
-            folders["extract_dir"],
-            stopped_speed_threshold,
-        )
+        # maps of workouts imported from archive are generated on first
+        # access
+        new_workouts = process_zip_archive(common_params, workout_file.stream)
+
+    enqueue_workouts_weather_update(new_workouts)
+    return new_workouts
 
 
 def get_average_speed(
@@ -0,0 +1,213 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from gpxpy.gpx import GPXTrackPoint
+from sqlalchemy import ColumnElement, func, or_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from fittrackee import appLog, db
+from fittrackee.files import get_absolute_file_path
+
+from .models import Workout
+from .utils.gpx import weather_service
+from .utils.gpx_columns import MISSING_TIME, TrackColumns, get_track_columns
+from .utils.weather.cache import WeatherCache
+
+BACKFILL_BATCH_SIZE = 50
+
+
+class RateLimiter:
+    """
+    Limit calls to a maximum number per second, shared between threads
+    (if rate is 0, calls are not limited).
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def is_weather_enabled() -> bool:
+    return weather_service.weather_api is not None
+
+
+def get_weather_cache() -> Optional[WeatherCache]:
+    weather_api = weather_service.weather_api
+    return None if weather_api is None else weather_api.cache
+
+
+def _get_track_point(
+    track_columns: TrackColumns, index: int
+) -> Optional[GPXTrackPoint]:
+    point_time = int(track_columns.times[index])
+    if point_time == MISSING_TIME:
+        return None
+    return GPXTrackPoint(
+        latitude=float(track_columns.latitudes[index]),
+        longitude=float(track_columns.longitudes[index]),
+        time=datetime.fromtimestamp(point_time / 1e6, tz=timezone.utc),
+    )
+
+
+def get_workout_weather_points(workout: Workout) -> List[GPXTrackPoint]:
+    """
+    Return workout start and end points (from track columns file), or an
+    empty list if workout has no gpx file or points have no time.
+    """
+    if not workout.gpx:
+        return []
+    try:
+        track_columns = get_track_columns(get_absolute_file_path(workout.gpx))
+    except Exception as e:
+        appLog.error(f"unable to get points for workout {workout.id}: {e}")
+        return []
+    if track_columns is None or track_columns.points_count == 0:
+        return []
+    start_point = _get_track_point(track_columns, 0)
+    end_point = _get_track_point(track_columns, track_columns.points_count - 1)
+    if start_point is None or end_point is None:
+        return []
+    return [start_point, end_point]
+
+
+def set_workout_weather(
+    workout: Workout, weather_data: List[Optional[Dict]]
+) -> bool:
+    """
+    Store retrieved weather data (existing data are not replaced with
+    missing data).
+    Return True if workout weather data are updated.
+    """
+    updated = False
+    for attribute, data in zip(["weather_start", "weather_end"], weather_data):
+        if data is not None:
+            setattr(workout, attribute, data)
+            updated = True
+    return updated
+
+
+def update_workouts_weather(workout_ids: List[int]) -> int:
+    """
+    Fetch and store weather data for given workouts.
+    Return number of updated workouts.
+    """
+    updated_count = 0
+    for workout in Workout.query.filter(Workout.id.in_(workout_ids)).all():
+        points = get_workout_weather_points(workout)
+        if points and set_workout_weather(
+            workout, weather_service.get_weather_data(points)
+        ):
+            updated_count += 1
+    db.session.commit()
+    return updated_count
+
+
+def enqueue_workouts_weather_update(workouts: List[Workout]) -> None:
+    """
+    Send workouts to task queue to fetch weather data once workouts are
+    created, in order not to wait for weather API during upload.
+    """
+    if not workouts or not is_weather_enabled():
+        return
+
+    from .tasks import update_weather
+
+    try:
+        update_weather.send(workout_ids=[workout.id for workout in workouts])
+    except Exception as e:
+        # weather data can be fetched later with CLI
+        appLog.error(f"unable to send workouts weather update task: {e}")
+
+
+def _is_missing(column: InstrumentedAttribute) -> ColumnElement[bool]:
+    # weather data may be stored as SQL NULL or JSON null
+    return or_(column.is_(None), func.json_typeof(column) == "null")
+
+
+def backfill_workouts_weather(
+    max_workouts: Optional[int] = None,
+    workers: int = 1,
+    rate: float = 0,
+) -> Tuple[int, int]:
+    """
+    Fetch weather data for workouts with gpx file and missing weather data,
+    with a given number of concurrent workers and a maximum number of
+    weather lookups per second.
+
+    Workouts are processed by batch, in ids order.
+    Return numbers of processed and updated workouts.
+    """
+    rate_limiter = RateLimiter(rate)
+
+    def get_weather_data(
+        points: List[GPXTrackPoint],
+    ) -> List[Optional[Dict]]:
+        weather_data = []
+        for point in points:
+            rate_limiter.wait()
+            weather_data.append(weather_service.get_weather(point))
+        return weather_data
+
+    processed_count = 0
+    updated_count = 0
+    last_workout_id = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        while max_workouts is None or processed_count < max_workouts:
+            batch_size = (
+                BACKFILL_BATCH_SIZE
+                if max_workouts is None
+                else min(BACKFILL_BATCH_SIZE, max_workouts - processed_count)
+            )
+            workouts = (
+                Workout.query.filter(
+                    Workout.id > last_workout_id,
+                    Workout.gpx.is_not(None),
+                    or_(
+                        _is_missing(Workout.weather_start),
+                        _is_missing(Workout.weather_end),
+                    ),
+                )
+                .order_by(Workout.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not workouts:
+                break
+            last_workout_id = workouts[-1].id
+            processed_count += len(workouts)
+
+            workouts_points = [
+                (workout, get_workout_weather_points(workout))
+                for workout in workouts
+            ]
+            workouts_points = [
+                (workout, points)
+                for workout, points in workouts_points
+                if points
+            ]
+            for (workout, _), weather_data in zip(
+                workouts_points,
+                executor.map(
+                    get_weather_data,
+                    [points for _, points in workouts_points],
+                ),
+            ):
+                if set_workout_weather(workout, weather_data):
+                    updated_count += 1
+            db.session.commit()
+
+    return processed_count, updated_count
@@ -1,16 +1,12 @@
 import json
-import os
-import shutil
 from datetime import timedelta
 from typing import Dict, List, Optional, Tuple, Union
 
-import requests
 from flask import (
     Blueprint,
     Response,
     current_app,
     request,
-    send_from_directory,
 )
 from sqlalchemy import asc, desc, exc
 from sqlalchemy.exc import IntegrityError
@@ -27,6 +23,7 @@ from fittrackee.equipments.utils import (
     SPORT_EQUIPMENT_TYPES,
     handle_equipments,
 )
+from fittrackee.files import send_upload_file
 from fittrackee.oauth2.server import require_auth
 from fittrackee.reports.models import ReportActionAppeal
 from fittrackee.responses import (
@@ -46,13 +43,28 @@ from fittrackee.utils import decode_short_id
 from fittrackee.visibility_levels import can_view
 
 from .decorators import check_workout
-from .models import Sport, Workout, WorkoutLike
+from .maps import generate_workout_map
+from .models import Sport, Workout, WorkoutLike, WorkoutsUploadTask
+from .tasks import upload_workouts
+from .upload_tasks import create_upload_task, set_upload_task_as_errored
 from .utils.convert import convert_in_duration
+from .utils.geometry import GEOMETRY_FORMATS, MAX_GEOMETRY_ZOOM
 from .utils.gpx import (
     WorkoutGPXException,
     extract_segment_from_gpx_file,
+    get_binary_chart_data,
     get_chart_data,
+    get_columnar_chart_data,
+    get_geometry_from_gpx_file,
 )
+from .utils.maps import (
+    DEFAULT_MAP_FORMAT,
+    DEFAULT_MAP_SIZE,
+    MAP_FORMATS,
+    MAP_SIZES,
+    get_map_variant_filepath,
+)
+from .utils.tile_proxy import get_tile_proxy
 from .utils.workouts import (
     WorkoutException,
     create_workout,
@@ -68,6 +80,12 @@ DEFAULT_WORKOUTS_PER_PAGE = 5
 MAX_WORKOUTS_PER_PAGE = 100
 MAX_WORKOUTS_TO_SEND = 5
 DEFAULT_WORKOUT_LIKES_PER_PAGE = 10
+DEFAULT_CHART_DATA_MAX_POINTS = 2000
+MIN_CHART_DATA_MAX_POINTS = 2
+CHART_DATA_FORMATS = [None, "columnar"]
+# the first one is the default mimetype
+CHART_DATA_MIMETYPES = ["application/json", "application/octet-stream"]
+MAP_TILE_MAX_AGE = 24 * 60 * 60  # 1 day
 
 
 @workouts_blueprint.route("/workouts", methods=["GET"])
@@ -505,8 +523,43 @@ def get_workout_data(
     workout_short_id: str,
     data_type: str,
     segment_id: Optional[int] = None,
-) -> Union[Dict, HttpResponse]:
+) -> Union[Dict, HttpResponse, Response]:
     """Get data from workout gpx file"""
+    max_points = DEFAULT_CHART_DATA_MAX_POINTS
+    data_format = request.args.get("format") or None
+    is_binary = False
+    zoom = MAX_GEOMETRY_ZOOM
+    if data_type == "chart_data":
+        if "max_points" in request.args:
+            try:
+                max_points = int(request.args["max_points"])
+            except ValueError:
+                max_points = 0
+            if max_points < MIN_CHART_DATA_MAX_POINTS:
+                return InvalidPayloadErrorResponse(
+                    "max_points must be an integer greater than or equal to "
+                    f"{MIN_CHART_DATA_MAX_POINTS}"
+                )
+        if data_format not in CHART_DATA_FORMATS:
+            return InvalidPayloadErrorResponse("invalid format")
+        is_binary = (
+            request.accept_mimetypes.best_match(CHART_DATA_MIMETYPES)
+            == "application/octet-stream"
+        )
+    elif data_type == "geometry":
+        if "zoom" in request.args:
+            try:
+                zoom = int(request.args["zoom"])
+            except ValueError:
+                zoom = -1
+            if not 0 <= zoom <= MAX_GEOMETRY_ZOOM:
+                return InvalidPayloadErrorResponse(
+                    "zoom must be an integer between 0 and "
+                    f"{MAX_GEOMETRY_ZOOM}"
+                )
+        if data_format not in [None, *GEOMETRY_FORMATS]:
+            return InvalidPayloadErrorResponse("invalid format")
+
     not_found_response = DataNotFoundErrorResponse(
         data_type=data_type,
         message=f"workout not found (id: {workout_short_id})",
@@ -532,18 +585,36 @@ def get_workout_data(
 
     try:
         absolute_gpx_filepath = get_absolute_file_path(workout.gpx)
-        chart_data_content: Optional[List] = []
-        if data_type == "chart_data":
-            chart_data_content = get_chart_data(
+        data_content: Union[List, Dict, str, None] = None
+        if data_type == "chart_data" and is_binary:
+            return Response(
+                get_binary_chart_data(
+                    absolute_gpx_filepath, segment_id, max_points
+                ),
+                mimetype="application/octet-stream",
+            )
+        elif data_type == "chart_data" and data_format == "columnar":
+            data_content = get_columnar_chart_data(
+                absolute_gpx_filepath, segment_id, max_points
+            )
+        elif data_type == "chart_data":
+            data_content = get_chart_data(
+                absolute_gpx_filepath, segment_id, max_points
+            )
+        elif data_type == "geometry":
+            data_content = get_geometry_from_gpx_file(
+                absolute_gpx_filepath,
+                segment_id,
+                zoom,
+                data_format if data_format else GEOMETRY_FORMATS[0],
+            )
+        elif segment_id is not None:  # data_type == 'gpx'
+            data_content = extract_segment_from_gpx_file(
                 absolute_gpx_filepath, segment_id
             )
         else:  # data_type == 'gpx'
             with open(absolute_gpx_filepath, encoding="utf-8") as f:
-                gpx_content = f.read()
-                if segment_id is not None:
-                    gpx_segment_content = extract_segment_from_gpx_file(
-                        gpx_content, segment_id
-                    )
+                data_content = f.read()
     except WorkoutGPXException as e:
         appLog.error(e.message)
         if e.status == "not found":
@@ -555,19 +626,7 @@ def get_workout_data(
     return {
         "status": "success",
         "message": "",
-        "data": (
-            {
-                data_type: (
-                    chart_data_content
-                    if data_type == "chart_data"
-                    else (
-                        gpx_content
-                        if segment_id is None
-                        else gpx_segment_content
-                    )
-                )
-            }
-        ),
+        "data": {data_type: data_content},
     }
 
 
@@ -577,7 +636,7 @@ def get_workout_data(
 @require_auth(scopes=["workouts:read"], optional_auth_user=True)
 def get_workout_gpx(
     auth_user: Optional[User], workout_short_id: str
-) -> Union[Dict, HttpResponse]:
+) -> Union[Dict, HttpResponse, Response]:
     """
     Get gpx file for a workout displayed on map with Leaflet.
 
@@ -631,7 +690,7 @@ def get_workout_gpx(
 @require_auth(scopes=["workouts:read"], optional_auth_user=True)
 def get_workout_chart_data(
     auth_user: Optional[User], workout_short_id: str
-) -> Union[Dict, HttpResponse]:
+) -> Union[Dict, HttpResponse, Response]:
     """
     Get chart data from a workout gpx file, to display it with Chart.js.
 
@@ -639,10 +698,12 @@ def get_workout_chart_data(
 
     .. sourcecode:: http
 
-      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/chart HTTP/1.1
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/chart_data HTTP/1.1
       Content-Type: application/json
 
-    **Example response**:
+    **Example responses**:
+
+    - default format, one object per point:
 
     .. sourcecode:: http
 
@@ -676,12 +737,62 @@ def get_workout_chart_data(
         "status": "success"
       }
 
+    - with ``format=columnar``, one list per field (``elevation`` is
+      ``null`` when point has no elevation):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "chart_data": {
+            "distance": [0, 7.5],
+            "duration": [0, 7380],
+            "elevation": [279.4, 280],
+            "latitude": [51.5078118, 51.5079733],
+            "longitude": [-0.1232004, -0.1234538],
+            "speed": [8.63, 6.39],
+            "time": [
+              "Fri, 14 Jul 2017 13:44:03 GMT",
+              "Fri, 14 Jul 2017 15:47:03 GMT"
+            ]
+          }
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    - with ``Accept: application/octet-stream`` header, data are packed in
+      binary format (little-endian): points count (unsigned 32-bit
+      integer), followed by one array per field: ``distance``,
+      ``duration``, ``elevation`` (32-bit floats), ``latitude``,
+      ``longitude`` (64-bit floats), ``speed`` (32-bit float) and ``time``
+      (timestamp in seconds, 64-bit float). Missing values are ``NaN``.
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/octet-stream
+
     :param string workout_short_id: workout short id
 
+    :query integer max_points: maximum number of points returned (minimum:
+           2, default: 2000). When the workout contains more points, they
+           are downsampled while preserving speed and elevation shapes.
+    :query string format: ``columnar`` to get one list per field instead of
+           one object per point
+
     :reqheader Authorization: OAuth 2.0 Bearer Token for workout with
                ``private`` or ``followers_only`` map visibility
+    :reqheader Accept: ``application/octet-stream`` to get data in binary
+               format
 
     :statuscode 200: ``success``
+    :statuscode 400:
+        - ``max_points must be an integer greater than or equal to 2``
+        - ``invalid format``
     :statuscode 401:
         - ``provide a valid auth token``
         - ``signature expired, please log in again``
@@ -705,7 +816,7 @@ def get_workout_chart_data(
 @require_auth(scopes=["workouts:read"], optional_auth_user=True)
 def get_segment_gpx(
     auth_user: Optional[User], workout_short_id: str, segment_id: int
-) -> Union[Dict, HttpResponse]:
+) -> Union[Dict, HttpResponse, Response]:
     """
     Get gpx file for a workout segment displayed on map with Leaflet.
 
@@ -760,7 +871,7 @@ def get_segment_gpx(
 @require_auth(scopes=["workouts:read"], optional_auth_user=True)
 def get_segment_chart_data(
     auth_user: Optional[User], workout_short_id: str, segment_id: int
-) -> Union[Dict, HttpResponse]:
+) -> Union[Dict, HttpResponse, Response]:
     """
     Get chart data from a workout gpx file, to display it with Chart.js.
 
@@ -768,10 +879,12 @@ def get_segment_chart_data(
 
     .. sourcecode:: http
 
-      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/chart/segment/1 HTTP/1.1
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/chart_data/segment/1 HTTP/1.1
       Content-Type: application/json
 
-    **Example response**:
+    **Example responses**:
+
+    - default format, one object per point:
 
     .. sourcecode:: http
 
@@ -805,14 +918,64 @@ def get_segment_chart_data(
         "status": "success"
       }
 
+    - with ``format=columnar``, one list per field (``elevation`` is
+      ``null`` when point has no elevation):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "chart_data": {
+            "distance": [0, 7.5],
+            "duration": [0, 7380],
+            "elevation": [279.4, 280],
+            "latitude": [51.5078118, 51.5079733],
+            "longitude": [-0.1232004, -0.1234538],
+            "speed": [8.63, 6.39],
+            "time": [
+              "Fri, 14 Jul 2017 13:44:03 GMT",
+              "Fri, 14 Jul 2017 15:47:03 GMT"
+            ]
+          }
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    - with ``Accept: application/octet-stream`` header, data are packed in
+      binary format (little-endian): points count (unsigned 32-bit
+      integer), followed by one array per field: ``distance``,
+      ``duration``, ``elevation`` (32-bit floats), ``latitude``,
+      ``longitude`` (64-bit floats), ``speed`` (32-bit float) and ``time``
+      (timestamp in seconds, 64-bit float). Missing values are ``NaN``.
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/octet-stream
+
     :param string workout_short_id: workout short id
     :param integer segment_id: segment id
 
+    :query integer max_points: maximum number of points returned (minimum:
+           2, default: 2000). When the segment contains more points, they
+           are downsampled while preserving speed and elevation shapes.
+    :query string format: ``columnar`` to get one list per field instead of
+           one object per point
+
     :reqheader Authorization: OAuth 2.0 Bearer Token for workout with
                ``private`` or ``followers_only`` map visibility
+    :reqheader Accept: ``application/octet-stream`` to get data in binary
+               format
 
     :statuscode 200: ``success``
-    :statuscode 400: ``no gpx file for this workout``
+    :statuscode 400:
+        - ``no gpx file for this workout``
+        - ``max_points must be an integer greater than or equal to 2``
+        - ``invalid format``
     :statuscode 401:
         - ``provide a valid auth token``
         - ``signature expired, please log in again``
@@ -829,6 +992,203 @@ def get_segment_chart_data(
     )
 
 
+@workouts_blueprint.route(
+    "/workouts/<string:workout_short_id>/geometry", methods=["GET"]
+)
+@require_auth(scopes=["workouts:read"], optional_auth_user=True)
+def get_workout_geometry(
+    auth_user: Optional[User], workout_short_id: str
+) -> Union[Dict, HttpResponse, Response]:
+    """
+    Get simplified track geometry for a workout displayed on map with
+    Leaflet.
+
+    **Example requests**:
+
+    .. sourcecode:: http
+
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/geometry HTTP/1.1
+      Content-Type: application/json
+
+    .. sourcecode:: http
+
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/geometry?zoom=12&format=polyline
+        HTTP/1.1
+      Content-Type: application/json
+
+    **Example responses**:
+
+    - GeoJSON geometry (one line per segment, coordinates are longitude and
+      latitude):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "geometry": {
+            "coordinates": [
+              [
+                [-0.1232004, 51.5078118],
+                [-0.1234538, 51.5079733]
+              ]
+            ],
+            "type": "MultiLineString"
+          }
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    - encoded polylines (one polyline per segment):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "geometry": ["ybkyH~`W_@p@"]
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    :param string workout_short_id: workout short id
+
+    :query integer zoom: map zoom level (between 0 and 20, default: 20).
+           Track is simplified with a tolerance of one pixel at this zoom
+           level.
+    :query string format: ``geojson`` (default) or ``polyline`` (Encoded
+           Polyline Algorithm Format)
+
+    :reqheader Authorization: OAuth 2.0 Bearer Token for workout with
+               ``private`` or ``followers_only`` map visibility
+
+    :statuscode 200: ``success``
+    :statuscode 400:
+        - ``zoom must be an integer between 0 and 20``
+        - ``invalid format``
+    :statuscode 401:
+        - ``provide a valid auth token``
+        - ``signature expired, please log in again``
+        - ``invalid token, please log in again``
+    :statuscode 403:
+        - ``you do not have permissions``
+        - ``you do not have permissions, your account is suspended``
+    :statuscode 404:
+        - ``workout not found``
+        - ``no gpx file for this workout``
+    :statuscode 500: ``error, please try again or contact the administrator``
+
+    """
+    return get_workout_data(auth_user, workout_short_id, "geometry")
+
+
+@workouts_blueprint.route(
+    "/workouts/<string:workout_short_id>/geometry/segment/<int:segment_id>",
+    methods=["GET"],
+)
+@require_auth(scopes=["workouts:read"], optional_auth_user=True)
+def get_segment_geometry(
+    auth_user: Optional[User], workout_short_id: str, segment_id: int
+) -> Union[Dict, HttpResponse, Response]:
+    """
+    Get simplified track geometry for a workout segment displayed on map
+    with Leaflet.
+
+    **Example requests**:
+
+    .. sourcecode:: http
+
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/geometry/segment/1 HTTP/1.1
+      Content-Type: application/json
+
+    .. sourcecode:: http
+
+      GET /api/workouts/kjxavSTUrJvoAh2wvCeGEF/geometry/segment/1?zoom=12
+        HTTP/1.1
+      Content-Type: application/json
+
+    **Example responses**:
+
+    - GeoJSON geometry (one line per segment, coordinates are longitude and
+      latitude):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "geometry": {
+            "coordinates": [
+              [
+                [-0.1232004, 51.5078118],
+                [-0.1234538, 51.5079733]
+              ]
+            ],
+            "type": "MultiLineString"
+          }
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    - encoded polylines (one polyline per segment):
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+      {
+        "data": {
+          "geometry": ["ybkyH~`W_@p@"]
+        },
+        "message": "",
+        "status": "success"
+      }
+
+    :param string workout_short_id: workout short id
+    :param integer segment_id: segment id
+
+    :query integer zoom: map zoom level (between 0 and 20, default: 20).
+           Track is simplified with a tolerance of one pixel at this zoom
+           level.
+    :query string format: ``geojson`` (default) or ``polyline`` (Encoded
+           Polyline Algorithm Format)
+
+    :reqheader Authorization: OAuth 2.0 Bearer Token for workout with
+               ``private`` or ``followers_only`` map visibility
+
+    :statuscode 200: ``success``
+    :statuscode 400:
+        - ``zoom must be an integer between 0 and 20``
+        - ``invalid format``
+    :statuscode 401:
+        - ``provide a valid auth token``
+        - ``signature expired, please log in again``
+        - ``invalid token, please log in again``
+    :statuscode 403:
+        - ``you do not have permissions``
+        - ``you do not have permissions, your account is suspended``
+    :statuscode 404:
+        - ``workout not found``
+        - ``no gpx file for this workout``
+        - ``No segment with id '<segment_id>'``
+    :statuscode 500: ``error, please try again or contact the administrator``
+
+    """
+    return get_workout_data(
+        auth_user, workout_short_id, "geometry", segment_id
+    )
+
+
 @workouts_blueprint.route(
     "/workouts/<string:workout_short_id>/gpx/download", methods=["GET"]
 )
@@ -883,8 +1243,7 @@ def download_workout_gpx(
             message=f"no gpx file for workout (id: {workout_short_id})",
         )
 
-    return send_from_directory(
-        current_app.config["UPLOAD_FOLDER"],
+    return send_upload_file(
         workout.gpx,
         mimetype="application/gpx+xml",
         as_attachment=True,
@@ -897,23 +1256,42 @@ def get_map(map_id: int) -> Union[HttpResponse, Response]:
     """
     Get map image for workouts with gpx.
 
+    Map images are generated on first access if not generated yet, in
+    several sizes and formats.
+
+    If format is not provided, WebP image is returned when client accepts
+    it (``Accept`` header), otherwise PNG image.
+
     **Example request**:
 
     .. sourcecode:: http
 
-      GET /api/workouts/map/fa33f4d996844a5c73ecd1ae24456ab8?1563529507772
+      GET /api/workouts/map/fa33f4d996844a5c73ecd1ae24456ab8?size=thumbnail
         HTTP/1.1
+      Accept: image/webp,*/*
 
     **Example response**:
 
     .. sourcecode:: http
 
       HTTP/1.1 200 OK
-      Content-Type: image/png
+      Content-Type: image/webp
+      Vary: Accept
 
     :param string map_id: workout map id
 
+    :query string size: image size:
+
+      - ``thumbnail``: 200x113
+      - ``card``: 400x225 (default)
+      - ``retina``: 800x450
+
+    :query string format: image format, ``png`` or ``webp``
+
     :statuscode 200: ``success``
+    :statuscode 400:
+        - ``invalid size``
+        - ``invalid format``
     :statuscode 401:
         - ``provide a valid auth token``
         - ``signature expired, please log in again``
@@ -924,28 +1302,55 @@ def get_map(map_id: int) -> Union[HttpResponse, Response]:
     :statuscode 500: ``error, please try again or contact the administrator``
 
     """
+    size = request.args.get("size", DEFAULT_MAP_SIZE)
+    if size not in MAP_SIZES:
+        return InvalidPayloadErrorResponse("invalid size")
+    negotiated_format = "format" not in request.args
+    if negotiated_format:
+        image_format = (
+            "webp"
+            if any(
+                value == MAP_FORMATS["webp"] and quality > 0
+                for value, quality in request.accept_mimetypes
+            )
+            else DEFAULT_MAP_FORMAT
+        )
+    else:
+        image_format = request.args["format"]
+        if image_format not in MAP_FORMATS:
+            return InvalidPayloadErrorResponse("invalid format")
+
     try:
         workout = Workout.query.filter_by(map_id=map_id).first()
         if not workout:
             return NotFoundErrorResponse("Map does not exist.")
-        return send_from_directory(
-            current_app.config["UPLOAD_FOLDER"],
-            workout.map,
+        generate_workout_map(workout)
+        response = send_upload_file(
+            get_map_variant_filepath(workout.map, size, image_format),
+            mimetype=MAP_FORMATS[image_format],
+            # map id changes when map is generated for a new gpx file
+            immutable=True,
         )
-    except NotFound:
+        if negotiated_format:
+            response.vary.add("Accept")
+        return response
+    except (NotFound, FileNotFoundError):
         return NotFoundErrorResponse("Map file does not exist.")
     except Exception as e:
         return handle_error_and_return_response(e)
 
 
 @workouts_blueprint.route(
-    "/workouts/map_tile/<s>/<z>/<x>/<y>.png", methods=["GET"]
+    "/workouts/map_tile/<s>/<int:z>/<int:x>/<int:y>.png", methods=["GET"]
 )
 @limiter.exempt
-def get_map_tile(s: str, z: str, x: str, y: str) -> Tuple[Response, int]:
+def get_map_tile(s: str, z: int, x: int, y: int) -> Response:
     """
     Get map tile from tile server.
 
+    Tiles are cached and revalidated with tile server once expired
+    (see `TILE_CACHE_TTL <installation.html#envvar-TILE_CACHE_TTL>`__).
+
     **Example request**:
 
     .. sourcecode:: http
@@ -957,31 +1362,43 @@ def get_map_tile(s: str, z: str, x: str, y: str) -> Tuple[Response, int]:
     .. sourcecode:: http
 
       HTTP/1.1 200 OK
+      Cache-Control: public, max-age=86400
       Content-Type: image/png
 
     :param string s: subdomain
-    :param string z: zoom
-    :param string x: index of the tile along the map's x axis
-    :param string y: index of the tile along the map's y axis
+    :param integer z: zoom
+    :param integer x: index of the tile along the map's x axis
+    :param integer y: index of the tile along the map's y axis
+
+    :reqheader If-None-Match: ETag returned on previous request
 
-    Status codes are status codes returned by tile server
+    Status codes are status codes returned by tile server, except:
+
+    :statuscode 304: ``not modified``
+    :statuscode 502: ``tile server not reachable``
 
     """
-    url = current_app.config["TILE_SERVER"]["URL"].format(
-        s=secure_filename(s),
-        z=secure_filename(z),
-        x=secure_filename(x),
-        y=secure_filename(y),
+    tile = get_tile_proxy(current_app.config["TILE_SERVER"]).get_tile(
+        secure_filename(s), z, x, y
     )
-    headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:88.0)"}
-    response = requests.get(url, headers=headers, timeout=30)
-    return (
-        Response(
-            response.content,
-            content_type=response.headers["content-type"],
-        ),
-        response.status_code,
+    response = Response(
+        tile.content,
+        status=tile.status_code,
+        content_type=tile.content_type,
     )
+    if tile.status_code != 200:
+        response.cache_control.no_store = True
+        return response
+
+    response.cache_control.public = True
+    response.cache_control.max_age = MAP_TILE_MAX_AGE
+    if tile.etag:
+        response.headers["ETag"] = tile.etag
+    if tile.last_modified:
+        response.headers["Last-Modified"] = tile.last_modified
+    # returns "304 Not Modified" if ETag matches
+    response.make_conditional(request)
+    return response
 
 
 @workouts_blueprint.route("/workouts", methods=["POST"])
@@ -1152,9 +1569,15 @@ def post_workout(auth_user: User) -> Union[Tuple[Dict, int], HttpResponse]:
        for workout, analysis and map are not mandatory.
        Visibility levels default to user preferences.
 
+    :query boolean async: if ``true``, file is processed by task queue
+       workers and response contains upload task (see
+       :http:get:`/api/workouts/upload_tasks/(string:task_id)`).
+       Default: ``false``
+
     :reqheader Authorization: OAuth 2.0 Bearer Token
 
     :statuscode 201: workout created
+    :statuscode 202: upload task created
     :statuscode 400:
         - ``invalid payload``
         - ``no file part``
@@ -1213,18 +1636,28 @@ def post_workout(auth_user: User) -> Union[Tuple[Dict, int], HttpResponse]:
         workout_data["equipments_list"] = equipments_list
 
     workout_file = request.files["file"]
-    upload_dir = os.path.join(
-        current_app.config["UPLOAD_FOLDER"], "workouts", str(auth_user.id)
-    )
-    folders = {
-        "extract_dir": os.path.join(upload_dir, "extract"),
-        "tmp_dir": os.path.join(upload_dir, "tmp"),
-    }
 
     try:
-        new_workouts = process_files(
-            auth_user, workout_data, workout_file, folders
-        )
+        if request.args.get("async", "false").lower() == "true":
+            upload_task = create_upload_task(
+                auth_user, workout_data, workout_file
+            )
+            try:
+                upload_workouts.send(upload_task_id=upload_task.id)
+            except Exception as e:
+                # task would remain queued
+                set_upload_task_as_errored(
+                    upload_task, "unable to queue workouts upload"
+                )
+                raise WorkoutException(
+                    "error", "error during workouts upload", e
+                ) from e
+            return {
+                "status": "accepted",
+                "data": {"upload_task": upload_task.serialize()},
+            }, 202
+
+        new_workouts = process_files(auth_user, workout_data, workout_file)
         if len(new_workouts) > 0:
             response_object = {
                 "status": "created",
@@ -1245,11 +1678,100 @@ def post_workout(auth_user: User) -> Union[Tuple[Dict, int], HttpResponse]:
             return InternalServerErrorResponse(e.message)
         return InvalidPayloadErrorResponse(e.message, e.status)
 
-    shutil.rmtree(folders["extract_dir"], ignore_errors=True)
-    shutil.rmtree(folders["tmp_dir"], ignore_errors=True)
     return response_object, 201
 
 
+@workouts_blueprint.route(
+    "/workouts/upload_tasks/<string:task_short_id>", methods=["GET"]
+)
+@require_auth(scopes=["workouts:read"])
+def get_workouts_upload_task(
+    auth_user: User, task_short_id: str
+) -> Union[Dict, HttpResponse]:
+    """
+    Get status of a workout file uploaded in asynchronous mode, and results
+    for each processed gpx file.
+
+    Upload task status can be:
+
+    - ``queued``: file is waiting to be processed,
+    - ``in_progress``: files are being processed,
+    - ``successful``: all files are processed without errors,
+    - ``errored``: the upload failed or at least one file is invalid (see
+      errors in files results).
+
+    **Scope**: ``workouts:read``
+
+    **Example request**:
+
+    .. sourcecode:: http
+
+      GET /api/workouts/upload_tasks/4A9ZqbZ8gVBr4y5xkMhe3C HTTP/1.1
+      Content-Type: application/json
+
+    **Example response**:
+
+    .. sourcecode:: http
+
+      HTTP/1.1 200 OK
+      Content-Type: application/json
+
+        {
+          "data": {
+            "upload_task": {
+              "created_at": "Sun, 18 Oct 2026 09:12:37 GMT",
+              "error_message": null,
+              "file_name": "workouts.zip",
+              "files": [
+                {
+                  "error": null,
+                  "file_name": "workout_1.gpx",
+                  "status": "successful",
+                  "workout_id": "PsjeeXbJZ2JJNQcTCPxVvF"
+                },
+                {
+                  "error": "no tracks in gpx file",
+                  "file_name": "workout_2.gpx",
+                  "status": "errored",
+                  "workout_id": null
+                }
+              ],
+              "files_count": 3,
+              "id": "4A9ZqbZ8gVBr4y5xkMhe3C",
+              "processed_files_count": 2,
+              "status": "in_progress",
+              "updated_at": "Sun, 18 Oct 2026 09:12:41 GMT"
+            }
+          },
+          "status": "success"
+        }
+
+    :param string task_short_id: upload task short id
+
+    :reqheader Authorization: OAuth 2.0 Bearer Token
+
+    :statuscode 200: ``success``
+    :statuscode 401:
+        - ``provide a valid auth token``
+        - ``signature expired, please log in again``
+        - ``invalid token, please log in again``
+    :statuscode 403:
+        - ``you do not have permissions, your account is suspended``
+    :statuscode 404: ``upload task not found``
+
+    """
+    upload_task = WorkoutsUploadTask.query.filter_by(
+        uuid=decode_short_id(task_short_id), user_id=auth_user.id
+    ).first()
+    if not upload_task:
+        return NotFoundErrorResponse("upload task not found")
+
+    return {
+        "status": "success",
+        "data": {"upload_task": upload_task.serialize()},
+    }
+
+
 @workouts_blueprint.route("/workouts/no_gpx", methods=["POST"])
 @require_auth(scopes=["workouts:write"])
 def post_workout_no_gpx(